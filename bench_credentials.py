@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la latence d'obtention d'un token par type de credential.
+
+Pour chaque credential (environment, managed_identity, cli, et la chaîne
+DefaultAzureCredential en référence) : temps de construction, premier token,
+puis tokens suivants, avec et sans le cache de CachedCredential (AzureCliCredential
+lance un sous-processus az à chaque get_token). Mesure enfin le coût de
+get_credential avec un choix mémorisé, celui payé au démarrage d'un script.
+
+Les credentials indisponibles dans l'environnement sont signalés avec leur
+erreur et le temps perdu à échouer (ce que DefaultAzureCredential paie pour
+chaque maillon avant le bon).
+
+Usage:
+    python bench_credentials.py
+    python bench_credentials.py --kind cli --kind default --repeat 5
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from credential_factory import (CREDENTIAL_KINDS, GRAPH_SCOPE, CachedCredential,
+                                detect_environment, get_credential, try_credential)
+from profiling import run_profiled
+
+
+def _build_default(env):
+    from azure.identity import DefaultAzureCredential
+
+    # Valeur par défaut de la chaîne, lue dans env plutôt que dans os.environ
+    return DefaultAzureCredential(managed_identity_client_id=env.get("AZURE_CLIENT_ID"))
+
+
+def bench_kind(kind: str, repeat: int) -> Dict[str, Any]:
+    """Construction, premier token et tokens suivants (bruts puis en cache)."""
+    builders = {"default": _build_default} if kind == "default" else None
+    result = try_credential(kind, GRAPH_SCOPE, builders=builders)
+    row = {"kind": kind, "build_ms": result["build_seconds"] * 1000,
+           "first_ms": result["token_seconds"] * 1000, "error": result["error"]}
+    if result["error"]:
+        return row
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result["credential"].get_token(GRAPH_SCOPE)
+    row["next_ms"] = (time.perf_counter() - started) / repeat * 1000
+
+    cached = CachedCredential(result["credential"], kind)
+    cached.remember((GRAPH_SCOPE,), result["token"])
+    started = time.perf_counter()
+    for _ in range(repeat):
+        cached.get_token(GRAPH_SCOPE)
+    row["cached_ms"] = (time.perf_counter() - started) / repeat * 1000
+    return row
+
+
+def bench_factory() -> Dict[str, float]:
+    """get_credential à froid (détection) puis avec le choix mémorisé."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "choice.json")
+        timings = {}
+        for label in ("cold_ms", "remembered_ms"):
+            started = time.perf_counter()
+            get_credential(choice_path=path)
+            timings[label] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def print_results(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'Credential':<18} {'Construction':>13} {'1er token':>11} "
+          f"{'Suivants':>10} {'En cache':>10}")
+    print("-" * 66)
+    for row in rows:
+        if row["error"]:
+            print(f"❌ {row['kind']:<16} {row['build_ms']:>10.1f} ms {row['first_ms']:>8.0f} ms"
+                  f"   {row['error'][:60]}")
+            continue
+        print(f"✅ {row['kind']:<16} {row['build_ms']:>10.1f} ms {row['first_ms']:>8.0f} ms "
+              f"{row['next_ms']:>7.1f} ms {row['cached_ms']:>7.3f} ms")
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Latence des tokens par type de credential")
+    parser.add_argument("--kind", action="append", choices=list(CREDENTIAL_KINDS) + ["default"],
+                        help="Credential à mesurer (répétable, défaut: tous)")
+    parser.add_argument("--repeat", type=int, default=3, help="Tokens suivants mesurés")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    print(f"🔍 Environnement détecté: {', '.join(detect_environment()) or 'aucun credential'}")
+    rows = [bench_kind(kind, args.repeat)
+            for kind in args.kind or list(CREDENTIAL_KINDS) + ["default"]]
+    print_results(rows)
+
+    if any(not row["error"] for row in rows if row["kind"] != "default"):
+        timings = bench_factory()
+        print(f"\n⚡ get_credential: {timings['cold_ms']:.0f} ms à froid, "
+              f"{timings['remembered_ms']:.0f} ms avec le choix mémorisé")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
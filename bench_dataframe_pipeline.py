@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'export de DataFrames : séquentiel contre pipeline
+sérialisation/upload.
+
+Par défaut, l'upload est simulé (latence fixe + bande passante limitée) pour
+isoler l'effet du recouvrement. Avec --live, les fichiers sont réellement
+uploadés dans SHAREPOINT_FOLDER_PATH via SharePointDDASYSTester (az login).
+
+Usage:
+    python bench_dataframe_pipeline.py --frames 60 --rows 2000
+    python bench_dataframe_pipeline.py --frames 50 --live
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from dataframe_pipeline import FrameJob, PipelinedExcelExporter, export_sequential
+from profiling import run_profiled
+
+
+class SimulatedUpload:
+    """Upload simulé : latence aller-retour + débit limité."""
+
+    def __init__(self, latency_seconds: float, bandwidth_mb_s: float):
+        self.latency_seconds = latency_seconds
+        self.bandwidth_bytes_s = bandwidth_mb_s * 1024 * 1024
+
+    def __call__(self, content: bytes, filename: str, content_type: str) -> Optional[str]:
+        time.sleep(self.latency_seconds + len(content) / self.bandwidth_bytes_s)
+        return f"https://example.sharepoint.com/{filename}"
+
+
+def make_frames(count: int, rows: int, cols: int) -> List[FrameJob]:
+    """Génère des DataFrames de test de forme identique."""
+    rng = np.random.default_rng(42)
+    frames = []
+    for i in range(count):
+        data = {f"col_{c}": rng.normal(size=rows) for c in range(cols - 2)}
+        data["categorie"] = rng.choice(["A", "B", "C"], size=rows)
+        data["date"] = pd.date_range("2025-01-01", periods=rows, freq="min")
+        frames.append((f"bench_frame_{i:03d}", pd.DataFrame(data), "Data"))
+    return frames
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Benchmark export pipeliné")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--serialize-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--upload-workers", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.15,
+                        help="Latence simulée par upload (secondes)")
+    parser.add_argument("--bandwidth", type=float, default=5.0,
+                        help="Débit simulé (Mo/s)")
+    parser.add_argument("--live", action="store_true",
+                        help="Upload réel vers SharePoint")
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames, args.rows, args.cols)
+    print(f"📊 {len(frames)} DataFrames de {args.rows} lignes x {args.cols} colonnes")
+
+    if args.live:
+        from write_file_working import SharePointDDASYSTester
+
+        tester = SharePointDDASYSTester(
+            site_url=os.getenv("SHAREPOINT_SITE_URL"),
+            folder_path=os.getenv("SHAREPOINT_FOLDER_PATH"),
+        )
+        if not tester.get_site_and_drive_info():
+            print("❌ Impossible de résoudre le site SharePoint")
+            return
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        frames = [(f"{name}-{stamp}", df, sheet) for name, df, sheet in frames]
+        upload_func = tester.upload_bytes
+        print("🌐 Upload réel vers SharePoint")
+    else:
+        upload_func = SimulatedUpload(args.latency, args.bandwidth)
+        print(f"🧪 Upload simulé: {args.latency * 1000:.0f} ms + {args.bandwidth} Mo/s")
+
+    print("\n1. Export séquentiel...")
+    sequential = export_sequential(upload_func, frames)
+    print(f"   ⏱️  {sequential['wall_seconds']:.2f}s "
+          f"(sérialisation {sequential['serialize_seconds']:.2f}s, "
+          f"upload {sequential['upload_seconds']:.2f}s)")
+
+    print("\n2. Export pipeliné...")
+    exporter = PipelinedExcelExporter(
+        upload_func,
+        serialize_workers=args.serialize_workers,
+        upload_workers=args.upload_workers,
+    )
+    pipelined = exporter.export(frames)
+    print(f"   ⏱️  {pipelined['wall_seconds']:.2f}s "
+          f"(sérialisation cumulée {pipelined['serialize_seconds']:.2f}s, "
+          f"upload cumulé {pipelined['upload_seconds']:.2f}s)")
+
+    speedup = sequential["wall_seconds"] / pipelined["wall_seconds"]
+    print("\n" + "=" * 50)
+    print(f"🚀 Accélération: x{speedup:.2f} "
+          f"({sequential['failed']} / {pipelined['failed']} échecs)")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
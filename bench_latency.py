@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latence des recherches de métadonnées (site, drive, élément par chemin).
+
+Le stand-in local retarde une petite part des lectures, comme un frontal Graph
+lent de temps en temps, puis les mêmes recherches sont mesurées sans puis avec
+doublons (hedging) : p50, p95, p99, maximum et requêtes supplémentaires.
+
+Usage:
+    python bench_latency.py --lookups 2000
+    python bench_latency.py --slow-ratio 0.02 --slow-ms 800 --percentile 90 --budget 0.1
+"""
+
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from unittest.mock import Mock
+
+from graph_client import GraphClient
+from graph_standin import GraphStandIn
+from hedging import HedgePolicy
+from profiling import run_profiled
+
+LOOKUP_PATHS = ("Rapports/2024/janvier.xlsx", "Rapports/2024/fevrier.xlsx", "Exports/donnees.csv")
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)] if ordered else 0.0
+
+
+def seed(standin: GraphStandIn) -> None:
+    """Site, drive et quelques fichiers à rechercher."""
+    site = standin.add_site("site-1", "DDASYS")
+    for path in LOOKUP_PATHS:
+        standin.put_file(site["drive_id"], path, b"x" * 1024, notify=False)
+
+
+def run_lookups(client: GraphClient, lookups: int, workers: int) -> Dict[str, Any]:
+    """Recherches site, drive et élément par chemin en boucle ; latence de chacune."""
+    paths = ["sites/site-1", "sites/site-1/drive"] + [
+        f"drives/drive-site-1/root:/{path}" for path in LOOKUP_PATHS
+    ]
+
+    def lookup(i: int) -> float:
+        started = time.perf_counter()
+        client.request("GET", paths[i % len(paths)], profile="ids_only").raise_for_status()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = sorted(executor.map(lookup, range(lookups)))
+    return {
+        "seconds": time.perf_counter() - started,
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "max": latencies[-1],
+    }
+
+
+def measure(standin: GraphStandIn, lookups: int, workers: int,
+            hedging: Optional[HedgePolicy]) -> Dict[str, Any]:
+    credential = Mock()
+    credential.get_token.return_value = Mock(token="bench", expires_on=4102444800)
+    client = GraphClient(credential, base_url=standin.base_url, hedging=hedging)
+    before = len(standin.request_log)
+    result = run_lookups(client, lookups, workers)
+    result["requests"] = len(standin.request_log) - before
+    return result
+
+
+def print_result(label: str, result: Dict[str, Any], lookups: int) -> None:
+    print(f"   {label:<18} p50 {result['p50'] * 1000:6.1f} ms  p95 {result['p95'] * 1000:6.1f} ms  "
+          f"p99 {result['p99'] * 1000:6.1f} ms  max {result['max'] * 1000:6.0f} ms  "
+          f"{result['requests']} requêtes (+{result['requests'] / lookups - 1:.1%})")
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Latence de queue des recherches de métadonnées")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4, help="Recherches simultanées")
+    parser.add_argument("--slow-ratio", type=float, default=0.02,
+                        help="Part des lectures servies par un frontal lent")
+    parser.add_argument("--slow-ms", type=float, default=300, help="Retard du frontal lent")
+    parser.add_argument("--percentile", type=float, default=95, help="Délai avant doublon")
+    parser.add_argument("--budget", type=float, default=0.05,
+                        help="Doublons autorisés par requête")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with GraphStandIn() as standin:
+        seed(standin)
+        standin.slow_read_ratio = args.slow_ratio
+        standin.slow_read_seconds = args.slow_ms / 1000
+        print(f"🧪 {args.lookups} recherches, {args.slow_ratio:.1%} de lectures "
+              f"retardées de {args.slow_ms:.0f} ms\n")
+
+        print_result("sans doublon", measure(standin, args.lookups, args.workers, None),
+                     args.lookups)
+        with HedgePolicy(percentile=args.percentile, budget_ratio=args.budget) as policy:
+            result = measure(standin, args.lookups, args.workers, policy)
+            print_result(f"doublon p{args.percentile:g}", result, args.lookups)
+            summary = policy.summary()
+        print(f"\n🪞 {summary['hedged']} doublons ({summary['hedge_wins']} gagnants, "
+              f"{summary['budget_denied']} refusés par le budget), délai final "
+              f"{summary['delay'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
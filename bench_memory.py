@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire des chemins d'upload, de téléchargement et de listing.
+
+Chaque chemin est exécuté sous tracemalloc avec échantillonnage du RSS, contre
+un stand-in Graph lancé dans un processus séparé (sa mémoire n'est pas
+comptée). Le rapport donne le pic mémoire en fonction de la taille de la
+charge ; un chemin déclaré à mémoire bornée dont le pic croît avec la charge
+fait échouer le benchmark (code de sortie 1), ce qui permet de l'utiliser en CI.
+
+Usage:
+    python bench_memory.py
+    python bench_memory.py --sizes-mb 8 32 128 --items 2000 8000 32000
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+
+from graph_client import GraphClient
+from profiling import run_profiled
+
+MB = 1024 * 1024
+DRIVE_ID = "bench-drive"
+
+# Un chemin borné peut dépasser son pic initial de 50 % + 1 Mo au plus
+BOUND_RATIO = 1.5
+BOUND_SLACK = 1 * MB
+# Le RSS suit les arènes de l'allocateur et les pages : marge plus large
+RSS_BOUND_SLACK = 8 * MB
+
+
+class MemorySampler:
+    """Échantillonne le RSS du processus dans un thread."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def rss(self) -> int:
+        """
+        RSS anonyme courant en octets (0 hors Linux).
+
+        Les pages des fichiers projetés (upload par mmap) sont exclues : elles
+        restent du cache de pages récupérable par le noyau, pas de la mémoire
+        détenue par le processus.
+        """
+        try:
+            with open(f"/proc/{os.getpid()}/statm") as f:
+                fields = f.read().split()
+            return (int(fields[1]) - int(fields[2])) * self._page_size
+        except (OSError, ValueError):
+            return 0
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.rss())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.start_rss = self.rss()
+        self.peak = self.start_rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+
+def measure(func: Callable[[], Any]) -> Dict[str, float]:
+    """
+    Mesure le pic mémoire d'un appel.
+
+    Returns:
+        Dict: {"peak_traced", "peak_rss_delta", "seconds"} (octets, secondes)
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    with MemorySampler() as sampler:
+        func()
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    if not was_tracing:
+        tracemalloc.stop()
+    return {
+        "peak_traced": peak - baseline,
+        "peak_rss_delta": max(sampler.peak - sampler.start_rss, 0),
+        "seconds": seconds,
+    }
+
+
+def check_bounded(peaks: List[float], slack: float = BOUND_SLACK) -> bool:
+    """Vérifie que le pic mémoire ne croît pas avec la charge."""
+    return max(peaks) <= peaks[0] * BOUND_RATIO + slack
+
+
+def check_measures_bounded(results: List[Dict[str, float]]) -> bool:
+    """
+    Vérifie qu'une série de mesures reste bornée, en tracemalloc comme en RSS.
+
+    Args:
+        results: Mesures de measure() par charge croissante
+
+    Returns:
+        bool: True si aucun des deux pics ne croît avec la charge
+    """
+    return (check_bounded([r["peak_traced"] for r in results])
+            and check_bounded([r["peak_rss_delta"] for r in results], RSS_BOUND_SLACK))
+
+
+def _serve_standin(port: int, listing_sizes: List[int], ready: Any) -> None:
+    """Processus du stand-in : drive de test et dossiers de listing."""
+    from graph_standin import GraphStandIn
+
+    logging.basicConfig(level=logging.WARNING)
+    standin = GraphStandIn(port=port)
+    standin.keep_content = False
+    drive = standin.add_drive(DRIVE_ID)
+    for count in listing_sizes:
+        folder_id = drive.ensure_folder(f"listing_{count}")
+        drive.add_files_bulk(folder_id, ((f"f_{i:07d}.txt", 1024) for i in range(count)))
+    ready.set()
+    standin._server.serve_forever()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def build_paths(client: GraphClient, tester: Any, workdir: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Déclare les chemins mesurés.
+
+    Chaque chemin fournit prepare(taille) -> appel à mesurer, l'unité de la
+    taille ("Mo" ou "éléments"), s'il doit être à mémoire bornée et,
+    éventuellement, ses propres tailles (l'export Excel est lent).
+    """
+    def source_file(size_mb: int) -> Path:
+        path = workdir / f"source_{size_mb}.bin"
+        if not path.exists():
+            block = os.urandom(MB)
+            with open(path, "wb") as f:
+                for _ in range(size_mb):
+                    f.write(block)
+        return path
+
+    def upload_buffered(size_mb):
+        path = source_file(size_mb)
+        return lambda: client.upload_content(DRIVE_ID, path.name, path.read_bytes())
+
+    def upload_streamed(size_mb):
+        path = source_file(size_mb)
+        return lambda: client.upload_file(DRIVE_ID, path.name, str(path))
+
+    def text_upload(size_mb):
+        content = "x" * (size_mb * MB)
+        return lambda: tester.upload_text_file(content, f"texte_{size_mb}.txt")
+
+    def excel_upload(size_mb):
+        # Environ 25 000 lignes de 4 flottants par Mo de xlsx
+        rows = size_mb * 25000
+        df = pd.DataFrame(np.random.default_rng(0).normal(size=(rows, 4)),
+                          columns=list("abcd"))
+        return lambda: tester.upload_excel_file(df, f"excel_{size_mb}")
+
+    def download_buffered(size_mb):
+        client.upload_file(DRIVE_ID, f"download_{size_mb}.bin", str(source_file(size_mb)))
+        return lambda: client.request(
+            "GET", f"drives/{DRIVE_ID}/root:/download_{size_mb}.bin:/content"
+        ).content
+
+    def download_streamed(size_mb):
+        client.upload_file(DRIVE_ID, f"download_{size_mb}.bin", str(source_file(size_mb)))
+
+        def run():
+            with open(workdir / "download.bin", "wb") as f:
+                client.download_to(DRIVE_ID, f"download_{size_mb}.bin", f)
+        return run
+
+    def listing_materialized(count):
+        return lambda: list(client.iter_pages(f"drives/{DRIVE_ID}/root:/listing_{count}:/children"))
+
+    def listing_streamed(count):
+        return lambda: sum(
+            1 for _ in client.iter_pages(f"drives/{DRIVE_ID}/root:/listing_{count}:/children")
+        )
+
+    return {
+        "upload.buffered": {"prepare": upload_buffered, "unit": "Mo", "bounded": False},
+        "upload.streamed": {"prepare": upload_streamed, "unit": "Mo", "bounded": True},
+        "upload.text": {"prepare": text_upload, "unit": "Mo", "bounded": True},
+        "upload.excel": {"prepare": excel_upload, "unit": "Mo", "bounded": False,
+                         "sizes": [1, 4]},
+        "download.buffered": {"prepare": download_buffered, "unit": "Mo", "bounded": False},
+        "download.streamed": {"prepare": download_streamed, "unit": "Mo", "bounded": True},
+        "listing.materialized": {"prepare": listing_materialized, "unit": "éléments",
+                                 "bounded": False},
+        "listing.streamed": {"prepare": listing_streamed, "unit": "éléments", "bounded": True},
+    }
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Benchmark mémoire des transferts")
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[8, 32, 96],
+                        help="Tailles des transferts (au-delà de 4 Mo : sessions d'upload)")
+    parser.add_argument("--items", type=int, nargs="+", default=[2000, 8000, 32000])
+    parser.add_argument("--path", action="append", help="Chemin à mesurer (tous par défaut)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    port = _free_port()
+    context = multiprocessing.get_context("spawn")
+    ready = context.Event()
+    server = context.Process(target=_serve_standin, args=(port, args.items, ready), daemon=True)
+    server.start()
+    ready.wait(120)
+
+    from write_file_working import SharePointDDASYSTester
+
+    logging.getLogger().setLevel(logging.WARNING)
+    credential = Mock()
+    credential.get_token.return_value = Mock(token="bench", expires_on=4102444800)
+    client = GraphClient(credential, base_url=f"http://127.0.0.1:{port}/v1.0")
+    tester = SharePointDDASYSTester(site_url="", folder_path="")
+    tester.site_id, tester.drive_id, tester.client = "bench-site", DRIVE_ID, client
+
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = build_paths(client, tester, Path(workdir))
+        selected = args.path or list(paths)
+        print(f"{'chemin':<22}{'charge':>12}{'pic traced':>14}{'pic RSS':>12}{'ratio':>8}")
+        for name in selected:
+            spec = paths[name]
+            sizes = spec.get("sizes") or (args.sizes_mb if spec["unit"] == "Mo" else args.items)
+            results = []
+            for size in sizes:
+                call = spec["prepare"](size)
+                result = measure(call)
+                results.append(result)
+                ratio = (f"{result['peak_traced'] / (size * MB):.2f}"
+                         if spec["unit"] == "Mo" else "-")
+                print(f"{name:<22}{size:>8} {spec['unit']:<3}"
+                      f"{result['peak_traced'] / MB:>12.1f}Mo"
+                      f"{result['peak_rss_delta'] / MB:>10.1f}Mo{ratio:>8}")
+            if spec["bounded"] and not check_measures_bounded(results):
+                failures.append(name)
+
+    server.terminate()
+    print("\n" + "=" * 68)
+    if failures:
+        print(f"❌ Chemins qui ne sont plus à mémoire bornée: {', '.join(failures)}")
+        raise SystemExit(1)
+    print("✅ Tous les chemins bornés le restent")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
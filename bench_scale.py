@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test à l'échelle des chemins listing, delta, résolution d'IDs et upload.
+
+Peuple un stand-in Graph local avec une charge synthétique (workload_generator)
+puis mesure chaque chemin à travers GraphClient, sans tenant SharePoint.
+
+Usage:
+    python bench_scale.py --files 100000
+    python bench_scale.py --files 1000000 --depth 2 --fanout 20 --lookups 2000
+"""
+
+import argparse
+import logging
+import random
+import time
+from typing import Any, Dict
+from unittest.mock import Mock
+
+from drive_index import DriveIndex, sync_delta
+from graph_client import GraphClient
+from graph_standin import GraphStandIn
+from workload_generator import WorkloadGenerator, WorkloadSpec, _rss_mb, seed_standin
+from profiling import run_profiled
+
+
+def _timed(label: str, func, count_label: str = "éléments") -> Dict[str, Any]:
+    """Exécute une étape et affiche son débit."""
+    started = time.perf_counter()
+    count = func()
+    seconds = time.perf_counter() - started
+    rate = count / seconds if seconds > 0 else 0.0
+    print(f"   {label:<28} {count:>9} {count_label} en {seconds:7.2f}s ({rate:,.0f}/s)")
+    return {"count": count, "seconds": seconds}
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Test à l'échelle contre le stand-in")
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--size-profile", default="mixed")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=999, help="$top des listings")
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--uploads", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    spec = WorkloadSpec(file_count=args.files, size_profile=args.size_profile,
+                        folder_depth=args.depth, folder_fanout=args.fanout)
+
+    standin = GraphStandIn()
+    seeded = seed_standin(standin, spec)
+    drive_id = seeded["drive_id"]
+    print(f"🧪 Stand-in: {seeded['files']} fichiers, {seeded['folders']} dossiers, "
+          f"seed {seeded['seconds']:.1f}s, RSS {_rss_mb() or 0:.0f} Mo")
+
+    credential = Mock()
+    credential.get_token.return_value = Mock(token="bench", expires_on=4102444800)
+    client = GraphClient(credential, base_url=standin.base_url)
+    index = DriveIndex(":memory:")
+    generator = WorkloadGenerator(spec)
+    folder = generator.folder_paths()[0]
+    top = {"$top": str(args.page_size)}
+
+    with standin:
+        print("\n📋 Chemins mesurés:")
+        _timed("listing d'un dossier", lambda: sum(1 for _ in client.iter_pages(
+            f"drives/{drive_id}/root:/{folder}:/children", params=top)))
+        _timed("delta complet -> index", lambda: sync_delta(client, index, drive_id))
+
+        standin.put_file(drive_id, f"{folder}/nouveau.txt", b"delta", notify=False)
+        _timed("delta incrémental", lambda: sync_delta(client, index, drive_id))
+
+        sample = random.Random(1).sample(
+            [f"{f}/{n}".lstrip("/") for f, n, _ in generator.iter_files()],
+            min(args.lookups, args.files),
+        )
+        _timed("résolution chemin -> ID (Graph)", lambda: sum(
+            1 for path in sample
+            if client.get_json(f"drives/{drive_id}/root:/{path}", profile="ids_only",
+                               kind="item").get("id")
+        ))
+        _timed("résolution chemin -> ID (index)", lambda: sum(
+            1 for path in sample if index.get_item_id(drive_id, path)
+        ))
+        _timed("upload de petits fichiers", lambda: sum(
+            1 for i in range(args.uploads)
+            if client.upload_content(drive_id, f"{folder}/upload_{i:05d}.txt", b"x" * 1024)
+        ))
+
+    index.close()
+    print(f"\n💾 RSS final: {_rss_mb() or 0:.0f} Mo")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark des profils de projection $select : taille des réponses JSON et temps
+de décodage pour le listing d'une bibliothèque volumineuse.
+
+Mode hors ligne (par défaut) : génère des driveItems synthétiques représentatifs
+et simule la projection côté serveur. Mode réel (--drive-id) : pagine le drive
+avec chaque profil via Microsoft Graph (credential choisi par credential_factory).
+
+Usage:
+    python bench_select_profiles.py --items 50000
+    python bench_select_profiles.py --drive-id <DRIVE_ID> --max-pages 20
+"""
+
+import argparse
+import json
+import time
+import uuid
+from typing import Any, Dict, List
+
+from graph_client import SELECT_PROFILES, GraphClient
+from profiling import run_profiled
+
+PAGE_SIZE = 200
+
+
+def make_drive_item(index: int) -> Dict[str, Any]:
+    """Génère un driveItem complet tel que renvoyé sans $select."""
+    item_id = f"01ABCDEF{index:012d}"
+    user = {
+        "user": {
+            "email": "jean.dupont@ddasys.onmicrosoft.com",
+            "id": str(uuid.UUID(int=index)),
+            "displayName": "Jean Dupont",
+        }
+    }
+    return {
+        "@odata.etag": f'"{{{uuid.UUID(int=index)}}},3"',
+        "@microsoft.graph.downloadUrl": (
+            "https://ddasys.sharepoint.com/sites/DDASYS/_layouts/15/download.aspx"
+            f"?UniqueId={uuid.UUID(int=index)}&Translate=false&tempauth=" + "x" * 400
+        ),
+        "createdDateTime": "2025-01-15T10:21:33Z",
+        "eTag": f'"{{{uuid.UUID(int=index)}}},3"',
+        "id": item_id,
+        "lastModifiedDateTime": "2025-03-02T08:12:45Z",
+        "name": f"rapport-{index:06d}.xlsx",
+        "webUrl": (
+            "https://ddasys.sharepoint.com/sites/DDASYS/Documents%20partages/"
+            f"General/rapport-{index:06d}.xlsx"
+        ),
+        "cTag": f'"c:{{{uuid.UUID(int=index)}}},2"',
+        "size": 10_000 + index,
+        "createdBy": user,
+        "lastModifiedBy": user,
+        "parentReference": {
+            "driveType": "documentLibrary",
+            "driveId": "b!6CsCkE1bfkO3uEKKW0qddZ7N3t_TTA1HoI_gtgK_g5BfZDakrgbgT4Irvjj",
+            "id": "01ABCDEFPARENT",
+            "name": "General",
+            "path": "/drives/b!6CsCkE1bfkO3uEKKW0qddZ7N3t/root:/General",
+            "siteId": str(uuid.UUID(int=42)),
+        },
+        "file": {
+            "mimeType": (
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            ),
+            "hashes": {"quickXorHash": "AAAAAAAAAAAAAAAAAAAAAAAAAAA="},
+        },
+        "fileSystemInfo": {
+            "createdDateTime": "2025-01-15T10:21:33Z",
+            "lastModifiedDateTime": "2025-03-02T08:12:45Z",
+        },
+        "shared": {"scope": "users"},
+    }
+
+
+def project(item: Dict[str, Any], select: str) -> Dict[str, Any]:
+    """Simule la projection $select appliquée par le serveur."""
+    if not select:
+        return item
+    fields = select.split(",")
+    projected = {key: item[key] for key in fields if key in item}
+    if "@odata.etag" in item:
+        projected["@odata.etag"] = item["@odata.etag"]
+    return projected
+
+
+def bench_offline(total_items: int) -> List[Dict[str, Any]]:
+    """Mesure taille et décodage des pages synthétiques pour chaque profil."""
+    items = [make_drive_item(i) for i in range(total_items)]
+    results = []
+
+    for profile, selects in SELECT_PROFILES.items():
+        select = selects.get("item", "")
+        pages = []
+        for start in range(0, total_items, PAGE_SIZE):
+            page = {"value": [project(it, select) for it in items[start:start + PAGE_SIZE]]}
+            pages.append(json.dumps(page).encode("utf-8"))
+
+        payload_bytes = sum(len(p) for p in pages)
+        started = time.perf_counter()
+        for page in pages:
+            json.loads(page)
+        decode_seconds = time.perf_counter() - started
+
+        results.append({
+            "profile": profile,
+            "pages": len(pages),
+            "payload_bytes": payload_bytes,
+            "decode_seconds": decode_seconds,
+        })
+    return results
+
+
+def bench_live(drive_id: str, max_pages: int) -> List[Dict[str, Any]]:
+    """Mesure taille et décodage réels en paginant un drive Graph."""
+    from credential_factory import get_credential
+
+    client = GraphClient(get_credential())
+    results = []
+
+    for profile in SELECT_PROFILES:
+        path = f"drives/{drive_id}/root/children"
+        params = {"$top": str(PAGE_SIZE)}
+        payload_bytes = 0
+        decode_seconds = 0.0
+        pages = 0
+        next_url = None
+
+        while pages < max_pages:
+            if next_url:
+                response = client.request("GET", next_url)
+            else:
+                response = client.request("GET", path, profile=profile, params=params)
+            response.raise_for_status()
+            payload_bytes += len(response.content)
+            started = time.perf_counter()
+            page = json.loads(response.content)
+            decode_seconds += time.perf_counter() - started
+            pages += 1
+            next_url = page.get("@odata.nextLink")
+            if not next_url:
+                break
+
+        results.append({
+            "profile": profile,
+            "pages": pages,
+            "payload_bytes": payload_bytes,
+            "decode_seconds": decode_seconds,
+        })
+    return results
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    """Affiche le tableau comparatif par rapport au profil full."""
+    baseline = next(r for r in results if r["profile"] == "full")
+    print(f"{'Profil':<10} {'Pages':>6} {'Octets':>14} {'Ratio':>7} "
+          f"{'Décodage (ms)':>14} {'Ratio':>7}")
+    print("-" * 64)
+    for r in results:
+        size_ratio = r["payload_bytes"] / baseline["payload_bytes"]
+        time_ratio = (r["decode_seconds"] / baseline["decode_seconds"]
+                      if baseline["decode_seconds"] else 0.0)
+        print(f"{r['profile']:<10} {r['pages']:>6} {r['payload_bytes']:>14,} "
+              f"{size_ratio:>6.0%} {r['decode_seconds'] * 1000:>14.1f} "
+              f"{time_ratio:>6.0%}")
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=50_000,
+                        help="Nombre de driveItems synthétiques (mode hors ligne)")
+    parser.add_argument("--drive-id", help="Drive à paginer (mode réel)")
+    parser.add_argument("--max-pages", type=int, default=20,
+                        help="Nombre maximal de pages par profil (mode réel)")
+    args = parser.parse_args()
+
+    if args.drive_id:
+        print(f"📊 Benchmark réel sur le drive {args.drive_id}")
+        results = bench_live(args.drive_id, args.max_pages)
+    else:
+        print(f"📊 Benchmark hors ligne sur {args.items:,} driveItems synthétiques")
+        results = bench_offline(args.items)
+
+    print_results(results)
+
+
+if __name__ == "__main__":
+    run_profiled(main)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark des copies d'octets côté client par Mo uploadé.
+
+Compare, contre le stand-in local, les façons d'envoyer un fichier disque :
+lecture complète (file.read()), corps fichier lu par urllib3, flux découpé
+par stream.read() en session d'upload, et source projetée en mémoire
+(GraphClient.upload). Les lectures du fichier sont comptées par un FileIO
+instrumenté : chaque octet lu est un octet copié dans un objet bytes Python.
+Une source mmap n'appelle jamais read : ses tranches vont à la socket telles
+quelles.
+
+Usage:
+    python bench_upload_copies.py --mb 2 --mb 32
+"""
+
+import argparse
+import io
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+from unittest.mock import Mock
+
+from graph_client import SIMPLE_UPLOAD_LIMIT, GraphClient
+from graph_standin import GraphStandIn
+from profiling import run_profiled
+
+MB = 1024 * 1024
+
+
+class CountingFile(io.FileIO):
+    """Fichier dont les lectures (copies vers des bytes) sont comptées."""
+
+    copied = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = super().read(size)
+        CountingFile.copied += len(data or b"")
+        return data
+
+    def readinto(self, buffer) -> int:
+        count = super().readinto(buffer)
+        CountingFile.copied += count or 0
+        return count
+
+    def readall(self) -> bytes:
+        data = super().readall()
+        CountingFile.copied += len(data)
+        return data
+
+
+class StreamOnly:
+    """Flux sans descripteur (lu par read), comme un upload_stream classique."""
+
+    def __init__(self, raw: io.RawIOBase):
+        self.raw = raw
+
+    def read(self, size: int = -1) -> bytes:
+        return self.raw.read(size)
+
+
+def variants(client: GraphClient, drive_id: str, size: int) -> Dict[str, Callable[[str], Any]]:
+    """Façons d'uploader le fichier, selon sa taille."""
+    def full_read(path):
+        with CountingFile(path) as f:
+            content = f.read()
+        if size > SIMPLE_UPLOAD_LIMIT:
+            return client.upload_stream(drive_id, "bench/read.bin", io.BytesIO(content), size)
+        return client.upload_content(drive_id, "bench/read.bin", content)
+
+    def file_body(path):
+        with CountingFile(path) as f:
+            return client.request("PUT", f"drives/{drive_id}/root:/bench/file.bin:/content",
+                                  data=f, headers={"Content-Length": str(size)})
+
+    def stream_chunks(path):
+        with CountingFile(path) as f:
+            return client.upload_stream(drive_id, "bench/stream.bin", StreamOnly(f), size)
+
+    def mapped(path):
+        with CountingFile(path) as f:
+            return client.upload(drive_id, "bench/mmap.bin", f)
+
+    result = {"file.read() complet": full_read}
+    if size <= SIMPLE_UPLOAD_LIMIT:
+        result["corps fichier (urllib3)"] = file_body
+    else:
+        result["flux read() par fragment"] = stream_chunks
+    result["mmap (GraphClient.upload)"] = mapped
+    return result
+
+
+def measure(client: GraphClient, drive_id: str, path: str, size: int,
+            repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for label, upload in variants(client, drive_id, size).items():
+        CountingFile.copied = 0
+        started = time.perf_counter()
+        for _ in range(repeat):
+            upload(path)
+        seconds = time.perf_counter() - started
+        sent_mb = size * repeat / MB
+        results.append({"variant": label, "copied_per_mb": CountingFile.copied / MB / sent_mb,
+                        "mb_per_second": sent_mb / seconds})
+    return results
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Octets copiés par Mo uploadé")
+    parser.add_argument("--mb", type=float, action="append",
+                        help="Taille du fichier en Mo (répétable, défaut 2 et 32)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    credential = Mock()
+    credential.get_token.return_value = Mock(token="bench", expires_on=4102444800)
+
+    with GraphStandIn() as standin, tempfile.TemporaryDirectory() as tmp:
+        standin.keep_content = False
+        drive = standin.add_drive("d")
+        drive.ensure_folder("bench")
+        client = GraphClient(credential, base_url=standin.base_url)
+
+        for mb in args.mb or [2, 32]:
+            size = int(mb * MB)
+            path = os.path.join(tmp, f"source-{size}.bin")
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+            print(f"\n📤 Fichier de {mb:g} Mo ({'session' if size > SIMPLE_UPLOAD_LIMIT else 'PUT simple'})")
+            for result in measure(client, "d", path, size, args.repeat):
+                print(f"   {result['variant']:<28} {result['copied_per_mb']:5.2f} Mo copiés/Mo  "
+                      f"{result['mb_per_second']:7.1f} Mo/s")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
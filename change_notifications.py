@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Traitement piloté par notifications de changement Microsoft Graph.
+
+Plutôt que de lister root/children en boucle pour détecter les nouveaux
+fichiers, on s'abonne aux changements du drive : Graph poste une notification
+sur un récepteur HTTP local, qui déclenche une requête delta incrémentale
+(drive_index.sync_delta) et ne transmet que les éléments modifiés.
+
+Graph exige une URL de notification HTTPS joignable publiquement (reverse proxy
+ou tunnel vers le récepteur local). Les abonnements driveItem expirent au plus
+tard après 42300 minutes et doivent être renouvelés avant échéance.
+
+Usage:
+    python change_notifications.py --drive-id <id> --public-url https://<hôte>/notifications
+"""
+
+import argparse
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from drive_index import DEFAULT_INDEX_PATH, DriveIndex, sync_delta
+from graph_client import GraphClient
+from profiling import run_profiled
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie maximale d'un abonnement driveItem (minutes)
+MAX_SUBSCRIPTION_MINUTES = 42300
+
+# Renouvellement lorsqu'il reste moins de cette durée (minutes)
+DEFAULT_RENEW_MARGIN_MINUTES = 60
+
+DEFAULT_NOTIFICATION_PATH = "/notifications"
+
+# Callback appelé après synchronisation : (drive_id, éléments modifiés)
+ChangeCallback = Callable[[str, List[Dict[str, Any]]], None]
+
+
+def _parse_expiration(value: str) -> datetime:
+    """Convertit expirationDateTime (ISO 8601) en datetime UTC."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class SubscriptionManager:
+    """Crée, renouvelle et expire les abonnements aux changements des drives."""
+
+    def __init__(
+        self,
+        client: GraphClient,
+        notification_url: str,
+        lifetime_minutes: int = MAX_SUBSCRIPTION_MINUTES,
+        renew_margin_minutes: int = DEFAULT_RENEW_MARGIN_MINUTES,
+        state_path: Optional[str] = None,
+    ):
+        """
+        Initialise le gestionnaire.
+
+        Args:
+            client: Client Graph
+            notification_url: URL publique du récepteur
+            lifetime_minutes: Durée de vie demandée pour chaque abonnement
+            renew_margin_minutes: Marge avant expiration déclenchant le renouvellement
+            state_path: Fichier JSON des abonnements (None pour ne pas persister)
+        """
+        self.client = client
+        self.notification_url = notification_url
+        self.lifetime_minutes = min(lifetime_minutes, MAX_SUBSCRIPTION_MINUTES)
+        self.renew_margin = timedelta(minutes=renew_margin_minutes)
+        self.state_path = Path(state_path) if state_path else None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._renewal_thread: Optional[threading.Thread] = None
+        self.subscriptions: Dict[str, Dict[str, Any]] = {}
+        if self.state_path and self.state_path.exists():
+            try:
+                self.subscriptions = json.loads(self.state_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"État des abonnements illisible, ignoré: {e}")
+
+    def _save(self) -> None:
+        """Persiste l'état des abonnements."""
+        if self.state_path:
+            self.state_path.write_text(
+                json.dumps(self.subscriptions, indent=2, ensure_ascii=False), encoding="utf-8"
+            )
+
+    def _expiration(self) -> str:
+        expires = datetime.now(timezone.utc) + timedelta(minutes=self.lifetime_minutes)
+        return expires.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    def create(self, drive_id: str, change_type: str = "updated") -> Dict[str, Any]:
+        """
+        Crée un abonnement sur la racine d'un drive.
+
+        Graph valide l'URL de notification pendant cet appel : le récepteur doit
+        déjà être démarré.
+
+        Args:
+            drive_id: ID du drive
+            change_type: Type de changement ("updated" pour les drives)
+
+        Returns:
+            Dict: Abonnement créé (lève requests.HTTPError si erreur)
+        """
+        client_state = secrets.token_urlsafe(24)
+        response = self.client.request("POST", "subscriptions", json={
+            "changeType": change_type,
+            "notificationUrl": self.notification_url,
+            "resource": f"/drives/{drive_id}/root",
+            "expirationDateTime": self._expiration(),
+            "clientState": client_state,
+        })
+        response.raise_for_status()
+        subscription = response.json()
+
+        with self._lock:
+            self.subscriptions[subscription["id"]] = {
+                "id": subscription["id"],
+                "drive_id": drive_id,
+                "client_state": client_state,
+                "expiration": subscription["expirationDateTime"],
+            }
+            self._save()
+        logger.info(f"Abonnement {subscription['id']} créé sur le drive {drive_id}")
+        return subscription
+
+    def renew(self, subscription_id: str) -> Dict[str, Any]:
+        """
+        Prolonge un abonnement ; le recrée s'il a déjà expiré côté Graph.
+
+        Returns:
+            Dict: Abonnement renouvelé ou recréé
+        """
+        response = self.client.request(
+            "PATCH", f"subscriptions/{subscription_id}",
+            json={"expirationDateTime": self._expiration()},
+        )
+        if response.status_code == 404:
+            with self._lock:
+                entry = self.subscriptions.pop(subscription_id, None)
+                self._save()
+            if entry is None:
+                response.raise_for_status()
+            logger.warning(f"Abonnement {subscription_id} expiré, recréation")
+            return self.create(entry["drive_id"])
+
+        response.raise_for_status()
+        subscription = response.json()
+        with self._lock:
+            if subscription_id in self.subscriptions:
+                self.subscriptions[subscription_id]["expiration"] = subscription[
+                    "expirationDateTime"
+                ]
+                self._save()
+        logger.info(f"Abonnement {subscription_id} renouvelé")
+        return subscription
+
+    def delete(self, subscription_id: str) -> None:
+        """Supprime un abonnement (ignoré s'il n'existe plus côté Graph)."""
+        response = self.client.request("DELETE", f"subscriptions/{subscription_id}")
+        if response.status_code not in (204, 404):
+            response.raise_for_status()
+        with self._lock:
+            self.subscriptions.pop(subscription_id, None)
+            self._save()
+        logger.info(f"Abonnement {subscription_id} supprimé")
+
+    def delete_all(self) -> None:
+        """Supprime tous les abonnements gérés."""
+        for subscription_id in list(self.subscriptions):
+            try:
+                self.delete(subscription_id)
+            except requests.RequestException as e:
+                logger.error(f"Suppression de {subscription_id} impossible: {e}")
+
+    def renew_due(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Renouvelle les abonnements proches de l'expiration.
+
+        Returns:
+            Liste des IDs d'abonnements renouvelés (ou recréés)
+        """
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            due = [
+                sub_id for sub_id, entry in self.subscriptions.items()
+                if _parse_expiration(entry["expiration"]) - now <= self.renew_margin
+            ]
+        renewed = []
+        for subscription_id in due:
+            try:
+                renewed.append(self.renew(subscription_id)["id"])
+            except requests.RequestException as e:
+                logger.error(f"Renouvellement de {subscription_id} impossible: {e}")
+        return renewed
+
+    def start_renewal(self, interval_seconds: float = 300.0) -> None:
+        """Démarre le renouvellement périodique dans un thread."""
+        def loop():
+            while not self._stop.wait(interval_seconds):
+                self.renew_due()
+
+        self._stop.clear()
+        self._renewal_thread = threading.Thread(target=loop, daemon=True)
+        self._renewal_thread.start()
+
+    def stop_renewal(self) -> None:
+        """Arrête le renouvellement périodique."""
+        self._stop.set()
+        if self._renewal_thread:
+            self._renewal_thread.join()
+
+    def validate(self, notification: Dict[str, Any]) -> Optional[str]:
+        """
+        Vérifie une notification (abonnement connu et clientState attendu).
+
+        Returns:
+            str: ID du drive concerné, ou None si la notification est rejetée
+        """
+        with self._lock:
+            entry = self.subscriptions.get(notification.get("subscriptionId", ""))
+        if entry is None:
+            return None
+        if not secrets.compare_digest(
+            str(notification.get("clientState") or ""), entry["client_state"]
+        ):
+            return None
+        return entry["drive_id"]
+
+
+class NotificationReceiver:
+    """Récepteur HTTP local des notifications de changement."""
+
+    def __init__(
+        self,
+        manager: SubscriptionManager,
+        on_change: Callable[[str], Any],
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        path: str = DEFAULT_NOTIFICATION_PATH,
+        debounce_seconds: float = 1.0,
+    ):
+        """
+        Initialise le récepteur (le serveur démarre avec start()).
+
+        Args:
+            manager: Gestionnaire d'abonnements (validation du clientState)
+            on_change: Appelé avec l'ID du drive à synchroniser
+            host: Interface d'écoute
+            port: Port d'écoute (0 pour un port libre)
+            path: Chemin HTTP des notifications
+            debounce_seconds: Regroupement des notifications rapprochées
+        """
+        self.manager = manager
+        self.on_change = on_change
+        self.path = path
+        self.debounce_seconds = debounce_seconds
+        self.stats = {"received": 0, "rejected": 0, "syncs": 0, "errors": 0}
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def url(self) -> str:
+        """URL locale du récepteur."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def start(self) -> "NotificationReceiver":
+        """Démarre le serveur HTTP et le worker de synchronisation."""
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, daemon=True),
+            threading.Thread(target=self._worker, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Arrête le serveur et le worker."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _accept(self, payload: Dict[str, Any]) -> None:
+        """Valide les notifications reçues et met en file les drives concernés."""
+        for notification in payload.get("value", []):
+            self.stats["received"] += 1
+            drive_id = self.manager.validate(notification)
+            if drive_id is None:
+                self.stats["rejected"] += 1
+                logger.warning(
+                    f"Notification rejetée (abonnement {notification.get('subscriptionId')})"
+                )
+                continue
+            self._queue.put(drive_id)
+
+    def _worker(self) -> None:
+        """Regroupe les notifications par drive et déclenche les synchronisations."""
+        while True:
+            drive_id = self._queue.get()
+            if drive_id is None:
+                return
+            pending = {drive_id}
+            deadline = time.monotonic() + self.debounce_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    more = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if more is None:
+                    self._queue.put(None)
+                    break
+                pending.add(more)
+
+            for pending_drive in pending:
+                try:
+                    self.on_change(pending_drive)
+                    self.stats["syncs"] += 1
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"Synchronisation du drive {pending_drive} échouée: {e}")
+
+    def _make_handler(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _reply(self, status: int, body: bytes = b"",
+                       content_type: str = "text/plain") -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                parsed = urllib.parse.urlsplit(self.path)
+                if parsed.path != receiver.path:
+                    self._reply(404)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+
+                # Validation de l'URL lors de la création de l'abonnement
+                token = urllib.parse.parse_qs(parsed.query).get("validationToken")
+                if token:
+                    self._reply(200, token[0].encode("utf-8"))
+                    return
+
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    self._reply(400)
+                    return
+                # Graph attend une réponse en moins de 3 secondes : traitement différé
+                receiver._accept(payload)
+                self._reply(202)
+
+        return Handler
+
+
+def delta_sync_handler(
+    client: GraphClient, index: DriveIndex, on_items: Optional[ChangeCallback] = None
+) -> Callable[[str], List[Dict[str, Any]]]:
+    """
+    Construit le callback du récepteur : delta incrémental puis éléments modifiés.
+
+    Args:
+        client: Client Graph
+        index: Index local (porte le deltaLink)
+        on_items: Appelé avec (drive_id, éléments modifiés) après chaque synchronisation
+
+    Returns:
+        Callable: Fonction drive_id -> éléments modifiés
+    """
+    def handle(drive_id: str) -> List[Dict[str, Any]]:
+        before = index.current_sequence(drive_id)
+        sync_delta(client, index, drive_id)
+        changed = index.changed_since(drive_id, before)
+        if on_items and changed:
+            on_items(drive_id, changed)
+        return changed
+
+    return handle
+
+
+def print_changes(drive_id: str, items: List[Dict[str, Any]]) -> None:
+    """Affiche les éléments modifiés d'un drive."""
+    files = [entry for entry in items if not entry["is_folder"]]
+    if files:
+        print(f"🔔 {len(files)} changement(s) sur le drive {drive_id}")
+    for entry in files:
+        status = "🗑️  supprimé" if entry["deleted"] else "📄 modifié"
+        print(f"   {status}: {entry['path']}")
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Notifications de changement SharePoint")
+    parser.add_argument("--drive-id", required=True, help="ID du drive à surveiller")
+    parser.add_argument("--public-url", required=True,
+                        help="URL HTTPS publique routée vers le récepteur")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default=DEFAULT_INDEX_PATH, help="Index SQLite")
+    parser.add_argument("--state", default="subscriptions.json",
+                        help="Fichier d'état des abonnements")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from credential_factory import get_credential
+
+    client = GraphClient(get_credential())
+    index = DriveIndex(args.db)
+    manager = SubscriptionManager(client, args.public_url, state_path=args.state)
+    handler = delta_sync_handler(client, index, on_items=print_changes)
+    path = urllib.parse.urlsplit(args.public_url).path or DEFAULT_NOTIFICATION_PATH
+    receiver = NotificationReceiver(manager, handler, args.host, args.port, path)
+
+    print("🔄 Synchronisation initiale...")
+    sync_delta(client, index, args.drive_id)
+
+    receiver.start()
+    print(f"👂 Récepteur en écoute sur {args.host}:{args.port}{path}")
+    if not any(e["drive_id"] == args.drive_id for e in manager.subscriptions.values()):
+        manager.create(args.drive_id)
+    manager.renew_due()
+    manager.start_renewal()
+    print("✅ Abonnement actif, en attente de changements (Ctrl+C pour arrêter)")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n🛑 Arrêt...")
+    finally:
+        manager.stop_renewal()
+        manager.delete_all()
+        receiver.stop()
+        index.close()
+        print(f"📊 {receiver.stats}")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
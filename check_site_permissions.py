@@ -4,22 +4,39 @@ Script pour vérifier les permissions d'un site SharePoint spécifique
 via l'API Microsoft Graph.
 """
 
+import os
+import sys
+
 import requests
 import json
 from azure.identity import AzureCliCredential
+from profiling import run_profiled
+
+DEFAULT_SITE_ID = (
+    "ddasys.sharepoint.com,90022be8-5b4d-437e-b7b8-428a5b4a9d75,"
+    "dfdecd9e-4cd3-470d-a08f-e0b602bf8390"
+)
 
 
-def check_site_permissions():
+def check_site_permissions(site_id: str = None):
     """
     Récupère et affiche les permissions pour un site SharePoint spécifique
     en utilisant l'API Microsoft Graph.
+
+    Pour vérifier plusieurs sites en parallèle, utiliser :
+        python site_fanout.py permissions --sites-file sites.txt
+
+    Pour un audit complet du tenant (lots $batch, cache ETag, rapport CSV) :
+        python permission_audit.py --discover "*" --output audit.csv
+
+    Args:
+        site_id: ID du site (par défaut: SHAREPOINT_SITE_ID ou site DDASYS)
     """
+    site_id = site_id or os.getenv("SHAREPOINT_SITE_ID", DEFAULT_SITE_ID)
 
-    # Endpoint fourni pour vérifier les permissions
+    # Endpoint pour vérifier les permissions
     endpoint_url = (
-        "https://graph.microsoft.com/v1.0/sites/"
-        "ddasys.sharepoint.com,90022be8-5b4d-437e-b7b8-428a5b4a9d75,"
-        "dfdecd9e-4cd3-470d-a08f-e0b602bf8390/permissions"
+        f"https://graph.microsoft.com/v1.0/sites/{site_id}/permissions"
     )
 
     print(f"▶️  Interrogation du endpoint : {endpoint_url}")
@@ -62,5 +79,10 @@ def check_site_permissions():
         print(f"\n❌ Une erreur inattendue est survenue : {e}")
 
 
+def main():
+    """Point d'entrée : ID du site en premier argument (optionnel)."""
+    check_site_permissions(sys.argv[1] if len(sys.argv) > 1 else None)
+
+
 if __name__ == "__main__":
-    check_site_permissions() 
\ No newline at end of file
+    run_profiled(main) 
\ No newline at end of file
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Disjoncteurs par hôte et par classe d'opération pour les appels Graph.
+
+Pendant un incident partiel de Graph ou de SharePoint, chaque appel attend son
+timeout avant d'échouer : les threads de travail s'empilent et les replis
+(upload à la racine après l'échec du dossier) doublent la charge. Un
+disjoncteur par point d'accès (hôte + classe : read, write, content, batch)
+observe les derniers appels :
+
+    - fermé : les appels passent ; des échecs répétés (exception réseau,
+      timeout, 5xx) ou des appels plus lents que slow_seconds l'ouvrent ;
+    - ouvert : les appels échouent aussitôt (CircuitOpenError) pendant
+      reset_seconds, sans réseau ;
+    - semi-ouvert : quelques appels sondes passent ; s'ils réussissent le
+      disjoncteur se referme, sinon il se rouvre.
+
+Les 4xx (dont le throttling 429, géré par les pools et les lanes) ne comptent
+pas comme des échecs : le service a répondu. Seul l'appel réseau est chronométré
+(l'attente d'un créneau de lane n'en fait pas partie). Le seuil de lenteur
+grandit avec la taille du corps envoyé (fragments d'upload) ; les transferts de
+contenu, dont la taille n'est pas connue d'avance, n'ont pas de seuil de lenteur.
+"""
+
+import logging
+import threading
+import time
+import urllib.parse
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_FAILURE_RATIO = 0.5
+DEFAULT_WINDOW = 20
+DEFAULT_MIN_CALLS = 10
+DEFAULT_SLOW_SECONDS = 20.0
+# Débit minimal attendu d'un corps de requête : ajouté au seuil de lenteur
+DEFAULT_SLOW_BYTES_PER_SECOND = 512 * 1024
+DEFAULT_RESET_SECONDS = 30.0
+DEFAULT_HALF_OPEN_PROBES = 1
+
+
+class CircuitOpenError(requests.RequestException):
+    """Appel refusé sans réseau : le disjoncteur du point d'accès est ouvert."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Disjoncteur ouvert pour {endpoint} (nouvel essai dans {retry_in:.0f}s)")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def endpoint_key(method: str, url: str) -> str:
+    """
+    Point d'accès d'une requête : hôte et classe d'opération.
+
+    Returns:
+        str: "<hôte> <read|write|content|batch>"
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path.rstrip("/")
+    if path.endswith("/$batch"):
+        operation = "batch"
+    elif path.endswith("/content") or path.endswith(":/content"):
+        operation = "content"
+    elif method.upper() == "GET":
+        operation = "read"
+    else:
+        operation = "write"
+    return f"{parts.netloc or 'local'} {operation}"
+
+
+class CircuitBreaker:
+    """Disjoncteur d'un point d'accès (fermé, ouvert, semi-ouvert)."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        failure_ratio: float = DEFAULT_FAILURE_RATIO,
+        window: int = DEFAULT_WINDOW,
+        min_calls: int = DEFAULT_MIN_CALLS,
+        slow_seconds: Optional[float] = DEFAULT_SLOW_SECONDS,
+        slow_bytes_per_second: float = DEFAULT_SLOW_BYTES_PER_SECOND,
+        reset_seconds: float = DEFAULT_RESET_SECONDS,
+        half_open_probes: int = DEFAULT_HALF_OPEN_PROBES,
+    ):
+        """
+        Initialise le disjoncteur.
+
+        Args:
+            name: Point d'accès surveillé (voir endpoint_key)
+            failure_threshold: Échecs consécutifs qui ouvrent le disjoncteur
+            failure_ratio: Part d'échecs sur la fenêtre qui l'ouvre
+            window: Nombre de derniers appels observés
+            min_calls: Appels minimum dans la fenêtre avant d'appliquer failure_ratio
+            slow_seconds: Durée au-delà de laquelle un appel réussi compte comme un
+                échec (None : pas de détection de lenteur)
+            slow_bytes_per_second: Débit minimal du corps envoyé ; le seuil devient
+                slow_seconds + taille / slow_bytes_per_second
+            reset_seconds: Durée d'ouverture avant les appels sondes
+            half_open_probes: Appels sondes simultanés (et réussites pour refermer)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.slow_seconds = slow_seconds
+        self.slow_bytes_per_second = slow_bytes_per_second
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.probes_inflight = 0
+        self.probe_successes = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0}
+
+    def reject_if_open(self) -> None:
+        """Lève CircuitOpenError si le disjoncteur est ouvert (sans réserver d'appel)."""
+        with self._lock:
+            retry_in = self.opened_at + self.reset_seconds - time.monotonic()
+            if self.state == OPEN and retry_in > 0:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(self.name, retry_in)
+
+    def before_call(self) -> bool:
+        """
+        Autorise un appel ou lève CircuitOpenError.
+
+        Returns:
+            bool: True si l'appel est une sonde du disjoncteur semi-ouvert
+        """
+        with self._lock:
+            if self.state == OPEN:
+                retry_in = self.opened_at + self.reset_seconds - time.monotonic()
+                if retry_in > 0:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, retry_in)
+                self.state = HALF_OPEN
+                self.probe_successes = 0
+                logger.info(f"Disjoncteur {self.name} semi-ouvert : appels sondes")
+            if self.state == HALF_OPEN:
+                if self.probes_inflight >= self.half_open_probes:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self.probes_inflight += 1
+                self.stats["calls"] += 1
+                return True
+            self.stats["calls"] += 1
+            return False
+
+    def record(self, success: bool, seconds: float, probe: bool = False,
+               size_bytes: int = 0) -> None:
+        """
+        Enregistre l'issue d'un appel autorisé par before_call.
+
+        Args:
+            success: False pour une exception réseau ou un 5xx
+            seconds: Durée de l'appel
+            probe: Valeur retournée par before_call
+            size_bytes: Taille du corps envoyé (relève le seuil de lenteur)
+        """
+        slow = success and self.slow_seconds is not None and (
+            seconds >= self.slow_seconds + size_bytes / self.slow_bytes_per_second
+        )
+        failed = not success or slow
+        with self._lock:
+            if slow:
+                self.stats["slow"] += 1
+            if failed:
+                self.stats["failures"] += 1
+            self._outcomes.append(failed)
+            self.consecutive_failures = self.consecutive_failures + 1 if failed else 0
+
+            if probe and self.state == HALF_OPEN:
+                self.probes_inflight = max(self.probes_inflight - 1, 0)
+                if failed:
+                    self._open()
+                else:
+                    self.probe_successes += 1
+                    if self.probe_successes >= self.half_open_probes:
+                        self.state = CLOSED
+                        self._outcomes.clear()
+                        logger.info(f"Disjoncteur {self.name} refermé")
+            elif self.state == CLOSED and failed and self._should_open():
+                self._open()
+
+    def release(self, probe: bool) -> None:
+        """Libère un appel interrompu sans issue (Ctrl+C, arrêt) : ni succès ni échec."""
+        if probe:
+            with self._lock:
+                self.probes_inflight = max(self.probes_inflight - 1, 0)
+
+    def _should_open(self) -> bool:
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        calls = len(self._outcomes)
+        return calls >= self.min_calls and sum(self._outcomes) / calls >= self.failure_ratio
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.stats["opened"] += 1
+        logger.warning(f"Disjoncteur {self.name} ouvert pour {self.reset_seconds:.0f}s "
+                       f"({self.consecutive_failures} échecs consécutifs)")
+
+    def is_open(self) -> bool:
+        """True si les appels sont actuellement refusés sans réseau."""
+        with self._lock:
+            return (self.state == OPEN
+                    and time.monotonic() < self.opened_at + self.reset_seconds)
+
+
+class CircuitBreakerRegistry:
+    """Disjoncteurs créés à la demande, un par point d'accès."""
+
+    def __init__(self, **breaker_options: Any):
+        """
+        Initialise le registre.
+
+        Args:
+            **breaker_options: Options transmises à chaque CircuitBreaker
+        """
+        self.breaker_options = breaker_options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, method: str, url: str) -> CircuitBreaker:
+        """Disjoncteur du point d'accès d'une requête."""
+        key = endpoint_key(method, url)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                options = dict(self.breaker_options)
+                if key.endswith(" content"):
+                    # Durée proportionnelle à un contenu de taille inconnue : pas de seuil
+                    options["slow_seconds"] = None
+                breaker = self._breakers[key] = CircuitBreaker(key, **options)
+            return breaker
+
+    def is_open(self, method: str, url: str) -> bool:
+        """True si le point d'accès de la requête refuse actuellement les appels."""
+        return self.breaker(method, url).is_open()
+
+    def check(self, method: str, url: str) -> None:
+        """Refuse aussitôt (CircuitOpenError) une requête dont le disjoncteur est ouvert."""
+        self.breaker(method, url).reject_if_open()
+
+    def call(self, method: str, url: str, send: Callable[[], requests.Response],
+             size_bytes: int = 0) -> requests.Response:
+        """
+        Exécute un appel sous le disjoncteur de son point d'accès.
+
+        Args:
+            method: Méthode HTTP (classe d'opération)
+            url: URL de la requête (hôte et classe d'opération)
+            send: Fonction qui envoie la requête (appel réseau seul, chronométré)
+            size_bytes: Taille du corps envoyé (relève le seuil de lenteur)
+
+        Returns:
+            requests.Response: Réponse (lève CircuitOpenError si le disjoncteur est ouvert)
+        """
+        breaker = self.breaker(method, url)
+        probe = breaker.before_call()
+        started = time.monotonic()
+        try:
+            response = send()
+        except Exception:
+            breaker.record(False, time.monotonic() - started, probe, size_bytes)
+            raise
+        except BaseException:
+            # KeyboardInterrupt, SystemExit : le point d'accès n'y est pour rien
+            breaker.release(probe)
+            raise
+        breaker.record(response.status_code < 500, time.monotonic() - started, probe,
+                       size_bytes)
+        return response
+
+    def states(self) -> List[Dict[str, Any]]:
+        """État et compteurs de chaque disjoncteur."""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [{"endpoint": b.name, "state": b.state, **b.stats} for b in breakers]
+
+
+def print_breaker_states(registry: CircuitBreakerRegistry) -> None:
+    """Affiche les disjoncteurs qui ont refusé ou échoué des appels."""
+    troubled = [s for s in registry.states() if s["failures"] or s["rejected"]]
+    if not troubled:
+        return
+    print("\n⚡ Disjoncteurs:")
+    for state in troubled:
+        print(f"   {state['endpoint']:<40} {state['state']:<9} {state['calls']} appels, "
+              f"{state['failures']} échecs ({state['slow']} lents), "
+              f"{state['rejected']} refusés, ouvert {state['opened']} fois")
@@ -0,0 +1,35 @@
+"""
+Fixtures partagées des tests : stand-in Graph local et clients qui l'interrogent
+"""
+from unittest.mock import Mock
+
+import pytest
+
+from graph_client import GraphClient
+from graph_standin import GraphStandIn
+
+# Expiration des jetons simulés (an 2100) : jamais rafraîchis pendant un test
+TOKEN_EXPIRES_ON = 4102444800
+
+
+@pytest.fixture(name="credential")
+def fixture_credential():
+    """Credential simulé dont le jeton n'expire pas pendant le test"""
+    credential = Mock()
+    credential.get_token.return_value = Mock(token="t", expires_on=TOKEN_EXPIRES_ON)
+    return credential
+
+
+@pytest.fixture(name="standin")
+def fixture_standin():
+    """Stand-in Graph démarré et vide, à peupler par le module de test"""
+    with GraphStandIn() as standin:
+        yield standin
+
+
+@pytest.fixture(name="make_client")
+def fixture_make_client(standin, credential):
+    """Fabrique de GraphClient pointant sur le stand-in (options passées au client)"""
+    def make_client(**options):
+        return GraphClient(credential, base_url=standin.base_url, **options)
+    return make_client
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Choix du credential Azure selon l'environnement, mémorisé entre exécutions.
+
+DefaultAzureCredential essaie une longue chaîne de credentials, chacun avec son
+délai d'expiration, avant de trouver celui qui fonctionne ; les scripts qui
+codent AzureCliCredential en dur échouent dans un conteneur, et l'inverse pour
+ManagedIdentityCredential. Ce module :
+
+    - détecte les credentials plausibles d'après l'environnement : variables
+      AZURE_TENANT_ID/AZURE_CLIENT_ID/AZURE_CLIENT_SECRET (environment),
+      identité managée (USE_MANAGED_IDENTITY=true, IDENTITY_ENDPOINT ou
+      MSI_ENDPOINT, comme dans ACI ou App Service) et Azure CLI (az dans le PATH) ;
+    - essaie les candidats dans cet ordre et mémorise celui qui a obtenu un
+      token (fichier JSON) : les exécutions suivantes ne construisent que
+      celui-ci, tant que l'environnement détecté ne change pas ;
+    - garde le token obtenu en cache jusqu'à peu avant son expiration, ce qui
+      évite un sous-processus az par appel à get_token.
+
+Configuration :
+    SHAREPOINT_CREDENTIAL=environment|managed_identity|cli  (force le choix)
+    SHAREPOINT_CREDENTIAL_CACHE=.credential_choice.json     (vide : pas de mémoire)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from identity_pool import TOKEN_REFRESH_MARGIN
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+DEFAULT_CHOICE_PATH = ".credential_choice.json"
+CREDENTIAL_KINDS = ("environment", "managed_identity", "cli")
+
+
+def _build_environment(env: Mapping[str, str]) -> Any:
+    from azure.identity import CertificateCredential, ClientSecretCredential
+
+    # Construit depuis env (et non os.environ) : mêmes variables que la détection
+    tenant_id, client_id = env.get("AZURE_TENANT_ID"), env.get("AZURE_CLIENT_ID")
+    if not tenant_id or not client_id:
+        raise ValueError("AZURE_TENANT_ID et AZURE_CLIENT_ID requis")
+    if env.get("AZURE_CLIENT_SECRET"):
+        return ClientSecretCredential(tenant_id, client_id, env["AZURE_CLIENT_SECRET"])
+    if env.get("AZURE_CLIENT_CERTIFICATE_PATH"):
+        return CertificateCredential(tenant_id, client_id, env["AZURE_CLIENT_CERTIFICATE_PATH"],
+                                     password=env.get("AZURE_CLIENT_CERTIFICATE_PASSWORD") or None)
+    raise ValueError("AZURE_CLIENT_SECRET ou AZURE_CLIENT_CERTIFICATE_PATH requis")
+
+
+def _build_managed_identity(env: Mapping[str, str]) -> Any:
+    from azure.identity import ManagedIdentityCredential
+
+    # Identité attribuée par l'utilisateur si AZURE_CLIENT_ID est fourni sans secret
+    client_id = None if env.get("AZURE_CLIENT_SECRET") else env.get("AZURE_CLIENT_ID")
+    return ManagedIdentityCredential(client_id=client_id) if client_id else ManagedIdentityCredential()
+
+
+def _build_cli(env: Mapping[str, str]) -> Any:
+    from azure.identity import AzureCliCredential
+
+    # Token du tenant AZURE_TENANT_ID s'il est fourni, sinon celui du compte az courant
+    return AzureCliCredential(tenant_id=env.get("AZURE_TENANT_ID", ""))
+
+
+BUILDERS: Dict[str, Callable[[Mapping[str, str]], Any]] = {
+    "environment": _build_environment,
+    "managed_identity": _build_managed_identity,
+    "cli": _build_cli,
+}
+
+
+def detect_environment(env: Optional[Mapping[str, str]] = None) -> List[str]:
+    """
+    Liste les credentials plausibles, du plus probable au moins probable.
+
+    Args:
+        env: Variables d'environnement (os.environ par défaut)
+
+    Returns:
+        Liste de types parmi CREDENTIAL_KINDS
+    """
+    env = os.environ if env is None else env
+    forced = env.get("SHAREPOINT_CREDENTIAL", "").strip().lower()
+    if forced:
+        if forced not in CREDENTIAL_KINDS:
+            raise ValueError(f"SHAREPOINT_CREDENTIAL inconnu: {forced} "
+                             f"(attendu: {', '.join(CREDENTIAL_KINDS)})")
+        return [forced]
+
+    candidates = []
+    if env.get("AZURE_TENANT_ID") and env.get("AZURE_CLIENT_ID") and (
+        env.get("AZURE_CLIENT_SECRET") or env.get("AZURE_CLIENT_CERTIFICATE_PATH")
+    ):
+        candidates.append("environment")
+    managed = env.get("IDENTITY_ENDPOINT") or env.get("MSI_ENDPOINT")
+    if managed or env.get("USE_MANAGED_IDENTITY", "").lower() == "true":
+        candidates.append("managed_identity")
+    if shutil.which("az", path=env.get("PATH")):
+        candidates.append("cli")
+    # Identité managée explicitement demandée : prioritaire sur les secrets
+    if env.get("USE_MANAGED_IDENTITY", "").lower() == "true" and "managed_identity" in candidates:
+        candidates.remove("managed_identity")
+        candidates.insert(0, "managed_identity")
+    return candidates
+
+
+class CachedCredential:
+    """Credential dont les tokens sont gardés jusqu'à peu avant leur expiration."""
+
+    def __init__(self, credential: Any, kind: str):
+        """
+        Initialise le cache.
+
+        Args:
+            credential: Credential azure-identity (objet avec get_token)
+            kind: Type du credential (voir CREDENTIAL_KINDS)
+        """
+        self.credential = credential
+        self.kind = kind
+        self._tokens: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requested": 0, "fetched": 0}
+
+    def remember(self, scopes: tuple, token: Any) -> None:
+        """Ajoute au cache un token déjà obtenu (ex: lors de la sélection)."""
+        with self._lock:
+            self._tokens[scopes] = token
+
+    def get_token(self, *scopes: str, **kwargs: Any) -> Any:
+        """Token pour les scopes, depuis le cache s'il est encore valide."""
+        if kwargs:
+            # claims, tenant_id... : défi spécifique, jamais servi depuis le cache
+            return self.credential.get_token(*scopes, **kwargs)
+        with self._lock:
+            self.stats["requested"] += 1
+            token = self._tokens.get(scopes)
+            if token is None or time.time() >= float(token.expires_on) - TOKEN_REFRESH_MARGIN:
+                token = self.credential.get_token(*scopes)
+                self._tokens[scopes] = token
+                self.stats["fetched"] += 1
+            return token
+
+    def close(self) -> None:
+        close = getattr(self.credential, "close", None)
+        if close:
+            close()
+
+
+def _fingerprint(candidates: List[str]) -> str:
+    """Empreinte de l'environnement détecté (invalide le choix s'il change)."""
+    return hashlib.sha256(",".join(candidates).encode("utf-8")).hexdigest()[:16]
+
+
+def _load_choice(path: Optional[Path]) -> Dict[str, Any]:
+    if not path or not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Choix de credential illisible, nouvelle détection: {e}")
+        return {}
+
+
+def _save_choice(path: Optional[Path], choice: Dict[str, Any]) -> None:
+    if not path:
+        return
+    try:
+        path.write_text(json.dumps(choice, indent=2), encoding="utf-8")
+    except OSError as e:
+        logger.warning(f"Choix de credential non mémorisé: {e}")
+
+
+def try_credential(kind: str, scope: str = GRAPH_SCOPE,
+                   env: Optional[Mapping[str, str]] = None,
+                   builders: Optional[Mapping[str, Callable]] = None) -> Dict[str, Any]:
+    """
+    Construit un credential et mesure l'obtention d'un token.
+
+    Returns:
+        Dict: {"kind", "credential", "token", "build_seconds", "token_seconds", "error"}
+    """
+    env = os.environ if env is None else env
+    builders = BUILDERS if builders is None else builders
+    result = {"kind": kind, "credential": None, "token": None,
+              "build_seconds": 0.0, "token_seconds": 0.0, "error": None}
+    started = time.perf_counter()
+    try:
+        result["credential"] = builders[kind](env)
+        result["build_seconds"] = time.perf_counter() - started
+        started = time.perf_counter()
+        result["token"] = result["credential"].get_token(scope)
+    except Exception as e:
+        result["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+    result["token_seconds"] = time.perf_counter() - started
+    return result
+
+
+def get_credential(
+    scope: str = GRAPH_SCOPE,
+    choice_path: Optional[str] = None,
+    env: Optional[Mapping[str, str]] = None,
+    builders: Optional[Mapping[str, Callable]] = None,
+) -> CachedCredential:
+    """
+    Retourne le credential qui fonctionne dans cet environnement.
+
+    Le choix mémorisé est essayé seul ; s'il échoue, ou si l'environnement
+    détecté a changé, les candidats sont essayés dans l'ordre de détection.
+
+    Args:
+        scope: Scope du token de vérification
+        choice_path: Fichier du choix mémorisé (SHAREPOINT_CREDENTIAL_CACHE par
+            défaut, "" pour ne rien mémoriser)
+        env: Variables d'environnement (os.environ par défaut)
+        builders: Constructeurs par type (BUILDERS par défaut)
+
+    Returns:
+        CachedCredential contenant déjà le token de vérification
+    """
+    env = os.environ if env is None else env
+    if choice_path is None:
+        choice_path = env.get("SHAREPOINT_CREDENTIAL_CACHE", DEFAULT_CHOICE_PATH)
+    path = Path(choice_path) if choice_path else None
+
+    candidates = detect_environment(env)
+    fingerprint = _fingerprint(candidates)
+    choice = _load_choice(path)
+    if choice.get("fingerprint") == fingerprint and choice.get("kind") in candidates:
+        candidates.remove(choice["kind"])
+        candidates.insert(0, choice["kind"])
+
+    errors = []
+    for kind in candidates:
+        result = try_credential(kind, scope, env, builders)
+        if result["error"] is None:
+            if choice.get("kind") != kind or choice.get("fingerprint") != fingerprint:
+                _save_choice(path, {
+                    "kind": kind,
+                    "fingerprint": fingerprint,
+                    "token_seconds": round(result["token_seconds"], 3),
+                    "chosen_at": datetime.now(timezone.utc).isoformat(),
+                })
+            logger.info(f"Credential {kind} retenu ({result['token_seconds'] * 1000:.0f} ms)")
+            credential = CachedCredential(result["credential"], kind)
+            credential.remember((scope,), result["token"])
+            return credential
+        logger.info(f"Credential {kind} indisponible: {result['error']}")
+        errors.append(f"{kind}: {result['error']}")
+
+    raise RuntimeError("Aucun credential Azure utilisable"
+                       + (" (" + "; ".join(errors) + ")" if errors else
+                          " : ni variables AZURE_*, ni identité managée, ni Azure CLI détectés"))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Export pipeliné de DataFrames vers SharePoint.
+
+upload_excel_file sérialise puis uploade chaque fichier l'un après l'autre : le
+CPU attend pendant le réseau et le réseau attend pendant la sérialisation. Ici,
+un pool de processus sérialise les DataFrames suivants pendant que des threads
+uploadent les précédents. Des files bornées entre les deux étages limitent la
+mémoire occupée par les fichiers en attente.
+"""
+
+import io
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Signature attendue pour l'upload : (contenu, nom de fichier, content-type) -> URL
+UploadFunc = Callable[[bytes, str, str], Optional[str]]
+
+# Élément à exporter : (nom de fichier sans extension, DataFrame, nom de feuille)
+FrameJob = Tuple[str, pd.DataFrame, str]
+
+
+def serialize_dataframe(df: pd.DataFrame, sheet_name: str = "Sheet1") -> bytes:
+    """
+    Sérialise un DataFrame en fichier xlsx, en mémoire.
+
+    Args:
+        df: DataFrame à exporter
+        sheet_name: Nom de la feuille Excel
+
+    Returns:
+        bytes: Contenu du fichier xlsx
+    """
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name=sheet_name, index=False)
+    return buffer.getvalue()
+
+
+def _serialize_job(name: str, df: pd.DataFrame, sheet_name: str) -> Tuple[str, bytes, float]:
+    """Tâche exécutée dans le pool de processus."""
+    started = time.perf_counter()
+    content = serialize_dataframe(df, sheet_name)
+    return name, content, time.perf_counter() - started
+
+
+class PipelinedExcelExporter:
+    """Sérialise et uploade des DataFrames en parallèle avec files bornées."""
+
+    def __init__(
+        self,
+        upload_func: UploadFunc,
+        serialize_workers: int = 2,
+        upload_workers: int = 2,
+        max_pending_serializations: int = 4,
+        upload_queue_size: int = 4,
+    ):
+        """
+        Initialise l'exporteur.
+
+        Args:
+            upload_func: Fonction d'upload (contenu, nom, content-type) -> URL
+            serialize_workers: Nombre de processus de sérialisation
+            upload_workers: Nombre de threads d'upload
+            max_pending_serializations: Sérialisations soumises non terminées
+            upload_queue_size: Fichiers sérialisés en attente d'upload
+        """
+        self.upload_func = upload_func
+        self.serialize_workers = serialize_workers
+        self.upload_workers = upload_workers
+        self.max_pending_serializations = max_pending_serializations
+        self.upload_queue_size = upload_queue_size
+
+    def _uploader(self, upload_queue: "queue.Queue", results: List[Dict[str, Any]],
+                  results_lock: threading.Lock) -> None:
+        """Boucle d'un thread d'upload."""
+        while True:
+            job = upload_queue.get()
+            if job is None:
+                return
+            name, content, serialize_seconds = job
+            started = time.perf_counter()
+            try:
+                url = self.upload_func(content, f"{name}.xlsx", XLSX_CONTENT_TYPE)
+                error = None if url else "upload échoué"
+            except Exception as e:
+                url, error = None, str(e)
+            with results_lock:
+                results.append({
+                    "name": name,
+                    "url": url,
+                    "error": error,
+                    "bytes": len(content),
+                    "serialize_seconds": serialize_seconds,
+                    "upload_seconds": time.perf_counter() - started,
+                })
+
+    def export(self, frames: Iterable[FrameJob]) -> Dict[str, Any]:
+        """
+        Exporte tous les DataFrames.
+
+        Args:
+            frames: Itérable de (nom sans extension, DataFrame, nom de feuille)
+
+        Returns:
+            Dict: Rapport (résultats par fichier, durées cumulées et totale)
+        """
+        started = time.perf_counter()
+        upload_queue: "queue.Queue" = queue.Queue(maxsize=self.upload_queue_size)
+        results: List[Dict[str, Any]] = []
+        results_lock = threading.Lock()
+
+        uploaders = [
+            threading.Thread(
+                target=self._uploader, args=(upload_queue, results, results_lock),
+                daemon=True,
+            )
+            for _ in range(self.upload_workers)
+        ]
+        for thread in uploaders:
+            thread.start()
+
+        def forward(done: Set[Future]) -> None:
+            """Transmet les sérialisations terminées à l'étage d'upload."""
+            for future in done:
+                try:
+                    upload_queue.put(future.result())
+                except Exception as e:
+                    name = future_names.pop(future, "?")
+                    logger.error(f"Échec de sérialisation de {name}: {e}")
+                    with results_lock:
+                        results.append({"name": name, "url": None, "error": str(e),
+                                        "bytes": 0, "serialize_seconds": 0.0,
+                                        "upload_seconds": 0.0})
+
+        future_names: Dict[Future, str] = {}
+        try:
+            with ProcessPoolExecutor(max_workers=self.serialize_workers) as executor:
+                pending: Set[Future] = set()
+                for name, df, sheet_name in frames:
+                    if len(pending) >= self.max_pending_serializations:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        forward(done)
+                    future = executor.submit(_serialize_job, name, df, sheet_name)
+                    future_names[future] = name
+                    pending.add(future)
+
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    forward(done)
+        finally:
+            for _ in uploaders:
+                upload_queue.put(None)
+            for thread in uploaders:
+                thread.join()
+
+        return {
+            "files": len(results),
+            "failed": sum(1 for r in results if r["error"]),
+            "bytes": sum(r["bytes"] for r in results),
+            "serialize_seconds": sum(r["serialize_seconds"] for r in results),
+            "upload_seconds": sum(r["upload_seconds"] for r in results),
+            "wall_seconds": time.perf_counter() - started,
+            "results": results,
+        }
+
+
+def export_sequential(upload_func: UploadFunc, frames: Iterable[FrameJob]) -> Dict[str, Any]:
+    """
+    Exporte les DataFrames un par un (référence pour le benchmark).
+
+    Args:
+        upload_func: Fonction d'upload (contenu, nom, content-type) -> URL
+        frames: Itérable de (nom sans extension, DataFrame, nom de feuille)
+
+    Returns:
+        Dict: Rapport au même format que PipelinedExcelExporter.export
+    """
+    started = time.perf_counter()
+    results = []
+    for name, df, sheet_name in frames:
+        _, content, serialize_seconds = _serialize_job(name, df, sheet_name)
+        upload_started = time.perf_counter()
+        url = upload_func(content, f"{name}.xlsx", XLSX_CONTENT_TYPE)
+        results.append({
+            "name": name,
+            "url": url,
+            "error": None if url else "upload échoué",
+            "bytes": len(content),
+            "serialize_seconds": serialize_seconds,
+            "upload_seconds": time.perf_counter() - upload_started,
+        })
+    return {
+        "files": len(results),
+        "failed": sum(1 for r in results if r["error"]),
+        "bytes": sum(r["bytes"] for r in results),
+        "serialize_seconds": sum(r["serialize_seconds"] for r in results),
+        "upload_seconds": sum(r["upload_seconds"] for r in results),
+        "wall_seconds": time.perf_counter() - started,
+        "results": results,
+    }
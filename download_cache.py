@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Cache local des fichiers téléchargés depuis SharePoint.
+
+Les contenus sont stockés par empreinte SHA-256 (un fichier identique
+référencé par plusieurs éléments n'est stocké qu'une fois) et indexés par
+driveItem avec le cTag de l'élément (version de son contenu). Si l'appelant
+connaît déjà le cTag courant (listing, index local), aucun appel n'est fait ;
+sinon un GET de métadonnées ($select cTag) suffit à revalider : un seul
+aller-retour sans contenu si le fichier n'a pas changé. Le téléchargement
+envoie en plus If-None-Match avec l'ETag de la réponse précédente.
+
+Le cache est borné en taille (éviction LRU) et partageable entre processus :
+les métadonnées sont dans SQLite (WAL) et chaque téléchargement se fait sous
+un verrou de fichier par élément.
+
+Usage:
+    python download_cache.py get --drive-id <DRIVE_ID> "Référentiels/tarifs.xlsx" -o tarifs.xlsx
+    python download_cache.py stats
+    python download_cache.py evict --max-mb 200
+"""
+
+import argparse
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+
+from graph_client import DOWNLOAD_CHUNK_SIZE, GraphClient
+from profiling import phase, run_profiled
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".download_cache"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key         TEXT PRIMARY KEY,
+    drive_id    TEXT NOT NULL,
+    item_ref    TEXT NOT NULL,
+    validator   TEXT,
+    ctag        TEXT,
+    sha256      TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_sha256 ON entries (sha256);
+"""
+
+
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Verrou exclusif inter-processus sur un fichier (créé si besoin)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as handle:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def cache_key(drive_id: str, item_id: Optional[str] = None, path: Optional[str] = None) -> str:
+    """Clé d'un élément : par ID si connu, sinon par chemin (insensible à la casse)."""
+    if item_id:
+        return f"{drive_id}/id:{item_id}"
+    if path:
+        return f"{drive_id}/path:{path.strip('/').lower()}"
+    raise ValueError("item_id ou path requis")
+
+
+class DownloadCache:
+    """Cache disque des contenus SharePoint, revalidé par GET conditionnel."""
+
+    def __init__(
+        self,
+        client: Optional[GraphClient],
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        """
+        Ouvre (ou crée) le cache.
+
+        Args:
+            client: Client Graph (None pour les opérations locales : stats, évictions)
+            cache_dir: Répertoire du cache (partageable entre processus)
+            max_bytes: Budget disque des contenus (éviction LRU au-delà)
+        """
+        self.client = client
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / "blobs"
+        self.lock_dir = self.cache_dir / "locks"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(str(self.cache_dir / "cache.sqlite"),
+                                    check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(entries)")}
+        if "ctag" not in columns:
+            # Cache créé avant l'enregistrement du cTag : entrées revalidées au prochain accès
+            self.conn.execute("ALTER TABLE entries ADD COLUMN ctag TEXT")
+        self.stats = {"hits": 0, "revalidated": 0, "downloads": 0,
+                      "bytes_downloaded": 0, "evictions": 0}
+
+    def close(self) -> None:
+        """Ferme la connexion SQLite."""
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def blob_path(self, sha256: str) -> Path:
+        """Chemin du contenu d'empreinte sha256."""
+        return self.blob_dir / sha256[:2] / sha256
+
+    def _entry(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        # Contenu supprimé par un autre processus (éviction) : entrée inutilisable
+        return entry if self.blob_path(entry["sha256"]).exists() else None
+
+    def _touch(self, key: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE entries SET last_access = ? WHERE key = ?",
+                              (time.time(), key))
+
+    def fetch(
+        self,
+        drive_id: str,
+        item_id: Optional[str] = None,
+        path: Optional[str] = None,
+        ctag: Optional[str] = None,
+    ) -> Path:
+        """
+        Retourne le chemin local du contenu à jour d'un élément.
+
+        Args:
+            drive_id: ID du drive
+            item_id: ID du driveItem (prioritaire sur path)
+            path: Chemin de l'élément relatif à la racine du drive
+            ctag: cTag courant s'il est connu (évite tout appel si le contenu
+                en cache est à cette version ; lu par GET de métadonnées sinon)
+
+        Returns:
+            Path: Fichier du cache (à ne pas modifier)
+        """
+        key = cache_key(drive_id, item_id, path)
+        item_url = (f"drives/{drive_id}/items/{item_id}" if item_id
+                    else f"drives/{drive_id}/root:/{path.strip('/')}:")
+        url = f"{item_url}/content"
+        lock_name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+        with file_lock(self.lock_dir / f"{lock_name}.lock"):
+            entry = self._entry(key)
+            if entry and ctag and entry["ctag"] == ctag:
+                self.stats["hits"] += 1
+                self._touch(key)
+                return self.blob_path(entry["sha256"])
+            if ctag is None:
+                # Lu avant le contenu : un cTag enregistré n'est jamais plus récent que lui
+                with phase("download_cache_get"):
+                    ctag = self.client.get_json(item_url, profile="hashes", kind="item").get("cTag")
+                if entry and ctag and entry["ctag"] == ctag:
+                    self.stats["revalidated"] += 1
+                    self._touch(key)
+                    return self.blob_path(entry["sha256"])
+
+            headers = {"If-None-Match": entry["validator"]} if entry and entry["validator"] else {}
+            with phase("download_cache_get"):
+                response = self.client.request("GET", url, headers=headers, stream=True)
+                with response:
+                    if response.status_code == 304 and entry:
+                        self.stats["revalidated"] += 1
+                        with self._lock, self.conn:
+                            self.conn.execute(
+                                "UPDATE entries SET ctag = ?, last_access = ? WHERE key = ?",
+                                (ctag, time.time(), key),
+                            )
+                        return self.blob_path(entry["sha256"])
+                    response.raise_for_status()
+                    sha256, size = self._store(response)
+
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries "
+                    "(key, drive_id, item_ref, validator, ctag, sha256, size, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, drive_id, item_id or path, response.headers.get("ETag"), ctag,
+                     sha256, size, time.time()),
+                )
+            self.stats["downloads"] += 1
+            self.stats["bytes_downloaded"] += size
+            if entry and entry["sha256"] != sha256:
+                self._drop_blob_if_unused(entry["sha256"])
+
+        self.evict(keep=key)
+        return self.blob_path(sha256)
+
+    def _store(self, response: requests.Response) -> tuple:
+        """Écrit le contenu en flux dans un fichier temporaire puis le range par empreinte."""
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix="download-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                for block in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    handle.write(block)
+                    digest.update(block)
+                    size += len(block)
+            sha256 = digest.hexdigest()
+            target = self.blob_path(sha256)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # Remplacement atomique : un lecteur concurrent voit l'ancien ou le nouveau fichier
+            os.replace(temp_path, target)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        return sha256, size
+
+    def _drop_blob_if_unused(self, sha256: str) -> bool:
+        """Supprime un contenu qui n'est plus référencé par aucune entrée."""
+        with self._lock:
+            used = self.conn.execute("SELECT 1 FROM entries WHERE sha256 = ? LIMIT 1",
+                                     (sha256,)).fetchone()
+        if used:
+            return False
+        self.blob_path(sha256).unlink(missing_ok=True)
+        return True
+
+    def read_bytes(self, drive_id: str, item_id: Optional[str] = None,
+                   path: Optional[str] = None, ctag: Optional[str] = None) -> bytes:
+        """Contenu à jour d'un élément (voir fetch)."""
+        return self.fetch(drive_id, item_id, path, ctag).read_bytes()
+
+    def copy_to(self, destination: str, drive_id: str, item_id: Optional[str] = None,
+                path: Optional[str] = None, ctag: Optional[str] = None) -> str:
+        """Copie le contenu à jour d'un élément vers un fichier local."""
+        shutil.copyfile(self.fetch(drive_id, item_id, path, ctag), destination)
+        return destination
+
+    def disk_usage(self) -> int:
+        """Taille cumulée des contenus distincts du cache."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM "
+                "(SELECT sha256, MAX(size) AS size FROM entries GROUP BY sha256)"
+            ).fetchone()
+        return row[0]
+
+    def evict(self, max_bytes: Optional[int] = None, keep: Optional[str] = None) -> int:
+        """
+        Libère les entrées les moins récemment utilisées au-delà du budget.
+
+        Args:
+            max_bytes: Budget à respecter (self.max_bytes par défaut)
+            keep: Clé à ne pas évincer (élément qui vient d'être lu)
+
+        Returns:
+            int: Nombre d'entrées évincées
+        """
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        evicted = 0
+        with file_lock(self.lock_dir / "evict.lock"):
+            usage = self.disk_usage()
+            if usage <= budget:
+                return 0
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT key, sha256, size FROM entries ORDER BY last_access"
+                ).fetchall()
+            for row in rows:
+                if usage <= budget:
+                    break
+                if row["key"] == keep:
+                    continue
+                with self._lock, self.conn:
+                    self.conn.execute("DELETE FROM entries WHERE key = ?", (row["key"],))
+                evicted += 1
+                if self._drop_blob_if_unused(row["sha256"]):
+                    usage -= row["size"]
+        self.stats["evictions"] += evicted
+        if evicted:
+            logger.info(f"{evicted} entrées évincées du cache ({usage / 1e6:.1f} Mo conservés)")
+        return evicted
+
+    def summary(self) -> Dict[str, Any]:
+        """Nombre d'entrées, occupation disque et compteurs de la session."""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"entries": entries, "bytes": self.disk_usage(), "max_bytes": self.max_bytes,
+                **self.stats}
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Cache local des téléchargements SharePoint")
+    parser.add_argument("command", choices=["get", "stats", "evict"])
+    parser.add_argument("path", nargs="?", help="Chemin de l'élément (get)")
+    parser.add_argument("--drive-id", help="ID du drive (get)")
+    parser.add_argument("--item-id", help="ID de l'élément (get, à la place du chemin)")
+    parser.add_argument("-o", "--output", help="Fichier de destination (get)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help="Budget disque du cache en Mo")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    max_bytes = int(args.max_mb * 1024 * 1024)
+
+    if args.command == "get":
+        if not args.drive_id or not (args.path or args.item_id):
+            parser.error("--drive-id et un chemin (ou --item-id) sont requis")
+        from credential_factory import get_credential
+
+        client = GraphClient(get_credential())
+        with DownloadCache(client, args.cache_dir, max_bytes) as cache:
+            try:
+                started = time.perf_counter()
+                local = cache.fetch(args.drive_id, args.item_id, args.path)
+            except requests.RequestException as e:
+                print(f"❌ Téléchargement impossible: {e}")
+                raise SystemExit(1)
+            elapsed = time.perf_counter() - started
+            if args.output:
+                shutil.copyfile(local, args.output)
+            stats = cache.stats
+            origin = ("téléchargé" if stats["downloads"] else
+                      "inchangé (304)" if stats["revalidated"] else "servi par le cache")
+            print(f"✅ {args.output or local}: {origin} en {elapsed * 1000:.0f} ms")
+        return
+
+    with DownloadCache(None, args.cache_dir, max_bytes) as cache:
+        if args.command == "evict":
+            print(f"🗑️  {cache.evict()} entrées évincées")
+        summary = cache.summary()
+        print(f"📦 {summary['entries']} entrées, {summary['bytes'] / 1e6:.1f} Mo "
+              f"/ {summary['max_bytes'] / 1e6:.0f} Mo")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Index local SQLite des driveItems SharePoint.
+
+Les résolutions chemin -> ID, les listings par préfixe et les requêtes
+"qu'est-ce qui a changé depuis" sont servis localement, sans appel réseau.
+L'index est alimenté par les listings de dossiers et par les requêtes delta
+Microsoft Graph, et les entrées sont invalidées lorsque leur cTag change.
+
+Usage:
+    python drive_index.py sync --drive-id <DRIVE_ID>
+    python drive_index.py lookup --drive-id <DRIVE_ID> "General/rapport.xlsx"
+    python drive_index.py ls --drive-id <DRIVE_ID> "General"
+    python drive_index.py changes --drive-id <DRIVE_ID> --since 0
+"""
+
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from graph_client import GraphClient
+from profiling import run_profiled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = "drive_index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    drive_id   TEXT NOT NULL,
+    item_id    TEXT NOT NULL,
+    path       TEXT NOT NULL COLLATE NOCASE,
+    parent_id  TEXT,
+    name       TEXT,
+    is_folder  INTEGER NOT NULL DEFAULT 0,
+    ctag       TEXT,
+    etag       TEXT,
+    size       INTEGER,
+    hash       TEXT,
+    mtime      TEXT,
+    deleted    INTEGER NOT NULL DEFAULT 0,
+    seq        INTEGER NOT NULL,
+    PRIMARY KEY (drive_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS idx_items_path ON items (drive_id, path);
+CREATE INDEX IF NOT EXISTS idx_items_parent ON items (drive_id, parent_id);
+CREATE INDEX IF NOT EXISTS idx_items_seq ON items (drive_id, seq);
+CREATE TABLE IF NOT EXISTS sync_state (
+    drive_id   TEXT PRIMARY KEY,
+    delta_link TEXT,
+    updated_at REAL
+);
+"""
+
+_COLUMNS = (
+    "drive_id", "item_id", "path", "parent_id", "name", "is_folder",
+    "ctag", "etag", "size", "hash", "mtime", "deleted", "seq",
+)
+
+
+def parent_path_from_reference(parent_reference: Dict[str, Any]) -> Optional[str]:
+    """
+    Extrait le chemin du parent depuis parentReference.path.
+
+    Args:
+        parent_reference: Facette parentReference d'un driveItem
+            (ex: {"path": "/drives/b!xxx/root:/General/Sub"})
+
+    Returns:
+        str: Chemin relatif à la racine ("" pour la racine) ou None si absent
+    """
+    path = parent_reference.get("path")
+    if path is None:
+        return None
+    _, _, relative = path.partition("root:")
+    return relative.strip("/")
+
+
+def item_hash(item: Dict[str, Any]) -> Optional[str]:
+    """Retourne le meilleur hash de contenu disponible pour un driveItem."""
+    hashes = item.get("file", {}).get("hashes", {})
+    for key in ("quickXorHash", "sha256Hash", "sha1Hash", "crc32Hash"):
+        if hashes.get(key):
+            return hashes[key]
+    return None
+
+
+class DriveIndex:
+    """Index SQLite local des éléments d'un ou plusieurs drives."""
+
+    def __init__(self, db_path: str = DEFAULT_INDEX_PATH):
+        """
+        Ouvre (ou crée) l'index.
+
+        Args:
+            db_path: Chemin du fichier SQLite (":memory:" pour un index volatil)
+        """
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Ferme la connexion SQLite."""
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Alimentation
+    # ------------------------------------------------------------------
+
+    def current_sequence(self, drive_id: str) -> int:
+        """Retourne le numéro de séquence de la dernière modification indexée."""
+        row = self.conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM items WHERE drive_id = ?", (drive_id,)
+        ).fetchone()
+        return row[0]
+
+    def _resolve_path(self, drive_id: str, item: Dict[str, Any]) -> Optional[str]:
+        """
+        Calcule le chemin d'un élément (parentReference.path ou parent indexé).
+
+        Returns:
+            str: Chemin relatif à la racine ("" pour la racine), ou None si
+            l'élément n'a pas de parent et ne peut pas être la racine
+        """
+        parent_reference = item.get("parentReference", {})
+        if "root" in item:
+            return ""
+        if not parent_reference.get("id"):
+            # La facette root est absente des réponses projetées par $select :
+            # un dossier sans parent est la racine, sauf si elle est déjà connue
+            other_root = self.conn.execute(
+                "SELECT 1 FROM items WHERE drive_id = ? AND path = '' "
+                "AND item_id != ? AND deleted = 0",
+                (drive_id, item["id"]),
+            ).fetchone()
+            return "" if "folder" in item and not other_root else None
+        name = item.get("name", "")
+        parent_path = parent_path_from_reference(parent_reference)
+
+        if parent_path is None:
+            # Les réponses delta ne contiennent pas parentReference.path
+            parent = self.conn.execute(
+                "SELECT path FROM items WHERE drive_id = ? AND item_id = ?",
+                (drive_id, parent_reference.get("id")),
+            ).fetchone()
+            parent_path = parent["path"] if parent else ""
+
+        return f"{parent_path}/{name}" if parent_path else name
+
+    def upsert_items(self, drive_id: str, items: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insère ou met à jour des driveItems (listing, delta ou réponse d'upload).
+
+        Les éléments portant la facette "deleted" sont marqués supprimés. Un
+        élément dont le cTag, l'eTag et le chemin n'ont pas changé garde sa
+        séquence : un listing relu ne le fait pas apparaître dans changed_since.
+        Les éléments sans parent qui ne peuvent pas être la racine sont ignorés.
+
+        Args:
+            drive_id: ID du drive
+            items: driveItems au format Graph
+
+        Returns:
+            int: Nombre d'éléments traités
+        """
+        count = 0
+        with self._lock, self.conn:
+            seq = self.current_sequence(drive_id)
+            for item in items:
+                if "deleted" in item:
+                    count += 1
+                    cursor = self.conn.execute(
+                        "UPDATE items SET deleted = 1, seq = ? "
+                        "WHERE drive_id = ? AND item_id = ? AND deleted = 0",
+                        (seq + 1, drive_id, item["id"]),
+                    )
+                    seq += cursor.rowcount
+                    continue
+
+                path = self._resolve_path(drive_id, item)
+                if path is None:
+                    logger.warning(f"Élément {item['id']} sans parent ignoré")
+                    continue
+                count += 1
+                is_folder = 1 if ("folder" in item or "root" in item) else 0
+                previous = self.conn.execute(
+                    "SELECT path, ctag, etag, deleted, seq FROM items "
+                    "WHERE drive_id = ? AND item_id = ?",
+                    (drive_id, item["id"]),
+                ).fetchone()
+                unchanged = (
+                    previous is not None and not previous["deleted"]
+                    and previous["path"] == path
+                    and (item.get("cTag") or item.get("eTag")) is not None
+                    and previous["ctag"] == item.get("cTag")
+                    and previous["etag"] == item.get("eTag")
+                )
+                if unchanged:
+                    item_seq = previous["seq"]
+                else:
+                    seq += 1
+                    item_seq = seq
+
+                self.conn.execute(
+                    f"INSERT OR REPLACE INTO items ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    (
+                        drive_id,
+                        item["id"],
+                        path,
+                        item.get("parentReference", {}).get("id"),
+                        item.get("name"),
+                        is_folder,
+                        item.get("cTag"),
+                        item.get("eTag"),
+                        item.get("size"),
+                        item_hash(item),
+                        item.get("lastModifiedDateTime"),
+                        0,
+                        item_seq,
+                    ),
+                )
+
+                # Dossier renommé ou déplacé : mise à jour des descendants
+                if is_folder and previous and previous["path"] != path and previous["path"]:
+                    old_prefix = previous["path"] + "/"
+                    self.conn.execute(
+                        "UPDATE items SET path = ? || substr(path, ?) "
+                        "WHERE drive_id = ? AND path >= ? AND path < ?",
+                        (path + "/", len(old_prefix) + 1, drive_id,
+                         old_prefix, previous["path"] + "0"),
+                    )
+        return count
+
+    def invalidate(self, drive_id: str, item_id: str, ctag: Optional[str]) -> bool:
+        """
+        Supprime une entrée si son cTag ne correspond plus.
+
+        Args:
+            drive_id: ID du drive
+            item_id: ID de l'élément
+            ctag: cTag connu comme courant
+
+        Returns:
+            bool: True si l'entrée était périmée et a été supprimée
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM items WHERE drive_id = ? AND item_id = ? "
+                "AND (ctag IS NULL OR ctag != ?)",
+                (drive_id, item_id, ctag),
+            )
+            return cursor.rowcount > 0
+
+    def clear(self, drive_id: str) -> None:
+        """Vide l'index et l'état delta d'un drive."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM items WHERE drive_id = ?", (drive_id,))
+            self.conn.execute("DELETE FROM sync_state WHERE drive_id = ?", (drive_id,))
+
+    # ------------------------------------------------------------------
+    # Requêtes locales
+    # ------------------------------------------------------------------
+
+    def lookup_path(self, drive_id: str, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Résout un chemin en entrée d'index (insensible à la casse).
+
+        Args:
+            drive_id: ID du drive
+            path: Chemin relatif à la racine (ex: "General/rapport.xlsx")
+
+        Returns:
+            Dict de l'entrée ou None si absente
+        """
+        row = self.conn.execute(
+            "SELECT * FROM items WHERE drive_id = ? AND path = ? AND deleted = 0",
+            (drive_id, path.strip("/")),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_item_id(self, drive_id: str, path: str) -> Optional[str]:
+        """Résout un chemin en ID de driveItem."""
+        entry = self.lookup_path(drive_id, path)
+        return entry["item_id"] if entry else None
+
+    def list_prefix(
+        self, drive_id: str, prefix: str = "", recursive: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Liste les éléments sous un dossier.
+
+        Args:
+            drive_id: ID du drive
+            prefix: Chemin du dossier ("" pour la racine)
+            recursive: Inclure toute la descendance (sinon enfants directs)
+
+        Returns:
+            Liste des entrées triées par chemin
+        """
+        prefix = prefix.strip("/")
+        if not recursive:
+            parent = self.lookup_path(drive_id, prefix)
+            if not parent:
+                return []
+            rows = self.conn.execute(
+                "SELECT * FROM items WHERE drive_id = ? AND parent_id = ? "
+                "AND deleted = 0 ORDER BY path",
+                (drive_id, parent["item_id"]),
+            ).fetchall()
+        elif prefix:
+            # Plage [prefix/, prefix0) : exploite l'index sur path
+            rows = self.conn.execute(
+                "SELECT * FROM items WHERE drive_id = ? AND path >= ? AND path < ? "
+                "AND deleted = 0 ORDER BY path",
+                (drive_id, prefix + "/", prefix + "0"),
+            ).fetchall()
+        else:
+            rows = self.conn.execute(
+                "SELECT * FROM items WHERE drive_id = ? AND path != '' "
+                "AND deleted = 0 ORDER BY path",
+                (drive_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def changed_since(self, drive_id: str, since_seq: int) -> List[Dict[str, Any]]:
+        """
+        Retourne les entrées modifiées ou supprimées depuis une séquence.
+
+        Args:
+            drive_id: ID du drive
+            since_seq: Séquence de référence (voir current_sequence)
+
+        Returns:
+            Liste des entrées (deleted = 1 pour les suppressions)
+        """
+        rows = self.conn.execute(
+            "SELECT * FROM items WHERE drive_id = ? AND seq > ? ORDER BY seq",
+            (drive_id, since_seq),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_delta_link(self, drive_id: str) -> Optional[str]:
+        """Retourne le deltaLink mémorisé pour un drive."""
+        row = self.conn.execute(
+            "SELECT delta_link FROM sync_state WHERE drive_id = ?", (drive_id,)
+        ).fetchone()
+        return row["delta_link"] if row else None
+
+    def set_delta_link(self, drive_id: str, delta_link: str) -> None:
+        """Mémorise le deltaLink d'un drive."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (drive_id, delta_link, updated_at) "
+                "VALUES (?, ?, ?)",
+                (drive_id, delta_link, time.time()),
+            )
+
+
+def refresh_folder(
+    client: GraphClient, index: DriveIndex, drive_id: str, folder_path: str = ""
+) -> int:
+    """
+    Indexe les enfants directs d'un dossier à partir d'un listing Graph.
+
+    Args:
+        client: Client Graph
+        index: Index local
+        drive_id: ID du drive
+        folder_path: Chemin du dossier ("" pour la racine)
+
+    Returns:
+        int: Nombre d'éléments indexés
+    """
+    folder_path = folder_path.strip("/")
+    if folder_path:
+        path = f"drives/{drive_id}/root:/{folder_path}:/children"
+    else:
+        path = f"drives/{drive_id}/root/children"
+    return index.upsert_items(
+        drive_id, client.iter_pages(path, profile="hashes", kind="item")
+    )
+
+
+def sync_delta(client: GraphClient, index: DriveIndex, drive_id: str) -> int:
+    """
+    Synchronise l'index d'un drive via la requête delta Graph.
+
+    La première synchronisation parcourt tout le drive ; les suivantes repartent
+    du deltaLink mémorisé et ne transfèrent que les changements.
+
+    Args:
+        client: Client Graph
+        index: Index local
+        drive_id: ID du drive
+
+    Returns:
+        int: Nombre de changements appliqués
+    """
+    url = index.get_delta_link(drive_id)
+    profile = "full" if url else "hashes"
+    if not url:
+        url = f"drives/{drive_id}/root/delta"
+
+    applied = 0
+    while url:
+        try:
+            page = client.get_json(url, profile=profile, kind="item")
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 410:
+                # Jeton delta expiré : resynchronisation complète
+                logger.warning("Jeton delta expiré, resynchronisation complète")
+                index.clear(drive_id)
+                url, profile = f"drives/{drive_id}/root/delta", "hashes"
+                continue
+            raise
+
+        applied += index.upsert_items(drive_id, page.get("value", []))
+        profile = "full"
+        if "@odata.deltaLink" in page:
+            index.set_delta_link(drive_id, page["@odata.deltaLink"])
+            break
+        url = page.get("@odata.nextLink")
+
+    logger.info(f"Delta appliqué sur le drive {drive_id}: {applied} changements")
+    return applied
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Index local des driveItems")
+    parser.add_argument("command", choices=["sync", "refresh", "lookup", "ls", "changes"])
+    parser.add_argument("path", nargs="?", default="", help="Chemin dans le drive")
+    parser.add_argument("--drive-id", required=True, help="ID du drive")
+    parser.add_argument("--db", default=DEFAULT_INDEX_PATH, help="Fichier SQLite")
+    parser.add_argument("--since", type=int, default=0, help="Séquence de référence")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    index = DriveIndex(args.db)
+
+    if args.command in ("sync", "refresh"):
+        from credential_factory import get_credential
+
+        client = GraphClient(get_credential())
+        if args.command == "sync":
+            count = sync_delta(client, index, args.drive_id)
+        else:
+            count = refresh_folder(client, index, args.drive_id, args.path)
+        print(f"✅ {count} éléments indexés")
+        print(f"🔢 Séquence courante: {index.current_sequence(args.drive_id)}")
+
+    elif args.command == "lookup":
+        started = time.perf_counter()
+        entry = index.lookup_path(args.drive_id, args.path)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        if entry:
+            print(f"✅ {entry['path']} -> {entry['item_id']} ({elapsed_us:.0f} µs)")
+        else:
+            print(f"❌ Chemin non indexé: {args.path} ({elapsed_us:.0f} µs)")
+
+    elif args.command == "ls":
+        for entry in index.list_prefix(args.drive_id, args.path, recursive=False):
+            marker = "📁" if entry["is_folder"] else "📄"
+            print(f"   {marker} {entry['name']} ({entry['size'] or 0} bytes)")
+
+    else:
+        for entry in index.changed_since(args.drive_id, args.since):
+            status = "supprimé" if entry["deleted"] else "modifié"
+            print(f"   [{entry['seq']}] {status}: {entry['path']}")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Mises à jour incrémentales de classeurs Excel via l'API workbook de Microsoft Graph.
+
+Au lieu de régénérer et de réuploader tout le fichier xlsx, les lignes sont
+ajoutées aux tables (et les plages modifiées) directement dans le classeur
+stocké sur SharePoint, au sein d'une session persistante. Les écritures sont
+regroupées par lots de lignes et envoyées via JSON $batch : ajouter 1 000
+lignes à un classeur de 50 Mo ne transfère que quelques dizaines de Ko.
+
+Usage:
+    python excel_workbook.py append --drive-id <id> --path Suivi/suivi.xlsx \\
+        --table Suivi donnees.csv
+    python excel_workbook.py columns --drive-id <id> --path Suivi/suivi.xlsx --table Suivi
+"""
+
+import argparse
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import requests
+
+from graph_client import GRAPH_BATCH_LIMIT, GraphClient, batch_request
+from profiling import phase, run_profiled
+
+logger = logging.getLogger(__name__)
+
+SESSION_HEADER = "workbook-session-id"
+
+# Lignes par requête d'ajout (20 requêtes par appel $batch)
+DEFAULT_ROWS_PER_REQUEST = 500
+
+# Format des dates écrites dans les cellules (reconnu par Excel)
+EXCEL_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Codes d'erreur Graph d'une session expirée pouvant être recréée
+RECREATABLE_SESSION_ERRORS = ("invalidSessionReCreatable", "sessionNotFound")
+
+
+class WorkbookWriteError(Exception):
+    """Écritures de classeur refusées par Graph."""
+
+    def __init__(self, message: str, failures: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.failures = failures
+
+
+def _error_code(body: Any) -> str:
+    if isinstance(body, dict):
+        return body.get("error", {}).get("code", "")
+    return ""
+
+
+def _response_error_code(response: requests.Response) -> str:
+    try:
+        return _error_code(response.json())
+    except ValueError:
+        return ""
+
+
+def dataframe_to_rows(
+    df: pd.DataFrame,
+    columns: Optional[Sequence[str]] = None,
+    date_format: str = EXCEL_DATE_FORMAT,
+) -> List[List[Any]]:
+    """
+    Convertit un DataFrame en lignes JSON pour l'API workbook.
+
+    Les valeurs manquantes deviennent null, les dates des chaînes (par défaut
+    "AAAA-MM-JJ HH:MM:SS", reconnues par Excel) et les scalaires numpy des
+    types Python.
+
+    Args:
+        df: DataFrame à convertir
+        columns: Ordre des colonnes de la table cible (celui du DataFrame si absent)
+        date_format: Format strftime des colonnes de dates
+
+    Returns:
+        Liste de lignes (listes de valeurs)
+    """
+    if columns is not None:
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            raise ValueError(f"Colonnes absentes du DataFrame: {', '.join(missing)}")
+        df = df[list(columns)]
+
+    converted = {}
+    for position, (_, series) in enumerate(df.items()):
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.strftime(date_format)
+        elif pd.api.types.is_timedelta64_dtype(series):
+            series = series.astype(str)
+        values = series.astype(object)
+        converted[position] = values.where(series.notna(), None)
+    return pd.DataFrame(converted, index=df.index).values.tolist()
+
+
+class WorkbookSession:
+    """Session persistante sur un classeur Excel stocké dans un drive."""
+
+    def __init__(
+        self,
+        client: GraphClient,
+        drive_id: str,
+        item_path: Optional[str] = None,
+        item_id: Optional[str] = None,
+        persist_changes: bool = True,
+        rows_per_request: int = DEFAULT_ROWS_PER_REQUEST,
+    ):
+        """
+        Initialise la session (ouverte par open() ou le gestionnaire de contexte).
+
+        Args:
+            client: Client Graph
+            drive_id: ID du drive
+            item_path: Chemin du classeur relatif à la racine du drive
+            item_id: ID du classeur (évite la résolution du chemin)
+            persist_changes: Enregistrer les modifications dans le fichier
+            rows_per_request: Lignes envoyées par requête d'ajout
+        """
+        if not item_path and not item_id:
+            raise ValueError("Un chemin ou un ID de classeur est requis")
+        self.client = client
+        self.drive_id = drive_id
+        self.item_path = item_path
+        self.item_id = item_id
+        self.persist_changes = persist_changes
+        self.rows_per_request = rows_per_request
+        self.session_id: Optional[str] = None
+        self.stats = {"requests": 0, "sub_requests": 0, "rows": 0, "sessions": 0}
+
+    @property
+    def workbook_path(self) -> str:
+        return f"drives/{self.drive_id}/items/{self.item_id}/workbook"
+
+    def open(self) -> "WorkbookSession":
+        """Résout le classeur et crée la session."""
+        if not self.item_id:
+            item = self.client.get_json(
+                f"drives/{self.drive_id}/root:/{self.item_path.strip('/')}",
+                profile="ids_only", kind="item",
+            )
+            self.item_id = item["id"]
+            self.stats["requests"] += 1
+        response = self.client.request(
+            "POST", f"{self.workbook_path}/createSession",
+            json={"persistChanges": self.persist_changes},
+        )
+        response.raise_for_status()
+        self.session_id = response.json()["id"]
+        self.stats["requests"] += 1
+        self.stats["sessions"] += 1
+        logger.info(f"Session de classeur ouverte sur {self.item_path or self.item_id}")
+        return self
+
+    def close(self) -> None:
+        """Ferme la session (les modifications persistées sont déjà enregistrées)."""
+        if not self.session_id:
+            return
+        try:
+            response = self.client.request(
+                "POST", f"{self.workbook_path}/closeSession",
+                headers={SESSION_HEADER: self.session_id},
+            )
+            if response.status_code not in (204, 404):
+                response.raise_for_status()
+        finally:
+            self.session_id = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _headers(self) -> Dict[str, str]:
+        if not self.session_id:
+            self.open()
+        return {SESSION_HEADER: self.session_id}
+
+    def request(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Exécute une requête workbook dans la session (recréée si expirée).
+
+        Args:
+            method: Méthode HTTP
+            path: Chemin relatif au classeur (ex: "tables/Suivi/columns")
+            **kwargs: Arguments transmis à GraphClient.request
+
+        Returns:
+            Dict: Réponse JSON (lève requests.HTTPError si erreur)
+        """
+        for attempt in range(2):
+            response = self.client.request(
+                method, f"{self.workbook_path}/{path}", headers=self._headers(), **kwargs
+            )
+            self.stats["requests"] += 1
+            if (attempt == 0 and response.status_code == 404
+                    and _response_error_code(response) in RECREATABLE_SESSION_ERRORS):
+                logger.warning("Session de classeur expirée, recréation")
+                self.session_id = None
+                continue
+            response.raise_for_status()
+            return response.json() if response.content else {}
+        return {}
+
+    def _batch(self, entries: List[Dict[str, Any]], ordered: bool = False) -> List[Dict[str, Any]]:
+        """
+        Envoie des écritures via $batch dans la session.
+
+        Args:
+            entries: Sous-requêtes (voir batch_request)
+            ordered: Chaîner les sous-requêtes (dependsOn) pour garder leur ordre
+
+        Returns:
+            Liste des sous-réponses (lève WorkbookWriteError si échec)
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+        pending = list(range(len(entries)))
+        for attempt in range(2):
+            headers = self._headers()
+            batch = []
+            for position, index in enumerate(pending):
+                entry = dict(entries[index], headers=dict(headers))
+                if ordered and position:
+                    entry["dependsOn"] = [position - 1]
+                batch.append(entry)
+            responses = self.client.batch(batch)
+            self.stats["requests"] += math.ceil(len(batch) / GRAPH_BATCH_LIMIT)
+            self.stats["sub_requests"] += len(batch)
+
+            expired = []
+            for position, (index, response) in enumerate(zip(pending, responses)):
+                # Les écritures chaînées derrière une session expirée reviennent en 424
+                if attempt == 0 and (
+                    _error_code(response["body"]) in RECREATABLE_SESSION_ERRORS
+                    or (response["status"] == 424 and ordered and position
+                        and pending[position - 1] in expired)
+                ):
+                    expired.append(index)
+                else:
+                    results[index] = response
+            if not expired:
+                break
+            logger.warning(f"Session de classeur expirée, rejeu de {len(expired)} écritures")
+            self.session_id = None
+            pending = expired
+
+        failures = [
+            {"index": i, "status": r["status"], "error": r["body"]}
+            for i, r in enumerate(results) if r["status"] is None or r["status"] >= 400
+        ]
+        if failures:
+            raise WorkbookWriteError(
+                f"{len(failures)}/{len(entries)} écritures refusées "
+                f"(première: {failures[0]['status']} {_error_code(failures[0]['error'])})",
+                failures,
+            )
+        return results
+
+    def table_columns(self, table: str) -> List[str]:
+        """Retourne les noms des colonnes d'une table, dans l'ordre."""
+        payload = self.request("GET", f"tables/{table}/columns", params={"$select": "name"})
+        return [column["name"] for column in payload.get("value", [])]
+
+    def add_rows(self, table: str, rows: Sequence[Sequence[Any]]) -> int:
+        """
+        Ajoute des lignes à la fin d'une table.
+
+        Les lignes sont envoyées par blocs de rows_per_request, regroupés par
+        appels $batch et chaînés pour conserver leur ordre.
+
+        Returns:
+            int: Nombre de lignes ajoutées (lève WorkbookWriteError si échec)
+        """
+        if not len(rows):
+            return 0
+        url = f"{self.workbook_path}/tables/{table}/rows"
+        entries = [
+            batch_request(url, method="POST", body={
+                "values": [list(row) for row in rows[start:start + self.rows_per_request]]
+            })
+            for start in range(0, len(rows), self.rows_per_request)
+        ]
+        with phase("workbook"):
+            self._batch(entries, ordered=True)
+        self.stats["rows"] += len(rows)
+        logger.info(f"{len(rows)} lignes ajoutées à la table {table} ({len(entries)} requêtes)")
+        return len(rows)
+
+    def append_dataframe(self, table: str, df: pd.DataFrame, align_columns: bool = True) -> int:
+        """
+        Ajoute un DataFrame à une table.
+
+        Args:
+            table: Nom de la table
+            df: Lignes à ajouter
+            align_columns: Réordonner les colonnes selon l'en-tête de la table
+
+        Returns:
+            int: Nombre de lignes ajoutées
+        """
+        columns = self.table_columns(table) if align_columns else None
+        return self.add_rows(table, dataframe_to_rows(df, columns))
+
+    def update_range(self, worksheet: str, address: str, values: List[List[Any]]) -> Dict[str, Any]:
+        """Remplace les valeurs d'une plage (ex: "B2:D4")."""
+        return self.request("PATCH", f"worksheets/{worksheet}/range(address='{address}')",
+                            json={"values": values})
+
+    def update_ranges(self, updates: Iterable[Tuple[str, str, List[List[Any]]]]) -> int:
+        """
+        Remplace plusieurs plages en un minimum d'appels $batch.
+
+        Args:
+            updates: Tuples (feuille, adresse, valeurs)
+
+        Returns:
+            int: Nombre de plages modifiées
+        """
+        entries = [
+            batch_request(f"{self.workbook_path}/worksheets/{worksheet}/range(address='{address}')",
+                          method="PATCH", body={"values": values})
+            for worksheet, address, values in updates
+        ]
+        if entries:
+            with phase("workbook"):
+                self._batch(entries, ordered=True)
+        return len(entries)
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Écritures incrémentales dans un classeur Excel")
+    parser.add_argument("command", choices=["append", "columns"])
+    parser.add_argument("csv", nargs="?", help="Lignes à ajouter (CSV avec en-têtes)")
+    parser.add_argument("--drive-id", required=True, help="ID du drive")
+    parser.add_argument("--path", required=True, help="Chemin du classeur dans le drive")
+    parser.add_argument("--table", required=True, help="Nom de la table Excel")
+    parser.add_argument("--rows-per-request", type=int, default=DEFAULT_ROWS_PER_REQUEST)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from credential_factory import get_credential
+
+    client = GraphClient(get_credential())
+    session = WorkbookSession(client, args.drive_id, args.path,
+                              rows_per_request=args.rows_per_request)
+    try:
+        with session:
+            if args.command == "columns":
+                for name in session.table_columns(args.table):
+                    print(f"   {name}")
+                return
+            if not args.csv:
+                parser.error("Fichier CSV requis pour append")
+            count = session.append_dataframe(args.table, pd.read_csv(args.csv))
+    except (requests.RequestException, WorkbookWriteError) as e:
+        print(f"❌ Écriture impossible: {e}")
+        raise SystemExit(1)
+
+    stats = session.stats
+    print(f"✅ {count} lignes ajoutées à {args.table} "
+          f"({stats['requests']} requêtes HTTP, {stats['sub_requests']} sous-requêtes $batch)")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
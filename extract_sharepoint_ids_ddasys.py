@@ -11,10 +11,13 @@ import os
 import urllib.parse
 from typing import Optional, Tuple
 
-import requests
 from azure.identity import AzureCliCredential
 from dotenv import load_dotenv
 
+from graph_client import GraphClient
+from hedging import HedgePolicy, print_hedge_summary
+from profiling import run_profiled
+
 # Chargement de la configuration
 load_dotenv('config.env')
 
@@ -30,6 +33,8 @@ class SharePointIDExtractorDDASYS:
         """Initialise l'extracteur avec l'authentification Azure CLI."""
         self.credential = AzureCliCredential()
         self.access_token = None
+        # Recherches de métadonnées doublées si lentes (SHAREPOINT_HEDGE)
+        self.client = GraphClient(self.credential, hedging=HedgePolicy.from_env())
 
     def get_access_token(self) -> str:
         """Récupère un token d'accès pour l'API Microsoft Graph."""
@@ -110,20 +115,10 @@ class SharePointIDExtractorDDASYS:
             str: Site ID ou None en cas d'erreur
         """
         try:
-            token = self.get_access_token()
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json",
-            }
-
-            # Construire l'URL pour récupérer le site
-            api_url = (
-                f"https://graph.microsoft.com/v1.0/sites/"
-                f"{tenant}:/sites/{site_name}"
-            )
-
-            logger.info(f"Requête GET vers: {api_url}")
-            response = requests.get(api_url, headers=headers)
+            # Récupérer le site par son chemin
+            api_path = f"sites/{tenant}:/sites/{site_name}"
+            logger.info(f"Requête GET vers: {api_path}")
+            response = self.client.request("GET", api_path, profile="listing")
 
             if response.status_code == 200:
                 site_data = response.json()
@@ -157,17 +152,10 @@ class SharePointIDExtractorDDASYS:
             str: Drive ID ou None en cas d'erreur
         """
         try:
-            token = self.get_access_token()
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json",
-            }
-
             # Récupérer tous les drives du site
-            api_url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drives"
-
-            logger.info(f"Requête GET vers: {api_url}")
-            response = requests.get(api_url, headers=headers)
+            api_path = f"sites/{site_id}/drives"
+            logger.info(f"Requête GET vers: {api_path}")
+            response = self.client.request("GET", api_path, profile="listing")
 
             if response.status_code == 200:
                 drives_data = response.json()
@@ -229,18 +217,10 @@ class SharePointIDExtractorDDASYS:
             drive_id: ID du drive principal
         """
         try:
-            token = self.get_access_token()
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json",
-            }
-
             # Lister les fichiers à la racine du drive
-            api_url = (f"https://graph.microsoft.com/v1.0/drives/"
-                       f"{drive_id}/root/children")
-
-            logger.info(f"Listing contenu du drive: {api_url}")
-            response = requests.get(api_url, headers=headers)
+            api_path = f"drives/{drive_id}/root/children"
+            logger.info(f"Listing contenu du drive: {api_path}")
+            response = self.client.request("GET", api_path, profile="listing")
 
             if response.status_code == 200:
                 items_data = response.json()
@@ -328,6 +308,9 @@ def main():
     extractor = SharePointIDExtractorDDASYS()
     site_id, drive_id, folder_path = extractor.extract_all_ids(sharepoint_url)
 
+    if extractor.client.hedging:
+        print_hedge_summary(extractor.client.hedging)
+
     # Affichage des résultats
     print("\n" + "=" * 60)
     print("📋 RÉSULTATS POUR VOS SCRIPTS SHAREPOINT DDASYS")
@@ -370,4 +353,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    run_profiled(main)
\ No newline at end of file
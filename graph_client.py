@@ -0,0 +1,840 @@
+#!/usr/bin/env python3
+"""
+Client Microsoft Graph partagé par les scripts SharePoint.
+
+Toutes les requêtes de métadonnées passent par build_graph_request, qui applique
+un profil de projection $select nommé (ids_only, listing, hashes, full) selon le
+type de ressource interrogée. Les listings de bibliothèques volumineuses ne
+transportent ainsi que les champs réellement lus par les scripts.
+"""
+
+import contextvars
+import logging
+import re
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import requests
+
+from circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from hedging import HedgePolicy
+from identity_pool import THROTTLE_STATUS_CODES, IdentityPool, parse_retry_after
+from metadata_cache import MetadataCache
+from request_lanes import LaneScheduler
+from upload_source import SourceLike, UploadSource
+
+logger = logging.getLogger(__name__)
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+
+# Marge de renouvellement du token avant son expiration (secondes)
+TOKEN_REFRESH_MARGIN = 300
+
+# Nombre maximal de sous-requêtes par appel JSON $batch
+GRAPH_BATCH_LIMIT = 20
+
+# Au-delà, les uploads passent par une session d'upload fragmentée
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+
+# Taille des fragments d'une session d'upload (multiple de 320 Kio exigé par Graph)
+UPLOAD_CHUNK_SIZE = 10 * 320 * 1024
+
+# Taille des blocs lus lors d'un téléchargement en flux
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Champs $select par profil et par type de ressource.
+# Un profil sans entrée pour un type de ressource ne restreint pas la réponse.
+SELECT_PROFILES: Dict[str, Dict[str, str]] = {
+    "ids_only": {
+        "site": "id",
+        "drive": "id",
+        "item": "id",
+        "list": "id",
+        "permission": "id",
+    },
+    "listing": {
+        "site": "id,displayName,webUrl",
+        "drive": "id,name,driveType,webUrl",
+        "item": "id,name,size,webUrl,folder,file,parentReference,"
+                "lastModifiedDateTime",
+        "list": "id,displayName,webUrl,list",
+        "permission": "id,roles,grantedToIdentitiesV2",
+    },
+    "hashes": {
+        "site": "id",
+        "drive": "id,driveType",
+        "item": "id,name,size,eTag,cTag,file,folder,parentReference,"
+                "lastModifiedDateTime",
+        "list": "id,eTag,lastModifiedDateTime",
+        "permission": "id,roles",
+    },
+    "full": {},
+}
+
+# Segment de chemin -> type de ressource, en partant de la fin de l'URL
+_SEGMENT_KINDS = {
+    "children": "item",
+    "root": "item",
+    "items": "item",
+    "delta": "item",
+    "drive": "drive",
+    "drives": "drive",
+    "lists": "list",
+    "permissions": "permission",
+    "sites": "site",
+}
+
+# Adressage par chemin "root:/dossier/fichier:" (le chemin peut contenir n'importe quoi)
+_ROOT_PATH_ADDRESSING = re.compile(r"root:/[^:]*:?")
+
+
+def infer_resource_kind(path: str) -> Optional[str]:
+    """
+    Déduit le type de ressource Graph (site, drive, item, list, permission).
+
+    Args:
+        path: Chemin relatif ou URL complète de la requête
+
+    Returns:
+        str: Type de ressource ou None s'il n'est pas reconnu
+    """
+    path = path.split("?", 1)[0]
+    if path.startswith(GRAPH_BASE_URL):
+        path = path[len(GRAPH_BASE_URL):]
+    path = _ROOT_PATH_ADDRESSING.sub("root", path)
+
+    for segment in reversed([s for s in path.split("/") if s]):
+        kind = _SEGMENT_KINDS.get(segment.rstrip(":"))
+        if kind:
+            return kind
+    return None
+
+
+def build_graph_request(
+    path: str,
+    profile: str = "full",
+    kind: Optional[str] = None,
+    params: Optional[Dict[str, str]] = None,
+    base_url: str = GRAPH_BASE_URL,
+) -> Tuple[str, Dict[str, str]]:
+    """
+    Construit l'URL et les paramètres d'une requête Graph avec projection.
+
+    Args:
+        path: Chemin relatif à base_url (ex: "sites/{id}/drives") ou URL complète
+        profile: Nom du profil de projection (ids_only, listing, hashes, full)
+        kind: Type de ressource (déduit du chemin si absent)
+        params: Paramètres de requête supplémentaires
+
+    Returns:
+        Tuple[url, params]: URL complète et paramètres de requête
+    """
+    if profile not in SELECT_PROFILES:
+        raise ValueError(f"Profil de projection inconnu: {profile}")
+
+    if path.startswith("http://") or path.startswith("https://"):
+        url = path
+    else:
+        url = f"{base_url.rstrip('/')}/{path.lstrip('/')}"
+
+    query = dict(params or {})
+    select = SELECT_PROFILES[profile].get(kind or infer_resource_kind(path) or "")
+    if select and "$select" not in query:
+        query["$select"] = select
+
+    return url, query
+
+
+def batch_request(
+    path: str,
+    profile: str = "full",
+    kind: Optional[str] = None,
+    params: Optional[Dict[str, str]] = None,
+    method: str = "GET",
+    headers: Optional[Dict[str, str]] = None,
+    body: Any = None,
+) -> Dict[str, Any]:
+    """
+    Construit une sous-requête $batch avec projection.
+
+    Args:
+        path: Chemin relatif (ex: "sites/{id}/permissions") ou URL complète
+        profile: Nom du profil de projection
+        kind: Type de ressource (déduit du chemin si absent)
+        params: Paramètres de requête supplémentaires
+        method: Méthode HTTP
+        headers: En-têtes de la sous-requête
+        body: Corps JSON de la sous-requête
+
+    Returns:
+        Dict: Sous-requête à passer à GraphClient.batch
+    """
+    url, query = build_graph_request(path, profile, kind, params, base_url="")
+    if query:
+        separator = "&" if "?" in url else "?"
+        url = f"{url}{separator}{urllib.parse.urlencode(query, safe='$,')}"
+    entry: Dict[str, Any] = {"method": method, "url": url}
+    if headers:
+        entry["headers"] = dict(headers)
+    if body is not None:
+        entry["body"] = body
+    return entry
+
+
+def _body_size(data: Any) -> int:
+    """Taille d'un corps de requête en octets (0 si inconnue : flux, JSON)."""
+    if isinstance(data, memoryview):
+        return data.nbytes
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    return 0
+
+
+def _body_position(data: Any) -> Optional[int]:
+    """Position courante d'un corps en flux repositionnable (None sinon)."""
+    if not (hasattr(data, "seek") and hasattr(data, "tell")):
+        return None
+    try:
+        return data.tell()
+    except (OSError, ValueError):
+        return None
+
+
+class GraphClient:
+    """Client HTTP Microsoft Graph avec cache de token et pagination."""
+
+    def __init__(
+        self,
+        credential: Any = None,
+        base_url: str = GRAPH_BASE_URL,
+        timeout: float = 30.0,
+        session: Optional[requests.Session] = None,
+        scope: str = GRAPH_SCOPE,
+        identity_pool: Optional[IdentityPool] = None,
+        metadata_cache: Optional[MetadataCache] = None,
+        lanes: Optional[LaneScheduler] = None,
+        breakers: Optional[CircuitBreakerRegistry] = None,
+        hedging: Optional[HedgePolicy] = None,
+    ):
+        """
+        Initialise le client Graph.
+
+        Args:
+            credential: Credential azure-identity (objet avec get_token)
+            base_url: URL de base de l'API Graph
+            timeout: Timeout par défaut des requêtes (secondes)
+            session: Session requests à réutiliser (créée si absente)
+            scope: Scope demandé pour le token
+            identity_pool: Pool d'identités ; remplace credential et répartit
+                les requêtes entre identités selon leur marge de throttling
+            metadata_cache: Cache des GET de métadonnées (ETag, 404, invalidation
+                par les écritures du client)
+            lanes: Ordonnanceur par classe de priorité (voir request_lanes.priority)
+            breakers: Disjoncteurs par point d'accès (échec immédiat pendant un incident)
+            hedging: Politique de doublons des GET lents (latence de queue)
+        """
+        if credential is None and identity_pool is None:
+            raise ValueError("Un credential ou un pool d'identités est requis")
+        self.credential = credential
+        self.identity_pool = identity_pool
+        self.metadata_cache = metadata_cache
+        self.lanes = lanes
+        self.breakers = breakers
+        self.hedging = hedging
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.scope = scope
+        self._token: Optional[str] = None
+        self._token_expires_on = 0.0
+        self._token_lock = threading.Lock()
+
+    def get_access_token(self) -> str:
+        """Récupère un token d'accès, renouvelé peu avant son expiration."""
+        with self._token_lock:
+            if (
+                not self._token
+                or time.time() >= self._token_expires_on - TOKEN_REFRESH_MARGIN
+            ):
+                token = self.credential.get_token(self.scope)
+                self._token = token.token
+                self._token_expires_on = float(token.expires_on)
+                logger.info("Token d'accès Microsoft Graph obtenu avec succès")
+            return self._token
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        profile: str = "full",
+        kind: Optional[str] = None,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Exécute une requête Graph authentifiée.
+
+        Args:
+            method: Méthode HTTP
+            path: Chemin relatif ou URL complète
+            profile: Profil de projection $select
+            kind: Type de ressource (déduit du chemin si absent)
+            params: Paramètres de requête supplémentaires
+            headers: En-têtes supplémentaires
+            **kwargs: Arguments transmis à requests (json, data, timeout...)
+
+        Returns:
+            requests.Response: Réponse brute
+        """
+        url, query = build_graph_request(path, profile, kind, params, self.base_url)
+        kwargs.setdefault("timeout", self.timeout)
+        cache = self.metadata_cache
+        if cache is None:
+            return self._send(method, url, query, headers, kwargs)
+
+        relative = self.relative_url(url)
+        if method != "GET":
+            response = self._send(method, url, query, headers, kwargs)
+            if response.status_code < 400 or response.status_code == 409:
+                result = None
+                if not kwargs.get("stream") and response.content:
+                    try:
+                        result = response.json()
+                    except ValueError:
+                        pass
+                cache.invalidate(relative, kwargs.get("json"), result)
+            return response
+        if not url.startswith(self.base_url) or not cache.cacheable(relative, headers, kwargs):
+            cache.stats["uncacheable"] += 1
+            return self._send(method, url, query, headers, kwargs)
+
+        key = cache.key(relative, query)
+        cached, etag = cache.lookup(key)
+        if cached is not None:
+            return cached
+        response = self._send(method, url, query, {"If-None-Match": etag} if etag else None,
+                              kwargs)
+        if etag:
+            revalidated = cache.revalidated(key, response)
+            if revalidated is not None:
+                return revalidated
+        cache.store(key, relative, response)
+        return response
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        query: Dict[str, str],
+        headers: Optional[Dict[str, str]],
+        kwargs: Dict[str, Any],
+    ) -> requests.Response:
+        """Envoie une requête sous disjoncteur, dans la classe de priorité courante."""
+        def send() -> requests.Response:
+            return self._guarded(method, url,
+                                 lambda: self._dispatch(method, url, query, headers, kwargs),
+                                 _body_size(kwargs.get("data")))
+
+        # Seuls les GET de métadonnées lus entièrement sont doublés (idempotents, courts)
+        if (self.hedging is not None and method == "GET" and not kwargs.get("stream")
+                and self.hedging.eligible(self.relative_url(url))):
+            return self.hedging.run(send)
+        return send()
+
+    def _guarded(self, method: str, url: str, send: Callable[[], requests.Response],
+                 size_bytes: int = 0) -> requests.Response:
+        """
+        Applique classe de priorité puis disjoncteur.
+
+        Un circuit ouvert est refusé avant la file d'attente (il n'occupe pas de
+        créneau) ; le disjoncteur ne chronomètre que l'appel, une fois le créneau
+        obtenu (l'attente et les pauses de throttling de la lane n'en font pas partie).
+        """
+        def send_guarded() -> requests.Response:
+            return self.breakers.call(method, url, send, size_bytes)
+
+        if self.breakers is not None:
+            self.breakers.check(method, url)
+            guarded = send_guarded
+        else:
+            guarded = send
+        if self.lanes is not None:
+            with self.lanes.slot() as slot:
+                slot["response"] = guarded()
+            return slot["response"]
+        return guarded()
+
+    def _dispatch(
+        self,
+        method: str,
+        url: str,
+        query: Dict[str, str],
+        headers: Optional[Dict[str, str]],
+        kwargs: Dict[str, Any],
+    ) -> requests.Response:
+        """Envoie une requête avec le token du client ou via le pool d'identités."""
+        if self.identity_pool:
+            return self._send_with_pool(method, url, query, headers or {}, kwargs)
+
+        request_headers = {"Authorization": f"Bearer {self.get_access_token()}"}
+        request_headers.update(headers or {})
+        return self.session.request(
+            method, url, params=query or None, headers=request_headers, **kwargs
+        )
+
+    def _send_with_pool(
+        self,
+        method: str,
+        url: str,
+        query: Dict[str, str],
+        headers: Dict[str, str],
+        kwargs: Dict[str, Any],
+    ) -> requests.Response:
+        """
+        Envoie la requête via le pool, en basculant si une identité est throttlée.
+
+        Un corps en flux est consommé par l'envoi : il n'est renvoyé que s'il
+        peut être repositionné, sinon la réponse throttlée est retournée telle
+        quelle (l'appelant réessaie avec une nouvelle source).
+        """
+        pool = self.identity_pool
+        tried = []
+        response = None
+        data = kwargs.get("data")
+        position = _body_position(data)
+        replayable = (position is not None or data is None
+                      or isinstance(data, (bytes, bytearray, memoryview, str, dict, list, tuple)))
+
+        for _ in range(len(pool) + 1):
+            identity = pool.acquire(exclude=tried)
+            try:
+                request_headers = {
+                    "Authorization": f"Bearer {identity.get_access_token(self.scope)}"
+                }
+                request_headers.update(headers)
+                response = self.session.request(
+                    method, url, params=query or None, headers=request_headers, **kwargs
+                )
+            except Exception:
+                pool.release(identity)
+                raise
+
+            throttled = pool.release(
+                identity, response.status_code, response.headers.get("Retry-After")
+            )
+            if not throttled:
+                return response
+            if not replayable:
+                logger.warning(f"Corps en flux non repositionnable, pas de bascule après "
+                               f"le throttling de {identity.name}")
+                return response
+            if position is not None:
+                data.seek(position)
+            logger.info(f"Bascule de {identity.name} vers une autre identité du pool")
+            tried.append(identity)
+
+        return response
+
+    def get_json(
+        self,
+        path: str,
+        profile: str = "full",
+        kind: Optional[str] = None,
+        params: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Exécute un GET et retourne le JSON (lève requests.HTTPError si erreur).
+        """
+        response = self.request("GET", path, profile=profile, kind=kind, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def iter_pages(
+        self,
+        path: str,
+        profile: str = "listing",
+        kind: Optional[str] = None,
+        params: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Itère sur les éléments d'une collection en suivant @odata.nextLink.
+
+        Args:
+            path: Chemin de la collection (ex: "drives/{id}/root/children")
+            profile: Profil de projection appliqué à la première page
+            kind: Type de ressource (déduit du chemin si absent)
+            params: Paramètres de requête supplémentaires
+
+        Yields:
+            Dict: Chaque élément de la collection
+        """
+        page = self.get_json(path, profile=profile, kind=kind, params=params)
+        while True:
+            yield from page.get("value", [])
+            next_link = page.get("@odata.nextLink")
+            if not next_link:
+                break
+            # Le nextLink contient déjà la projection et le jeton de pagination
+            page = self.get_json(next_link)
+
+    def relative_url(self, url: str) -> str:
+        """Convertit une URL complète (ex: nextLink) en URL relative pour $batch."""
+        for base in (self.base_url, GRAPH_BASE_URL):
+            if url.startswith(base):
+                return url[len(base):] or "/"
+        return url if url.startswith("/") else f"/{url}"
+
+    def _send_batch(self, entries: List[Tuple[int, Dict[str, Any]]]) -> Dict[int, Dict[str, Any]]:
+        """Envoie un lot $batch et retourne les sous-réponses par index."""
+        payload = []
+        sent = {index for index, _ in entries}
+        for index, entry in entries:
+            sub_request = {
+                "id": str(index),
+                "method": entry.get("method", "GET"),
+                "url": self.relative_url(entry["url"]),
+            }
+            # Dépendances hors du lot (déjà exécutées lors d'un lot précédent) ignorées
+            depends_on = [str(i) for i in entry.get("dependsOn", []) if i in sent]
+            if depends_on:
+                sub_request["dependsOn"] = depends_on
+            headers = dict(entry.get("headers", {}))
+            if "body" in entry:
+                sub_request["body"] = entry["body"]
+                headers.setdefault("Content-Type", "application/json")
+            if headers:
+                sub_request["headers"] = headers
+            payload.append(sub_request)
+
+        response = self.request("POST", "$batch", json={"requests": payload})
+        if response.status_code in THROTTLE_STATUS_CODES:
+            # Lot entier throttlé : chaque entrée est rejouée comme une sous-requête throttlée
+            retry_after = response.headers.get("Retry-After")
+            return {
+                index: {"status": response.status_code,
+                        "headers": {"Retry-After": retry_after} if retry_after else {},
+                        "body": None}
+                for index, _ in entries
+            }
+        response.raise_for_status()
+        return {
+            int(sub["id"]): {
+                "status": sub.get("status"),
+                "headers": sub.get("headers", {}),
+                "body": sub.get("body"),
+            }
+            for sub in response.json().get("responses", [])
+        }
+
+    def batch(
+        self,
+        entries: List[Dict[str, Any]],
+        max_retries: int = 3,
+        concurrency: int = 1,
+    ) -> List[Dict[str, Any]]:
+        """
+        Exécute des requêtes via JSON $batch, par lots de 20.
+
+        Les sous-requêtes throttlées (429/503), ou toutes celles d'un lot rejeté
+        en bloc, sont rejouées dans un lot ultérieur après le plus long
+        Retry-After reçu, avec les sous-requêtes
+        qui en dépendent (424 Failed Dependency) : une chaîne dependsOn est
+        rejouée dans son ordre, et les lots suivants de la chaîne attendent.
+
+        Args:
+            entries: Sous-requêtes {"method", "url", "headers", "body", "dependsOn"}
+                (voir batch_request) ; dependsOn liste les index d'entrées à
+                exécuter avant
+            max_retries: Nombre maximal de rejeux d'une sous-requête throttlée
+            concurrency: Nombre de lots envoyés simultanément (lots séquentiels
+                dès qu'une entrée a des dépendances)
+
+        Returns:
+            Liste de {"status", "headers", "body"} dans l'ordre des entrées
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+        pending = list(range(len(entries)))
+        attempt = 0
+
+        while pending:
+            chunks = [
+                [(i, entries[i]) for i in pending[start:start + GRAPH_BATCH_LIMIT]]
+                for start in range(0, len(pending), GRAPH_BATCH_LIMIT)
+            ]
+            retry, wait = [], 0.0
+            # Entrées rejouées au prochain passage : leurs dépendantes le sont aussi
+            deferred: set = set()
+
+            def settle(chunk_responses: Dict[int, Dict[str, Any]]) -> None:
+                nonlocal wait
+                for index in sorted(chunk_responses):
+                    sub = chunk_responses[index]
+                    depends_on = entries[index].get("dependsOn", [])
+                    if attempt < max_retries and (
+                        sub["status"] in THROTTLE_STATUS_CODES
+                        or (sub["status"] == 424 and deferred.intersection(depends_on))
+                    ):
+                        retry.append(index)
+                        deferred.add(index)
+                        if sub["status"] != 424:
+                            wait = max(wait, parse_retry_after(
+                                sub["headers"].get("Retry-After"), default=1.0
+                            ))
+                    else:
+                        results[index] = sub
+
+            if any(entries[i].get("dependsOn") for i in pending):
+                for chunk in chunks:
+                    ready = []
+                    for index, entry in chunk:
+                        depends_on = entry.get("dependsOn", [])
+                        if deferred.intersection(depends_on):
+                            retry.append(index)
+                            deferred.add(index)
+                        elif any(results[d] is not None and (results[d]["status"] or 500) >= 400
+                                 for d in depends_on):
+                            # Dépendance en échec définitif dans un lot précédent
+                            results[index] = {"status": 424, "headers": {}, "body": {
+                                "error": {"code": "failedDependency",
+                                          "message": f"Dépendance en échec: {depends_on}"}}}
+                        else:
+                            ready.append((index, entry))
+                    if ready:
+                        settle(self._send_batch(ready))
+            elif concurrency > 1 and len(chunks) > 1:
+                # Chaque lot garde la classe de priorité de l'appelant
+                with ThreadPoolExecutor(max_workers=min(concurrency, len(chunks))) as executor:
+                    futures = [executor.submit(contextvars.copy_context().run,
+                                               self._send_batch, chunk) for chunk in chunks]
+                    for future in futures:
+                        settle(future.result())
+            else:
+                for chunk in chunks:
+                    settle(self._send_batch(chunk))
+
+            if retry:
+                logger.warning(f"{len(retry)} sous-requêtes throttlées, rejeu dans {wait:.0f}s")
+                time.sleep(wait)
+                attempt += 1
+            pending = sorted(retry)
+
+        if self.metadata_cache is not None:
+            for entry, result in zip(entries, results):
+                if entry.get("method", "GET") != "GET" and result and result["status"] \
+                        and (result["status"] < 400 or result["status"] == 409):
+                    self.metadata_cache.invalidate(entry["url"], entry.get("body"),
+                                                   result.get("body"))
+        return [
+            result or {"status": None, "headers": {}, "body": None} for result in results
+        ]
+
+    def upload_content(
+        self,
+        drive_id: str,
+        item_path: str,
+        content: bytes,
+        content_type: str = "application/octet-stream",
+    ) -> Dict[str, Any]:
+        """
+        Uploade un contenu par PUT simple (fichiers jusqu'à quelques Mo).
+
+        Args:
+            drive_id: ID du drive cible
+            item_path: Chemin du fichier relatif à la racine du drive
+            content: Contenu du fichier
+            content_type: Type MIME du contenu
+
+        Returns:
+            Dict: driveItem créé ou remplacé (lève requests.HTTPError si erreur)
+        """
+        response = self.request(
+            "PUT",
+            f"drives/{drive_id}/root:/{item_path.strip('/')}:/content",
+            data=content,
+            headers={"Content-Type": content_type},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def create_upload_session(
+        self, drive_id: str, item_path: str, conflict_behavior: str = "replace"
+    ) -> str:
+        """
+        Crée une session d'upload fragmenté.
+
+        Returns:
+            str: URL d'upload pré-authentifiée
+        """
+        response = self.request(
+            "POST",
+            f"drives/{drive_id}/root:/{item_path.strip('/')}:/createUploadSession",
+            json={"item": {"@microsoft.graph.conflictBehavior": conflict_behavior}},
+        )
+        response.raise_for_status()
+        return response.json()["uploadUrl"]
+
+    def upload_stream(
+        self,
+        drive_id: str,
+        item_path: str,
+        stream: BinaryIO,
+        size: int,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Uploade un flux par session d'upload, un fragment à la fois.
+
+        La mémoire occupée est bornée par chunk_size, quelle que soit la taille
+        du fichier. Un fichier disque est projeté en mémoire (fragments sans copie).
+
+        Args:
+            drive_id: ID du drive cible
+            item_path: Chemin du fichier relatif à la racine du drive
+            stream: Flux binaire positionné au début du contenu
+            size: Taille totale du contenu
+            chunk_size: Taille des fragments (multiple de 320 Kio)
+
+        Returns:
+            Dict: driveItem créé (lève requests.HTTPError si erreur)
+        """
+        with UploadSource(stream, size) as source:
+            return self._upload_session(drive_id, item_path, source, size, chunk_size)
+
+    def _upload_session(
+        self,
+        drive_id: str,
+        item_path: str,
+        source: UploadSource,
+        size: int,
+        chunk_size: int,
+    ) -> Dict[str, Any]:
+        """Envoie une source fragment par fragment dans une session d'upload."""
+        upload_url = self.create_upload_session(drive_id, item_path)
+        offset = 0
+        try:
+            while True:
+                chunk = source.view(offset, min(offset + chunk_size, size))
+                if not len(chunk) and offset < size:
+                    raise ValueError(f"Flux interrompu à {offset}/{size} octets")
+                end = offset + len(chunk) - 1
+                # L'URL de session est pré-authentifiée : pas d'en-tête Authorization
+                response = self._put_chunk(upload_url, chunk, offset, end, size)
+                # La requête préparée référence la tranche envoyée : détachée aussitôt
+                response.request.body = None
+                response.raise_for_status()
+                offset = end + 1
+                if offset >= size:
+                    item = response.json()
+                    if self.metadata_cache is not None:
+                        self.metadata_cache.invalidate(
+                            f"drives/{drive_id}/root:/{item_path.strip('/')}:", result=item
+                        )
+                    return item
+                chunk = response = None
+        except Exception as e:
+            # Disjoncteur ouvert : la session expirera d'elle-même, inutile d'attendre un timeout
+            if not isinstance(e, CircuitOpenError):
+                try:
+                    self.session.delete(upload_url, timeout=self.timeout)
+                except requests.RequestException:
+                    pass
+            raise
+
+    def _put_chunk(self, upload_url: str, chunk: Union[bytes, memoryview], offset: int, end: int,
+                   size: int) -> requests.Response:
+        """Envoie un fragment de session d'upload (disjoncteur et classe de priorité)."""
+        return self._guarded("PUT", upload_url, lambda: self.session.put(
+            upload_url,
+            data=chunk,
+            headers={"Content-Range": f"bytes {offset}-{end}/{size}"},
+            timeout=self.timeout,
+        ), end - offset + 1)
+
+    def upload(
+        self,
+        drive_id: str,
+        item_path: str,
+        source: SourceLike,
+        content_type: str = "application/octet-stream",
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Uploade un chemin, un fichier ouvert ou un tampon sans copie du contenu.
+
+        Les chemins et fichiers sont projetés en mémoire (mmap), les tampons
+        (bytes, memoryview...) découpés en vues : PUT simple et fragments de
+        session sont envoyés à la socket sans copie. Au-delà de 4 Mo, session
+        d'upload fragmentée.
+
+        Args:
+            drive_id: ID du drive cible
+            item_path: Chemin du fichier relatif à la racine du drive
+            source: Chemin local, fichier binaire ouvert ou objet tampon
+            content_type: Type MIME du contenu (PUT simple)
+            chunk_size: Taille des fragments (multiple de 320 Kio)
+            size: Taille à envoyer (obligatoire pour un flux non positionnable)
+
+        Returns:
+            Dict: driveItem créé ou remplacé (lève requests.HTTPError si erreur)
+        """
+        with UploadSource(source, size) as body:
+            if body.size > SIMPLE_UPLOAD_LIMIT:
+                return self._upload_session(drive_id, item_path, body, body.size, chunk_size)
+            response = self.request(
+                "PUT",
+                f"drives/{drive_id}/root:/{item_path.strip('/')}:/content",
+                data=body.body(),
+                headers={"Content-Type": content_type},
+            )
+            response.request.body = None
+        response.raise_for_status()
+        return response.json()
+
+    def upload_file(
+        self,
+        drive_id: str,
+        item_path: str,
+        local_path: str,
+        content_type: str = "application/octet-stream",
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Uploade un fichier local sans le charger en mémoire.
+
+        Le fichier est projeté en mémoire : les petits fichiers partent en PUT
+        simple, les autres par session d'upload fragmentée (voir upload).
+
+        Returns:
+            Dict: driveItem créé ou remplacé (lève requests.HTTPError si erreur)
+        """
+        return self.upload(drive_id, item_path, local_path, content_type, chunk_size)
+
+    def download_to(
+        self,
+        drive_id: str,
+        item_path: str,
+        destination: BinaryIO,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    ) -> int:
+        """
+        Télécharge un fichier en flux vers un fichier ouvert en écriture.
+
+        Returns:
+            int: Nombre d'octets écrits (lève requests.HTTPError si erreur)
+        """
+        response = self.request(
+            "GET", f"drives/{drive_id}/root:/{item_path.strip('/')}:/content", stream=True
+        )
+        with response:
+            response.raise_for_status()
+            written = 0
+            for block in response.iter_content(chunk_size):
+                destination.write(block)
+                written += len(block)
+        return written
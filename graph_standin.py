@@ -0,0 +1,1200 @@
+#!/usr/bin/env python3
+"""
+Serveur local imitant un sous-ensemble de Microsoft Graph (drives et abonnements).
+
+Permet de tester de bout en bout les chemins listing, delta, upload et
+notifications de changement sans tenant SharePoint. Les éléments sont stockés
+de façon compacte (liste de champs par élément) et les chemins sont recalculés
+à la demande, pour tenir des bibliothèques volumineuses en mémoire.
+
+Endpoints supportés (préfixe /v1.0) :
+    GET    /drives/{d}/root, /drives/{d}/items/{id}, /drives/{d}/root:/{path} (ETag)
+    GET    /drives/{d}/root/children, .../items/{id}/children, .../root:/{path}:/children
+    GET    /drives/{d}/root/delta
+    GET    /drives/{d}/items/{id}/content, .../root:/{path}:/content (If-None-Match -> 304)
+    GET    /sites, /sites/{id}, /sites/{id}/drive, /sites/{id}/permissions (ETag)
+    GET    /sites/{id}/lists, /sites/{id}/lists/{l}/permissions, /sites/{id}/lists/{l}/columns
+    GET    /sites/{id}/lists/{l}/items?$expand=fields($select=...), .../items/delta
+    POST   /sites/{id}/lists/{l}/items, PATCH .../items/{i}/fields, DELETE .../items/{i}
+    POST   /$batch (20 sous-requêtes maximum, dependsOn -> 424 si dépendance en échec)
+    PUT    /drives/{d}/root:/{path}:/content
+    POST   /drives/{d}/root:/{path}:/createUploadSession, PUT/DELETE /upload/{session}
+    POST   /drives/{d}/root/children, .../root:/{path}:/children (création de dossier)
+    POST   /drives/{d}/items/{id}/copy (202 + Location), GET /monitor/{operation}
+    POST   /drives/{d}/items/{id}/workbook/createSession, closeSession, refreshSession
+    GET    /drives/{d}/items/{id}/workbook/tables/{t}/columns
+    POST   /drives/{d}/items/{id}/workbook/tables/{t}/rows
+    PATCH  /drives/{d}/items/{id}/workbook/worksheets/{w}/range(address='A1:B2')
+    POST   /subscriptions, PATCH/DELETE /subscriptions/{id}
+
+Usage:
+    python graph_standin.py --port 8765
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from profiling import run_profiled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 999
+
+# Index des champs d'un élément compact
+_ID, _PARENT, _NAME, _FOLDER, _SIZE, _VERSION, _MTIME, _SEQ = range(8)
+
+
+def _isoformat(epoch: float) -> str:
+    """Formate un horodatage epoch au format Graph."""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class StandInError(Exception):
+    """Erreur HTTP renvoyée par le stand-in."""
+
+    def __init__(self, status: int, code: str, message: str = ""):
+        super().__init__(message or code)
+        self.status = status
+        self.code = code
+
+
+class DriveState:
+    """État d'un drive du stand-in."""
+
+    def __init__(self, drive_id: str, name: str = "Documents"):
+        self.drive_id = drive_id
+        self.name = name
+        self.seq = 0
+        self.items: Dict[str, list] = {}
+        self.children: Dict[str, Dict[str, str]] = {}
+        self.content: Dict[str, bytes] = {}
+        self.deleted: Dict[str, Tuple[str, int]] = {}
+        self.change_log: List[Tuple[int, str]] = []
+        self._sorted_children: Dict[str, List[str]] = {}
+        self._id_counter = 0
+        self.root_id = "root"
+        self._add(self.root_id, None, "root", True, 0)
+
+    def _next_seq(self) -> int:
+        self.seq += 1
+        return self.seq
+
+    def new_id(self) -> str:
+        """Génère un ID d'élément court (mémoire réduite pour les gros seeds)."""
+        self._id_counter += 1
+        return f"01{self._id_counter:012X}"
+
+    def _add(self, item_id: str, parent_id: Optional[str], name: str,
+             is_folder: bool, size: int, mtime: Optional[float] = None) -> list:
+        seq = self._next_seq()
+        entry = [item_id, parent_id, name, is_folder, size, 1, mtime or time.time(), seq]
+        self.items[item_id] = entry
+        if is_folder:
+            self.children[item_id] = {}
+        if parent_id is not None:
+            self.children[parent_id][name.lower()] = item_id
+            self._sorted_children.pop(parent_id, None)
+        self.change_log.append((seq, item_id))
+        return entry
+
+    def add_files_bulk(self, parent_id: str, files: Iterable[Tuple[str, int]],
+                       mtime: Optional[float] = None) -> int:
+        """
+        Ajoute en masse des fichiers sans contenu (seed de bibliothèques volumineuses).
+
+        Args:
+            parent_id: ID du dossier parent
+            files: Itérable de (nom, taille)
+            mtime: Date de modification commune
+
+        Returns:
+            int: Nombre de fichiers ajoutés
+        """
+        mtime = mtime or time.time()
+        children = self.children[parent_id]
+        items, change_log = self.items, self.change_log
+        count = 0
+        for name, size in files:
+            self._id_counter += 1
+            self.seq += 1
+            item_id = f"01{self._id_counter:012X}"
+            items[item_id] = [item_id, parent_id, name, False, size, 1, mtime, self.seq]
+            key = name.lower()
+            children[name if key == name else key] = item_id
+            change_log.append((self.seq, item_id))
+            count += 1
+        self._sorted_children.pop(parent_id, None)
+        return count
+
+    def sorted_children(self, folder_id: str) -> List[str]:
+        """IDs des enfants d'un dossier triés par nom (mis en cache)."""
+        ordered = self._sorted_children.get(folder_id)
+        if ordered is None:
+            children = self.children.get(folder_id, {})
+            ordered = [children[key] for key in sorted(children)]
+            self._sorted_children[folder_id] = ordered
+        return ordered
+
+    def touch(self, item_id: str, size: Optional[int] = None) -> list:
+        """Enregistre une modification de contenu d'un élément."""
+        entry = self.items[item_id]
+        if size is not None:
+            entry[_SIZE] = size
+        entry[_VERSION] += 1
+        entry[_MTIME] = time.time()
+        entry[_SEQ] = self._next_seq()
+        self.change_log.append((entry[_SEQ], item_id))
+        return entry
+
+    def path_of(self, item_id: str) -> str:
+        """Chemin relatif à la racine d'un élément."""
+        parts = []
+        entry = self.items[item_id]
+        while entry[_PARENT] is not None:
+            parts.append(entry[_NAME])
+            entry = self.items[entry[_PARENT]]
+        return "/".join(reversed(parts))
+
+    def resolve(self, path: str) -> Optional[str]:
+        """Résout un chemin relatif en ID d'élément."""
+        current = self.root_id
+        for part in [p for p in path.split("/") if p]:
+            children = self.children.get(current)
+            if children is None or part.lower() not in children:
+                return None
+            current = children[part.lower()]
+        return current
+
+    def ensure_folder(self, path: str) -> str:
+        """Crée (si besoin) la hiérarchie de dossiers et retourne l'ID final."""
+        current = self.root_id
+        for part in [p for p in path.split("/") if p]:
+            child = self.children[current].get(part.lower())
+            if child is None:
+                child = self._add(self.new_id(), current, part, True, 0)[_ID]
+            current = child
+        return current
+
+    def add_file(self, parent_id: str, name: str, size: int,
+                 content: Optional[bytes] = None, mtime: Optional[float] = None) -> str:
+        """Ajoute ou remplace un fichier sous un dossier."""
+        existing = self.children[parent_id].get(name.lower())
+        if existing:
+            self.touch(existing, size)
+            item_id = existing
+        else:
+            item_id = self._add(self.new_id(), parent_id, name, False, size, mtime)[_ID]
+        if content is not None:
+            self.content[item_id] = content
+        else:
+            self.content.pop(item_id, None)
+        return item_id
+
+    def delete(self, item_id: str) -> None:
+        """Supprime un élément et sa descendance."""
+        entry = self.items[item_id]
+        for child_id in list(self.children.get(item_id, {}).values()):
+            self.delete(child_id)
+        del self.children[entry[_PARENT]][entry[_NAME].lower()]
+        self._sorted_children.pop(entry[_PARENT], None)
+        self._sorted_children.pop(item_id, None)
+        self.children.pop(item_id, None)
+        self.content.pop(item_id, None)
+        del self.items[item_id]
+        seq = self._next_seq()
+        self.deleted[item_id] = (entry[_PARENT], seq)
+        self.change_log.append((seq, item_id))
+
+    def content_of(self, item_id: str) -> bytes:
+        """Contenu d'un fichier (octets nuls pour les éléments générés)."""
+        if item_id in self.content:
+            return self.content[item_id]
+        return b"\0" * self.items[item_id][_SIZE]
+
+    def to_json(self, item_id: str, base_url: str, with_path: bool = True) -> Dict[str, Any]:
+        """Sérialise un élément au format driveItem."""
+        if item_id not in self.items:
+            parent_id, _ = self.deleted[item_id]
+            return {"id": item_id, "deleted": {"state": "deleted"},
+                    "parentReference": {"driveId": self.drive_id, "id": parent_id}}
+
+        entry = self.items[item_id]
+        item = {
+            "id": item_id,
+            "name": entry[_NAME],
+            "size": entry[_SIZE],
+            "eTag": f'"{{{item_id}}},{entry[_VERSION]}"',
+            "cTag": f'"c:{{{item_id}}},{entry[_VERSION]}"',
+            "lastModifiedDateTime": _isoformat(entry[_MTIME]),
+            "webUrl": f"{base_url}/sites/standin/{self.path_of(item_id)}",
+        }
+        if entry[_PARENT] is None:
+            item["root"] = {}
+            item["folder"] = {"childCount": len(self.children[item_id])}
+            return item
+
+        reference = {"driveId": self.drive_id, "id": entry[_PARENT]}
+        if with_path:
+            parent_path = self.path_of(entry[_PARENT])
+            reference["path"] = f"/drives/{self.drive_id}/root:" + (
+                f"/{parent_path}" if parent_path else ""
+            )
+        item["parentReference"] = reference
+
+        if entry[_FOLDER]:
+            item["folder"] = {"childCount": len(self.children[item_id])}
+        else:
+            digest = hashlib.sha256(
+                f"{item_id}:{entry[_VERSION]}".encode("utf-8")
+            ).hexdigest().upper()
+            item["file"] = {"mimeType": "application/octet-stream",
+                            "hashes": {"sha256Hash": digest}}
+        return item
+
+
+class GraphStandIn:
+    """Serveur HTTP local imitant Microsoft Graph."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialise le stand-in (le serveur démarre avec start()).
+
+        Args:
+            host: Interface d'écoute
+            port: Port d'écoute (0 pour un port libre)
+        """
+        self.lock = threading.RLock()
+        self.drives: Dict[str, DriveState] = {}
+        self.subscriptions: Dict[str, Dict[str, Any]] = {}
+        self.sites: Dict[str, Dict[str, Any]] = {}
+        self.upload_sessions: Dict[str, Dict[str, Any]] = {}
+        # Opérations longues (copy) : interrogations restantes avant exécution
+        self.operations: Dict[str, Dict[str, Any]] = {}
+        self.copy_polls = 2
+        # Classeurs Excel : (drive_id, item_id) -> sessions, tables et plages écrites
+        self.workbooks: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # False : seules les tailles des contenus uploadés sont conservées
+        self.keep_content = True
+        self.request_log: List[Tuple[str, str]] = []
+        self.bytes_received = 0
+        # Nombre d'écritures à venir rejetées en 429 (simulation du throttling)
+        self.throttle_writes = 0
+        # Capacité du service : requêtes traitées simultanément (None : illimitée)
+        # et durée de traitement de chaque écriture (simulation de la charge)
+        self.capacity: Optional[threading.Semaphore] = None
+        self.write_latency = 0.0
+        # Frontal lent de temps en temps : part des lectures retardées et retard
+        self.slow_read_ratio = 0.0
+        self.slow_read_seconds = 0.0
+        self._random = random.Random(0)
+        self._list_seq = 0
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        """URL de base à passer à GraphClient(base_url=...)."""
+        return f"{self.root_url}/v1.0"
+
+    def start(self) -> "GraphStandIn":
+        """Démarre le serveur dans un thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Arrête le serveur."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Manipulation directe (côté test)
+    # ------------------------------------------------------------------
+
+    def add_drive(self, drive_id: str = "standin-drive", name: str = "Documents") -> DriveState:
+        """Crée un drive vide."""
+        with self.lock:
+            drive = DriveState(drive_id, name)
+            self.drives[drive_id] = drive
+            return drive
+
+    def add_site(
+        self,
+        site_id: str,
+        name: str,
+        drive_id: Optional[str] = None,
+        permissions: Optional[List[Dict[str, Any]]] = None,
+        libraries: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Crée un site (et son drive par défaut).
+
+        Args:
+            site_id: ID du site
+            name: Nom affiché (et chemin /sites/{name})
+            drive_id: ID du drive par défaut (généré si absent)
+            permissions: Permissions accordées sur le site
+            libraries: Bibliothèques {nom: permissions}
+        """
+        with self.lock:
+            drive_id = drive_id or f"drive-{site_id}"
+            if drive_id not in self.drives:
+                self.add_drive(drive_id)
+            site = {
+                "id": site_id,
+                "displayName": name,
+                "webUrl": f"https://standin.sharepoint.com/sites/{name}",
+                "drive_id": drive_id,
+                "permissions": list(permissions or []),
+                "lists": {
+                    f"list-{i}": {"displayName": lib_name, "permissions": list(perms)}
+                    for i, (lib_name, perms) in enumerate((libraries or {}).items())
+                },
+            }
+            self.sites[site_id] = site
+            return site
+
+    def add_list(self, site_id: str, name: str, columns: List[str],
+                 items: Optional[Iterable[Dict[str, Any]]] = None) -> str:
+        """
+        Crée une liste générique sur un site.
+
+        Args:
+            site_id: ID du site
+            name: Nom affiché de la liste
+            columns: Noms internes des colonnes (Title ajouté si absent)
+            items: Champs des éléments initiaux
+
+        Returns:
+            str: ID de la liste
+        """
+        with self.lock:
+            site = self.sites[site_id]
+            list_id = f"list-{len(site['lists'])}"
+            site["lists"][list_id] = {
+                "displayName": name,
+                "template": "genericList",
+                "permissions": [],
+                "columns": ["Title"] + [c for c in columns if c != "Title"],
+                "items": {},
+                "deleted": {},
+                "next_id": 1,
+            }
+            for fields in items or ():
+                self._list_write(site["lists"][list_id], None, fields)
+            return list_id
+
+    def _list_write(self, sp_list: Dict[str, Any], item_id: Optional[str],
+                    fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Crée (item_id None) ou met à jour un élément de liste."""
+        unknown = set(fields) - set(sp_list["columns"])
+        if unknown:
+            raise StandInError(400, "invalidRequest",
+                               f"Champs inconnus: {', '.join(sorted(unknown))}")
+        self._list_seq += 1
+        if item_id is None:
+            item_id = str(sp_list["next_id"])
+            sp_list["next_id"] += 1
+            sp_list["items"][item_id] = {"fields": {}, "version": 0}
+        item = sp_list["items"][item_id]
+        item["fields"].update(fields)
+        item["version"] += 1
+        item["seq"] = self._list_seq
+        item["mtime"] = time.time()
+        return item
+
+    def put_file(self, drive_id: str, path: str, content: bytes, notify: bool = True) -> str:
+        """Crée ou remplace un fichier (dossiers parents créés si besoin)."""
+        with self.lock:
+            drive = self.drives[drive_id]
+            folder, _, name = path.strip("/").rpartition("/")
+            parent_id = drive.ensure_folder(folder)
+            item_id = drive.add_file(parent_id, name, len(content), content)
+        if notify:
+            self.notify(drive_id)
+        return item_id
+
+    def add_workbook(self, drive_id: str, path: str, tables: Dict[str, List[str]],
+                     size: int = 0) -> str:
+        """
+        Crée un classeur Excel (contenu non stocké) avec des tables vides.
+
+        Args:
+            drive_id: ID du drive
+            path: Chemin du fichier .xlsx
+            tables: Tables {nom: colonnes d'en-tête}
+            size: Taille annoncée du fichier
+        """
+        with self.lock:
+            drive = self.drives[drive_id]
+            folder, _, name = path.strip("/").rpartition("/")
+            item_id = drive.add_file(drive.ensure_folder(folder), name, size)
+            self.workbooks[(drive_id, item_id)] = {
+                "sessions": set(),
+                "tables": {table: {"columns": list(columns), "rows": []}
+                           for table, columns in tables.items()},
+                "ranges": {},
+            }
+            return item_id
+
+    def delete_path(self, drive_id: str, path: str, notify: bool = True) -> None:
+        """Supprime un élément par chemin."""
+        with self.lock:
+            drive = self.drives[drive_id]
+            item_id = drive.resolve(path)
+            if item_id:
+                drive.delete(item_id)
+        if notify:
+            self.notify(drive_id)
+
+    # ------------------------------------------------------------------
+    # Notifications de changement
+    # ------------------------------------------------------------------
+
+    def notify(self, drive_id: str) -> None:
+        """Poste une notification aux abonnements actifs sur ce drive."""
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            targets = [
+                sub for sub in self.subscriptions.values()
+                if sub["resource"].strip("/").startswith(f"drives/{drive_id}")
+                and datetime.fromisoformat(
+                    sub["expirationDateTime"].replace("Z", "+00:00")) > now
+            ]
+        for sub in targets:
+            payload = {"value": [{
+                "subscriptionId": sub["id"],
+                "clientState": sub.get("clientState"),
+                "changeType": sub["changeType"],
+                "resource": sub["resource"],
+                "subscriptionExpirationDateTime": sub["expirationDateTime"],
+                "tenantId": "standin-tenant",
+            }]}
+            threading.Thread(
+                target=self._post_notification, args=(sub["notificationUrl"], payload),
+                daemon=True,
+            ).start()
+
+    @staticmethod
+    def _post_notification(url: str, payload: Dict[str, Any]) -> None:
+        request = urllib.request.Request(
+            url, data=json.dumps(payload).encode("utf-8"), method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            urllib.request.urlopen(request, timeout=10).read()
+        except Exception as e:
+            logger.warning(f"Notification non délivrée à {url}: {e}")
+
+    @staticmethod
+    def _validate_endpoint(url: str) -> bool:
+        """Effectue la poignée de main de validation de l'URL de notification."""
+        token = uuid.uuid4().hex
+        separator = "&" if "?" in url else "?"
+        request = urllib.request.Request(
+            f"{url}{separator}validationToken={token}", data=b"", method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status == 200 and response.read().decode() == token
+        except Exception:
+            return False
+
+    # ------------------------------------------------------------------
+    # Routage HTTP
+    # ------------------------------------------------------------------
+
+    def _make_handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # En-têtes et corps envoyés ensemble (évite Nagle + ACK retardé en keep-alive)
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _dispatch(self, method: str) -> None:
+                parsed = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(parsed.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with standin.lock:
+                    standin.request_log.append((method, parsed.path))
+                    standin.bytes_received += len(body)
+                capacity = standin.capacity
+                if capacity is not None:
+                    capacity.acquire()
+                try:
+                    if method != "GET" and standin.write_latency:
+                        time.sleep(standin.write_latency)
+                    if method == "GET" and standin.slow_read_ratio:
+                        with standin.lock:
+                            slow = standin._random.random() < standin.slow_read_ratio
+                        if slow:
+                            time.sleep(standin.slow_read_seconds)
+                    status, payload, headers = standin.handle(
+                        method, urllib.parse.unquote(parsed.path), query, body,
+                        dict(self.headers),
+                    )
+                except StandInError as e:
+                    status, headers = e.status, {}
+                    payload = {"error": {"code": e.code, "message": str(e)}}
+                finally:
+                    if capacity is not None:
+                        capacity.release()
+                self._respond(status, payload, headers)
+
+            def _respond(self, status: int, payload: Any, headers: Dict[str, str]) -> None:
+                if isinstance(payload, bytes):
+                    body = payload
+                    content_type = headers.pop("Content-Type", "application/octet-stream")
+                elif payload is None:
+                    body, content_type = b"", "application/json"
+                else:
+                    body = json.dumps(payload).encode("utf-8")
+                    content_type = "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_PUT(self):
+                self._dispatch("PUT")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+        return Handler
+
+    _DRIVE_ROUTE = re.compile(r"^/v1\.0/drives/(?P<drive>[^/]+)/(?P<rest>.*)$")
+    _UPLOAD_ROUTE = re.compile(r"^/upload/(?P<session>[^/]+)$")
+    _MONITOR_ROUTE = re.compile(r"^/monitor/(?P<operation>[^/]+)$")
+    _SUBSCRIPTION_ROUTE = re.compile(r"^/v1\.0/subscriptions(?:/(?P<id>[^/]+))?$")
+    _SITE_ROUTE = re.compile(r"^/v1\.0/sites(?:/(?P<site>[^/]+(?::/sites/[^/:]+:?)?)(?:/(?P<rest>.*))?)?$")
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: bytes,
+               headers: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        """Traite une requête et retourne (statut, contenu, en-têtes)."""
+        headers = {key.lower(): value for key, value in headers.items()}
+        if path == "/v1.0/$batch" and method == "POST":
+            return self._handle_batch(body)
+        if method != "GET" and self.throttle_writes > 0:
+            with self.lock:
+                self.throttle_writes -= 1
+            raise StandInError(429, "TooManyRequests", "Écriture throttlée")
+
+        match = self._SUBSCRIPTION_ROUTE.match(path)
+        if match:
+            return self._handle_subscription(method, match.group("id"), body)
+
+        match = self._SITE_ROUTE.match(path)
+        if match:
+            with self.lock:
+                return self._handle_site(method, match.group("site"),
+                                         match.group("rest") or "", query, headers, body)
+
+        match = self._UPLOAD_ROUTE.match(path)
+        if match:
+            return self._handle_upload_session(method, match.group("session"), body, headers)
+
+        match = self._MONITOR_ROUTE.match(path)
+        if match and method == "GET":
+            with self.lock:
+                return self._handle_monitor(match.group("operation"))
+
+        match = self._DRIVE_ROUTE.match(path)
+        if not match:
+            raise StandInError(404, "itemNotFound", f"Route inconnue: {path}")
+        with self.lock:
+            drive = self.drives.get(match.group("drive"))
+            if drive is None:
+                raise StandInError(404, "itemNotFound", "Drive introuvable")
+            return self._handle_drive(method, drive, match.group("rest"), query, body, headers)
+
+    def _handle_batch(self, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        """Exécute les sous-requêtes d'un appel JSON $batch."""
+        sub_requests = json.loads(body or b"{}").get("requests", [])
+        if len(sub_requests) > 20:
+            raise StandInError(400, "BadRequest", "Un lot $batch est limité à 20 requêtes")
+
+        responses = []
+        statuses: Dict[str, int] = {}
+        for sub in sub_requests:
+            # Comme Graph : une dépendance en échec (ou absente du lot) -> 424 sans exécution
+            if any(statuses.get(dep, 424) >= 400 for dep in sub.get("dependsOn", [])):
+                statuses[sub["id"]] = 424
+                responses.append({"id": sub["id"], "status": 424, "headers": {}, "body": {
+                    "error": {"code": "failedDependency", "message": "Dépendance en échec"}}})
+                continue
+            parsed = urllib.parse.urlsplit(sub["url"])
+            query = dict(urllib.parse.parse_qsl(parsed.query))
+            sub_body = sub.get("body")
+            raw = json.dumps(sub_body).encode("utf-8") if sub_body is not None else b""
+            try:
+                status, payload, headers = self.handle(
+                    sub.get("method", "GET"),
+                    "/v1.0/" + urllib.parse.unquote(parsed.path).lstrip("/"),
+                    query, raw, sub.get("headers", {}),
+                )
+            except StandInError as e:
+                status, headers = e.status, {}
+                payload = {"error": {"code": e.code, "message": str(e)}}
+            if isinstance(payload, bytes):
+                payload = payload.decode("utf-8", errors="replace")
+            statuses[sub["id"]] = status
+            responses.append({"id": sub["id"], "status": status,
+                              "headers": headers, "body": payload})
+        return 200, {"responses": responses}, {}
+
+    def _find_site(self, key: str) -> Dict[str, Any]:
+        """Trouve un site par ID ou par adressage hôte:/sites/nom."""
+        if key in self.sites:
+            return self.sites[key]
+        if ":/" in key:
+            site_path = key.split(":", 1)[1].rstrip(":")
+            for site in self.sites.values():
+                if site["webUrl"].lower().endswith(site_path.lower()):
+                    return site
+        raise StandInError(404, "itemNotFound", f"Site introuvable: {key}")
+
+    def _collection(self, values: List[Dict[str, Any]], query: Dict[str, str],
+                    headers: Dict[str, str], next_url: str) -> Tuple[int, Any, Dict[str, str]]:
+        """Collection paginée avec ETag (If-None-Match -> 304)."""
+        etag = 'W/"' + hashlib.sha256(
+            json.dumps(values, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16] + '"'
+        if "$skiptoken" not in query and headers.get("if-none-match") == etag:
+            return 304, None, {"ETag": etag}
+        top = min(int(query.get("$top", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        start = int(query.get("$skiptoken", 0))
+        page = {"value": [self._select(v, query) for v in values[start:start + top]]}
+        if start + top < len(values):
+            next_query = dict(query, **{"$skiptoken": str(start + top)})
+            page["@odata.nextLink"] = f"{next_url}?{urllib.parse.urlencode(next_query)}"
+        return 200, page, {"ETag": etag}
+
+    def _handle_site(self, method: str, key: Optional[str], rest: str, query: Dict[str, str],
+                     headers: Dict[str, str], body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        match = re.match(r"^lists/([^/]+)/(items.*|columns)$", (rest or "").strip("/"))
+        if key is not None and match:
+            site = self._find_site(key)
+            sp_list = site["lists"].get(match.group(1))
+            if sp_list is None:
+                raise StandInError(404, "itemNotFound", f"Liste introuvable: {match.group(1)}")
+            return self._handle_list(method, sp_list, match.group(2), query, body,
+                                     f"{self.base_url}/sites/{site['id']}/lists/{match.group(1)}")
+        if method != "GET":
+            raise StandInError(405, "notSupported", f"{method} sites/{rest}")
+
+        if key is None:
+            search = query.get("search", "*").lower()
+            sites = [
+                {k: v for k, v in site.items() if k in ("id", "displayName", "webUrl")}
+                for site in self.sites.values()
+                if search == "*" or search in site["displayName"].lower()
+            ]
+            return self._collection(sites, query, headers, f"{self.base_url}/sites")
+
+        site = self._find_site(key)
+        site_url = f"{self.base_url}/sites/{site['id']}"
+        rest = rest.strip("/")
+        if rest == "":
+            public = {k: v for k, v in site.items() if k in ("id", "displayName", "webUrl")}
+            return 200, self._select(public, query), {}
+        if rest == "drive":
+            drive = self.drives[site["drive_id"]]
+            return 200, self._select({"id": drive.drive_id, "name": drive.name,
+                                      "driveType": "documentLibrary"}, query), {}
+        if rest == "drives":
+            drive = self.drives[site["drive_id"]]
+            drives = [{"id": drive.drive_id, "name": drive.name, "driveType": "documentLibrary",
+                       "webUrl": f"{site['webUrl']}/{drive.name}"}]
+            return self._collection(drives, query, headers, f"{site_url}/drives")
+        if rest == "permissions":
+            return self._collection(site["permissions"], query, headers,
+                                    f"{site_url}/permissions")
+        if rest == "lists":
+            lists = [
+                {"id": list_id, "displayName": entry["displayName"],
+                 "list": {"template": entry.get("template", "documentLibrary")}}
+                for list_id, entry in site["lists"].items()
+            ]
+            return self._collection(lists, query, headers, f"{site_url}/lists")
+        match = re.match(r"^lists/([^/]+)/permissions$", rest)
+        if match and match.group(1) in site["lists"]:
+            return self._collection(site["lists"][match.group(1)]["permissions"], query,
+                                    headers, f"{site_url}/lists/{match.group(1)}/permissions")
+        raise StandInError(404, "itemNotFound", f"Ressource de site inconnue: {rest}")
+
+    @staticmethod
+    def _list_item_json(item_id: str, item: Dict[str, Any],
+                        fields: Optional[List[str]]) -> Dict[str, Any]:
+        """Sérialise un élément de liste, champs projetés par $expand=fields($select=)."""
+        etag = f'"{item_id},{item["version"]}"'
+        values = item["fields"] if fields is None else {
+            name: item["fields"][name] for name in fields if name in item["fields"]
+        }
+        return {
+            "id": item_id,
+            "eTag": etag,
+            "lastModifiedDateTime": _isoformat(item["mtime"]),
+            "fields": {"@odata.etag": etag, "id": item_id, **values},
+        }
+
+    def _handle_list(self, method: str, sp_list: Dict[str, Any], rest: str,
+                     query: Dict[str, str], body: bytes,
+                     list_url: str) -> Tuple[int, Any, Dict[str, str]]:
+        """Colonnes et éléments d'une liste générique."""
+        if rest == "columns" and method == "GET":
+            return 200, {"value": [{"name": name, "displayName": name, "readOnly": False}
+                                   for name in sp_list["columns"]]}, {}
+
+        expand = re.match(r"^fields(?:\(\$select=([^)]*)\))?$", query.get("$expand", ""))
+        fields = expand.group(1).split(",") if expand and expand.group(1) else None
+        if rest == "items" and method == "GET":
+            ids = sorted(sp_list["items"], key=int)
+            top = min(int(query.get("$top", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            start = int(query.get("$skiptoken", 0))
+            page = {"value": [self._list_item_json(i, sp_list["items"][i], fields)
+                              for i in ids[start:start + top]]}
+            if start + top < len(ids):
+                next_query = dict(query, **{"$skiptoken": str(start + top)})
+                page["@odata.nextLink"] = f"{list_url}/items?{urllib.parse.urlencode(next_query)}"
+            return 200, page, {}
+
+        if rest == "items/delta" and method == "GET":
+            return 200, self._list_delta(sp_list, query, fields, f"{list_url}/items/delta"), {}
+
+        payload = json.loads(body or b"{}")
+        if rest == "items" and method == "POST":
+            item = self._list_write(sp_list, None, payload.get("fields", {}))
+            item_id = str(sp_list["next_id"] - 1)
+            return 201, self._list_item_json(item_id, item, None), {}
+
+        match = re.match(r"^items/([^/]+)(/fields)?$", rest)
+        if not match or match.group(1) not in sp_list["items"]:
+            raise StandInError(404, "itemNotFound", f"Élément de liste introuvable: {rest}")
+        item_id = match.group(1)
+        if method == "PATCH" and match.group(2):
+            item = self._list_write(sp_list, item_id, payload)
+            return 200, {"@odata.etag": f'"{item_id},{item["version"]}"', **item["fields"]}, {}
+        if method == "GET" and not match.group(2):
+            return 200, self._list_item_json(item_id, sp_list["items"][item_id], fields), {}
+        if method == "DELETE" and not match.group(2):
+            del sp_list["items"][item_id]
+            self._list_seq += 1
+            sp_list["deleted"][item_id] = self._list_seq
+            return 204, None, {}
+        raise StandInError(405, "notSupported", f"{method} lists/.../{rest}")
+
+    def _list_delta(self, sp_list: Dict[str, Any], query: Dict[str, str],
+                    fields: Optional[List[str]], delta_url: str) -> Dict[str, Any]:
+        """Delta d'une liste : éléments modifiés et supprimés depuis le jeton."""
+        since = int(query.get("token", 0))
+        # Instantané figé à la première page pour une pagination cohérente
+        upto = int(query.get("upto", self._list_seq))
+        changes = [(item["seq"], item_id) for item_id, item in sp_list["items"].items()
+                   if since < item["seq"] <= upto]
+        if since:
+            changes += [(seq, item_id) for item_id, seq in sp_list["deleted"].items()
+                        if since < seq <= upto]
+        changes.sort()
+
+        top = min(int(query.get("$top", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        start = int(query.get("$skiptoken", 0))
+        page = {"value": [
+            self._list_item_json(item_id, sp_list["items"][item_id], fields)
+            if item_id in sp_list["items"] else {"id": item_id, "deleted": {"state": "deleted"}}
+            for _, item_id in changes[start:start + top]
+        ]}
+        if start + top < len(changes):
+            next_query = dict(query, upto=str(upto), **{"$skiptoken": str(start + top)})
+            page["@odata.nextLink"] = f"{delta_url}?{urllib.parse.urlencode(next_query)}"
+        else:
+            delta_query = {k: v for k, v in query.items() if k not in ("$skiptoken", "upto")}
+            delta_query["token"] = str(upto)
+            page["@odata.deltaLink"] = f"{delta_url}?{urllib.parse.urlencode(delta_query)}"
+        return page
+
+    def _address(self, drive: DriveState, rest: str) -> Tuple[Optional[str], str, str]:
+        """
+        Décode l'adressage d'un élément.
+
+        Returns:
+            Tuple[item_id (None si chemin inexistant), chemin adressé, suffixe]
+        """
+        if rest.startswith("root:"):
+            addressed, _, suffix = rest[len("root:"):].partition(":")
+            addressed = addressed.strip("/")
+            return drive.resolve(addressed), addressed, suffix.strip("/")
+        if rest == "root" or rest.startswith("root/"):
+            return drive.root_id, "", rest[len("root"):].strip("/")
+        match = re.match(r"^items/([^/]+)/?(.*)$", rest)
+        if match:
+            item_id = match.group(1)
+            if item_id not in drive.items:
+                raise StandInError(404, "itemNotFound")
+            return item_id, drive.path_of(item_id), match.group(2)
+        raise StandInError(404, "itemNotFound", f"Adressage inconnu: {rest}")
+
+    def _select(self, item: Dict[str, Any], query: Dict[str, str]) -> Dict[str, Any]:
+        """Applique une projection $select (id et deleted sont toujours renvoyés)."""
+        select = query.get("$select")
+        if not select:
+            return item
+        fields = set(select.split(",")) | {"id", "deleted"}
+        return {key: value for key, value in item.items() if key in fields}
+
+    def _page(self, drive: DriveState, ids: List[str], query: Dict[str, str],
+              next_url: str, with_path: bool = True) -> Dict[str, Any]:
+        """Pagine une liste d'IDs (jeton $skiptoken = position)."""
+        top = min(int(query.get("$top", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        start = int(query.get("$skiptoken", 0))
+        page_ids = ids[start:start + top]
+        page = {"value": [
+            self._select(drive.to_json(i, self.root_url, with_path), query) for i in page_ids
+        ]}
+        if start + top < len(ids):
+            next_query = dict(query, **{"$skiptoken": str(start + top)})
+            page["@odata.nextLink"] = f"{next_url}?{urllib.parse.urlencode(next_query)}"
+        return page
+
+    def _handle_drive(self, method: str, drive: DriveState, rest: str, query: Dict[str, str],
+                      body: bytes, headers: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        drive_url = f"{self.base_url}/drives/{drive.drive_id}"
+        if rest in ("", "/") and method == "GET":
+            return 200, self._select({"id": drive.drive_id, "name": drive.name,
+                                      "driveType": "documentLibrary"}, query), {}
+
+        if rest == "root/delta" and method == "GET":
+            return 200, self._delta(drive, query, f"{drive_url}/root/delta"), {}
+
+        item_id, addressed, suffix = self._address(drive, rest)
+
+        if method == "PUT" and suffix == "content":
+            folder, _, name = addressed.rpartition("/")
+            parent_id = drive.resolve(folder)
+            if parent_id is None or not drive.items[parent_id][_FOLDER]:
+                raise StandInError(404, "itemNotFound", "Dossier parent introuvable")
+            created = item_id is None
+            item_id = drive.add_file(parent_id, name, len(body),
+                                     body if self.keep_content else None)
+            threading.Thread(target=self.notify, args=(drive.drive_id,), daemon=True).start()
+            return (201 if created else 200), drive.to_json(item_id, self.root_url), {}
+
+        if method == "POST" and suffix == "createUploadSession":
+            folder, _, name = addressed.rpartition("/")
+            parent_id = drive.resolve(folder)
+            if parent_id is None:
+                raise StandInError(404, "itemNotFound", "Dossier parent introuvable")
+            session_id = uuid.uuid4().hex
+            self.upload_sessions[session_id] = {
+                "drive_id": drive.drive_id, "parent_id": parent_id, "name": name,
+                "received": 0, "parts": [],
+            }
+            expiration = datetime.now(timezone.utc) + timedelta(hours=1)
+            return 200, {"uploadUrl": f"{self.root_url}/upload/{session_id}",
+                         "expirationDateTime": expiration.isoformat()}, {}
+
+        if item_id is None:
+            raise StandInError(404, "itemNotFound", f"Élément introuvable: {addressed}")
+
+        if method == "GET" and suffix == "":
+            item = drive.to_json(item_id, self.root_url)
+            if headers.get("if-none-match") == item["eTag"]:
+                return 304, None, {"ETag": item["eTag"]}
+            return 200, self._select(item, query), {"ETag": item["eTag"]}
+
+        if suffix.startswith("workbook/"):
+            workbook = self.workbooks.get((drive.drive_id, item_id))
+            if workbook is None:
+                raise StandInError(400, "notAllowed", "L'élément n'est pas un classeur")
+            return self._handle_workbook(method, workbook, suffix[len("workbook/"):],
+                                         body, headers)
+
+        if method == "GET" and suffix == "children":
+            ids = drive.sorted_children(item_id)
+            next_url = f"{drive_url}/items/{item_id}/children"
+            return 200, self._page(drive, ids, query, next_url), {}
+
+        if method == "GET" and suffix == "content":
+            # Comme le téléchargement redirigé de Graph : ETag propre, distinct du cTag
+            download_tag = f'"dl-{item_id}-{drive.items[item_id][_VERSION]}"'
+            if headers.get("if-none-match") == download_tag:
+                return 304, None, {"ETag": download_tag}
+            return 200, drive.content_of(item_id), {"ETag": download_tag}
+
+        if method == "POST" and suffix == "children":
+            payload = json.loads(body or b"{}")
+            name = payload.get("name", "")
+            if name.lower() in drive.children[item_id]:
+                behavior = payload.get("@microsoft.graph.conflictBehavior", "fail")
+                if behavior == "fail":
+                    raise StandInError(409, "nameAlreadyExists")
+                name = f"{name} {len(drive.children[item_id]) + 1}"
+            folder_id = drive._add(drive.new_id(), item_id, name, True, 0)[_ID]
+            return 201, drive.to_json(folder_id, self.root_url), {}
+
+        if method == "DELETE" and suffix == "":
+            drive.delete(item_id)
+            return 204, None, {}
+
+        if method == "POST" and suffix == "copy":
+            if drive.items[item_id][_FOLDER]:
+                raise StandInError(400, "notSupported", "Copie de dossier non simulée")
+            payload = json.loads(body or b"{}")
+            parent = payload.get("parentReference") or {}
+            target = self.drives.get(parent.get("driveId", drive.drive_id))
+            if target is None or parent.get("id") not in target.items:
+                raise StandInError(400, "invalidRequest", "Dossier de destination introuvable")
+            operation_id = uuid.uuid4().hex
+            self.operations[operation_id] = {
+                "remaining": self.copy_polls, "source": (drive.drive_id, item_id),
+                "target": (target.drive_id, parent["id"]),
+                "name": payload.get("name") or drive.items[item_id][_NAME],
+                "behavior": query.get("@microsoft.graph.conflictBehavior", "fail"),
+            }
+            return 202, None, {"Location": f"{self.root_url}/monitor/{operation_id}"}
+
+        raise StandInError(405, "notSupported", f"{method} {rest}")
+
+    def _handle_monitor(self, operation_id: str) -> Tuple[int, Any, Dict[str, str]]:
+        """État d'une copie : en cours pendant copy_polls interrogations, puis exécutée."""
+        operation = self.operations.get(operation_id)
+        if operation is None:
+            raise StandInError(404, "itemNotFound", "Opération introuvable")
+        if operation.get("status"):
+            return 200, operation["status"], {}
+        if operation["remaining"] > 0:
+            operation["remaining"] -= 1
+            done = 100 * (self.copy_polls - operation["remaining"]) // (self.copy_polls + 1)
+            return 202, {"status": "inProgress", "percentageComplete": done}, {}
+
+        source_drive, source_id = operation["source"]
+        target_drive, parent_id = operation["target"]
+        source, target = self.drives[source_drive], self.drives[target_drive]
+        if source_id not in source.items:
+            operation["status"] = {"status": "failed", "error": {
+                "code": "itemNotFound", "message": "Élément source supprimé"}}
+        elif (operation["name"].lower() in target.children[parent_id]
+              and operation["behavior"] == "fail"):
+            operation["status"] = {"status": "failed", "error": {
+                "code": "nameAlreadyExists", "message": f"{operation['name']} existe déjà"}}
+        else:
+            content = source.content_of(source_id)
+            item_id = target.add_file(parent_id, operation["name"], len(content),
+                                      content if self.keep_content else None)
+            operation["status"] = {"status": "completed", "percentageComplete": 100,
+                                   "resourceId": item_id}
+            threading.Thread(target=self.notify, args=(target_drive,), daemon=True).start()
+        return 200, operation["status"], {}
+
+    def _handle_workbook(self, method: str, workbook: Dict[str, Any], rest: str,
+                         body: bytes, headers: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        """Sessions, lignes de tables et plages d'un classeur."""
+        payload = json.loads(body or b"{}")
+        if method == "POST" and rest == "createSession":
+            session_id = uuid.uuid4().hex
+            workbook["sessions"].add(session_id)
+            return 201, {"id": session_id,
+                         "persistChanges": payload.get("persistChanges", True)}, {}
+
+        session_id = headers.get("workbook-session-id")
+        if session_id and session_id not in workbook["sessions"]:
+            raise StandInError(404, "invalidSessionReCreatable", "Session de classeur expirée")
+        if method == "POST" and rest == "closeSession":
+            workbook["sessions"].discard(session_id)
+            return 204, None, {}
+        if method == "POST" and rest == "refreshSession":
+            return 204, None, {}
+
+        match = re.match(r"^tables/([^/]+)/(columns|rows)$", rest)
+        if match:
+            table = workbook["tables"].get(match.group(1))
+            if table is None:
+                raise StandInError(404, "itemNotFound", f"Table inconnue: {match.group(1)}")
+            if method == "GET" and match.group(2) == "columns":
+                return 200, {"value": [{"index": i, "name": name}
+                                       for i, name in enumerate(table["columns"])]}, {}
+            if method == "POST" and match.group(2) == "rows":
+                values = payload.get("values") or []
+                if any(len(row) != len(table["columns"]) for row in values):
+                    raise StandInError(400, "invalidArgument",
+                                       "Nombre de colonnes différent de la table")
+                index = len(table["rows"])
+                table["rows"].extend(values)
+                return 201, {"index": index, "values": values}, {}
+
+        match = re.match(r"^worksheets/([^/]+)/range\(address='([^']+)'\)$", rest)
+        if match and method == "PATCH":
+            workbook["ranges"][(match.group(1), match.group(2))] = payload.get("values")
+            return 200, {"address": f"{match.group(1)}!{match.group(2)}",
+                         "values": payload.get("values")}, {}
+        raise StandInError(405, "notSupported", f"{method} workbook/{rest}")
+
+    def _handle_upload_session(self, method: str, session_id: str, body: bytes,
+                               headers: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        """Reçoit les fragments d'une session d'upload (Content-Range)."""
+        with self.lock:
+            session = self.upload_sessions.get(session_id)
+            if session is None:
+                raise StandInError(404, "itemNotFound", "Session d'upload introuvable")
+            if method == "DELETE":
+                del self.upload_sessions[session_id]
+                return 204, None, {}
+            if method != "PUT":
+                raise StandInError(405, "notSupported")
+
+            match = re.match(r"bytes (\d+)-(\d+)/(\d+)", headers.get("content-range", ""))
+            if not match:
+                raise StandInError(400, "invalidRange", "Content-Range manquant")
+            start, end, total = (int(value) for value in match.groups())
+            if start != session["received"] or end - start + 1 != len(body):
+                raise StandInError(416, "invalidRange", "Fragment hors séquence")
+            session["received"] = end + 1
+            if self.keep_content:
+                session["parts"].append(body)
+
+            if session["received"] < total:
+                return 202, {"nextExpectedRanges": [f"{session['received']}-"]}, {}
+
+            del self.upload_sessions[session_id]
+            drive = self.drives[session["drive_id"]]
+            content = b"".join(session["parts"]) if self.keep_content else None
+            item_id = drive.add_file(session["parent_id"], session["name"], total, content)
+        threading.Thread(target=self.notify, args=(drive.drive_id,), daemon=True).start()
+        return 201, drive.to_json(item_id, self.root_url), {}
+
+    def _delta(self, drive: DriveState, query: Dict[str, str], delta_url: str) -> Dict[str, Any]:
+        """Requête delta : changements depuis le jeton, dédupliqués et paginés."""
+        since = int(query.get("token", 0))
+        top = min(int(query.get("$top", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        position = int(query.get("cursor", bisect_right(drive.change_log, (since, "￿"))))
+
+        page_ids = []
+        while position < len(drive.change_log) and len(page_ids) < top:
+            seq, item_id = drive.change_log[position]
+            position += 1
+            current = drive.items.get(item_id)
+            if current is not None and current[_SEQ] != seq:
+                continue  # Entrée remplacée par une modification plus récente
+            if current is None and drive.deleted.get(item_id, (None, -1))[1] != seq:
+                continue
+            page_ids.append(item_id)
+
+        page = {"value": [
+            self._select(drive.to_json(i, self.root_url, with_path=False), query)
+            for i in page_ids
+        ]}
+        keep = {k: v for k, v in query.items() if k in ("$select", "$top")}
+        if position < len(drive.change_log):
+            next_query = dict(keep, token=str(since), cursor=str(position))
+            page["@odata.nextLink"] = f"{delta_url}?{urllib.parse.urlencode(next_query)}"
+        else:
+            delta_query = dict(keep, token=str(drive.seq))
+            page["@odata.deltaLink"] = f"{delta_url}?{urllib.parse.urlencode(delta_query)}"
+        return page
+
+    def _handle_subscription(self, method: str, sub_id: Optional[str],
+                             body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        payload = json.loads(body or b"{}")
+
+        if method == "POST" and sub_id is None:
+            if not self._validate_endpoint(payload["notificationUrl"]):
+                raise StandInError(400, "InvalidRequest",
+                                   "Validation de l'URL de notification échouée")
+            subscription = {
+                "id": uuid.uuid4().hex,
+                "resource": payload["resource"],
+                "changeType": payload.get("changeType", "updated"),
+                "notificationUrl": payload["notificationUrl"],
+                "clientState": payload.get("clientState"),
+                "expirationDateTime": payload.get(
+                    "expirationDateTime",
+                    (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat(),
+                ),
+            }
+            with self.lock:
+                self.subscriptions[subscription["id"]] = subscription
+            return 201, subscription, {}
+
+        with self.lock:
+            subscription = self.subscriptions.get(sub_id or "")
+            if subscription is None:
+                raise StandInError(404, "ResourceNotFound", "Abonnement introuvable")
+            if method == "PATCH":
+                subscription["expirationDateTime"] = payload["expirationDateTime"]
+                return 200, subscription, {}
+            if method == "DELETE":
+                del self.subscriptions[sub_id]
+                return 204, None, {}
+            if method == "GET":
+                return 200, subscription, {}
+        raise StandInError(405, "notSupported")
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Stand-in local Microsoft Graph")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--drive-id", default="standin-drive")
+    parser.add_argument("--discard-content", action="store_true",
+                        help="Ne conserver que la taille des contenus uploadés")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    standin = GraphStandIn(args.host, args.port)
+    standin.keep_content = not args.discard_content
+    standin.add_drive(args.drive_id)
+    print(f"🧪 Stand-in Graph démarré: {standin.base_url}")
+    print(f"📁 Drive: {args.drive_id}")
+    try:
+        standin._server.serve_forever()
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    run_profiled(main)
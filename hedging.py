@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Requêtes couvertes (hedging) pour les lectures sensibles à la latence de queue.
+
+Un frontal Graph lent de temps en temps suffit à étirer le p99 des recherches
+de métadonnées (site, drive, élément par chemin). Branché sur GraphClient
+(paramètre hedging), HedgePolicy lance pour chaque GET de métadonnées la requête
+principale puis, si elle n'a pas répondu après un délai égal à un percentile
+des latences observées (p95 par défaut), un doublon ; la première réponse
+gagne, l'autre est abandonnée. Les listings, requêtes delta et téléchargements
+de contenu ne sont jamais doublés : leur durée suit le volume transféré, et un
+doublon en doublerait le coût.
+
+La charge supplémentaire est bornée par un budget global partagé par tous les
+clients d'une même politique : chaque requête principale crédite budget_ratio
+doublon (5 % par défaut, au plus burst d'avance), chaque doublon en consomme un.
+
+Configuration par variables d'environnement :
+    SHAREPOINT_HEDGE=95              (percentile du délai, ou true pour p95)
+    SHAREPOINT_HEDGE_BUDGET=0.05     (doublons par requête principale)
+"""
+
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERCENTILE = 95.0
+DEFAULT_BUDGET_RATIO = 0.05
+DEFAULT_BURST = 10.0
+DEFAULT_MIN_DELAY = 0.02
+DEFAULT_MAX_DELAY = 2.0
+# Latences observées avant de calculer le délai (max_delay en attendant)
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_SAMPLE_SIZE = 1000
+
+# Listings d'éléments, pages suivantes, delta, contenu et classeurs : pas des
+# métadonnées. Les drives et listes d'un site (quelques entrées) restent doublés.
+_UNHEDGEABLE = re.compile(
+    r"/(content|children|items|versions|permissions|search\(.*\))(\?|$)"
+    r"|/(delta|workbook|createUploadSession)\b|token=",
+    re.IGNORECASE,
+)
+
+
+def _close_response(future: Future) -> None:
+    """Libère la connexion d'une réponse abandonnée."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class HedgePolicy:
+    """Politique de doublons des GET : délai par percentile et budget global."""
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_PERCENTILE,
+        budget_ratio: float = DEFAULT_BUDGET_RATIO,
+        burst: float = DEFAULT_BURST,
+        min_delay: float = DEFAULT_MIN_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        sample_size: int = DEFAULT_SAMPLE_SIZE,
+        max_workers: int = 32,
+    ):
+        """
+        Initialise la politique.
+
+        Args:
+            percentile: Percentile des latences observées utilisé comme délai
+            budget_ratio: Doublons crédités par requête principale
+            burst: Crédit maximal de doublons
+            min_delay: Délai minimal avant doublon (secondes)
+            max_delay: Délai maximal avant doublon (secondes)
+            min_samples: Latences observées avant d'utiliser le percentile
+            sample_size: Nombre de latences conservées
+            max_workers: Requêtes simultanées (principales et doublons)
+        """
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.burst = burst
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.tokens = burst
+        self._latencies: Deque[float] = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="graph-hedge")
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["HedgePolicy"]:
+        """
+        Crée une politique depuis SHAREPOINT_HEDGE et SHAREPOINT_HEDGE_BUDGET.
+
+        Returns:
+            HedgePolicy ou None si SHAREPOINT_HEDGE est absente, vide ou à false
+        """
+        value = os.getenv("SHAREPOINT_HEDGE", "").strip().lower()
+        if value in ("", "0", "false", "no"):
+            return None
+        percentile = DEFAULT_PERCENTILE if value in ("1", "true", "yes") else float(value)
+        budget = float(os.getenv("SHAREPOINT_HEDGE_BUDGET", DEFAULT_BUDGET_RATIO))
+        return cls(percentile=percentile, budget_ratio=budget)
+
+    @staticmethod
+    def eligible(relative: str) -> bool:
+        """Indique si un GET (chemin Graph relatif) est une lecture de métadonnées à doubler."""
+        return not _UNHEDGEABLE.search(relative)
+
+    def delay(self) -> float:
+        """Délai avant doublon : percentile des latences observées, borné."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.max_delay
+            ordered = sorted(self._latencies)
+        rank = min(int(len(ordered) * self.percentile / 100), len(ordered) - 1)
+        return min(max(ordered[rank], self.min_delay), self.max_delay)
+
+    def _timed(self, send: Callable[[], requests.Response]) -> requests.Response:
+        started = time.monotonic()
+        try:
+            return send()
+        finally:
+            with self._lock:
+                self._latencies.append(time.monotonic() - started)
+
+    def _submit(self, send: Callable[[], requests.Response]) -> Future:
+        # Contexte copié par tentative : classe de priorité de l'appelant conservée
+        return self._executor.submit(contextvars.copy_context().run, self._timed, send)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                self.stats["hedged"] += 1
+                return True
+            self.stats["budget_denied"] += 1
+            return False
+
+    def run(self, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Exécute une lecture idempotente, doublée si elle tarde et si le budget le permet.
+
+        Args:
+            send: Fonction qui envoie la requête (appelée une ou deux fois)
+
+        Returns:
+            requests.Response: Première réponse obtenue
+        """
+        delay = self.delay()
+        with self._lock:
+            self.stats["requests"] += 1
+            self.tokens = min(self.tokens + self.budget_ratio, self.burst)
+
+        primary = self._submit(send)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._spend():
+            return primary.result()
+
+        logger.debug(f"Pas de réponse après {delay * 1000:.0f} ms : doublon envoyé")
+        hedge = self._submit(send)
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Une tentative en erreur laisse sa chance à l'autre
+                if future.exception() is None or not pending:
+                    for loser in pending:
+                        loser.add_done_callback(_close_response)
+                    if future is hedge:
+                        with self._lock:
+                            self.stats["hedge_wins"] += 1
+                    return future.result()
+
+    def summary(self) -> Dict[str, Any]:
+        """Compteurs, délai courant et charge supplémentaire."""
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "delay": self.delay(),
+            "extra_load": stats["hedged"] / stats["requests"] if stats["requests"] else 0.0,
+        }
+
+    def close(self) -> None:
+        """Arrête les threads (les tentatives en cours se terminent)."""
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self) -> "HedgePolicy":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def print_hedge_summary(policy: HedgePolicy) -> None:
+    """Affiche l'activité des doublons."""
+    summary = policy.summary()
+    print(f"\n🪞 Doublons de lecture: {summary['hedged']} pour {summary['requests']} GET "
+          f"(+{summary['extra_load']:.1%} de charge), {summary['hedge_wins']} gagnants, "
+          f"{summary['budget_denied']} refusés par le budget, délai "
+          f"{summary['delay'] * 1000:.0f} ms")
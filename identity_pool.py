@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Pool d'identités pour répartir le budget de throttling Microsoft Graph.
+
+Les limites de throttling Graph s'appliquent par application et par tenant : une
+seule identité managée plafonne le débit total. Ce module gère plusieurs
+identités (identités managées ou inscriptions d'application), chacune avec son
+propre cache de token et son état de throttling. Chaque requête est routée vers
+l'identité qui a le plus de marge, et bascule sur une autre lorsqu'une identité
+reçoit un 429/503.
+
+Configuration par variables d'environnement :
+    IDENTITY_CLIENT_IDS=<client_id_1>,<client_id_2>,...  (identités managées)
+    IDENTITY_POOL_APPS=<client_id>:<secret>,...          (inscriptions d'app,
+                                                          tenant AZURE_TENANT_ID)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Durée de mise à l'écart par défaut si le serveur n'envoie pas Retry-After
+DEFAULT_THROTTLE_SECONDS = 10.0
+
+# Marge de renouvellement du token avant son expiration (secondes)
+TOKEN_REFRESH_MARGIN = 300
+
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str], default: float = DEFAULT_THROTTLE_SECONDS) -> float:
+    """Convertit l'en-tête Retry-After (secondes) en durée."""
+    try:
+        return max(float(value), 0.0) if value is not None else default
+    except ValueError:
+        return default
+
+
+class PooledIdentity:
+    """Identité du pool : credential, cache de token et état de throttling."""
+
+    def __init__(self, name: str, credential: Any, max_concurrency: int = 8):
+        """
+        Initialise l'identité.
+
+        Args:
+            name: Nom affiché dans les métriques (ex: client ID)
+            credential: Credential azure-identity (objet avec get_token)
+            max_concurrency: Nombre maximal de requêtes simultanées
+        """
+        self.name = name
+        self.credential = credential
+        self.max_concurrency = max_concurrency
+        self.inflight = 0
+        self.throttled_until = 0.0
+        self._token: Optional[str] = None
+        self._token_expires_on = 0.0
+        self._token_lock = threading.Lock()
+        self.stats = {"requests": 0, "succeeded": 0, "throttled": 0, "errors": 0}
+        self.first_request_at: Optional[float] = None
+
+    def get_access_token(self, scope: str) -> str:
+        """Récupère le token de cette identité (cache propre à l'identité)."""
+        with self._token_lock:
+            if (
+                not self._token
+                or time.time() >= self._token_expires_on - TOKEN_REFRESH_MARGIN
+            ):
+                token = self.credential.get_token(scope)
+                self._token = token.token
+                self._token_expires_on = float(token.expires_on)
+                logger.info(f"Token obtenu pour l'identité {self.name}")
+            return self._token
+
+    def is_throttled(self, now: Optional[float] = None) -> bool:
+        """Indique si l'identité est en période de throttling."""
+        return (now or time.monotonic()) < self.throttled_until
+
+    def headroom(self, now: Optional[float] = None) -> float:
+        """Part de capacité disponible (0 si throttlée ou saturée)."""
+        if self.is_throttled(now):
+            return 0.0
+        return max(self.max_concurrency - self.inflight, 0) / self.max_concurrency
+
+
+class IdentityPool:
+    """Routeur de requêtes entre plusieurs identités Graph."""
+
+    def __init__(self, identities: Iterable[PooledIdentity]):
+        """
+        Initialise le pool.
+
+        Args:
+            identities: Identités du pool (au moins une)
+        """
+        self.identities: List[PooledIdentity] = list(identities)
+        if not self.identities:
+            raise ValueError("Le pool d'identités est vide")
+        self._condition = threading.Condition()
+        self._started_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.identities)
+
+    @classmethod
+    def from_client_ids(cls, client_ids: Iterable[str], max_concurrency: int = 8) -> "IdentityPool":
+        """Crée un pool d'identités managées assignées par l'utilisateur."""
+        from azure.identity import ManagedIdentityCredential
+
+        return cls(
+            PooledIdentity(client_id, ManagedIdentityCredential(client_id=client_id),
+                           max_concurrency)
+            for client_id in client_ids
+        )
+
+    @classmethod
+    def from_env(cls, max_concurrency: int = 8) -> Optional["IdentityPool"]:
+        """
+        Crée un pool depuis IDENTITY_CLIENT_IDS / IDENTITY_POOL_APPS.
+
+        Returns:
+            IdentityPool ou None si aucune identité n'est configurée
+        """
+        identities: List[PooledIdentity] = []
+
+        client_ids = os.getenv("IDENTITY_CLIENT_IDS") or os.getenv("IDENTITY_CLIENT_ID", "")
+        managed_ids = [cid.strip() for cid in client_ids.split(",") if cid.strip()]
+        if managed_ids:
+            from azure.identity import ManagedIdentityCredential
+
+            identities += [
+                PooledIdentity(cid, ManagedIdentityCredential(client_id=cid), max_concurrency)
+                for cid in managed_ids
+            ]
+
+        apps = [entry for entry in os.getenv("IDENTITY_POOL_APPS", "").split(",") if entry]
+        if apps:
+            from azure.identity import ClientSecretCredential
+
+            tenant_id = os.getenv("AZURE_TENANT_ID")
+            for entry in apps:
+                client_id, _, secret = entry.partition(":")
+                identities.append(PooledIdentity(
+                    client_id,
+                    ClientSecretCredential(tenant_id, client_id, secret),
+                    max_concurrency,
+                ))
+
+        return cls(identities) if identities else None
+
+    def acquire(
+        self, exclude: Iterable[PooledIdentity] = (), timeout: Optional[float] = None
+    ) -> PooledIdentity:
+        """
+        Choisit l'identité qui a le plus de marge (attend si toutes sont saturées).
+
+        Args:
+            exclude: Identités à éviter (déjà throttlées pour cette requête)
+            timeout: Attente maximale (secondes), illimitée si None
+
+        Returns:
+            PooledIdentity: Identité réservée (à libérer avec release)
+        """
+        excluded = {id(identity) for identity in exclude}
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                candidates = [i for i in self.identities if id(i) not in excluded]
+                if not candidates:
+                    # Toutes les identités ont été essayées : on reprend le pool complet
+                    candidates = self.identities
+
+                available = [i for i in candidates if i.headroom(now) > 0]
+                if available:
+                    chosen = max(available, key=lambda i: (i.headroom(now), -i.stats["throttled"]))
+                    chosen.inflight += 1
+                    chosen.stats["requests"] += 1
+                    if chosen.first_request_at is None:
+                        chosen.first_request_at = now
+                    return chosen
+
+                # Attente de la fin du throttling le plus court ou d'une libération
+                wake_at = min(
+                    (i.throttled_until for i in candidates if i.is_throttled(now)),
+                    default=now + 1.0,
+                )
+                wait = max(wake_at - now, 0.01)
+                if deadline is not None:
+                    if now >= deadline:
+                        raise TimeoutError("Aucune identité disponible dans le pool")
+                    wait = min(wait, deadline - now)
+                self._condition.wait(wait)
+
+    def release(
+        self,
+        identity: PooledIdentity,
+        status_code: Optional[int] = None,
+        retry_after: Optional[str] = None,
+    ) -> bool:
+        """
+        Libère une identité et met à jour son état selon la réponse.
+
+        Args:
+            identity: Identité réservée par acquire
+            status_code: Code HTTP de la réponse (None si exception réseau)
+            retry_after: Valeur de l'en-tête Retry-After
+
+        Returns:
+            bool: True si l'identité a été throttlée (la requête doit basculer)
+        """
+        throttled = status_code in THROTTLE_STATUS_CODES
+        with self._condition:
+            identity.inflight = max(identity.inflight - 1, 0)
+            if throttled:
+                delay = parse_retry_after(retry_after)
+                identity.throttled_until = time.monotonic() + delay
+                identity.stats["throttled"] += 1
+                logger.warning(
+                    f"Identité {identity.name} throttlée pendant {delay:.0f}s"
+                )
+            elif status_code is None or status_code >= 500:
+                identity.stats["errors"] += 1
+            else:
+                identity.stats["succeeded"] += 1
+            self._condition.notify_all()
+        return throttled
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        """
+        Retourne les métriques par identité (débit, throttling, charge).
+
+        Returns:
+            Liste de dicts, une entrée par identité
+        """
+        now = time.monotonic()
+        result = []
+        with self._condition:
+            for identity in self.identities:
+                elapsed = now - (identity.first_request_at or now)
+                result.append({
+                    "identity": identity.name,
+                    **identity.stats,
+                    "inflight": identity.inflight,
+                    "requests_per_second": (
+                        identity.stats["succeeded"] / elapsed if elapsed > 0 else 0.0
+                    ),
+                    "throttled_for_seconds": max(identity.throttled_until - now, 0.0),
+                })
+        return result
+
+
+def print_pool_metrics(pool: IdentityPool) -> None:
+    """Affiche les métriques du pool d'identités."""
+    print("\n🆔 Débit par identité:")
+    for entry in pool.metrics():
+        print(f"   {entry['identity'][:20]}: {entry['succeeded']} ok, "
+              f"{entry['throttled']} throttlées, {entry['errors']} erreurs, "
+              f"{entry['requests_per_second']:.1f} req/s")
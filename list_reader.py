@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Lecture vectorisée des éléments d'une liste SharePoint vers un DataFrame.
+
+Les pages de /lists/{id}/items (champs projetés par $expand=fields($select=))
+sont converties colonne par colonne : une liste Python par champ et par page,
+puis un DataFrame par page concaténé à la fin, sans dict intermédiaire par
+ligne. La conversion des types (dates, nombres) est faite sur des colonnes
+entières.
+
+La lecture passe par la requête delta de la liste : la première lecture
+mémorise le deltaLink avec une copie locale (Parquet pour un chemin .parquet
+si pyarrow est installé, pickle sinon) ; les suivantes ne transfèrent que les éléments modifiés ou
+supprimés et les fusionnent dans la copie locale.
+
+Usage:
+    python list_reader.py --site https://tenant.sharepoint.com/sites/x --list Suivi \\
+        --fields Title,Reference,Heures --cache suivi.pkl --output suivi.csv
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import pandas as pd
+import requests
+
+from graph_client import GraphClient
+from list_writer import resolve_list_id
+from profiling import phase, run_profiled
+from site_fanout import site_graph_path
+
+try:
+    import pyarrow
+except ImportError:  # copie locale en pickle, read_arrow indisponible
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+READ_PAGE_SIZE = 999
+
+# Colonnes de métadonnées ajoutées aux champs de la liste
+ID_COLUMN = "id"
+MODIFIED_COLUMN = "lastModifiedDateTime"
+
+# Réponses indiquant que la requête delta n'est pas disponible pour la liste
+DELTA_UNSUPPORTED_STATUS = (400, 404, 501)
+
+
+def items_to_frame(
+    items: Sequence[Dict[str, Any]],
+    fields: Optional[Sequence[str]] = None,
+    parse_dates: Sequence[str] = (),
+) -> pd.DataFrame:
+    """
+    Convertit une page d'éléments de liste en DataFrame, colonne par colonne.
+
+    Args:
+        items: Éléments {"id", "lastModifiedDateTime", "fields": {...}}
+        fields: Champs à extraire (tous les champs rencontrés si absent)
+        parse_dates: Champs à convertir en dates (UTC)
+
+    Returns:
+        pd.DataFrame: Une ligne par élément, colonnes id, lastModifiedDateTime, champs
+    """
+    if fields is None:
+        seen: Dict[str, None] = {}
+        for item in items:
+            seen.update(dict.fromkeys(item.get("fields", {})))
+        fields = [name for name in seen if name not in (ID_COLUMN, "@odata.etag")]
+
+    field_dicts = [item.get("fields", {}) for item in items]
+    columns: Dict[str, Any] = {
+        ID_COLUMN: [item["id"] for item in items],
+        MODIFIED_COLUMN: pd.to_datetime([item.get(MODIFIED_COLUMN) for item in items], utc=True),
+    }
+    for name in fields:
+        columns[name] = [values.get(name) for values in field_dicts]
+    frame = pd.DataFrame(columns)
+    for name in parse_dates:
+        if name in frame:
+            frame[name] = pd.to_datetime(frame[name], utc=True, errors="coerce")
+    return frame
+
+
+def _sort_by_id(frame: pd.DataFrame) -> pd.DataFrame:
+    """Trie par ID numérique (les IDs de liste sont des entiers en texte)."""
+    order = pd.to_numeric(frame[ID_COLUMN], errors="coerce").argsort(kind="stable")
+    return frame.iloc[order].reset_index(drop=True)
+
+
+def merge_changes(cached: pd.DataFrame, changed: pd.DataFrame, deleted_ids: Sequence[str]) -> pd.DataFrame:
+    """
+    Fusionne un delta dans la copie locale.
+
+    Args:
+        cached: Copie locale
+        changed: Éléments créés ou modifiés
+        deleted_ids: IDs des éléments supprimés
+
+    Returns:
+        pd.DataFrame: Copie locale à jour, triée par ID
+    """
+    replaced = set(changed[ID_COLUMN]) | set(deleted_ids)
+    kept = cached[~cached[ID_COLUMN].isin(replaced)]
+    frames = [frame for frame in (kept, changed) if len(frame)]
+    if not frames:
+        return cached.iloc[0:0]
+    return _sort_by_id(pd.concat(frames, ignore_index=True))
+
+
+class ListReader:
+    """Lit une liste SharePoint en DataFrame, avec copie locale mise à jour par delta."""
+
+    def __init__(
+        self,
+        client: GraphClient,
+        site_id: str,
+        list_id: str,
+        fields: Optional[Sequence[str]] = None,
+        cache_path: Optional[str] = None,
+        parse_dates: Sequence[str] = (),
+        page_size: int = READ_PAGE_SIZE,
+    ):
+        """
+        Initialise le lecteur.
+
+        Args:
+            client: Client Graph
+            site_id: ID du site
+            list_id: ID de la liste
+            fields: Champs projetés (tous si absent)
+            cache_path: Copie locale (.parquet ou .pkl ; None pour ne pas en garder).
+                Sans pyarrow, un chemin .parquet contient du pickle
+            parse_dates: Champs à convertir en dates
+            page_size: Éléments par page
+        """
+        self.client = client
+        self.site_id = site_id
+        self.list_id = list_id
+        self.fields = list(fields) if fields else None
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.cache_format = None
+        if self.cache_path:
+            self.cache_format = "parquet" if self.cache_path.suffix == ".parquet" else "pickle"
+            if self.cache_format == "parquet" and pyarrow is None:
+                logger.warning(f"pyarrow absent : copie locale {self.cache_path} en pickle")
+                self.cache_format = "pickle"
+        self.parse_dates = list(parse_dates)
+        self.page_size = page_size
+        self.stats = {"requests": 0, "items": 0, "deleted": 0, "mode": None, "seconds": 0.0}
+
+    @property
+    def list_path(self) -> str:
+        return f"sites/{self.site_id}/lists/{self.list_id}"
+
+    @property
+    def state_path(self) -> Optional[Path]:
+        return self.cache_path.with_name(self.cache_path.name + ".json") if self.cache_path else None
+
+    def _params(self) -> Dict[str, str]:
+        expand = f"fields($select={','.join(self.fields)})" if self.fields else "fields"
+        return {"$expand": expand, "$select": f"id,{MODIFIED_COLUMN}",
+                "$top": str(self.page_size)}
+
+    def _pages(self, url: str, params: Optional[Dict[str, str]]) -> Iterator[Dict[str, Any]]:
+        """Itère sur les pages brutes (le nextLink contient déjà la projection)."""
+        while url:
+            page = self.client.get_json(url, profile="full", params=params)
+            self.stats["requests"] += 1
+            yield page
+            url, params = page.get("@odata.nextLink"), None
+
+    def _collect(self, pages: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Construit les DataFrames page par page et relève IDs supprimés et deltaLink."""
+        frames, deleted, delta_link = [], [], None
+        for page in pages:
+            values = page.get("value", [])
+            live = [item for item in values if "deleted" not in item and "@removed" not in item]
+            deleted.extend(item["id"] for item in values if "deleted" in item or "@removed" in item)
+            if live:
+                frames.append(items_to_frame(live, self.fields, self.parse_dates))
+            delta_link = page.get("@odata.deltaLink", delta_link)
+
+        if frames:
+            frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        else:
+            frame = items_to_frame([], self.fields or [], self.parse_dates)
+        return {"frame": frame, "deleted": deleted, "delta_link": delta_link}
+
+    def _load_cache(self) -> Optional[Dict[str, Any]]:
+        if not self.cache_path or not self.cache_path.exists() or not self.state_path.exists():
+            return None
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            if (state.get("list_id"), state.get("fields"), state.get("parse_dates", [])) != (
+                    self.list_id, self.fields, self.parse_dates):
+                logger.info("Copie locale obtenue avec une autre projection, relecture complète")
+                return None
+            # Format réellement écrit (un .parquet peut être du pickle sans pyarrow)
+            if state.get("format", self.cache_format) == "parquet":
+                frame = pd.read_parquet(self.cache_path)
+            else:
+                frame = pd.read_pickle(self.cache_path)
+        except (OSError, ValueError, ImportError) as e:
+            logger.warning(f"Copie locale illisible, relecture complète: {e}")
+            return None
+        return {"frame": frame, "delta_link": state.get("delta_link")}
+
+    def _save_cache(self, frame: pd.DataFrame, delta_link: Optional[str]) -> None:
+        if not self.cache_path:
+            return
+        if self.cache_format == "parquet":
+            frame.to_parquet(self.cache_path, index=False)
+        else:
+            frame.to_pickle(self.cache_path)
+        self.state_path.write_text(json.dumps({
+            "site_id": self.site_id, "list_id": self.list_id, "fields": self.fields,
+            "parse_dates": self.parse_dates, "format": self.cache_format,
+            "delta_link": delta_link, "rows": len(frame), "updated_at": time.time(),
+        }, indent=2), encoding="utf-8")
+
+    def read(self, full: bool = False) -> pd.DataFrame:
+        """
+        Lit la liste : delta depuis la copie locale si possible, sinon lecture complète.
+
+        Args:
+            full: Ignorer la copie locale
+
+        Returns:
+            pd.DataFrame: Éléments de la liste (id, lastModifiedDateTime, champs)
+        """
+        started = time.perf_counter()
+        cached = None if full else self._load_cache()
+        with phase("list_read"):
+            result = None
+            if cached and cached["delta_link"]:
+                try:
+                    result = self._collect(self._pages(cached["delta_link"], None))
+                    self.stats["mode"] = "delta"
+                except requests.HTTPError as e:
+                    if e.response is None or e.response.status_code != 410:
+                        raise
+                    logger.warning("Jeton delta de la liste expiré, relecture complète")
+                    cached = None
+
+            if result is None:
+                cached = None
+                try:
+                    result = self._collect(self._pages(f"{self.list_path}/items/delta",
+                                                       self._params()))
+                    self.stats["mode"] = "full"
+                except requests.HTTPError as e:
+                    if e.response is None or e.response.status_code not in DELTA_UNSUPPORTED_STATUS:
+                        raise
+                    logger.warning("Delta indisponible pour la liste, lecture sans suivi")
+                    result = self._collect(self._pages(f"{self.list_path}/items", self._params()))
+                    self.stats["mode"] = "full-no-delta"
+
+        if cached is not None:
+            frame = merge_changes(cached["frame"], result["frame"], result["deleted"])
+        else:
+            frame = _sort_by_id(result["frame"])
+        self._save_cache(frame, result["delta_link"])
+
+        self.stats["items"] = len(result["frame"])
+        self.stats["deleted"] = len(result["deleted"])
+        self.stats["seconds"] = time.perf_counter() - started
+        logger.info(f"Liste {self.list_id} ({self.stats['mode']}): {self.stats['items']} éléments "
+                    f"lus, {self.stats['deleted']} supprimés, {len(frame)} au total")
+        return frame
+
+    def read_arrow(self, full: bool = False):
+        """Lit la liste en table Arrow (nécessite pyarrow : pip install .[arrow])."""
+        if pyarrow is None:
+            raise ImportError("read_arrow nécessite pyarrow (pip install .[arrow])")
+        return pyarrow.Table.from_pandas(self.read(full), preserve_index=False)
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Lecture d'une liste SharePoint en DataFrame")
+    parser.add_argument("--site", required=True, help="URL ou ID du site")
+    parser.add_argument("--list", required=True, help="Nom affiché ou ID de la liste")
+    parser.add_argument("--fields", help="Champs projetés, séparés par des virgules")
+    parser.add_argument("--dates", default="", help="Champs à convertir en dates")
+    parser.add_argument("--cache", help="Copie locale (.parquet ou .pkl)")
+    parser.add_argument("--full", action="store_true", help="Ignorer la copie locale")
+    parser.add_argument("--output", help="Export (.csv ou .parquet)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from credential_factory import get_credential
+
+    client = GraphClient(get_credential())
+    try:
+        site_id = client.get_json(site_graph_path(args.site), profile="ids_only", kind="site")["id"]
+        list_id = resolve_list_id(client, site_id, args.list)
+        reader = ListReader(
+            client, site_id, list_id,
+            fields=args.fields.split(",") if args.fields else None,
+            cache_path=args.cache,
+            parse_dates=[name for name in args.dates.split(",") if name],
+        )
+        frame = reader.read(full=args.full)
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Lecture impossible: {e}")
+        raise SystemExit(1)
+
+    stats = reader.stats
+    print(f"✅ {len(frame)} éléments ({stats['mode']}: {stats['items']} lus, "
+          f"{stats['deleted']} supprimés) en {stats['seconds']:.1f}s, {stats['requests']} requêtes")
+    if args.output:
+        if args.output.endswith(".parquet"):
+            frame.to_parquet(args.output, index=False)
+        else:
+            frame.to_csv(args.output, index=False)
+        print(f"📄 Export: {args.output}")
+    else:
+        print(frame.head(20).to_string())
+
+
+if __name__ == "__main__":
+    run_profiled(main)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Écriture en masse d'éléments de listes SharePoint depuis un DataFrame.
+
+Les colonnes du DataFrame sont associées aux champs de la liste (nom interne ou
+nom affiché), puis chaque ligne est créée ou mise à jour via JSON $batch
+(20 écritures par appel). Une colonne clé rend l'opération idempotente : les
+éléments existants sont relus une fois, et une relance ne modifie que les
+lignes dont les valeurs ont changé.
+
+Le débit s'adapte au throttling : les lots sont envoyés en parallèle
+(concurrency), la concurrence est divisée par deux dès que des écritures
+restent throttlées après rejeu, puis remonte progressivement.
+
+Usage:
+    python list_writer.py --site https://tenant.sharepoint.com/sites/x \\
+        --list "Suivi" --key Reference donnees.csv
+    python list_writer.py --site <id> --list "Suivi" --key Reference data.parquet --dry-run
+"""
+
+import argparse
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+
+from excel_workbook import dataframe_to_rows
+from graph_client import GRAPH_BATCH_LIMIT, GraphClient, batch_request
+from identity_pool import THROTTLE_STATUS_CODES, IdentityPool, print_pool_metrics
+from profiling import phase, run_profiled
+from site_fanout import site_graph_path
+
+logger = logging.getLogger(__name__)
+
+# Format des dates écrites dans les champs de liste (ISO 8601 UTC)
+LIST_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Taille des pages lors de la relecture des éléments existants
+READ_PAGE_SIZE = 999
+
+
+def _normalize(value: Any) -> Any:
+    """Forme comparable d'une valeur de champ (vide = None, nombres en float)."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _key(value: Any) -> Optional[str]:
+    """Clé d'idempotence : 12, 12.0 et "12" désignent le même élément."""
+    value = _normalize(value)
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def resolve_list_id(client: GraphClient, site_id: str, list_name: str) -> str:
+    """Retourne l'ID d'une liste à partir de son nom affiché (ou de son ID)."""
+    for sp_list in client.iter_pages(f"sites/{site_id}/lists", profile="listing", kind="list"):
+        if list_name in (sp_list["id"], sp_list.get("displayName")):
+            return sp_list["id"]
+    raise ValueError(f"Liste introuvable sur le site {site_id}: {list_name}")
+
+
+class ListWriter:
+    """Crée ou met à jour les éléments d'une liste à partir d'un DataFrame."""
+
+    def __init__(
+        self,
+        client: GraphClient,
+        site_id: str,
+        list_id: str,
+        key_column: str,
+        field_map: Optional[Dict[str, str]] = None,
+        concurrency: int = 4,
+        requests_per_second: Optional[float] = None,
+        max_retries: int = 3,
+        max_requeues: int = 3,
+    ):
+        """
+        Initialise l'écrivain.
+
+        Args:
+            client: Client Graph
+            site_id: ID du site
+            list_id: ID de la liste
+            key_column: Colonne du DataFrame identifiant un élément de façon unique
+            field_map: Colonne -> nom interne du champ (déduit des colonnes de la
+                liste si absent)
+            concurrency: Nombre maximal d'appels $batch simultanés
+            requests_per_second: Plafond d'appels $batch par seconde (None : aucun)
+            max_retries: Rejeux d'une écriture throttlée au sein d'un appel
+            max_requeues: Renvois d'une écriture encore throttlée dans une
+                fenêtre ultérieure, au-delà desquels elle est comptée en échec
+        """
+        self.client = client
+        self.site_id = site_id
+        self.list_id = list_id
+        self.key_column = key_column
+        self.field_map = dict(field_map) if field_map else None
+        self.max_concurrency = max(concurrency, 1)
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.max_requeues = max_requeues
+
+    @property
+    def list_path(self) -> str:
+        return f"sites/{self.site_id}/lists/{self.list_id}"
+
+    def resolve_field_map(self, columns: List[str]) -> Dict[str, str]:
+        """
+        Associe les colonnes du DataFrame aux champs modifiables de la liste.
+
+        Returns:
+            Dict: Colonne -> nom interne (lève ValueError si une colonne est inconnue)
+        """
+        if self.field_map is not None:
+            missing = [column for column in self.field_map if column not in columns]
+            if missing:
+                raise ValueError(f"Colonnes absentes du DataFrame: {', '.join(missing)}")
+            return self.field_map
+
+        fields = {}
+        for column in self.client.iter_pages(f"{self.list_path}/columns", profile="full",
+                                             params={"$select": "name,displayName,readOnly"}):
+            if not column.get("readOnly"):
+                fields.setdefault(column["name"], column["name"])
+                fields.setdefault(column.get("displayName", column["name"]), column["name"])
+        unknown = [column for column in columns if column not in fields]
+        if unknown:
+            raise ValueError(f"Colonnes sans champ de liste correspondant: {', '.join(unknown)}")
+        return {column: fields[column] for column in columns}
+
+    def existing_items(self, field_names: List[str], key_field: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Relit les éléments existants (champs mappés uniquement), indexés par clé.
+
+        Returns:
+            Dict: Clé -> {"id", "fields"}
+        """
+        params = {"$expand": f"fields($select={','.join(field_names)})",
+                  "$top": str(READ_PAGE_SIZE)}
+        existing = {}
+        for item in self.client.iter_pages(f"{self.list_path}/items", profile="full",
+                                           params=params):
+            fields = item.get("fields", {})
+            key = _key(fields.get(key_field))
+            if key is not None:
+                existing[key] = {"id": item["id"], "fields": fields}
+        return existing
+
+    def plan(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Détermine les créations et mises à jour nécessaires.
+
+        Returns:
+            Dict: {"creates": [(clé, champs)], "updates": [(clé, id, champs modifiés)],
+                "unchanged": int, "field_map": dict}
+        """
+        if self.key_column not in df.columns:
+            raise ValueError(f"Colonne clé absente du DataFrame: {self.key_column}")
+        keys = df[self.key_column].map(_key)
+        if keys.isna().any():
+            raise ValueError(f"{int(keys.isna().sum())} lignes sans valeur de clé")
+        duplicated = keys[keys.duplicated()].unique()
+        if len(duplicated):
+            raise ValueError(f"Clés en double: {', '.join(map(str, duplicated[:10]))}")
+
+        field_map = self.resolve_field_map(list(df.columns))
+        field_names = [field_map[column] for column in df.columns]
+        key_field = field_map[self.key_column]
+
+        with phase("list_read"):
+            existing = self.existing_items(field_names, key_field)
+
+        creates, updates, unchanged = [], [], 0
+        for key, row in zip(keys, dataframe_to_rows(df, date_format=LIST_DATE_FORMAT)):
+            fields = dict(zip(field_names, row))
+            current = existing.get(key)
+            if current is None:
+                creates.append((key, {name: v for name, v in fields.items() if v is not None}))
+                continue
+            changed = {
+                name: value for name, value in fields.items()
+                if _normalize(value) != _normalize(current["fields"].get(name))
+            }
+            if changed:
+                updates.append((key, current["id"], changed))
+            else:
+                unchanged += 1
+        return {"creates": creates, "updates": updates, "unchanged": unchanged,
+                "field_map": field_map}
+
+    def _send(self, writes: List[Tuple[str, Dict[str, Any]]], report: Dict[str, Any]) -> None:
+        """Envoie les écritures par fenêtres de lots, en adaptant la concurrence."""
+        concurrency = self.max_concurrency
+        pending = writes
+        requeues: Dict[str, int] = {}
+        min_interval = 1.0 / self.requests_per_second if self.requests_per_second else 0.0
+
+        while pending:
+            window = pending[:concurrency * GRAPH_BATCH_LIMIT]
+            pending = pending[len(window):]
+            lots = math.ceil(len(window) / GRAPH_BATCH_LIMIT)
+            started = time.perf_counter()
+            results = self.client.batch([entry for _, entry in window],
+                                        max_retries=self.max_retries, concurrency=concurrency)
+            report["requests"] += lots
+            report["sub_requests"] += len(window)
+
+            throttled = []
+            for (key, entry), result in zip(window, results):
+                status = result["status"]
+                if status in THROTTLE_STATUS_CODES and requeues.get(key, 0) < self.max_requeues:
+                    requeues[key] = requeues.get(key, 0) + 1
+                    throttled.append((key, entry))
+                elif status in THROTTLE_STATUS_CODES:
+                    report["failed"].append({
+                        "key": key, "status": status,
+                        "error": f"Toujours throttlée après {self.max_requeues} renvois",
+                    })
+                elif status is None or status >= 400:
+                    body = result["body"] if isinstance(result["body"], dict) else {}
+                    report["failed"].append({
+                        "key": key, "status": status,
+                        "error": body.get("error", {}).get("message", str(result["body"])[:200]),
+                    })
+                else:
+                    report["created" if entry["method"] == "POST" else "updated"] += 1
+
+            if throttled:
+                # Toujours throttlé après rejeu : on ralentit et on réessaie plus tard
+                report["throttled"] += len(throttled)
+                concurrency = max(concurrency // 2, 1)
+                pending = throttled + pending
+                logger.warning(f"{len(throttled)} écritures throttlées, concurrence -> {concurrency}")
+            elif concurrency < self.max_concurrency:
+                concurrency += 1
+
+            wait = lots * min_interval - (time.perf_counter() - started)
+            if wait > 0:
+                time.sleep(wait)
+        report["final_concurrency"] = concurrency
+
+    def write(self, df: pd.DataFrame, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Synchronise les lignes du DataFrame dans la liste.
+
+        Args:
+            df: Lignes à écrire (une ligne par élément, clé unique)
+            dry_run: Calculer les écritures sans les envoyer
+
+        Returns:
+            Dict: {"created", "updated", "unchanged", "failed", "requests",
+                "sub_requests", "throttled", "seconds", "rows_per_second", "planned"}
+        """
+        started = time.perf_counter()
+        plan = self.plan(df)
+        report: Dict[str, Any] = {
+            "created": 0, "updated": 0, "unchanged": plan["unchanged"], "failed": [],
+            "requests": 0, "sub_requests": 0, "throttled": 0,
+            "final_concurrency": self.max_concurrency,
+            "planned": {"creates": len(plan["creates"]), "updates": len(plan["updates"])},
+        }
+
+        writes = [
+            (key, batch_request(f"{self.list_path}/items", method="POST", body={"fields": fields}))
+            for key, fields in plan["creates"]
+        ] + [
+            (key, batch_request(f"{self.list_path}/items/{item_id}/fields", method="PATCH",
+                                body=fields))
+            for key, item_id, fields in plan["updates"]
+        ]
+        if writes and not dry_run:
+            with phase("list_write"):
+                self._send(writes, report)
+
+        report["seconds"] = time.perf_counter() - started
+        written = report["created"] + report["updated"]
+        report["rows_per_second"] = written / report["seconds"] if report["seconds"] else 0.0
+        logger.info(f"Liste {self.list_id}: {report['created']} créés, {report['updated']} mis à "
+                    f"jour, {report['unchanged']} inchangés, {len(report['failed'])} échecs")
+        return report
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    """Lit un fichier CSV, Excel ou Parquet."""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".parquet":
+        return pd.read_parquet(path)
+    if suffix in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Écriture en masse dans une liste SharePoint")
+    parser.add_argument("data", help="Fichier de données (.csv, .xlsx, .parquet)")
+    parser.add_argument("--site", required=True, help="URL ou ID du site")
+    parser.add_argument("--list", required=True, help="Nom affiché ou ID de la liste")
+    parser.add_argument("--key", required=True, help="Colonne clé (idempotence)")
+    parser.add_argument("--map", action="append", default=[],
+                        help="Association colonne=champ_interne (répétable)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rps", type=float, help="Plafond d'appels $batch par seconde")
+    parser.add_argument("--dry-run", action="store_true", help="Compter sans écrire")
+    parser.add_argument("--identity-pool", action="store_true",
+                        help="Répartir les requêtes sur IDENTITY_CLIENT_IDS")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    pool = IdentityPool.from_env() if args.identity_pool else None
+    if pool:
+        client = GraphClient(identity_pool=pool)
+    else:
+        from credential_factory import get_credential
+
+        client = GraphClient(get_credential())
+
+    df = read_frame(args.data)
+    field_map = dict(item.split("=", 1) for item in args.map) or None
+    try:
+        site_id = client.get_json(site_graph_path(args.site), profile="ids_only", kind="site")["id"]
+        list_id = resolve_list_id(client, site_id, args.list)
+        writer = ListWriter(client, site_id, list_id, args.key, field_map,
+                            args.concurrency, args.rps)
+        report = writer.write(df, dry_run=args.dry_run)
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Écriture impossible: {e}")
+        raise SystemExit(1)
+
+    if args.dry_run:
+        print(f"🔍 {len(df)} lignes: {report['planned']['creates']} à créer, "
+              f"{report['planned']['updates']} à mettre à jour, {report['unchanged']} inchangées")
+        return
+    print(f"✅ {report['created']} créés, {report['updated']} mis à jour, "
+          f"{report['unchanged']} inchangés en {report['seconds']:.1f}s "
+          f"({report['rows_per_second']:.0f} lignes/s)")
+    print(f"📦 {report['requests']} appels $batch, {report['throttled']} écritures throttlées, "
+          f"concurrence finale {report['final_concurrency']}")
+    for failure in report["failed"][:20]:
+        print(f"❌ {failure['key']}: {failure['status']} {failure['error']}")
+    if pool:
+        print_pool_metrics(pool)
+    if report["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    run_profiled(main)
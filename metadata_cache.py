@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Cache de lecture des réponses de métadonnées Graph (sites, drives, éléments).
+
+Branché sur GraphClient (paramètre metadata_cache), il sert les GET répétés
+sans appel réseau pendant une courte fraîcheur, puis les revalide par GET
+conditionnel If-None-Match quand la réponse portait un ETag (304 : réponse
+en cache réutilisée). Les 404 sont mémorisés brièvement (cache négatif),
+ce qui évite de revérifier un dossier que l'on vient de trouver absent. Toute
+écriture du client (PUT, POST, PATCH, DELETE, y compris dans un $batch)
+invalide les entrées du chemin écrit, de ses dossiers parents et de ses
+descendants.
+
+Les contenus (/content), requêtes delta, URLs pré-authentifiées et requêtes
+portant leurs propres en-têtes ne sont jamais mis en cache.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRESH_SECONDS = 30.0
+DEFAULT_NEGATIVE_SECONDS = 10.0
+DEFAULT_MAX_ENTRIES = 10_000
+
+# Segments rendant une réponse non cachable (contenu, delta, état de session)
+_UNCACHEABLE = re.compile(r"/(content|delta|workbook|createUploadSession)(/|\(|$|\?)|token=",
+                          re.IGNORECASE)
+_DRIVE_ADDRESS = re.compile(
+    r"^drives/(?P<drive>[^/]+)(?:/(?:root(?::/(?P<path>[^:]*):?)?|items/(?P<item>[^/]+)))?",
+    re.IGNORECASE,
+)
+_SCOPE = re.compile(r"^(sites/[^/]+(?:/lists/[^/]+)?|subscriptions)", re.IGNORECASE)
+
+
+def parse_address(relative: str) -> Dict[str, Optional[str]]:
+    """
+    Décode la ressource visée par un chemin Graph relatif.
+
+    Returns:
+        Dict: {"drive", "path" (minuscules, "" pour la racine), "item", "scope"}
+    """
+    relative = relative.split("?", 1)[0].strip("/")
+    match = _DRIVE_ADDRESS.match(relative)
+    if match:
+        path = match.group("path")
+        if path is None and re.match(r"^drives/[^/]+/root(/|$)", relative, re.IGNORECASE):
+            path = ""
+        return {"drive": match.group("drive"),
+                "path": path.strip("/").lower() if path is not None else None,
+                "item": match.group("item"), "scope": None}
+    scope = _SCOPE.match(relative)
+    return {"drive": None, "path": None, "item": None,
+            "scope": (scope.group(1) if scope else relative).lower()}
+
+
+def _related(a: str, b: str) -> bool:
+    """Deux chemins sont liés si l'un est l'autre, un parent ou un descendant."""
+    return a == b or a == "" or b == "" or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+class MetadataCache:
+    """Cache mémoire des GET de métadonnées, revalidé par ETag et invalidé par les écritures."""
+
+    def __init__(
+        self,
+        fresh_seconds: float = DEFAULT_FRESH_SECONDS,
+        negative_seconds: float = DEFAULT_NEGATIVE_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        """
+        Initialise le cache.
+
+        Args:
+            fresh_seconds: Durée pendant laquelle une réponse est servie sans appel
+            negative_seconds: Durée de mémorisation d'un 404
+            max_entries: Nombre maximal d'entrées (éviction LRU)
+        """
+        self.fresh_seconds = fresh_seconds
+        self.negative_seconds = negative_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "negative_hits": 0, "revalidated": 0, "misses": 0,
+                      "uncacheable": 0, "invalidated": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["MetadataCache"]:
+        """
+        Crée un cache depuis SHAREPOINT_METADATA_CACHE (fraîcheur en secondes).
+
+        Returns:
+            MetadataCache ou None si la variable est absente, vide ou à 0
+        """
+        value = os.getenv("SHAREPOINT_METADATA_CACHE", "").strip().lower()
+        if value in ("", "0", "false", "no"):
+            return None
+        fresh = DEFAULT_FRESH_SECONDS if value in ("1", "true", "yes") else float(value)
+        negative = float(os.getenv("SHAREPOINT_METADATA_NEGATIVE_TTL", DEFAULT_NEGATIVE_SECONDS))
+        return cls(fresh_seconds=fresh, negative_seconds=negative)
+
+    @staticmethod
+    def cacheable(relative: str, headers: Optional[Dict[str, str]], kwargs: Dict[str, Any]) -> bool:
+        """Indique si un GET peut passer par le cache."""
+        return not headers and not kwargs.get("stream") and not _UNCACHEABLE.search(relative)
+
+    @staticmethod
+    def key(relative: str, query: Dict[str, str]) -> str:
+        """Clé d'une requête : chemin (insensible à la casse) et paramètres triés."""
+        path, _, inline = relative.partition("?")
+        params = sorted(dict(urllib.parse.parse_qsl(inline), **query).items())
+        return f"{path.strip('/').lower()}?{urllib.parse.urlencode(params)}"
+
+    def lookup(self, key: str) -> Tuple[Optional[requests.Response], Optional[str]]:
+        """
+        Cherche une réponse.
+
+        Returns:
+            Tuple[réponse servie sans appel (ou None), ETag à revalider (ou None)]
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None, None
+            self._entries.move_to_end(key)
+            age = now - entry["stored_at"]
+            if entry["status"] == 404:
+                if age < self.negative_seconds:
+                    self.stats["negative_hits"] += 1
+                    return self._response(entry), None
+            elif age < self.fresh_seconds:
+                self.stats["hits"] += 1
+                return self._response(entry), None
+            elif entry["etag"]:
+                return None, entry["etag"]
+            self.stats["misses"] += 1
+            return None, None
+
+    def revalidated(self, key: str, response: requests.Response) -> Optional[requests.Response]:
+        """Traite la réponse d'un GET conditionnel (304 : entrée rafraîchie et servie)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if response.status_code != 304 or entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["revalidated"] += 1
+            entry["stored_at"] = time.monotonic()
+            return self._response(entry)
+
+    def store(self, key: str, relative: str, response: requests.Response) -> None:
+        """Mémorise une réponse 200 ou 404."""
+        if response.status_code not in (200, 404):
+            return
+        body_id = None
+        if response.status_code == 200:
+            try:
+                body = response.json()
+                body_id = body.get("id") if isinstance(body, dict) else None
+            except ValueError:
+                return
+        entry = {
+            "status": response.status_code,
+            "reason": response.reason,
+            "content": response.content,
+            "headers": dict(response.headers),
+            "url": response.url,
+            "etag": response.headers.get("ETag"),
+            "stored_at": time.monotonic(),
+            "body_id": body_id,
+            **parse_address(relative),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _response(entry: Dict[str, Any]) -> requests.Response:
+        """Reconstruit une réponse requests à partir d'une entrée."""
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response._content = entry["content"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.url = entry["url"]
+        response.encoding = "utf-8"
+        return response
+
+    def invalidate(self, relative: str, body: Any = None, result: Any = None) -> int:
+        """
+        Invalide les entrées touchées par une écriture.
+
+        Args:
+            relative: Chemin relatif de la requête d'écriture
+            body: Corps JSON envoyé (nom d'un dossier créé)
+            result: Corps JSON reçu (ID de l'élément écrit)
+
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        target = parse_address(relative)
+        with self._lock:
+            if target["drive"] is None:
+                doomed = [key for key, entry in self._entries.items()
+                          if entry["scope"] and (entry["scope"].startswith(target["scope"])
+                                                 or target["scope"].startswith(entry["scope"]))]
+            else:
+                doomed = self._drive_entries(target, relative, body, result)
+            for key in doomed:
+                del self._entries[key]
+            self.stats["invalidated"] += len(doomed)
+        return len(doomed)
+
+    def _drive_entries(self, target: Dict[str, Optional[str]], relative: str,
+                       body: Any, result: Any) -> List[str]:
+        """Entrées d'un drive liées à l'élément écrit (appelé sous verrou)."""
+        drive = target["drive"].lower()
+        entries = [(key, entry) for key, entry in self._entries.items()
+                   if entry["drive"] and entry["drive"].lower() == drive]
+        ids = {target["item"]} if target["item"] else set()
+        if isinstance(result, dict) and result.get("id"):
+            ids.add(result["id"])
+
+        paths = []
+        if target["path"] is not None:
+            paths.append(target["path"])
+        for key, entry in entries:
+            if entry["body_id"] in ids and entry["path"] is not None:
+                paths.append(entry["path"])
+        if target["item"] and not paths:
+            # Élément adressé par ID sans chemin connu : tout le drive
+            return [key for key, _ in entries]
+        if isinstance(body, dict) and body.get("name") and relative.split("?")[0].endswith("children"):
+            paths = [f"{path}/{body['name'].lower()}".lstrip("/") for path in paths]
+
+        doomed = []
+        for key, entry in entries:
+            if entry["path"] is not None:
+                if any(_related(entry["path"], path) for path in paths):
+                    ids.add(entry["body_id"])
+                    doomed.append(key)
+            elif entry["item"] is None:
+                # Ressource du drive lui-même (quota, métadonnées)
+                doomed.append(key)
+        ids.discard(None)
+        doomed += [key for key, entry in entries
+                   if key not in doomed and (entry["item"] in ids or entry["body_id"] in ids)]
+        return doomed
+
+    def clear(self) -> None:
+        """Vide le cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """Compteurs et ratio de requêtes évitées ou allégées (304)."""
+        with self._lock:
+            stats = dict(self.stats)
+            entries = len(self._entries)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["revalidated"] + stats["misses"]
+        served = stats["hits"] + stats["negative_hits"] + stats["revalidated"]
+        return {
+            **stats,
+            "entries": entries,
+            "lookups": lookups,
+            "hit_ratio": served / lookups if lookups else 0.0,
+            "network_avoided_ratio": (
+                (stats["hits"] + stats["negative_hits"]) / lookups if lookups else 0.0
+            ),
+        }
+
+
+def print_cache_summary(cache: MetadataCache) -> None:
+    """Affiche l'efficacité du cache de métadonnées."""
+    summary = cache.summary()
+    print(f"\n🗃️  Cache de métadonnées: {summary['hit_ratio']:.0%} servies "
+          f"({summary['hits']} directes, {summary['negative_hits']} 404 mémorisés, "
+          f"{summary['revalidated']} revalidées en 304, {summary['misses']} manquées, "
+          f"{summary['invalidated']} invalidées)")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Suivi partagé des opérations longues de Microsoft Graph (copy, etc.).
+
+Les actions asynchrones répondent 202 avec une URL de suivi (en-tête
+Location). Plutôt qu'une boucle de polling par appelant, un seul poller
+planifie toutes les URLs en attente : un thread d'ordonnancement les réveille
+à échéance (Retry-After ou intervalle croissant) et un pool borné exécute les
+GET concurrents. Chaque soumission retourne un Future résolu avec l'état final
+de l'opération.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.5
+MAX_INTERVAL = 10.0
+DEFAULT_TIMEOUT = 600.0
+
+# États terminaux d'une opération longue (asyncJobStatus)
+COMPLETED_STATUSES = ("completed",)
+FAILED_STATUSES = ("failed", "cancelled", "deleteFailed")
+
+
+class OperationFailed(Exception):
+    """Opération longue terminée en échec ou abandonnée."""
+
+    def __init__(self, message: str, status: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.status = status or {}
+
+
+class OperationPoller:
+    """Poller partagé des URLs de suivi d'opérations longues."""
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        concurrency: int = 8,
+        interval: float = DEFAULT_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        timeout: float = DEFAULT_TIMEOUT,
+        request_timeout: float = 30.0,
+    ):
+        """
+        Initialise le poller (le thread d'ordonnancement démarre à la première soumission).
+
+        Args:
+            session: Session HTTP (les URLs de suivi sont pré-authentifiées)
+            concurrency: GET de suivi simultanés au maximum
+            interval: Délai initial entre deux interrogations d'une opération
+            max_interval: Délai maximal (l'intervalle double à chaque interrogation)
+            timeout: Durée maximale d'une opération avant abandon
+            request_timeout: Timeout de chaque GET de suivi
+        """
+        self.session = session or requests.Session()
+        self.interval = interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.request_timeout = request_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(concurrency, 1),
+                                            thread_name_prefix="lro-poll")
+        self._heap: List[Any] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {"submitted": 0, "polls": 0, "completed": 0, "failed": 0}
+
+    def submit(self, monitor_url: str, context: Any = None) -> Future:
+        """
+        Ajoute une opération à suivre.
+
+        Args:
+            monitor_url: URL de suivi (en-tête Location de la réponse 202)
+            context: Donnée libre recopiée dans le résultat
+
+        Returns:
+            Future: Résolu avec {"status", "resourceId", "polls", "seconds", "context"}
+                    ou en échec avec OperationFailed
+        """
+        future: Future = Future()
+        operation = {
+            "url": monitor_url, "context": context, "future": future, "polls": 0,
+            "started": time.monotonic(), "interval": self.interval,
+        }
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Poller fermé")
+            self.stats["submitted"] += 1
+            self._schedule(operation, 0.0)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="lro-scheduler",
+                                                daemon=True)
+                self._thread.start()
+        return future
+
+    def _schedule(self, operation: Dict[str, Any], delay: float) -> None:
+        """Replanifie une opération (appelé sous self._condition)."""
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), operation))
+        self._condition.notify()
+
+    def _run(self) -> None:
+        """Boucle d'ordonnancement : lance les interrogations arrivées à échéance."""
+        while True:
+            with self._condition:
+                while not self._closed and (
+                    not self._heap or self._heap[0][0] > time.monotonic()
+                ):
+                    wait = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(wait)
+                if self._closed:
+                    return
+                _, _, operation = heapq.heappop(self._heap)
+            self._executor.submit(self._poll, operation)
+
+    def _poll(self, operation: Dict[str, Any]) -> None:
+        """Interroge une URL de suivi et résout ou replanifie l'opération."""
+        future: Future = operation["future"]
+        operation["polls"] += 1
+        try:
+            response = self.session.get(operation["url"], allow_redirects=False,
+                                        timeout=self.request_timeout)
+            with self._condition:
+                self.stats["polls"] += 1
+            status = self._status(response)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Interrogation de l'opération impossible: {e}")
+            status = {"status": "inProgress"}
+            response = None
+
+        elapsed = time.monotonic() - operation["started"]
+        state = status.get("status")
+        if state in COMPLETED_STATUSES:
+            with self._condition:
+                self.stats["completed"] += 1
+            future.set_result({
+                "status": state, "resourceId": status.get("resourceId"),
+                "polls": operation["polls"], "seconds": elapsed, "context": operation["context"],
+            })
+            return
+        if state in FAILED_STATUSES or elapsed > self.timeout:
+            with self._condition:
+                self.stats["failed"] += 1
+            error = status.get("error") or {}
+            message = error.get("message") or (
+                f"Opération {state}" if state in FAILED_STATUSES
+                else f"Opération non terminée après {elapsed:.0f}s"
+            )
+            future.set_exception(OperationFailed(message, status))
+            return
+
+        delay = operation["interval"]
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(float(retry_after), 0.0)
+            except ValueError:
+                pass
+        operation["interval"] = min(operation["interval"] * 2, self.max_interval)
+        with self._condition:
+            if self._closed:
+                future.set_exception(OperationFailed("Poller fermé", status))
+                return
+            self._schedule(operation, delay)
+
+    @staticmethod
+    def _status(response: requests.Response) -> Dict[str, Any]:
+        """Décode la réponse d'une URL de suivi en asyncJobStatus."""
+        if response.status_code == 303:
+            # Terminé : redirection vers la ressource créée (.../items/{id})
+            location = response.headers.get("Location", "")
+            return {"status": "completed", "resourceId": location.rstrip("/").rsplit("/", 1)[-1]}
+        if response.status_code >= 400 and response.status_code not in (429, 503):
+            body = response.json() if response.content else {}
+            return {"status": "failed", "error": body.get("error") or {
+                "message": f"HTTP {response.status_code}"}}
+        if response.status_code in (429, 503):
+            return {"status": "inProgress"}
+        return response.json()
+
+    def wait(self, futures: Iterable[Future], timeout: Optional[float] = None) -> List[Any]:
+        """
+        Attend une série d'opérations.
+
+        Returns:
+            List: Résultat ou exception de chaque opération, dans l'ordre
+        """
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout))
+            except OperationFailed as e:
+                results.append(e)
+        return results
+
+    def close(self) -> None:
+        """Arrête l'ordonnancement ; les opérations encore en attente échouent."""
+        with self._condition:
+            self._closed = True
+            pending = [entry[2] for entry in self._heap]
+            self._heap.clear()
+            self._condition.notify_all()
+        for operation in pending:
+            operation["future"].set_exception(OperationFailed("Poller fermé"))
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "OperationPoller":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
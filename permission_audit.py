@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Audit des permissions (Sites.Selected) sur l'ensemble des sites SharePoint.
+
+check_site_permissions.py interroge un seul site en un GET non paginé. Ici, les
+sites sont énumérés puis leurs permissions (et, en option, celles de leurs
+bibliothèques) sont récupérées par lots JSON $batch de 20 sous-requêtes, en
+suivant la pagination. Chaque collection est mise en cache avec son ETag : un
+audit suivant envoie If-None-Match et réutilise les permissions inchangées.
+
+Le rapport est une table plate triée (une ligne par permission et application),
+écrite en CSV ou Parquet, comparable d'un audit à l'autre.
+
+Usage:
+    python permission_audit.py --discover "*" --output audit.csv
+    python permission_audit.py --sites-file sites.txt --libraries --previous audit.csv
+"""
+
+import argparse
+import csv
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from graph_client import GraphClient, batch_request
+from identity_pool import IdentityPool, print_pool_metrics
+from site_fanout import discover_sites, site_graph_path
+from profiling import run_profiled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERMISSION_CACHE_PATH = "permission_cache.json"
+
+REPORT_COLUMNS = [
+    "site_id", "site_name", "site_url", "scope", "library",
+    "permission_id", "roles", "app_id", "app_name",
+]
+
+# Clé d'une ligne du rapport pour la comparaison entre deux audits
+_ROW_KEY = ("site_id", "scope", "library", "permission_id", "app_id")
+
+
+def permission_rows(
+    site: Dict[str, Any],
+    permissions: Iterable[Dict[str, Any]],
+    scope: str = "site",
+    library: str = "",
+) -> List[Dict[str, str]]:
+    """
+    Aplatit des permissions Graph en lignes de rapport.
+
+    Args:
+        site: Site ({"id", "displayName", "webUrl"})
+        permissions: Permissions au format Graph
+        scope: "site" ou "library"
+        library: Nom de la bibliothèque (scope "library")
+
+    Returns:
+        Liste de lignes (une par permission et application)
+    """
+    rows = []
+    for permission in permissions:
+        identities = (
+            permission.get("grantedToIdentitiesV2")
+            or permission.get("grantedToIdentities")
+            or [{}]
+        )
+        for identity in identities:
+            application = identity.get("application") or {}
+            rows.append({
+                "site_id": site.get("id", ""),
+                "site_name": site.get("displayName", ""),
+                "site_url": site.get("webUrl", ""),
+                "scope": scope,
+                "library": library,
+                "permission_id": permission.get("id", ""),
+                "roles": ";".join(sorted(permission.get("roles", []))),
+                "app_id": application.get("id", ""),
+                "app_name": application.get("displayName", ""),
+            })
+    return rows
+
+
+class PermissionAudit:
+    """Moteur d'audit des permissions par lots $batch avec cache ETag."""
+
+    def __init__(
+        self,
+        client: GraphClient,
+        cache_path: Optional[str] = DEFAULT_PERMISSION_CACHE_PATH,
+        include_libraries: bool = False,
+        concurrency: int = 4,
+    ):
+        """
+        Initialise l'audit.
+
+        Args:
+            client: Client Graph
+            cache_path: Fichier JSON du cache ETag (None pour ne pas persister)
+            include_libraries: Auditer aussi les permissions des bibliothèques
+            concurrency: Nombre de lots $batch envoyés simultanément
+        """
+        self.client = client
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.include_libraries = include_libraries
+        self.concurrency = concurrency
+        self.cache: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"sub_requests": 0, "cache_hits": 0, "errors": 0}
+        if self.cache_path and self.cache_path.exists():
+            try:
+                self.cache = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cache de permissions illisible, ignoré: {e}")
+
+    def _save_cache(self) -> None:
+        """Persiste le cache ETag."""
+        if self.cache_path:
+            self.cache_path.write_text(
+                json.dumps(self.cache, indent=2, ensure_ascii=False), encoding="utf-8"
+            )
+
+    def _batch(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.stats["sub_requests"] += len(entries)
+        return self.client.batch(entries, concurrency=self.concurrency)
+
+    def fetch_collections(
+        self, paths: Dict[str, str], profile: str = "listing", kind: Optional[str] = None
+    ) -> Dict[str, Optional[List[Dict[str, Any]]]]:
+        """
+        Récupère plusieurs collections par $batch, pagination et cache ETag compris.
+
+        Args:
+            paths: {clé: chemin de la collection}
+            profile: Profil de projection de la première page
+            kind: Type de ressource (déduit du chemin si absent)
+
+        Returns:
+            {clé: éléments} (None si la collection est inaccessible)
+        """
+        results: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+        etags: Dict[str, str] = {}
+
+        # Premier tour : requêtes conditionnelles sur les entrées en cache
+        keys = list(paths)
+        entries = []
+        for key in keys:
+            cached = self.cache.get(paths[key])
+            headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else None
+            entries.append(batch_request(paths[key], profile, kind, headers=headers))
+
+        pending: List[Tuple[str, Dict[str, Any]]] = list(zip(keys, self._batch(entries)))
+        while pending:
+            next_round: List[Tuple[str, str]] = []
+            for key, response in pending:
+                status = response["status"]
+                if status == 304:
+                    self.stats["cache_hits"] += 1
+                    results[key] = list(self.cache[paths[key]]["value"])
+                    continue
+                if status != 200:
+                    self.stats["errors"] += 1
+                    logger.warning(f"{paths[key]}: statut {status}")
+                    results[key] = None
+                    continue
+
+                body = response["body"] or {}
+                results.setdefault(key, []).extend(body.get("value", []))
+                if key not in etags:
+                    etags[key] = response["headers"].get("ETag", "")
+                if body.get("@odata.nextLink"):
+                    next_round.append((key, body["@odata.nextLink"]))
+
+            if not next_round:
+                break
+            responses = self._batch([batch_request(link) for _, link in next_round])
+            pending = [(key, response) for (key, _), response in zip(next_round, responses)]
+
+        for key, etag in etags.items():
+            if results.get(key) is not None:
+                self.cache[paths[key]] = {
+                    "etag": etag,
+                    "value": results[key],
+                    "fetched_at": datetime.now(timezone.utc).isoformat(),
+                }
+        return results
+
+    def resolve_sites(self, sites: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Résout URLs et IDs de sites par $batch.
+
+        Returns:
+            Tuple[sites résolus, sites non résolus]
+        """
+        entries = [batch_request(site_graph_path(site), "listing", "site") for site in sites]
+        resolved, unresolved = [], []
+        for site, response in zip(sites, self._batch(entries)):
+            if response["status"] == 200:
+                resolved.append(response["body"])
+            else:
+                self.stats["errors"] += 1
+                unresolved.append(site)
+                logger.warning(f"Site {site} non résolu (statut {response['status']})")
+        return resolved, unresolved
+
+    def run(self, sites: List[str]) -> Dict[str, Any]:
+        """
+        Audite les permissions des sites.
+
+        Args:
+            sites: URLs ou IDs de sites
+
+        Returns:
+            Dict: {"rows": lignes triées, "sites", "failed_sites", "stats", "wall_seconds"}
+        """
+        started = time.perf_counter()
+        resolved, failed = self.resolve_sites(sites)
+        by_id = {site["id"]: site for site in resolved}
+
+        site_permissions = self.fetch_collections(
+            {site_id: f"sites/{site_id}/permissions" for site_id in by_id},
+            kind="permission",
+        )
+        rows: List[Dict[str, str]] = []
+        for site_id, permissions in site_permissions.items():
+            if permissions is None:
+                failed.append(site_id)
+                continue
+            rows += permission_rows(by_id[site_id], permissions)
+
+        if self.include_libraries:
+            site_lists = self.fetch_collections(
+                {site_id: f"sites/{site_id}/lists" for site_id in by_id}, kind="list"
+            )
+            libraries = {
+                f"{site_id}|{entry['id']}": (site_id, entry.get("displayName", ""))
+                for site_id, lists in site_lists.items()
+                for entry in lists or []
+                if (entry.get("list") or {}).get("template") == "documentLibrary"
+            }
+            library_permissions = self.fetch_collections(
+                {
+                    key: f"sites/{site_id}/lists/{key.split('|', 1)[1]}/permissions"
+                    for key, (site_id, _) in libraries.items()
+                },
+                kind="permission",
+            )
+            for key, permissions in library_permissions.items():
+                site_id, library = libraries[key]
+                # Permissions de bibliothèque non exposées sur certains tenants
+                if permissions:
+                    rows += permission_rows(by_id[site_id], permissions, "library", library)
+
+        self._save_cache()
+        rows.sort(key=lambda row: tuple(row[column] for column in REPORT_COLUMNS))
+        return {
+            "rows": rows,
+            "sites": len(resolved),
+            "failed_sites": failed,
+            "stats": dict(self.stats),
+            "wall_seconds": time.perf_counter() - started,
+        }
+
+
+def write_report(rows: List[Dict[str, str]], path: str) -> None:
+    """Écrit le rapport en CSV, ou en Parquet si l'extension est .parquet."""
+    if path.endswith(".parquet"):
+        import pandas as pd
+
+        pd.DataFrame(rows, columns=REPORT_COLUMNS).to_parquet(path, index=False)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_report(path: str) -> List[Dict[str, str]]:
+    """Relit un rapport CSV ou Parquet."""
+    if path.endswith(".parquet"):
+        import pandas as pd
+
+        return pd.read_parquet(path).fillna("").astype(str).to_dict("records")
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def diff_reports(
+    previous: List[Dict[str, str]], current: List[Dict[str, str]]
+) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Compare deux audits.
+
+    Returns:
+        Dict: {"added", "removed", "changed"} (changed : rôles modifiés)
+    """
+    old = {tuple(row[k] for k in _ROW_KEY): row for row in previous}
+    new = {tuple(row[k] for k in _ROW_KEY): row for row in current}
+    return {
+        "added": [new[key] for key in sorted(new.keys() - old.keys())],
+        "removed": [old[key] for key in sorted(old.keys() - new.keys())],
+        "changed": [
+            new[key] for key in sorted(new.keys() & old.keys())
+            if new[key]["roles"] != old[key]["roles"]
+        ],
+    }
+
+
+def print_diff(diff: Dict[str, List[Dict[str, str]]]) -> None:
+    """Affiche les différences entre deux audits."""
+    labels = {"added": "➕ Ajoutée", "removed": "➖ Retirée", "changed": "✏️  Modifiée"}
+    for kind, rows in diff.items():
+        for row in rows:
+            target = row["site_name"] + (f" / {row['library']}" if row["library"] else "")
+            print(f"   {labels[kind]}: {target} -> {row['app_name'] or row['app_id']} "
+                  f"[{row['roles']}]")
+    if not any(diff.values()):
+        print("   Aucun changement depuis l'audit précédent")
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Audit des permissions SharePoint")
+    parser.add_argument("--site", action="append", default=[], help="URL ou ID de site")
+    parser.add_argument("--sites-file", help="Fichier texte : un site par ligne")
+    parser.add_argument("--discover", help="Requête de découverte des sites (\"*\" pour tous)")
+    parser.add_argument("--libraries", action="store_true",
+                        help="Auditer aussi les bibliothèques de documents")
+    parser.add_argument("--output", default="permission_audit.csv",
+                        help="Rapport (.csv ou .parquet)")
+    parser.add_argument("--previous", help="Rapport précédent à comparer")
+    parser.add_argument("--cache", default=DEFAULT_PERMISSION_CACHE_PATH)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--identity-pool", action="store_true",
+                        help="Répartir les requêtes sur IDENTITY_CLIENT_IDS")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    pool = IdentityPool.from_env() if args.identity_pool else None
+    if pool:
+        client = GraphClient(identity_pool=pool)
+    else:
+        from credential_factory import get_credential
+
+        client = GraphClient(get_credential())
+
+    sites = list(args.site)
+    if args.sites_file:
+        lines = Path(args.sites_file).read_text(encoding="utf-8").splitlines()
+        sites += [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    if args.discover:
+        sites += discover_sites(client, args.discover)
+    if not sites:
+        print("❌ Aucun site fourni (--site, --sites-file ou --discover)")
+        return
+
+    print(f"🔍 Audit de {len(sites)} sites...")
+    audit = PermissionAudit(client, args.cache, args.libraries, args.concurrency)
+    report = audit.run(sites)
+    write_report(report["rows"], args.output)
+
+    stats = report["stats"]
+    print(f"✅ {len(report['rows'])} permissions sur {report['sites']} sites "
+          f"en {report['wall_seconds']:.1f}s")
+    print(f"📦 {stats['sub_requests']} sous-requêtes $batch, "
+          f"{stats['cache_hits']} inchangées (ETag), {stats['errors']} erreurs")
+    print(f"📄 Rapport: {args.output}")
+    if report["failed_sites"]:
+        print(f"⚠️  Sites en échec: {', '.join(report['failed_sites'])}")
+
+    if args.previous and Path(args.previous).exists():
+        print(f"\n🔄 Différences avec {args.previous}:")
+        print_diff(diff_reports(read_report(args.previous), report["rows"]))
+
+    if pool:
+        print_pool_metrics(pool)
+
+
+if __name__ == "__main__":
+    run_profiled(main)
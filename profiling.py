@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Profilage intégré des scripts SharePoint.
+
+Activé par la variable d'environnement SHAREPOINT_PROFILE ou l'option
+--profile sur la ligne de commande de n'importe quel script :
+
+    SHAREPOINT_PROFILE=1 python write_file_working.py
+    python extract_sharepoint_ids_ddasys.py --profile
+    python site_fanout.py list --site ... --profile=cprofile
+
+Modes :
+    sampling (défaut) : échantillonnage des piles de tous les threads, écrit au
+                        format "folded" (flamegraph.pl, speedscope, inferno)
+    cprofile          : profilage déterministe, écrit en .pstats (snakeviz,
+                        flameprof)
+
+Dans les deux cas, un découpage du temps par phase (token, HTTP,
+sérialisation, sortie console rich) est affiché en fin d'exécution et écrit en JSON
+dans SHAREPOINT_PROFILE_DIR (profiles/ par défaut). Sans profilage, phase() ne
+coûte qu'un test de booléen.
+"""
+
+import cProfile
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = "SHAREPOINT_PROFILE"
+PROFILE_DIR_ENV = "SHAREPOINT_PROFILE_DIR"
+PROFILE_FLAG = "--profile"
+PROFILE_MODES = ("sampling", "cprofile")
+
+DEFAULT_SAMPLING_INTERVAL = 0.005
+
+
+class PhaseTimer:
+    """Temps mural cumulé par phase, avec temps propre (hors sous-phases)."""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.phases: Dict[str, Dict[str, float]] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.phases = {}
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Mesure un bloc ; les phases imbriquées sont retirées du temps propre."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [0.0]  # Durée cumulée des sous-phases
+        stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            with self._lock:
+                entry = self.phases.setdefault(name, {"calls": 0, "total": 0.0, "self": 0.0})
+                entry["calls"] += 1
+                entry["total"] += elapsed
+                entry["self"] += elapsed - frame[0]
+
+    def breakdown(self, wall_seconds: float) -> List[Dict[str, Any]]:
+        """Phases triées par temps propre décroissant, avec part du temps total."""
+        with self._lock:
+            rows = [
+                {"phase": name, **values,
+                 "percent": 100.0 * values["self"] / wall_seconds if wall_seconds else 0.0}
+                for name, values in self.phases.items()
+            ]
+        return sorted(rows, key=lambda row: row["self"], reverse=True)
+
+
+_timer = PhaseTimer()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Délimite une phase (sans effet si le profilage est désactivé)."""
+    if not _timer.enabled:
+        yield
+        return
+    with _timer.measure(name):
+        yield
+
+
+def timed(name: str) -> Callable:
+    """Décorateur : exécute la fonction dans une phase."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _timer.enabled:
+                return func(*args, **kwargs)
+            with _timer.measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """Profileur par échantillonnage des piles Python de tous les threads."""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLING_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{Path(code.co_filename).stem}:{code.co_name}"
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path: Path) -> None:
+        """Écrit les piles au format folded ("a;b;c <nombre>")."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def profile_mode(argv: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Détermine le mode de profilage et retire --profile des arguments.
+
+    Returns:
+        str: "sampling", "cprofile" ou None si le profilage est désactivé
+    """
+    argv = sys.argv if argv is None else argv
+    mode = None
+    for arg in list(argv[1:]):
+        if arg == PROFILE_FLAG or arg.startswith(PROFILE_FLAG + "="):
+            argv.remove(arg)
+            mode = arg.partition("=")[2] or "sampling"
+
+    if mode is None:
+        value = os.getenv(PROFILE_ENV, "").strip().lower()
+        if value in ("", "0", "false", "no"):
+            return None
+        mode = value if value in PROFILE_MODES else "sampling"
+
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Mode de profilage inconnu: {mode} ({', '.join(PROFILE_MODES)})")
+    return mode
+
+
+def _wrap_method(owner: Any, attribute: str, phase_name: str) -> None:
+    """Place une méthode de bibliothèque dans une phase (une seule fois)."""
+    original = getattr(owner, attribute)
+    if getattr(original, "_profiling_phase", None):
+        return
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        with phase(phase_name):
+            return original(*args, **kwargs)
+
+    wrapper._profiling_phase = phase_name
+    setattr(owner, attribute, wrapper)
+
+
+def instrument_libraries() -> None:
+    """Rattache tokens, HTTP, sérialisation pandas et sortie rich à leurs phases."""
+    import requests
+
+    _wrap_method(requests.Session, "request", "http")
+    try:
+        import azure.identity
+
+        for attribute in azure.identity.__all__:
+            credential_class = getattr(azure.identity, attribute)
+            if isinstance(credential_class, type) and hasattr(credential_class, "get_token"):
+                _wrap_method(credential_class, "get_token", "token")
+    except ImportError:
+        pass
+    try:
+        import pandas as pd
+
+        _wrap_method(pd.DataFrame, "to_excel", "serialization")
+        _wrap_method(pd.ExcelWriter, "close", "serialization")
+    except ImportError:
+        pass
+    try:
+        from rich.console import Console
+
+        _wrap_method(Console, "print", "console")
+    except ImportError:
+        pass
+
+
+def print_breakdown(breakdown: List[Dict[str, Any]], wall_seconds: float) -> None:
+    """Affiche le découpage par phase."""
+    print(f"\n⏱️  Découpage par phase (temps total {wall_seconds:.2f}s):", file=sys.stderr)
+    attributed = 0.0
+    for row in breakdown:
+        attributed += row["self"]
+        print(f"   {row['phase']:<16} {row['calls']:>6} appels "
+              f"{row['self']:>8.2f}s propre {row['total']:>8.2f}s total "
+              f"{row['percent']:>5.1f}%", file=sys.stderr)
+    other = max(wall_seconds - attributed, 0.0)
+    print(f"   {'(non attribué)':<16} {'':>6}       {other:>8.2f}s", file=sys.stderr)
+
+
+def run_profiled(main: Callable, *args: Any, name: Optional[str] = None, **kwargs: Any) -> Any:
+    """
+    Exécute le point d'entrée d'un script, sous profilage si activé.
+
+    Args:
+        main: Fonction principale du script
+        name: Nom des fichiers de profil (nom du script par défaut)
+
+    Returns:
+        Valeur de retour de main
+    """
+    mode = profile_mode()
+    if mode is None:
+        return main(*args, **kwargs)
+
+    name = name or Path(sys.argv[0]).stem or main.__name__
+    output_dir = Path(os.getenv(PROFILE_DIR_ENV, "profiles"))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    prefix = output_dir / f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+
+    instrument_libraries()
+    _timer.reset()
+    _timer.enabled = True
+    sampler = SamplingProfiler() if mode == "sampling" else None
+    profiler = cProfile.Profile() if mode == "cprofile" else None
+
+    started = time.perf_counter()
+    if sampler:
+        sampler.start()
+    if profiler:
+        profiler.enable()
+    try:
+        return main(*args, **kwargs)
+    finally:
+        if profiler:
+            profiler.disable()
+        if sampler:
+            sampler.stop()
+        wall_seconds = time.perf_counter() - started
+        _timer.enabled = False
+
+        if sampler:
+            profile_path = prefix.with_suffix(".folded")
+            sampler.write_folded(profile_path)
+        else:
+            profile_path = prefix.with_suffix(".pstats")
+            profiler.dump_stats(str(profile_path))
+
+        breakdown = _timer.breakdown(wall_seconds)
+        phases_path = Path(f"{prefix}-phases.json")
+        phases_path.write_text(json.dumps(
+            {"script": name, "mode": mode, "wall_seconds": wall_seconds, "phases": breakdown},
+            indent=2, ensure_ascii=False,
+        ), encoding="utf-8")
+
+        print_breakdown(breakdown, wall_seconds)
+        print(f"🔥 Profil: {profile_path}", file=sys.stderr)
+        print(f"📊 Phases: {phases_path}", file=sys.stderr)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Réplication d'un fichier vers plusieurs bibliothèques par copie côté serveur.
+
+Le fichier est uploadé une seule fois (première cible), puis l'action
+asynchrone copy de Graph le duplique vers les autres drives et dossiers : le
+contenu ne quitte la machine qu'une fois, quel que soit le nombre de cibles.
+Les URLs de suivi des copies sont interrogées en parallèle par un
+OperationPoller partagé et le rapport donne l'état de chaque cible.
+
+Usage:
+    python replication.py --file export.xlsx \\
+        --target "https://tenant.sharepoint.com/sites/A|Exports" \\
+        --target "https://tenant.sharepoint.com/sites/B|Rapports/2024" \\
+        --target "b!driveId|Archives"
+"""
+
+import argparse
+import json
+import logging
+import mimetypes
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import requests
+
+from graph_client import GraphClient
+from operation_poller import OperationFailed, OperationPoller
+from profiling import phase, run_profiled
+from site_fanout import SiteResolver
+
+logger = logging.getLogger(__name__)
+
+CONFLICT_BEHAVIORS = ("replace", "fail", "rename")
+
+# Upload de la copie source : (drive_id, chemin de l'élément) -> driveItem
+Uploader = Callable[[str, str], Dict[str, Any]]
+
+
+def target_path(target: Dict[str, str], name: str) -> str:
+    """Chemin du fichier dans le drive cible."""
+    folder = target.get("folder", "").strip("/")
+    return f"{folder}/{name}" if folder else name
+
+
+class Replicator:
+    """Uploade une fois puis réplique par copie serveur vers les autres cibles."""
+
+    def __init__(
+        self,
+        client: GraphClient,
+        poller: Optional[OperationPoller] = None,
+        conflict_behavior: str = "replace",
+    ):
+        """
+        Initialise le réplicateur.
+
+        Args:
+            client: Client Graph
+            poller: Poller partagé des opérations longues (créé si absent)
+            conflict_behavior: Comportement si le fichier existe dans la cible
+        """
+        if conflict_behavior not in CONFLICT_BEHAVIORS:
+            raise ValueError(f"Comportement de conflit inconnu: {conflict_behavior}")
+        self.client = client
+        self.poller = poller or OperationPoller(client.session,
+                                                request_timeout=client.timeout)
+        self._owns_poller = poller is None
+        self.conflict_behavior = conflict_behavior
+        self._folders: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def folder_id(self, drive_id: str, folder: str) -> str:
+        """
+        Résout l'ID d'un dossier cible, en créant les dossiers manquants.
+
+        Args:
+            drive_id: ID du drive
+            folder: Chemin du dossier ("" pour la racine)
+
+        Returns:
+            str: ID du dossier
+        """
+        folder = folder.strip("/")
+        key = (drive_id, folder.lower())
+        with self._lock:
+            if key in self._folders:
+                return self._folders[key]
+
+        url = f"drives/{drive_id}/root:/{folder}" if folder else f"drives/{drive_id}/root"
+        response = self.client.request("GET", url, profile="ids_only", kind="item")
+        if response.status_code == 404 and folder:
+            parent, _, name = folder.rpartition("/")
+            parent_id = self.folder_id(drive_id, parent)
+            response = self.client.request(
+                "POST", f"drives/{drive_id}/items/{parent_id}/children",
+                profile="ids_only", kind="item",
+                json={"name": name, "folder": {}, "@microsoft.graph.conflictBehavior": "fail"},
+            )
+            if response.status_code == 409:
+                # Créé entre-temps par une autre réplication
+                response = self.client.request("GET", url, profile="ids_only", kind="item")
+        response.raise_for_status()
+
+        item_id = response.json()["id"]
+        with self._lock:
+            self._folders[key] = item_id
+        return item_id
+
+    def start_copy(self, source: Dict[str, Any], target: Dict[str, str], name: str):
+        """
+        Lance la copie serveur de source vers une cible.
+
+        Args:
+            source: driveItem source (id et parentReference.driveId)
+            target: {"drive_id", "folder"}
+            name: Nom du fichier dans la cible
+
+        Returns:
+            Future: Opération suivie par le poller
+        """
+        parent_id = self.folder_id(target["drive_id"], target.get("folder", ""))
+        response = self.client.request(
+            "POST",
+            f"drives/{source['parentReference']['driveId']}/items/{source['id']}/copy",
+            params={"@microsoft.graph.conflictBehavior": self.conflict_behavior},
+            json={"parentReference": {"driveId": target["drive_id"], "id": parent_id},
+                  "name": name},
+        )
+        response.raise_for_status()
+        monitor_url = response.headers.get("Location")
+        if response.status_code != 202 or not monitor_url:
+            raise OperationFailed(f"Copie non acceptée (HTTP {response.status_code})")
+        return self.poller.submit(monitor_url, context=target)
+
+    def replicate(self, upload: Uploader, name: str,
+                  targets: Sequence[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Uploade vers la première cible puis copie vers les suivantes.
+
+        Args:
+            upload: Fonction d'upload de la copie source
+            name: Nom du fichier
+            targets: Cibles {"drive_id", "folder"} (la première reçoit l'upload)
+
+        Returns:
+            Dict: {"name", "source" (driveItem uploadé),
+                "targets": [{drive_id, folder, status, item_id, seconds, error}],
+                "completed", "failed", "uploads", "copies", "seconds"}
+        """
+        if not targets:
+            raise ValueError("Aucune cible de réplication")
+        started = time.perf_counter()
+        results: List[Dict[str, Any]] = [
+            {"drive_id": t["drive_id"], "folder": t.get("folder", ""), "status": "pending",
+             "item_id": None, "seconds": None, "error": None}
+            for t in targets
+        ]
+        report = {"name": name, "source": None, "targets": results, "completed": 0,
+                  "failed": 0, "uploads": 1, "copies": 0, "seconds": 0.0}
+
+        with phase("replication_upload"):
+            try:
+                self.folder_id(targets[0]["drive_id"], targets[0].get("folder", ""))
+                source = upload(targets[0]["drive_id"], target_path(targets[0], name))
+            except (requests.RequestException, OSError, ValueError) as e:
+                for result in results:
+                    result.update(status="failed", error=f"Upload source impossible: {e}")
+                report["failed"] = len(results)
+                report["seconds"] = time.perf_counter() - started
+                return report
+        source.setdefault("parentReference", {}).setdefault("driveId", targets[0]["drive_id"])
+        report["source"] = source
+        results[0].update(status="completed", item_id=source.get("id"),
+                          seconds=time.perf_counter() - started)
+
+        with phase("replication_copy"):
+            futures = []
+            for result, target in zip(results[1:], targets[1:]):
+                try:
+                    futures.append((result, self.start_copy(source, target, name)))
+                    report["copies"] += 1
+                except (requests.RequestException, OperationFailed) as e:
+                    result.update(status="failed", error=str(e))
+            for result, future in futures:
+                try:
+                    outcome = future.result()
+                    result.update(status="completed", item_id=outcome["resourceId"],
+                                  seconds=time.perf_counter() - started)
+                except OperationFailed as e:
+                    result.update(status="failed", error=str(e),
+                                  seconds=time.perf_counter() - started)
+
+        report["completed"] = sum(1 for r in results if r["status"] == "completed")
+        report["failed"] = len(results) - report["completed"]
+        report["seconds"] = time.perf_counter() - started
+        logger.info(f"{name} répliqué vers {report['completed']}/{len(results)} cibles "
+                    f"(1 upload, {report['copies']} copies serveur)")
+        return report
+
+    def replicate_file(self, local_path: str, targets: Sequence[Dict[str, str]],
+                       name: Optional[str] = None,
+                       content_type: Optional[str] = None) -> Dict[str, Any]:
+        """Réplique un fichier local (uploadé en flux une seule fois)."""
+        name = name or os.path.basename(local_path)
+        content_type = content_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        return self.replicate(
+            lambda drive_id, path: self.client.upload_file(drive_id, path, local_path, content_type),
+            name, targets,
+        )
+
+    def replicate_content(self, content: bytes, name: str, targets: Sequence[Dict[str, str]],
+                          content_type: str = "application/octet-stream") -> Dict[str, Any]:
+        """Réplique un contenu en mémoire (uploadé une seule fois)."""
+        return self.replicate(
+            lambda drive_id, path: self.client.upload_content(drive_id, path, content, content_type),
+            name, targets,
+        )
+
+    def close(self) -> None:
+        """Ferme le poller s'il a été créé par le réplicateur."""
+        if self._owns_poller:
+            self.poller.close()
+
+    def __enter__(self) -> "Replicator":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def parse_targets(specs: Sequence[str], resolver: Optional[SiteResolver]) -> List[Dict[str, str]]:
+    """
+    Décode les cibles "site-ou-drive|dossier" (les URLs de site sont résolues en drive).
+    """
+    targets = []
+    for spec in specs:
+        location, _, folder = spec.partition("|")
+        if location.startswith("https://"):
+            if resolver is None:
+                raise ValueError(f"Résolution de site indisponible pour {location}")
+            drive_id = resolver.resolve(location)["drive_id"]
+        else:
+            drive_id = location
+        targets.append({"drive_id": drive_id, "folder": folder.strip("/")})
+    return targets
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Affiche l'état de chaque cible."""
+    print(f"\n📦 {report['name']}: {report['completed']}/{len(report['targets'])} cibles "
+          f"en {report['seconds']:.1f}s ({report['uploads']} upload, "
+          f"{report['copies']} copies serveur)")
+    for result in report["targets"]:
+        icon = "✅" if result["status"] == "completed" else "❌"
+        where = f"{result['drive_id']}/{result['folder']}".rstrip("/")
+        detail = f"{result['seconds']:.1f}s" if result["seconds"] is not None else ""
+        print(f"  {icon} {where} {detail} {result['error'] or ''}".rstrip())
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Réplication d'un fichier par copie serveur")
+    parser.add_argument("--file", required=True, help="Fichier local à répliquer")
+    parser.add_argument("--name", help="Nom du fichier dans SharePoint")
+    parser.add_argument("--target", action="append", required=True,
+                        help="Cible 'URL de site ou ID de drive|dossier' (répétable)")
+    parser.add_argument("--conflict", choices=CONFLICT_BEHAVIORS, default="replace")
+    parser.add_argument("--concurrency", type=int, default=8, help="Suivis simultanés")
+    parser.add_argument("--report", help="Fichier JSON du rapport")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from credential_factory import get_credential
+
+    client = GraphClient(get_credential())
+    try:
+        targets = parse_targets(args.target, SiteResolver(client))
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Cibles invalides: {e}")
+        raise SystemExit(1)
+
+    with OperationPoller(client.session, concurrency=args.concurrency) as poller:
+        with Replicator(client, poller, conflict_behavior=args.conflict) as replicator:
+            report = replicator.replicate_file(args.file, targets, name=args.name)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📄 Rapport: {args.report}")
+    return report["failed"] == 0
+
+
+if __name__ == "__main__":
+    success = run_profiled(main)
+    raise SystemExit(0 if success else 1)
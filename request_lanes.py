@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Files de priorité des requêtes Graph (interactive, normal, bulk).
+
+Un même worker peut lancer un upload nocturne de milliers de fichiers et, en
+parallèle, une vérification de dossier ou un petit upload attendus par un
+utilisateur. Sans distinction, la requête interactive attend derrière les PUT
+en vol et ceux qui saturent le service. Branché sur GraphClient (paramètre
+lanes), LaneScheduler donne à chaque classe :
+
+    - sa part de concurrence (requêtes en vol au plus), de sorte que le bulk
+      ne consomme jamais les créneaux réservés à l'interactif ;
+    - son budget de débit (requêtes par seconde, seau à jetons) ;
+    - son état de throttling : un 429/503 reçu dans une classe suspend cette
+      classe et les classes moins prioritaires pendant Retry-After, sans
+      freiner les classes plus prioritaires ;
+    - ses métriques de latence (attente en file et latence totale, p50/p95/p99).
+
+La classe d'une requête est celle du contexte courant :
+
+    with priority("bulk"):
+        execute_plan(client, plan)
+
+Configuration par variables d'environnement :
+    SHAREPOINT_LANES=interactive=4,normal=4,bulk=8   (requêtes en vol par classe)
+    SHAREPOINT_LANE_RATES=bulk=20                    (requêtes/s, illimité si absent)
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import requests
+
+from identity_pool import THROTTLE_STATUS_CODES, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Classes de la plus prioritaire à la moins prioritaire
+LANES = ("interactive", "normal", "bulk")
+DEFAULT_LANE = "normal"
+
+DEFAULT_SHARES = {"interactive": 4, "normal": 4, "bulk": 8}
+
+# Nombre de latences conservées par classe pour les percentiles
+DEFAULT_SAMPLE_SIZE = 2048
+
+_current_lane: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "graph_request_lane", default=None
+)
+
+
+def _check_lane(lane: str) -> str:
+    if lane not in LANES:
+        raise ValueError(f"Classe de priorité inconnue: {lane} (attendu: {', '.join(LANES)})")
+    return lane
+
+
+@contextmanager
+def priority(lane: str) -> Iterator[None]:
+    """Exécute le bloc dans une classe de priorité (interactive, normal, bulk)."""
+    token = _current_lane.set(_check_lane(lane))
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def current_lane() -> str:
+    """Classe de priorité du contexte courant (normal par défaut)."""
+    return _current_lane.get() or DEFAULT_LANE
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Percentile par rang le plus proche d'une liste triée."""
+    if not ordered:
+        return 0.0
+    rank = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def _parse_lane_values(value: str) -> Dict[str, float]:
+    """Décode "interactive=4,bulk=8" en {"interactive": 4.0, "bulk": 8.0}."""
+    result = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        lane, _, number = part.partition("=")
+        result[_check_lane(lane.strip())] = float(number)
+    return result
+
+
+class Lane:
+    """Classe de priorité : part de concurrence, budget de débit, throttling et latences."""
+
+    def __init__(self, name: str, rank: int, concurrency: int, rate: Optional[float],
+                 sample_size: int = DEFAULT_SAMPLE_SIZE):
+        self.name = name
+        self.rank = rank
+        self.concurrency = concurrency
+        self.rate = rate
+        self.tokens = 1.0
+        self.refilled_at = time.monotonic()
+        self.inflight = 0
+        self.paused_until = 0.0
+        self.latencies: Deque[float] = deque(maxlen=sample_size)
+        self.waits: Deque[float] = deque(maxlen=sample_size)
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "paused": 0}
+
+    def refill(self, now: float) -> None:
+        """Ajoute les jetons accumulés depuis le dernier appel (rafale d'une seconde au plus)."""
+        if self.rate:
+            self.tokens = min(self.tokens + (now - self.refilled_at) * self.rate,
+                              max(self.rate, 1.0))
+        self.refilled_at = now
+
+    def ready_at(self, now: float) -> Optional[float]:
+        """
+        Instant à partir duquel une requête peut partir.
+
+        Returns:
+            now si un créneau est libre, un instant futur (pause ou jeton), ou
+            None si la classe attend une libération de créneau
+        """
+        if self.paused_until > now:
+            return self.paused_until
+        if self.inflight >= self.concurrency:
+            return None
+        if self.rate:
+            self.refill(now)
+            if self.tokens < 1.0:
+                return now + (1.0 - self.tokens) / self.rate
+        return now
+
+
+class LaneTicket:
+    """Créneau réservé par acquire, à rendre avec release."""
+
+    __slots__ = ("lane", "queued_at", "started_at")
+
+    def __init__(self, lane: Lane, queued_at: float, started_at: float):
+        self.lane = lane
+        self.queued_at = queued_at
+        self.started_at = started_at
+
+
+class LaneScheduler:
+    """Ordonnanceur des requêtes Graph par classe de priorité."""
+
+    def __init__(
+        self,
+        shares: Optional[Dict[str, int]] = None,
+        rates: Optional[Dict[str, float]] = None,
+        sample_size: int = DEFAULT_SAMPLE_SIZE,
+    ):
+        """
+        Initialise l'ordonnanceur.
+
+        Args:
+            shares: Requêtes en vol au plus par classe (DEFAULT_SHARES pour les absentes)
+            rates: Requêtes par seconde au plus par classe (illimité si absent)
+            sample_size: Nombre de latences conservées par classe
+        """
+        shares = dict(DEFAULT_SHARES, **(shares or {}))
+        rates = rates or {}
+        for lane in list(shares) + list(rates):
+            _check_lane(lane)
+        self.lanes = {
+            name: Lane(name, rank, max(int(shares[name]), 1), rates.get(name), sample_size)
+            for rank, name in enumerate(LANES)
+        }
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls) -> Optional["LaneScheduler"]:
+        """
+        Crée un ordonnanceur depuis SHAREPOINT_LANES et SHAREPOINT_LANE_RATES.
+
+        Returns:
+            LaneScheduler ou None si SHAREPOINT_LANES est absente ou vide
+        """
+        shares = os.getenv("SHAREPOINT_LANES", "").strip()
+        if not shares:
+            return None
+        return cls(
+            shares={lane: int(value) for lane, value in _parse_lane_values(shares).items()},
+            rates=_parse_lane_values(os.getenv("SHAREPOINT_LANE_RATES", "")),
+        )
+
+    def acquire(self, lane: Optional[str] = None, timeout: Optional[float] = None) -> LaneTicket:
+        """
+        Réserve un créneau dans une classe (attend sa part, son budget et la fin d'une pause).
+
+        Args:
+            lane: Classe visée (classe du contexte courant si absente)
+            timeout: Attente maximale (secondes), illimitée si None
+
+        Returns:
+            LaneTicket: Créneau à rendre avec release
+        """
+        state = self.lanes[_check_lane(lane or current_lane())]
+        queued_at = time.monotonic()
+        deadline = queued_at + timeout if timeout is not None else None
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                ready = state.ready_at(now)
+                if ready is not None and ready <= now:
+                    state.inflight += 1
+                    state.stats["requests"] += 1
+                    if state.rate:
+                        state.tokens -= 1.0
+                    state.waits.append(now - queued_at)
+                    return LaneTicket(state, queued_at, now)
+                if deadline is not None and now >= deadline:
+                    raise TimeoutError(f"Aucun créneau disponible dans la classe {state.name}")
+                # Sans instant connu, réveil par release ; sinon à l'instant prévu
+                wait = ready - now if ready is not None else 1.0
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                self._condition.wait(max(wait, 0.001))
+
+    def release(self, ticket: LaneTicket, response: Optional[requests.Response] = None) -> None:
+        """
+        Rend un créneau et enregistre la latence.
+
+        Un 429/503 suspend la classe de la requête et les classes moins
+        prioritaires pendant Retry-After.
+
+        Args:
+            ticket: Créneau réservé par acquire
+            response: Réponse reçue (None si exception réseau)
+        """
+        now = time.monotonic()
+        state = ticket.lane
+        with self._condition:
+            state.inflight = max(state.inflight - 1, 0)
+            state.latencies.append(now - ticket.queued_at)
+            if response is None or response.status_code >= 500:
+                state.stats["errors"] += 1
+            if response is not None and response.status_code in THROTTLE_STATUS_CODES:
+                state.stats["throttled"] += 1
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                for lane in self.lanes.values():
+                    if lane.rank >= state.rank and lane.paused_until < now + delay:
+                        lane.paused_until = now + delay
+                        lane.stats["paused"] += 1
+                logger.warning(f"Classe {state.name} throttlée : classes "
+                               f"{state.name} et moins prioritaires suspendues {delay:.0f}s")
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, lane: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Réserve un créneau pour le bloc ; le bloc range sa réponse dans slot["response"].
+
+        Exemple :
+            with lanes.slot() as slot:
+                slot["response"] = session.put(...)
+        """
+        ticket = self.acquire(lane)
+        slot: Dict[str, Any] = {"response": None}
+        try:
+            yield slot
+        finally:
+            self.release(ticket, slot["response"])
+
+    def paused_for(self, lane: str, now: Optional[float] = None) -> float:
+        """Durée de pause restante d'une classe (secondes)."""
+        now = time.monotonic() if now is None else now
+        with self._condition:
+            return max(self.lanes[_check_lane(lane)].paused_until - now, 0.0)
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        """
+        Retourne les métriques par classe (charge, throttling, percentiles de latence).
+
+        Returns:
+            Liste de dicts, une entrée par classe, de la plus prioritaire à la moins prioritaire
+        """
+        now = time.monotonic()
+        result = []
+        with self._condition:
+            for lane in self.lanes.values():
+                latencies = sorted(lane.latencies)
+                waits = sorted(lane.waits)
+                result.append({
+                    "lane": lane.name,
+                    **lane.stats,
+                    "concurrency": lane.concurrency,
+                    "rate": lane.rate,
+                    "inflight": lane.inflight,
+                    "paused_for_seconds": max(lane.paused_until - now, 0.0),
+                    "p50": _percentile(latencies, 50),
+                    "p95": _percentile(latencies, 95),
+                    "p99": _percentile(latencies, 99),
+                    "wait_p99": _percentile(waits, 99),
+                })
+        return result
+
+
+def print_lane_metrics(scheduler: LaneScheduler) -> None:
+    """Affiche les latences par classe de priorité."""
+    print("\n🚦 Latence par classe de priorité:")
+    for lane in scheduler.metrics():
+        if not lane["requests"]:
+            continue
+        print(f"   {lane['lane']:<12} {lane['requests']:>6} requêtes  "
+              f"p50 {lane['p50'] * 1000:.0f} ms  p95 {lane['p95'] * 1000:.0f} ms  "
+              f"p99 {lane['p99'] * 1000:.0f} ms  (file p99 {lane['wait_p99'] * 1000:.0f} ms, "
+              f"{lane['throttled']} throttlées)")
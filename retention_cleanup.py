@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Nettoyage par lots des fichiers SharePoint selon des règles de rétention.
+
+Les scripts de test déposent des fichiers horodatés (test-final-*.txt,
+test_from_aci_*.txt...) qui s'accumulent et ralentissent chaque listing. Une
+règle sélectionne des fichiers par motif, âge et taille dans un dossier (en
+gardant les N plus récents), à partir d'un listing Graph ou de l'index local ;
+les suppressions partent par $batch (20 par appel), avec une concurrence
+bornée et le rejeu des sous-requêtes throttlées. Le mode simulation liste les
+candidats sans rien supprimer, et --every relance le nettoyage périodiquement.
+
+Usage:
+    python retention_cleanup.py --drive-id b!xxx --test-artifacts --dry-run
+    python retention_cleanup.py --drive-id b!xxx --folder Exports --pattern "*.csv" \\
+        --older-than-days 30 --keep-latest 10
+    python retention_cleanup.py --drive-id b!xxx --policies retention.json --every 3600
+"""
+
+import argparse
+import fnmatch
+import json
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+
+from drive_index import DEFAULT_INDEX_PATH, DriveIndex, sync_delta
+from graph_client import GRAPH_BATCH_LIMIT, GraphClient, batch_request
+from profiling import phase, run_profiled
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_SOURCES = ("listing", "index")
+
+# Fichiers horodatés laissés par les scripts de test
+TEST_ARTIFACT_POLICY = {
+    "name": "test-artifacts",
+    "folder": "",
+    "patterns": [
+        "test-final-*.txt",
+        "test-excel-*.xlsx",
+        "test-personal-identity-*.txt",
+        "test-simple-*.txt",
+        "test-graph-api-*.txt",
+        "test-rest-api-*.txt",
+        "test_from_aci_*.txt",
+        "test_perso_*.txt",
+        "test_aci_*.txt",
+        "test_with_ids_*.txt",
+        "test_sharepoint_ddasys_*.xlsx",
+    ],
+    "older_than_days": 7,
+    "keep_latest": 5,
+    "recursive": True,
+}
+
+# Plafond de suppressions par règle et par exécution (garde-fou)
+DEFAULT_MAX_DELETES = 50_000
+
+
+def _parse_mtime(value: Optional[str]) -> Optional[float]:
+    """Convertit lastModifiedDateTime (ISO 8601) en epoch."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def normalize_policy(policy: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Complète et valide une règle de rétention.
+
+    Args:
+        policy: {"name", "folder", "patterns", "older_than_days", "min_size",
+            "max_size", "keep_latest", "recursive"}
+
+    Returns:
+        Dict: Règle avec toutes les clés renseignées
+    """
+    normalized = {
+        "name": policy.get("name") or policy.get("folder") or "racine",
+        "folder": (policy.get("folder") or "").strip("/"),
+        "patterns": list(policy.get("patterns") or ["*"]),
+        "older_than_days": policy.get("older_than_days"),
+        "min_size": policy.get("min_size"),
+        "max_size": policy.get("max_size"),
+        "keep_latest": int(policy.get("keep_latest") or 0),
+        "recursive": bool(policy.get("recursive", False)),
+    }
+    unknown = set(policy) - set(normalized)
+    if unknown:
+        raise ValueError(f"Clés de règle inconnues: {', '.join(sorted(unknown))}")
+    if normalized["patterns"] == ["*"] and normalized["older_than_days"] is None \
+            and normalized["min_size"] is None and normalized["max_size"] is None:
+        raise ValueError(f"Règle {normalized['name']} sans critère : tout le dossier serait supprimé")
+    return normalized
+
+
+def load_policies(path: str) -> List[Dict[str, Any]]:
+    """Charge une liste de règles depuis un fichier JSON."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [normalize_policy(policy) for policy in (data if isinstance(data, list) else [data])]
+
+
+def select_candidates(entries: Iterable[Dict[str, Any]], policy: Dict[str, Any],
+                      now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Sélectionne les fichiers à supprimer selon une règle.
+
+    Les keep_latest fichiers les plus récents correspondant aux motifs sont
+    conservés quel que soit leur âge ; les dossiers ne sont jamais supprimés.
+
+    Args:
+        entries: Fichiers {"id", "path", "name", "size", "mtime" (epoch), "is_folder"}
+        policy: Règle normalisée
+        now: Instant de référence (epoch)
+
+    Returns:
+        Liste des entrées à supprimer, les plus anciennes d'abord
+    """
+    now = time.time() if now is None else now
+    patterns = [pattern.lower() for pattern in policy["patterns"]]
+    matching = [
+        entry for entry in entries
+        if not entry["is_folder"]
+        and any(fnmatch.fnmatchcase(entry["name"].lower(), pattern) for pattern in patterns)
+        and (policy["min_size"] is None or (entry["size"] or 0) >= policy["min_size"])
+        and (policy["max_size"] is None or (entry["size"] or 0) <= policy["max_size"])
+    ]
+    matching.sort(key=lambda entry: entry["mtime"] or 0, reverse=True)
+    candidates = matching[policy["keep_latest"]:]
+    if policy["older_than_days"] is not None:
+        cutoff = now - policy["older_than_days"] * 86400
+        # Date inconnue : conservé par prudence
+        candidates = [e for e in candidates if e["mtime"] is not None and e["mtime"] < cutoff]
+    return candidates[::-1]
+
+
+def entries_from_listing(client: GraphClient, drive_id: str, folder: str,
+                         recursive: bool) -> List[Dict[str, Any]]:
+    """Liste un dossier (et sa descendance si recursive) via Graph."""
+    entries, folders = [], [folder.strip("/")]
+    while folders:
+        current = folders.pop()
+        path = (f"drives/{drive_id}/root:/{current}:/children" if current
+                else f"drives/{drive_id}/root/children")
+        try:
+            items = list(client.iter_pages(path, profile="hashes", kind="item"))
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                logger.warning(f"Dossier introuvable: {current or '/'}")
+                continue
+            raise
+        for item in items:
+            item_path = f"{current}/{item['name']}" if current else item["name"]
+            is_folder = "folder" in item
+            entries.append({
+                "id": item["id"], "path": item_path, "name": item["name"],
+                "size": item.get("size"), "is_folder": is_folder,
+                "mtime": _parse_mtime(item.get("lastModifiedDateTime")),
+            })
+            if is_folder and recursive:
+                folders.append(item_path)
+    return entries
+
+
+def entries_from_index(index: DriveIndex, drive_id: str, folder: str,
+                       recursive: bool) -> List[Dict[str, Any]]:
+    """Lit un dossier depuis l'index local (à synchroniser au préalable)."""
+    return [
+        {"id": row["item_id"], "path": row["path"], "name": row["name"], "size": row["size"],
+         "is_folder": bool(row["is_folder"]), "mtime": _parse_mtime(row["mtime"])}
+        for row in index.list_prefix(drive_id, folder, recursive=recursive)
+    ]
+
+
+class CleanupEngine:
+    """Applique des règles de rétention à un drive et supprime par $batch."""
+
+    def __init__(
+        self,
+        client: Optional[GraphClient],
+        drive_id: str,
+        index: Optional[DriveIndex] = None,
+        concurrency: int = 4,
+        max_retries: int = 5,
+        max_deletes: int = DEFAULT_MAX_DELETES,
+    ):
+        """
+        Initialise le moteur.
+
+        Args:
+            client: Client Graph (None en simulation depuis l'index)
+            drive_id: ID du drive
+            index: Index local (source "index", tenu à jour après suppression)
+            concurrency: Appels $batch simultanés
+            max_retries: Rejeux d'une suppression throttlée
+            max_deletes: Suppressions maximales par règle et par exécution
+        """
+        self.client = client
+        self.drive_id = drive_id
+        self.index = index
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.max_deletes = max_deletes
+
+    def candidates(self, policy: Dict[str, Any], source: str = "listing",
+                   now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Fichiers à supprimer pour une règle, depuis un listing ou l'index."""
+        if source not in CANDIDATE_SOURCES:
+            raise ValueError(f"Source inconnue: {source}")
+        with phase("cleanup_select"):
+            if source == "index":
+                if self.index is None:
+                    raise ValueError("La source index nécessite un DriveIndex")
+                entries = entries_from_index(self.index, self.drive_id, policy["folder"],
+                                             policy["recursive"])
+            else:
+                entries = entries_from_listing(self.client, self.drive_id, policy["folder"],
+                                               policy["recursive"])
+            return select_candidates(entries, policy, now)
+
+    def delete(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Supprime des éléments par lots $batch.
+
+        Un 404 compte comme supprimé (déjà absent). L'index local est mis à
+        jour pour les éléments supprimés.
+
+        Returns:
+            Dict: {"deleted", "bytes", "failed": [{path, status, error}], "requests"}
+        """
+        requests_ = [batch_request(f"drives/{self.drive_id}/items/{entry['id']}", method="DELETE")
+                     for entry in entries]
+        with phase("cleanup_delete"):
+            results = self.client.batch(requests_, max_retries=self.max_retries,
+                                        concurrency=self.concurrency) if requests_ else []
+
+        report: Dict[str, Any] = {"deleted": 0, "bytes": 0, "failed": [],
+                                  "requests": math.ceil(len(requests_) / GRAPH_BATCH_LIMIT)}
+        removed = []
+        for entry, result in zip(entries, results):
+            if result["status"] in (200, 204, 404):
+                report["deleted"] += 1
+                report["bytes"] += entry["size"] or 0
+                removed.append({"id": entry["id"], "deleted": {"state": "deleted"}})
+            else:
+                error = result["body"].get("error", {}).get("message", "") \
+                    if isinstance(result["body"], dict) else ""
+                report["failed"].append({"path": entry["path"], "status": result["status"],
+                                         "error": error})
+        if self.index is not None and removed:
+            self.index.upsert_items(self.drive_id, removed)
+        return report
+
+    def run(self, policies: List[Dict[str, Any]], source: str = "listing",
+            dry_run: bool = False, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Applique des règles de rétention.
+
+        Args:
+            policies: Règles normalisées
+            source: Origine des candidats (listing ou index)
+            dry_run: Lister les candidats sans supprimer
+            now: Instant de référence (epoch)
+
+        Returns:
+            Dict: {"policies": [rapport par règle], "deleted", "bytes", "failed", "seconds"}
+        """
+        started = time.perf_counter()
+        if source == "index" and self.client is not None:
+            sync_delta(self.client, self.index, self.drive_id)
+
+        reports = []
+        for policy in policies:
+            candidates = self.candidates(policy, source, now)
+            report: Dict[str, Any] = {
+                "name": policy["name"], "folder": policy["folder"],
+                "candidates": len(candidates),
+                "candidate_bytes": sum(entry["size"] or 0 for entry in candidates),
+                "sample": [entry["path"] for entry in candidates[:20]],
+                "capped": len(candidates) > self.max_deletes,
+                "deleted": 0, "bytes": 0, "failed": [], "requests": 0,
+            }
+            if not dry_run:
+                report.update(self.delete(candidates[:self.max_deletes]))
+            reports.append(report)
+            logger.info(f"Règle {policy['name']}: {report['candidates']} candidats, "
+                        f"{report['deleted']} supprimés, {len(report['failed'])} échecs")
+
+        return {
+            "policies": reports,
+            "dry_run": dry_run,
+            "deleted": sum(r["deleted"] for r in reports),
+            "bytes": sum(r["bytes"] for r in reports),
+            "failed": sum(len(r["failed"]) for r in reports),
+            "seconds": time.perf_counter() - started,
+        }
+
+
+def run_scheduled(engine: CleanupEngine, policies: List[Dict[str, Any]], interval: float,
+                  source: str = "listing", dry_run: bool = False,
+                  iterations: Optional[int] = None,
+                  stop: Optional[threading.Event] = None,
+                  on_report: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  ) -> List[Dict[str, Any]]:
+    """
+    Relance le nettoyage toutes les interval secondes.
+
+    Une exécution en échec (erreur réseau) est journalisée et la suivante a
+    lieu normalement.
+
+    Args:
+        engine: Moteur de nettoyage
+        policies: Règles normalisées
+        interval: Période en secondes
+        source: Origine des candidats
+        dry_run: Simulation
+        iterations: Nombre d'exécutions (None : jusqu'à stop)
+        stop: Événement d'arrêt
+        on_report: Appelé avec le rapport de chaque exécution
+
+    Returns:
+        Liste des rapports d'exécution
+    """
+    stop = stop or threading.Event()
+    reports = []
+    while iterations is None or len(reports) < iterations:
+        try:
+            report = engine.run(policies, source, dry_run)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Nettoyage en échec, nouvel essai dans {interval:.0f}s: {e}")
+            report = {"error": str(e)}
+        reports.append(report)
+        if on_report:
+            on_report(report)
+        if iterations is not None and len(reports) >= iterations:
+            break
+        if stop.wait(interval):
+            break
+    return reports
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Affiche le rapport d'une exécution."""
+    if "error" in report:
+        print(f"❌ {report['error']}")
+        return
+    for policy in report["policies"]:
+        where = policy["folder"] or "/"
+        if report["dry_run"]:
+            print(f"🔍 {policy['name']} ({where}): {policy['candidates']} fichiers à supprimer "
+                  f"({policy['candidate_bytes'] / 1e6:.1f} Mo)")
+            for path in policy["sample"]:
+                print(f"   - {path}")
+        else:
+            print(f"🗑️  {policy['name']} ({where}): {policy['deleted']}/{policy['candidates']} "
+                  f"supprimés ({policy['bytes'] / 1e6:.1f} Mo, {policy['requests']} appels $batch)")
+        if policy["capped"]:
+            print("⚠️  Plafond de suppressions atteint, relancer pour continuer")
+        for failure in policy["failed"][:10]:
+            print(f"❌ {failure['path']}: {failure['status']} {failure['error']}")
+    print(f"⏱️  {report['seconds']:.1f}s")
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Nettoyage SharePoint selon des règles de rétention")
+    parser.add_argument("--drive-id", required=True, help="ID du drive")
+    parser.add_argument("--policies", help="Fichier JSON de règles")
+    parser.add_argument("--test-artifacts", action="store_true",
+                        help="Règle prédéfinie des fichiers laissés par les scripts de test")
+    parser.add_argument("--folder", default="", help="Dossier de la règle en ligne de commande")
+    parser.add_argument("--pattern", action="append", default=[], help="Motif (répétable)")
+    parser.add_argument("--older-than-days", type=float)
+    parser.add_argument("--min-size", type=int)
+    parser.add_argument("--max-size", type=int)
+    parser.add_argument("--keep-latest", type=int, default=0)
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--source", choices=CANDIDATE_SOURCES, default="listing")
+    parser.add_argument("--db", default=DEFAULT_INDEX_PATH, help="Index SQLite (source index)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-deletes", type=int, default=DEFAULT_MAX_DELETES)
+    parser.add_argument("--dry-run", action="store_true", help="Lister sans supprimer")
+    parser.add_argument("--every", type=float, help="Relancer toutes les N secondes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        policies = load_policies(args.policies) if args.policies else []
+        if args.test_artifacts:
+            policies.append(normalize_policy(TEST_ARTIFACT_POLICY))
+        if args.pattern or args.older_than_days is not None or args.min_size or args.max_size:
+            policies.append(normalize_policy({
+                "folder": args.folder, "patterns": args.pattern,
+                "older_than_days": args.older_than_days, "min_size": args.min_size,
+                "max_size": args.max_size, "keep_latest": args.keep_latest,
+                "recursive": args.recursive,
+            }))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not policies:
+        parser.error("Aucune règle : --policies, --test-artifacts ou --pattern/--older-than-days")
+
+    from credential_factory import get_credential
+
+    client = GraphClient(get_credential())
+    index = DriveIndex(args.db) if args.source == "index" else None
+    engine = CleanupEngine(client, args.drive_id, index, args.concurrency,
+                           max_deletes=args.max_deletes)
+    try:
+        if args.every:
+            print(f"🕒 Nettoyage toutes les {args.every:.0f}s (Ctrl+C pour arrêter)")
+            stop = threading.Event()
+            try:
+                run_scheduled(engine, policies, args.every, args.source, args.dry_run,
+                              stop=stop, on_report=print_report)
+            except KeyboardInterrupt:
+                stop.set()
+            return
+        report = engine.run(policies, args.source, args.dry_run)
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Nettoyage impossible: {e}")
+        raise SystemExit(1)
+    finally:
+        if index:
+            index.close()
+
+    print_report(report)
+    if report["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    run_profiled(main)
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+Expédition de journaux et de CSV incrémentaux vers SharePoint par segments.
+
+Graph n'a pas d'opération d'ajout : prolonger un fichier distant oblige à le
+réuploader en entier. SegmentShipper découpe plutôt le flux en segments :
+
+    - les octets reçus (fichier suivi comme tail -F, flux ou appels write)
+      sont compressés au fil de l'eau dans un segment gzip sur disque local ;
+    - le segment est clos lorsqu'il atteint max_bytes (non compressés) ou
+      max_seconds d'âge, puis uploadé par GraphClient.upload (fichier projeté
+      en mémoire : mémoire bornée quelle que soit sa taille) ;
+    - un index JSON (index.json) liste les segments dans l'ordre, avec
+      tailles, SHA-256 et horodatages : un lecteur les réassemble en les
+      décompressant dans l'ordre (voir reassemble). Chaque segment est un
+      membre gzip indépendant, leur concaténation brute est donc aussi un
+      fichier gzip valide.
+
+Le segment est uploadé avant l'index, qui ne référence ainsi que des segments
+complets. Un segment dont l'upload échoue reste sur disque et est réessayé au
+segment suivant, dans l'ordre. L'état local (numéro de segment, position dans
+le fichier suivi) survit aux redémarrages : la position enregistrée ne couvre
+que les octets des segments clos. Après un arrêt brutal, le segment resté
+ouvert est relu depuis le fichier suivi ou, pour un flux, récupéré du spool
+(la partie déjà compressée sur disque).
+
+Usage:
+    python segment_shipper.py tail /var/log/app.log --name app
+    my_app | python segment_shipper.py stdin --name app --max-seconds 60
+    python segment_shipper.py reassemble --name app --output app.log
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+import requests
+
+from graph_client import GraphClient
+from profiling import phase, run_profiled
+from site_fanout import SiteResolver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_SECONDS = 300.0
+DEFAULT_SPOOL_DIR = ".segments"
+INDEX_NAME = "index.json"
+
+# Taille des blocs lus dans un fichier suivi ou un flux
+READ_BLOCK = 64 * 1024
+
+
+def _utc(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _read_partial_gzip(path: Path) -> bytes:
+    """Décompresse un segment gzip, éventuellement tronqué (sans en-queue)."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    parts = []
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_BLOCK)
+            if not block:
+                break
+            try:
+                parts.append(decompressor.decompress(block))
+            except zlib.error:
+                break
+    return b"".join(parts)
+
+
+class SegmentShipper:
+    """Découpe un flux en segments gzip uploadés avec un index ordonné."""
+
+    def __init__(
+        self,
+        client: GraphClient,
+        drive_id: str,
+        folder: str,
+        name: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_seconds: float = DEFAULT_MAX_SECONDS,
+        spool_dir: str = DEFAULT_SPOOL_DIR,
+        compress_level: int = 6,
+    ):
+        """
+        Initialise l'expéditeur (reprend l'état local ou l'index distant).
+
+        Args:
+            client: Client Graph
+            drive_id: ID du drive cible
+            folder: Dossier cible ; les segments vont dans <folder>/<name>/
+            name: Nom du flux (préfixe des segments)
+            max_bytes: Taille non compressée qui clôt un segment
+            max_seconds: Âge qui clôt un segment non vide
+            spool_dir: Répertoire local des segments en cours ou non envoyés
+            compress_level: Niveau de compression gzip (1 à 9)
+        """
+        self.client = client
+        self.drive_id = drive_id
+        self.name = name
+        self.remote_dir = "/".join(p for p in (folder.strip("/"), name) if p)
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.compress_level = compress_level
+        self.spool = Path(spool_dir) / name
+        self.spool.mkdir(parents=True, exist_ok=True)
+        self._state_path = self.spool / "state.json"
+        self._lock = threading.RLock()
+        self._writer: Optional[gzip.GzipFile] = None
+        self._raw_bytes = 0
+        self._hash = hashlib.sha256()
+        self._opened_at = 0.0
+        self._folder_ready = False
+        self.stats = {"segments": 0, "bytes_in": 0, "bytes_uploaded": 0, "upload_failures": 0}
+
+        self.state = self._load_state()
+        # Position atteinte dans le fichier suivi ; state["tail"] ne couvre que les segments clos
+        self._tail: Optional[Dict[str, Any]] = self.state.get("tail")
+        self._recover_open_segment()
+
+    # ------------------------------------------------------------------
+    # État et index
+    # ------------------------------------------------------------------
+
+    def _load_state(self) -> Dict[str, Any]:
+        """État local, ou reconstruit depuis l'index distant s'il est absent."""
+        if self._state_path.exists():
+            with open(self._state_path, encoding="utf-8") as f:
+                return json.load(f)
+        index = self.fetch_index()
+        next_seq = max((s["seq"] for s in index["segments"]), default=0) + 1
+        return {"next_seq": next_seq, "pending": [], "index": index, "tail": None}
+
+    def _recover_open_segment(self) -> None:
+        """Reprend le segment laissé ouvert par un arrêt brutal (même numéro que le suivant)."""
+        path = self._segment_path(self.state["next_seq"])
+        if not path.exists():
+            return
+        data = _read_partial_gzip(path)
+        path.unlink()
+        if self.state.get("tail") is not None:
+            # Ses octets sont au-delà de la position enregistrée : ils seront relus
+            logger.info(f"Segment non clos {path.name} abandonné, relu depuis le fichier suivi")
+            return
+        logger.warning(f"Segment non clos {path.name} récupéré ({len(data)} octets)")
+        self.write(data)
+
+    def _save_state(self) -> None:
+        temp = self._state_path.with_suffix(".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temp, self._state_path)
+
+    def fetch_index(self) -> Dict[str, Any]:
+        """Index distant du flux (vide s'il n'existe pas encore)."""
+        response = self.client.request(
+            "GET", f"drives/{self.drive_id}/root:/{self.remote_dir}/{INDEX_NAME}:/content"
+        )
+        if response.status_code == 404:
+            return {"name": self.name, "format": "gzip", "segments": []}
+        response.raise_for_status()
+        return response.json()
+
+    def _ensure_folder(self, folder: str) -> None:
+        """Crée le dossier distant et ses parents manquants."""
+        url = f"drives/{self.drive_id}/root:/{folder}" if folder else f"drives/{self.drive_id}/root"
+        response = self.client.request("GET", url, profile="ids_only", kind="item")
+        if response.status_code != 404 or not folder:
+            response.raise_for_status()
+            return
+        parent, _, name = folder.rpartition("/")
+        self._ensure_folder(parent)
+        parent_url = (f"drives/{self.drive_id}/root:/{parent}:/children" if parent
+                      else f"drives/{self.drive_id}/root/children")
+        response = self.client.request(
+            "POST", parent_url, profile="ids_only", kind="item",
+            json={"name": name, "folder": {}, "@microsoft.graph.conflictBehavior": "fail"},
+        )
+        if response.status_code != 409:
+            response.raise_for_status()
+
+    # ------------------------------------------------------------------
+    # Écriture et découpage
+    # ------------------------------------------------------------------
+
+    def write(self, data: bytes) -> None:
+        """Ajoute des octets au segment courant (clos et uploadé dès qu'il est plein)."""
+        view = memoryview(data)
+        with self._lock:
+            while view:
+                if self._writer is None:
+                    self._open_segment()
+                part = view[:self.max_bytes - self._raw_bytes]
+                self._writer.write(part)
+                self._hash.update(part)
+                self._raw_bytes += len(part)
+                self.stats["bytes_in"] += len(part)
+                view = view[len(part):]
+                if self._raw_bytes >= self.max_bytes:
+                    self.roll()
+
+    def poll(self, now: Optional[float] = None) -> bool:
+        """
+        Clôt le segment courant s'il a dépassé max_seconds.
+
+        Returns:
+            bool: True si un segment a été clos
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._writer is not None and now - self._opened_at >= self.max_seconds:
+                self.roll()
+                return True
+            return False
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.spool / f"{self.name}-{seq:06d}.gz"
+
+    def _open_segment(self) -> None:
+        seq = self.state["next_seq"]
+        self._writer = gzip.GzipFile(self._segment_path(seq), "wb",
+                                     compresslevel=self.compress_level)
+        self._raw_bytes = 0
+        self._hash = hashlib.sha256()
+        self._opened_at = time.time()
+
+    def roll(self) -> None:
+        """Clôt le segment courant et uploade les segments en attente, dans l'ordre."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                seq = self.state["next_seq"]
+                self.state["next_seq"] = seq + 1
+                self.state["pending"].append({
+                    "seq": seq,
+                    "file": self._segment_path(seq).name,
+                    "raw_bytes": self._raw_bytes,
+                    "sha256": self._hash.hexdigest(),
+                    "started_at": _utc(self._opened_at),
+                    "ended_at": _utc(time.time()),
+                })
+                if self._tail is not None:
+                    self.state["tail"] = dict(self._tail)
+                self._save_state()
+            self.flush_pending()
+
+    def flush_pending(self) -> int:
+        """
+        Uploade les segments clos non encore envoyés puis l'index.
+
+        Returns:
+            int: Nombre de segments envoyés (arrêt au premier échec, réessayé plus tard)
+        """
+        shipped = 0
+        with self._lock:
+            while self.state["pending"]:
+                segment = self.state["pending"][0]
+                path = self.spool / segment["file"]
+                try:
+                    with phase("segment_upload"):
+                        if not self._folder_ready:
+                            self._ensure_folder(self.remote_dir)
+                            self._folder_ready = True
+                        self.client.upload(self.drive_id, f"{self.remote_dir}/{segment['file']}",
+                                           str(path), content_type="application/gzip")
+                        segment = dict(segment, compressed_bytes=path.stat().st_size)
+                        self.state["index"]["segments"].append(segment)
+                        self.state["index"]["updated_at"] = _utc(time.time())
+                        self.client.upload_content(
+                            self.drive_id, f"{self.remote_dir}/{INDEX_NAME}",
+                            json.dumps(self.state["index"], indent=2).encode("utf-8"),
+                            content_type="application/json",
+                        )
+                except (requests.RequestException, OSError) as e:
+                    if self.state["index"]["segments"] and \
+                            self.state["index"]["segments"][-1]["seq"] == segment["seq"]:
+                        # Segment envoyé mais index non publié : republié au prochain essai
+                        self.state["index"]["segments"].pop()
+                    self.stats["upload_failures"] += 1
+                    logger.warning(f"Upload du segment {segment['file']} reporté: {e}")
+                    break
+                self.state["pending"].pop(0)
+                self._save_state()
+                path.unlink(missing_ok=True)
+                self.stats["segments"] += 1
+                self.stats["bytes_uploaded"] += segment["compressed_bytes"]
+                shipped += 1
+        return shipped
+
+    def close(self) -> None:
+        """Clôt le dernier segment et tente d'envoyer tout ce qui reste."""
+        self.roll()
+
+    def __enter__(self) -> "SegmentShipper":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Sources
+    # ------------------------------------------------------------------
+
+    def ship_stream(self, stream: BinaryIO) -> int:
+        """
+        Expédie un flux jusqu'à sa fin (ex: stdin d'un conteneur).
+
+        Returns:
+            int: Octets lus
+        """
+        total = 0
+        # Lecture bloquante : l'âge des segments est surveillé par un thread à part
+        stop = threading.Event()
+        interval = min(1.0, self.max_seconds)
+        poller = threading.Thread(target=self._poll_until, args=(stop, interval), daemon=True)
+        poller.start()
+        try:
+            while True:
+                data = stream.read1(READ_BLOCK) if hasattr(stream, "read1") \
+                    else stream.read(READ_BLOCK)
+                if not data:
+                    break
+                self.write(data)
+                total += len(data)
+        finally:
+            stop.set()
+            poller.join()
+        self.roll()
+        return total
+
+    def _poll_until(self, stop: threading.Event, interval: float) -> None:
+        while not stop.wait(interval):
+            self.poll()
+
+    def tail_once(self, path: str) -> int:
+        """
+        Expédie les lignes complètes ajoutées au fichier depuis le dernier passage.
+
+        Une rotation (autre inode) ou une troncature reprend au début du
+        nouveau fichier ; une ligne incomplète attend son retour chariot, sauf
+        si elle dépasse max_bytes (expédiée telle quelle pour ne pas bloquer). La
+        position n'est enregistrée qu'à la clôture des segments : un arrêt
+        brutal relit ce qui n'était que dans le segment ouvert.
+
+        Returns:
+            int: Octets expédiés
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return 0
+        path = os.path.abspath(path)
+        with self._lock:
+            tail = self._tail or {}
+            offset = tail.get("offset", 0)
+            if tail.get("path") != path or tail.get("inode") != stat.st_ino \
+                    or stat.st_size < offset:
+                # Rotation ou troncature : le segment de l'ancien fichier est clos d'abord
+                self.roll()
+                offset = 0
+            self._tail = {"path": path, "inode": stat.st_ino, "offset": offset}
+            if self._writer is None:
+                self.state["tail"] = dict(self._tail)
+                self._save_state()
+            shipped = 0
+            with open(path, "rb") as f:
+                while True:
+                    f.seek(offset)
+                    block = f.read(READ_BLOCK)
+                    stop = offset + block.rfind(b"\n") + 1
+                    if stop == offset:
+                        if len(block) < READ_BLOCK:
+                            break
+                        # Ligne plus longue qu'un bloc : on cherche sa fin plus loin
+                        stop = self._find_line_end(f)
+                        if stop is None:
+                            # Sans fin de ligne, au-delà de max_bytes elle part quand même
+                            stop = f.tell()
+                            if stop - offset < self.max_bytes:
+                                break
+                    shipped += stop - offset
+                    offset = self._ship_range(f, offset, stop)
+            if self._writer is None:
+                self.state["tail"] = dict(self._tail)
+                self._save_state()
+            self.poll()
+        return shipped
+
+    @staticmethod
+    def _find_line_end(f: BinaryIO) -> Optional[int]:
+        """Position qui suit le prochain retour chariot depuis la position courante (None si EOF)."""
+        while True:
+            block = f.read(READ_BLOCK)
+            if not block:
+                return None
+            newline = block.find(b"\n")
+            if newline >= 0:
+                return f.tell() - len(block) + newline + 1
+
+    def _ship_range(self, f: BinaryIO, start: int, stop: int) -> int:
+        """Écrit les octets [start, stop) du fichier suivi, par blocs ; retourne stop."""
+        f.seek(start)
+        offset = start
+        while offset < stop:
+            view = memoryview(f.read(min(READ_BLOCK, stop - offset)))
+            if not view:
+                break
+            while view:
+                # Morceaux qui ne chevauchent pas une clôture : la position
+                # enregistrée par roll() couvre exactement les segments clos
+                room = self.max_bytes - (self._raw_bytes if self._writer else 0)
+                part = view[:room]
+                offset += len(part)
+                self._tail = dict(self._tail, offset=offset)
+                self.write(part)
+                view = view[len(part):]
+        return offset
+
+    def tail(self, path: str, interval: float = 1.0,
+             stop: Optional[threading.Event] = None) -> None:
+        """Suit un fichier (tail -F) jusqu'à stop, puis clôt le dernier segment."""
+        stop = stop or threading.Event()
+        try:
+            while not stop.is_set():
+                self.tail_once(path)
+                stop.wait(interval)
+        finally:
+            self.roll()
+
+
+def reassemble(client: GraphClient, drive_id: str, folder: str, name: str,
+               destination: BinaryIO) -> Dict[str, Any]:
+    """
+    Reconstitue un flux : segments de l'index décompressés dans l'ordre.
+
+    Args:
+        client: Client Graph
+        drive_id: ID du drive
+        folder: Dossier cible de l'expéditeur
+        name: Nom du flux
+        destination: Fichier binaire ouvert en écriture
+
+    Returns:
+        Dict: {"segments", "bytes"} (lève ValueError si un SHA-256 diffère)
+    """
+    remote_dir = "/".join(p for p in (folder.strip("/"), name) if p)
+    response = client.request("GET", f"drives/{drive_id}/root:/{remote_dir}/{INDEX_NAME}:/content")
+    response.raise_for_status()
+    segments = sorted(response.json()["segments"], key=lambda s: s["seq"])
+    total = 0
+    for segment in segments:
+        response = client.request(
+            "GET", f"drives/{drive_id}/root:/{remote_dir}/{segment['file']}:/content", stream=True
+        )
+        with response:
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            with gzip.GzipFile(fileobj=response.raw) as unzipped:
+                while True:
+                    block = unzipped.read(READ_BLOCK)
+                    if not block:
+                        break
+                    digest.update(block)
+                    destination.write(block)
+                    total += len(block)
+        if digest.hexdigest() != segment["sha256"]:
+            raise ValueError(f"Segment {segment['file']} corrompu (SHA-256 différent)")
+    return {"segments": len(segments), "bytes": total}
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Expédition de journaux par segments")
+    parser.add_argument("command", choices=["tail", "stdin", "reassemble"])
+    parser.add_argument("path", nargs="?", help="Fichier à suivre (tail)")
+    parser.add_argument("--name", required=True, help="Nom du flux")
+    parser.add_argument("--drive-id", default=os.getenv("SHAREPOINT_DRIVE_ID"))
+    parser.add_argument("--folder", default=os.getenv("SHAREPOINT_FOLDER_PATH", ""))
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024)
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS)
+    parser.add_argument("--interval", type=float, default=1.0, help="Période de suivi (tail)")
+    parser.add_argument("--spool", default=DEFAULT_SPOOL_DIR, help="Répertoire local des segments")
+    parser.add_argument("--output", help="Fichier reconstitué (reassemble)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    site_url = os.getenv("SHAREPOINT_SITE_URL")
+    if not args.drive_id and not site_url:
+        parser.error("--drive-id, SHAREPOINT_DRIVE_ID ou SHAREPOINT_SITE_URL est requis")
+    from credential_factory import get_credential
+
+    client = GraphClient(get_credential())
+    if not args.drive_id:
+        args.drive_id = SiteResolver(client).resolve(site_url)["drive_id"]
+    if args.command == "reassemble":
+        if not args.output:
+            parser.error("--output est requis")
+        with open(args.output, "wb") as destination:
+            result = reassemble(client, args.drive_id, args.folder, args.name, destination)
+        print(f"✅ {result['segments']} segments, {result['bytes'] / 1e6:.1f} Mo -> {args.output}",
+              file=sys.stderr)
+        return
+
+    shipper = SegmentShipper(client, args.drive_id, args.folder, args.name,
+                             max_bytes=int(args.max_mb * 1024 * 1024),
+                             max_seconds=args.max_seconds, spool_dir=args.spool)
+    try:
+        if args.command == "tail":
+            if not args.path:
+                parser.error("Fichier à suivre requis")
+            print(f"📡 Suivi de {args.path} -> {shipper.remote_dir}", file=sys.stderr)
+            shipper.tail(args.path, args.interval)
+        else:
+            shipper.ship_stream(sys.stdin.buffer)
+    except KeyboardInterrupt:
+        shipper.close()
+    print(f"✅ {shipper.stats['segments']} segments envoyés "
+          f"({shipper.stats['bytes_in'] / 1e6:.1f} Mo lus, "
+          f"{shipper.stats['bytes_uploaded'] / 1e6:.1f} Mo compressés), "
+          f"{len(shipper.state['pending'])} en attente", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    run_profiled(main)
@@ -5,7 +5,7 @@ import os
 import logging
 from datetime import datetime
 from typing import Optional, Dict, Any
-from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
+from azure.identity import ManagedIdentityCredential
 from office365.runtime.auth.authentication_context import AuthenticationContext
 from office365.sharepoint.client_context import ClientContext
 from office365.sharepoint.files.file import File
@@ -14,6 +14,8 @@ import requests
 from rich.console import Console
 from rich.table import Table
 from dotenv import load_dotenv
+from credential_factory import get_credential
+from profiling import run_profiled
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -34,7 +36,8 @@ class SharePointAuthenticator:
         
         Args:
             site_url: URL du site SharePoint
-            use_managed_identity: Utiliser Managed Identity (True) ou DefaultAzureCredential (False)
+            use_managed_identity: Utiliser Managed Identity (True) ou le credential
+                détecté par credential_factory (False)
         """
         self.site_url = site_url
         self.use_managed_identity = use_managed_identity
@@ -56,8 +59,8 @@ class SharePointAuthenticator:
                 console.print("📋 Utilisation de Managed Identity...")
                 self.credential = ManagedIdentityCredential()
             else:
-                console.print("📋 Utilisation de DefaultAzureCredential...")
-                self.credential = DefaultAzureCredential()
+                self.credential = get_credential()
+                console.print(f"📋 Utilisation du credential détecté ({self.credential.kind})...")
             
             # Test de l'obtention du token
             console.print("🎫 Obtention du token d'accès...")
@@ -285,7 +288,7 @@ def main():
     use_managed_identity = os.getenv("USE_MANAGED_IDENTITY", "true").lower() == "true"  # True par défaut pour Azure
     
     console.print(f"🌐 Site SharePoint: {site_url}")
-    console.print(f"🔐 Type d'authentification: {'Managed Identity' if use_managed_identity else 'DefaultAzureCredential'}")
+    console.print(f"🔐 Type d'authentification: {'Managed Identity' if use_managed_identity else 'détection automatique'}")
     console.print()
     
     # Création de l'authentificateur
@@ -322,4 +325,4 @@ def main():
     console.print("✅ [bold green]Test terminé avec succès ![/bold green]")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    run_profiled(main)
\ No newline at end of file
@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""
+Regroupement des petits fichiers en archives avant upload SharePoint.
+
+Chaque petit fichier texte coûte une requête PUT complète vers Microsoft Graph :
+le throttling arrive bien avant la limite de bande passante. Ce module empaquette
+les fichiers sous un seuil de taille dans une archive zip ou tar par lot (ou par
+fenêtre de temps), uploade l'archive en une seule requête et conserve un index
+local pour retrouver ou extraire chaque fichier.
+
+Une archive dont l'upload échoue est conservée sur disque et réessayée avec un
+délai croissant ; l'échec remonte à l'appelant (BundleUploadError). Un fichier
+n'est uploadé qu'une fois son archive acceptée par SharePoint : lookup retourne
+None tant que ce n'est pas le cas.
+"""
+
+import io
+import json
+import logging
+import tarfile
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Nom du membre d'index embarqué dans chaque archive
+BUNDLE_INDEX_MEMBER = "_bundle_index.json"
+
+ARCHIVE_CONTENT_TYPES = {
+    "zip": "application/zip",
+    "tar": "application/x-tar",
+}
+
+# Signature attendue pour l'upload : (contenu, nom de fichier, content-type) -> URL
+UploadFunc = Callable[[bytes, str, str], Optional[str]]
+
+
+class BundleUploadError(Exception):
+    """Archives non uploadées, conservées pour un nouvel essai."""
+
+    def __init__(self, message: str, bundles: List[str]):
+        super().__init__(message)
+        self.bundles = bundles
+
+
+class SmallFileBundler:
+    """Regroupe les petits fichiers en archives uploadées en une seule requête."""
+
+    def __init__(
+        self,
+        upload_func: UploadFunc,
+        size_threshold: int = 256 * 1024,
+        max_bundle_files: int = 500,
+        max_bundle_bytes: int = 4 * 1024 * 1024,
+        window_seconds: float = 60.0,
+        archive_format: str = "zip",
+        bundle_prefix: str = "bundle",
+        index_path: Optional[str] = "bundle_index.json",
+        spool_dir: Optional[str] = None,
+        retry_base_seconds: float = 30.0,
+        retry_max_seconds: float = 900.0,
+        max_spooled_bundles: int = 20,
+    ):
+        """
+        Initialise le regroupeur.
+
+        Args:
+            upload_func: Fonction d'upload (contenu, nom, content-type) -> URL
+            size_threshold: Taille maximale (octets) d'un fichier éligible
+            max_bundle_files: Nombre maximal de fichiers par archive
+            max_bundle_bytes: Taille brute maximale par archive (4 Mo par défaut,
+                la limite recommandée pour un PUT simple Graph)
+            window_seconds: Durée maximale d'attente avant envoi d'un lot
+            archive_format: Format d'archive ("zip" ou "tar")
+            bundle_prefix: Préfixe des noms d'archives
+            index_path: Fichier JSON local de l'index (None pour ne pas persister)
+            spool_dir: Dossier des archives en échec (par défaut à côté de
+                l'index, suffixe .spool ; en mémoire sans index persistant)
+            retry_base_seconds: Délai avant le premier nouvel essai, doublé à
+                chaque échec
+            retry_max_seconds: Délai maximal entre deux essais
+            max_spooled_bundles: Archives en échec au-delà desquelles les
+                fichiers sont refusés (à uploader directement)
+        """
+        if archive_format not in ARCHIVE_CONTENT_TYPES:
+            raise ValueError(f"Format d'archive non supporté: {archive_format}")
+
+        self.upload_func = upload_func
+        self.size_threshold = size_threshold
+        self.max_bundle_files = max_bundle_files
+        self.max_bundle_bytes = max_bundle_bytes
+        self.window_seconds = window_seconds
+        self.archive_format = archive_format
+        self.bundle_prefix = bundle_prefix
+        self.index_path = Path(index_path) if index_path else None
+        if spool_dir:
+            self.spool_dir: Optional[Path] = Path(spool_dir)
+        elif self.index_path:
+            self.spool_dir = self.index_path.with_suffix(".spool")
+        else:
+            self.spool_dir = None
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_spooled_bundles = max_spooled_bundles
+
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_bytes = 0
+        self._batch_started: Optional[float] = None
+        self._bundle_name: Optional[str] = None
+        self._bundle_counter = 0
+        # Archives en échec : nom -> {"members", "format", "attempts", "next_attempt"}
+        self._spooled: Dict[str, Dict[str, Any]] = {}
+
+        self.index: Dict[str, Any] = self._load_index()
+        self.stats = {
+            "files_bundled": 0,
+            "bytes_bundled": 0,
+            "bundles_uploaded": 0,
+            "bundles_failed": 0,
+            "files_rejected": 0,
+            "files_spilled": 0,
+            "files_renamed": 0,
+        }
+        self._load_spool()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.flush()
+        except BundleUploadError as e:
+            if exc_type is None:
+                raise
+            logger.error(str(e))
+
+    def _load_index(self) -> Dict[str, Any]:
+        """Charge l'index local s'il existe."""
+        if self.index_path and self.index_path.exists():
+            try:
+                index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Index de bundles illisible, réinitialisation: {e}")
+            else:
+                # Ancien format : une seule archive par nom de fichier
+                index["files"] = {
+                    name: [bundles] if isinstance(bundles, str) else bundles
+                    for name, bundles in index.get("files", {}).items()
+                }
+                return index
+        return {"bundles": {}, "files": {}}
+
+    def _save_index(self) -> None:
+        """Persiste l'index local."""
+        if not self.index_path:
+            return
+        tmp_path = self.index_path.with_suffix(self.index_path.suffix + ".tmp")
+        tmp_path.write_text(
+            json.dumps(self.index, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+        tmp_path.replace(self.index_path)
+
+    def _load_spool(self) -> None:
+        """Reprend les archives en échec d'une exécution précédente (dues immédiatement)."""
+        if not self.spool_dir or not self.spool_dir.is_dir():
+            return
+        for meta_path in sorted(self.spool_dir.glob("*.json")):
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Archive en attente illisible {meta_path.name}: {e}")
+                continue
+            if meta_path.with_suffix("").exists():
+                self._spooled[meta_path.stem] = dict(meta, next_attempt=0.0)
+        if self._spooled:
+            logger.info(f"{len(self._spooled)} archive(s) en attente reprise(s) de {self.spool_dir}")
+
+    def _next_bundle_name(self) -> str:
+        """Génère le nom de la prochaine archive."""
+        while True:
+            self._bundle_counter += 1
+            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            name = (
+                f"{self.bundle_prefix}-{timestamp}-{self._bundle_counter:04d}"
+                f".{self.archive_format}"
+            )
+            if name not in self._spooled:
+                return name
+
+    def _unique_name(self, filename: str) -> str:
+        """Renomme un fichier déjà présent dans le lot courant ("nom (2).txt")."""
+        names = {entry["name"] for entry in self._pending}
+        if filename not in names:
+            return filename
+        path = PurePosixPath(filename)
+        counter = 2
+        while True:
+            candidate = str(path.with_name(f"{path.stem} ({counter}){path.suffix}"))
+            if candidate not in names:
+                self.stats["files_renamed"] += 1
+                logger.info(f"Nom en double dans le lot, {filename} renommé en {candidate}")
+                return candidate
+            counter += 1
+
+    def add(self, filename: str, content: bytes) -> Optional[str]:
+        """
+        Ajoute un fichier au lot courant.
+
+        Le fichier n'est pas encore uploadé : il l'est avec son archive (lot
+        plein, fenêtre écoulée, flush_if_due ou flush). Un nom déjà présent dans
+        le lot est renommé, la référence retournée porte le nom retenu.
+
+        Args:
+            filename: Nom du fichier dans l'archive
+            content: Contenu du fichier
+
+        Returns:
+            str: Référence "archive#fichier" si le fichier est accepté, None s'il
+            dépasse le seuil ou si trop d'archives sont en échec : le fichier
+            doit alors être uploadé directement
+        """
+        if len(content) > self.size_threshold:
+            self.stats["files_rejected"] += 1
+            return None
+
+        if self._pending and (self._is_full(len(content)) or self._is_window_expired()):
+            self._ship_logged(include_current=True)
+
+        if not self._pending:
+            if len(self._spooled) >= self.max_spooled_bundles:
+                # Uploads en échec : les archives en attente restent bornées
+                self.stats["files_spilled"] += 1
+                return None
+            self._batch_started = time.monotonic()
+            self._bundle_name = self._next_bundle_name()
+
+        filename = self._unique_name(filename)
+        self._pending.append({"name": filename, "content": content})
+        self._pending_bytes += len(content)
+        reference = f"{self._bundle_name}#{filename}"
+
+        if len(self._pending) >= self.max_bundle_files:
+            self._ship_logged(include_current=True)
+
+        return reference
+
+    def _is_full(self, incoming_bytes: int) -> bool:
+        """Indique si le lot courant ne peut plus accueillir un fichier."""
+        return (len(self._pending) >= self.max_bundle_files
+                or self._pending_bytes + incoming_bytes > self.max_bundle_bytes)
+
+    def _is_window_expired(self) -> bool:
+        """Indique si la fenêtre de temps du lot courant est écoulée."""
+        if self._batch_started is None:
+            return False
+        return time.monotonic() - self._batch_started >= self.window_seconds
+
+    def flush_if_due(self) -> Optional[str]:
+        """
+        Envoie le lot courant si sa fenêtre de temps est écoulée, et réessaie
+        les archives en échec dont le délai est écoulé.
+
+        À appeler régulièrement depuis la boucle d'upload : sans nouvel ajout,
+        un lot incomplet partirait sinon seulement au flush final.
+
+        Returns:
+            str: URL de l'archive du lot courant ou None
+
+        Raises:
+            BundleUploadError: Si un upload tenté a échoué
+        """
+        now = time.monotonic()
+        include_current = bool(self._pending) and self._is_window_expired()
+        if include_current or any(e["next_attempt"] <= now for e in self._spooled.values()):
+            return self._ship(include_current=include_current, force=False)
+        return None
+
+    def flush(self) -> Optional[str]:
+        """
+        Uploade le lot courant et réessaie toutes les archives en échec.
+
+        Returns:
+            str: URL de l'archive du lot courant ou None (lot vide)
+
+        Raises:
+            BundleUploadError: Si une archive n'a pas pu être uploadée (elle
+            reste en attente pour un prochain flush)
+        """
+        return self._ship(include_current=True, force=True)
+
+    def pending_bundles(self) -> List[str]:
+        """Archives en échec en attente d'un nouvel essai."""
+        return sorted(self._spooled)
+
+    def _ship_logged(self, include_current: bool) -> None:
+        """Envoi déclenché par add : l'échec est journalisé, l'archive reste en attente."""
+        try:
+            self._ship(include_current=include_current, force=False)
+        except BundleUploadError as e:
+            logger.error(str(e))
+
+    def _ship(self, include_current: bool, force: bool) -> Optional[str]:
+        """
+        Uploade le lot courant (mis en attente s'il échoue) puis les archives
+        en attente dont le délai est écoulé (toutes si force).
+        """
+        failed = []
+        url = None
+        if include_current and self._pending:
+            bundle_name = self._bundle_name or self._next_bundle_name()
+            members = {
+                entry["name"]: {"size": len(entry["content"])} for entry in self._pending
+            }
+            archive = self._build_archive(self._pending, members)
+            logger.info(
+                f"Upload de l'archive {bundle_name}: {len(self._pending)} fichiers, "
+                f"{self._pending_bytes} octets bruts, {len(archive)} octets compressés"
+            )
+            self._pending = []
+            self._pending_bytes = 0
+            self._batch_started = None
+            self._bundle_name = None
+            url = self._upload_bundle(bundle_name, archive, members, self.archive_format)
+            if url is None:
+                self._spool(bundle_name, archive, members)
+                failed.append(bundle_name)
+
+        # Service en échec à l'instant : inutile de réessayer les archives en attente
+        if not failed:
+            now = time.monotonic()
+            for bundle_name, entry in list(self._spooled.items()):
+                if not force and entry["next_attempt"] > now:
+                    continue
+                archive = self._read_spooled(bundle_name)
+                if self._upload_bundle(bundle_name, archive, entry["members"], entry["format"]):
+                    self._unspool(bundle_name)
+                    continue
+                entry["attempts"] += 1
+                entry["next_attempt"] = time.monotonic() + self._backoff(entry["attempts"])
+                self._write_spool_meta(bundle_name, entry)
+                failed.append(bundle_name)
+                break
+
+        if failed:
+            raise BundleUploadError(
+                f"Upload impossible de {', '.join(failed)} ; "
+                f"{len(self._spooled)} archive(s) en attente d'un nouvel essai",
+                failed,
+            )
+        return url
+
+    def _backoff(self, attempts: int) -> float:
+        """Délai avant le prochain essai d'une archive après attempts échecs."""
+        return min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+
+    def _upload_bundle(self, bundle_name: str, archive: bytes, members: Dict[str, Any],
+                       archive_format: str) -> Optional[str]:
+        """Uploade une archive et l'enregistre dans l'index (None si échec)."""
+        try:
+            url = self.upload_func(archive, bundle_name, ARCHIVE_CONTENT_TYPES[archive_format])
+        except Exception as e:
+            logger.error(f"Erreur lors de l'upload de l'archive {bundle_name}: {e}")
+            url = None
+        if url is None:
+            self.stats["bundles_failed"] += 1
+            logger.error(f"Échec de l'upload de l'archive {bundle_name}")
+            return None
+
+        self.index["bundles"][bundle_name] = {
+            "url": url,
+            "format": archive_format,
+            "created": datetime.now().isoformat(),
+            "archive_size": len(archive),
+            "members": members,
+        }
+        for name in members:
+            bundles = self.index["files"].setdefault(name, [])
+            if bundle_name not in bundles:
+                bundles.append(bundle_name)
+        self._save_index()
+
+        self.stats["files_bundled"] += len(members)
+        self.stats["bytes_bundled"] += sum(member["size"] for member in members.values())
+        self.stats["bundles_uploaded"] += 1
+        return url
+
+    def _spool(self, bundle_name: str, archive: bytes, members: Dict[str, Any]) -> None:
+        """Conserve une archive en échec pour un nouvel essai différé."""
+        entry = {"members": members, "format": self.archive_format, "attempts": 1,
+                 "next_attempt": time.monotonic() + self._backoff(1)}
+        if self.spool_dir:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.spool_dir / f"{bundle_name}.tmp"
+            tmp_path.write_bytes(archive)
+            tmp_path.replace(self.spool_dir / bundle_name)
+        else:
+            entry["archive"] = archive
+        self._spooled[bundle_name] = entry
+        self._write_spool_meta(bundle_name, entry)
+
+    def _write_spool_meta(self, bundle_name: str, entry: Dict[str, Any]) -> None:
+        if not self.spool_dir:
+            return
+        meta = {key: entry[key] for key in ("members", "format", "attempts")}
+        (self.spool_dir / f"{bundle_name}.json").write_text(
+            json.dumps(meta, ensure_ascii=False), encoding="utf-8"
+        )
+
+    def _read_spooled(self, bundle_name: str) -> bytes:
+        entry = self._spooled[bundle_name]
+        if "archive" in entry:
+            return entry["archive"]
+        return (self.spool_dir / bundle_name).read_bytes()
+
+    def _unspool(self, bundle_name: str) -> None:
+        del self._spooled[bundle_name]
+        if self.spool_dir:
+            (self.spool_dir / bundle_name).unlink(missing_ok=True)
+            (self.spool_dir / f"{bundle_name}.json").unlink(missing_ok=True)
+
+    def _build_archive(self, entries: List[Dict[str, Any]], members: Dict[str, Any]) -> bytes:
+        """Construit l'archive en mémoire avec son index embarqué."""
+        index_bytes = json.dumps(members, indent=2, ensure_ascii=False).encode(
+            "utf-8"
+        )
+        buffer = io.BytesIO()
+
+        if self.archive_format == "zip":
+            with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                for entry in entries:
+                    zf.writestr(entry["name"], entry["content"])
+                zf.writestr(BUNDLE_INDEX_MEMBER, index_bytes)
+        else:
+            with tarfile.open(fileobj=buffer, mode="w") as tf:
+                for name, data in [
+                    *((e["name"], e["content"]) for e in entries),
+                    (BUNDLE_INDEX_MEMBER, index_bytes),
+                ]:
+                    info = tarfile.TarInfo(name=name)
+                    info.size = len(data)
+                    info.mtime = int(time.time())
+                    tf.addfile(info, io.BytesIO(data))
+
+        return buffer.getvalue()
+
+    def lookup(self, filename: str, bundle_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retrouve l'archive contenant un fichier.
+
+        Un même nom peut figurer dans plusieurs archives : sans précision, la
+        plus récente est retournée.
+
+        Args:
+            filename: Nom du fichier recherché, ou référence "archive#fichier"
+                retournée par add
+            bundle_name: Archive à interroger (optionnel)
+
+        Returns:
+            Dict avec le nom de l'archive, son URL et la taille du fichier
+        """
+        if bundle_name is None and "#" in filename:
+            candidate, member = filename.split("#", 1)
+            if candidate in self.index["bundles"]:
+                bundle_name, filename = candidate, member
+        bundles = self.index["files"].get(filename, [])
+        if bundle_name is None:
+            bundle_name = bundles[-1] if bundles else None
+        if bundle_name not in bundles:
+            return None
+        bundle = self.index["bundles"][bundle_name]
+        return {
+            "bundle": bundle_name,
+            "url": bundle["url"],
+            "format": bundle["format"],
+            "size": bundle["members"][filename]["size"],
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Calcule la réduction du nombre de requêtes obtenue.
+
+        Returns:
+            Dict contenant les compteurs et le taux de réduction
+        """
+        without_bundling = self.stats["files_bundled"]
+        with_bundling = self.stats["bundles_uploaded"]
+        saved = without_bundling - with_bundling
+        reduction = (saved / without_bundling * 100) if without_bundling else 0.0
+        return {
+            **self.stats,
+            "bundles_pending": len(self._spooled),
+            "requests_without_bundling": without_bundling,
+            "requests_with_bundling": with_bundling,
+            "requests_saved": saved,
+            "reduction_percent": round(reduction, 1),
+        }
+
+
+def extract_from_bundle(archive: bytes, member: str, archive_format: str = "zip") -> bytes:
+    """
+    Extrait un fichier d'une archive téléchargée.
+
+    Args:
+        archive: Contenu de l'archive
+        member: Nom du fichier à extraire
+        archive_format: Format de l'archive ("zip" ou "tar")
+
+    Returns:
+        bytes: Contenu du fichier
+    """
+    if archive_format == "zip":
+        with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+            return zf.read(member)
+
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r") as tf:
+        extracted = tf.extractfile(member)
+        if extracted is None:
+            raise KeyError(member)
+        return extracted.read()
+
+
+def read_bundle_index(archive: bytes, archive_format: str = "zip") -> Dict[str, Any]:
+    """Lit l'index embarqué dans une archive."""
+    return json.loads(extract_from_bundle(archive, BUNDLE_INDEX_MEMBER, archive_format))
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Exécution d'une même opération SharePoint sur plusieurs sites en parallèle.
+
+Les sites sont fournis par liste (URLs ou IDs) ou découverts par une requête de
+recherche Graph. Leurs IDs de site et de drive sont résolus une fois puis mis en
+cache localement. L'opération (upload, listing, vérification des permissions)
+est ensuite exécutée sur tous les sites avec une limite de concurrence globale
+et par site, et un rapport agrégé (résultats et durées) est produit.
+
+Usage:
+    python site_fanout.py list --sites-file sites.txt --folder General
+    python site_fanout.py upload --site https://t.sharepoint.com/sites/A \\
+        --site https://t.sharepoint.com/sites/B --file export.xlsx --folder Exports
+    python site_fanout.py permissions --discover "DDASYS" --report report.json
+"""
+
+import argparse
+import json
+import logging
+import mimetypes
+import threading
+import time
+import urllib.parse
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from graph_client import GraphClient
+from identity_pool import IdentityPool, print_pool_metrics
+from profiling import run_profiled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SITE_CACHE_PATH = "site_cache.json"
+
+# Opération : (client, cible résolue, élément de travail) -> résultat sérialisable
+Operation = Callable[[GraphClient, Dict[str, str], Any], Any]
+
+
+def site_graph_path(site: str) -> str:
+    """
+    Convertit une URL de site SharePoint ou un ID de site en chemin Graph.
+
+    Args:
+        site: URL (https://tenant.sharepoint.com/sites/nom) ou ID de site
+
+    Returns:
+        str: Chemin Graph (ex: "sites/tenant.sharepoint.com:/sites/nom")
+    """
+    if site.startswith("https://"):
+        parsed = urllib.parse.urlparse(site)
+        return f"sites/{parsed.netloc}:{parsed.path.rstrip('/')}"
+    return f"sites/{site}"
+
+
+class SiteResolver:
+    """Résout les sites en IDs de site et de drive, avec cache local JSON."""
+
+    def __init__(self, client: GraphClient, cache_path: Optional[str] = DEFAULT_SITE_CACHE_PATH):
+        """
+        Initialise le résolveur.
+
+        Args:
+            client: Client Graph
+            cache_path: Fichier JSON du cache (None pour ne pas persister)
+        """
+        self.client = client
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._lock = threading.Lock()
+        self.cache: Dict[str, Dict[str, str]] = {}
+        if self.cache_path and self.cache_path.exists():
+            try:
+                self.cache = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cache des sites illisible, réinitialisation: {e}")
+
+    def _save(self) -> None:
+        """Persiste le cache."""
+        if self.cache_path:
+            self.cache_path.write_text(
+                json.dumps(self.cache, indent=2, ensure_ascii=False), encoding="utf-8"
+            )
+
+    def resolve(self, site: str) -> Dict[str, str]:
+        """
+        Résout un site (depuis le cache si possible).
+
+        Args:
+            site: URL ou ID du site
+
+        Returns:
+            Dict avec site, site_id, drive_id, name et web_url
+        """
+        with self._lock:
+            if site in self.cache:
+                return self.cache[site]
+
+        graph_path = site_graph_path(site)
+        site_info = self.client.get_json(graph_path, profile="listing", kind="site")
+        drive_info = self.client.get_json(
+            f"sites/{site_info['id']}/drive", profile="listing", kind="drive"
+        )
+        target = {
+            "site": site,
+            "site_id": site_info["id"],
+            "drive_id": drive_info["id"],
+            "name": site_info.get("displayName", ""),
+            "web_url": site_info.get("webUrl", site),
+        }
+
+        with self._lock:
+            self.cache[site] = target
+            self._save()
+        return target
+
+
+def discover_sites(client: GraphClient, query: str) -> List[str]:
+    """
+    Découvre des sites via la recherche Graph.
+
+    Args:
+        client: Client Graph
+        query: Texte recherché ("*" pour tous les sites accessibles)
+
+    Returns:
+        Liste des URLs de sites trouvés
+    """
+    sites = [
+        site["webUrl"]
+        for site in client.iter_pages(
+            "sites", profile="listing", kind="site", params={"search": query}
+        )
+        if site.get("webUrl")
+    ]
+    logger.info(f"{len(sites)} sites découverts pour la recherche '{query}'")
+    return sites
+
+
+# ----------------------------------------------------------------------
+# Opérations
+# ----------------------------------------------------------------------
+
+def list_operation(folder_path: str = "") -> Operation:
+    """Crée une opération qui compte les éléments d'un dossier."""
+
+    def run(client: GraphClient, target: Dict[str, str], _work_item: Any) -> Dict[str, Any]:
+        folder = folder_path.strip("/")
+        if folder:
+            path = f"drives/{target['drive_id']}/root:/{folder}:/children"
+        else:
+            path = f"drives/{target['drive_id']}/root/children"
+        items = list(client.iter_pages(path, profile="ids_only", kind="item"))
+        return {"items": len(items)}
+
+    return run
+
+
+def upload_operation(folder_path: str = "") -> Operation:
+    """Crée une opération qui uploade un fichier local (élément de travail)."""
+
+    def run(client: GraphClient, target: Dict[str, str], local_path: str) -> Dict[str, Any]:
+        source = Path(local_path)
+        content_type = mimetypes.guess_type(source.name)[0] or "application/octet-stream"
+        item_path = f"{folder_path.strip('/')}/{source.name}".strip("/")
+        # Fichier projeté en mémoire, session d'upload au-delà de 4 Mo
+        item = client.upload_file(target["drive_id"], item_path, str(source), content_type)
+        return {"file": source.name, "size": item.get("size"), "web_url": item.get("webUrl")}
+
+    return run
+
+
+def permissions_operation() -> Operation:
+    """Crée une opération qui liste les permissions accordées sur le site."""
+
+    def run(client: GraphClient, target: Dict[str, str], _work_item: Any) -> Dict[str, Any]:
+        permissions = list(
+            client.iter_pages(f"sites/{target['site_id']}/permissions", profile="listing")
+        )
+        return {
+            "permissions": [
+                {
+                    "id": permission.get("id"),
+                    "roles": permission.get("roles", []),
+                    "apps": [
+                        identity.get("application", {}).get("displayName")
+                        for identity in permission.get("grantedToIdentitiesV2", [])
+                    ],
+                }
+                for permission in permissions
+            ]
+        }
+
+    return run
+
+
+# ----------------------------------------------------------------------
+# Exécution
+# ----------------------------------------------------------------------
+
+class SiteFanout:
+    """Exécute une opération sur plusieurs sites avec limites de concurrence."""
+
+    def __init__(
+        self,
+        client: GraphClient,
+        max_workers: int = 16,
+        per_site_concurrency: int = 2,
+        resolver: Optional[SiteResolver] = None,
+    ):
+        """
+        Initialise l'exécuteur.
+
+        Args:
+            client: Client Graph partagé par tous les workers
+            max_workers: Nombre total de requêtes simultanées
+            per_site_concurrency: Nombre maximal de tâches simultanées par site
+            resolver: Résolveur de sites (créé avec le cache par défaut si absent)
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.per_site_concurrency = per_site_concurrency
+        self.resolver = resolver or SiteResolver(client)
+
+    def _run_task(
+        self, site: str, operation: Operation, work_item: Any
+    ) -> Dict[str, Any]:
+        """Exécute une tâche (site, élément de travail) ; durée hors file d'attente."""
+        started = time.perf_counter()
+        try:
+            target = self.resolver.resolve(site)
+            result = operation(self.client, target, work_item)
+            status, error = "ok", None
+        except Exception as e:
+            logger.error(f"Échec sur le site {site}: {e}")
+            result, status, error = None, "error", str(e)
+        return {
+            "site": site,
+            "work_item": work_item,
+            "status": status,
+            "result": result,
+            "error": error,
+            "seconds": time.perf_counter() - started,
+        }
+
+    def run(
+        self,
+        sites: Iterable[str],
+        operation: Operation,
+        work_items: Optional[List[Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Exécute l'opération sur tous les sites.
+
+        Args:
+            sites: URLs ou IDs des sites
+            operation: Opération à exécuter (voir *_operation)
+            work_items: Éléments de travail répétés sur chaque site
+                (ex: fichiers à uploader) ; une seule tâche par site si absent
+
+        Les tâches attendent dans une file par site et ne sont confiées à un
+        worker que lorsque leur site a de la capacité : un site très chargé
+        n'immobilise pas les workers pendant que les autres attendent.
+
+        Returns:
+            Dict: Rapport agrégé (par site et global)
+        """
+        sites = list(dict.fromkeys(sites))
+        items = work_items or [None]
+        started = time.perf_counter()
+        tasks: List[Dict[str, Any]] = []
+        queues = {site: deque(items) for site in sites}
+        running = {site: 0 for site in sites}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            inflight: Dict[Any, str] = {}
+            while queues or inflight:
+                # Tour de rôle entre les sites ayant de la capacité
+                while len(inflight) < self.max_workers:
+                    ready = [site for site in queues if running[site] < self.per_site_concurrency]
+                    if not ready:
+                        break
+                    for site in ready[:self.max_workers - len(inflight)]:
+                        future = executor.submit(self._run_task, site, operation,
+                                                 queues[site].popleft())
+                        inflight[future] = site
+                        running[site] += 1
+                        if not queues[site]:
+                            del queues[site]
+                if not inflight:
+                    break
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running[inflight.pop(future)] -= 1
+                    tasks.append(future.result())
+
+        return self._build_report(sites, tasks, time.perf_counter() - started)
+
+    @staticmethod
+    def _build_report(
+        sites: List[str], tasks: List[Dict[str, Any]], wall_seconds: float
+    ) -> Dict[str, Any]:
+        """Agrège les résultats des tâches par site."""
+        per_site: Dict[str, Dict[str, Any]] = {
+            site: {"site": site, "ok": 0, "errors": 0, "seconds": 0.0, "tasks": []}
+            for site in sites
+        }
+        for task in tasks:
+            entry = per_site[task["site"]]
+            entry["ok" if task["status"] == "ok" else "errors"] += 1
+            entry["seconds"] += task["seconds"]
+            entry["tasks"].append(task)
+
+        task_seconds = sorted(task["seconds"] for task in tasks)
+        failed_sites = [site for site, entry in per_site.items() if entry["errors"]]
+        return {
+            "sites": len(sites),
+            "tasks": len(tasks),
+            "succeeded": sum(1 for task in tasks if task["status"] == "ok"),
+            "failed": sum(1 for task in tasks if task["status"] != "ok"),
+            "failed_sites": failed_sites,
+            "wall_seconds": wall_seconds,
+            "sum_task_seconds": sum(task_seconds),
+            "p50_task_seconds": task_seconds[len(task_seconds) // 2] if tasks else 0.0,
+            "max_task_seconds": task_seconds[-1] if tasks else 0.0,
+            "per_site": list(per_site.values()),
+        }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Affiche le rapport agrégé."""
+    print("\n" + "=" * 60)
+    print(f"🌐 Sites: {report['sites']} | Tâches: {report['tasks']}")
+    print(f"✅ Réussies: {report['succeeded']} | ❌ Échouées: {report['failed']}")
+    print(f"⏱️  Durée totale: {report['wall_seconds']:.1f}s "
+          f"(cumul {report['sum_task_seconds']:.1f}s, "
+          f"p50 {report['p50_task_seconds']:.2f}s, "
+          f"max {report['max_task_seconds']:.2f}s)")
+    for entry in report["per_site"]:
+        marker = "✅" if not entry["errors"] else "❌"
+        print(f"   {marker} {entry['site']}: {entry['ok']} ok, "
+              f"{entry['errors']} erreurs, {entry['seconds']:.2f}s")
+        for task in entry["tasks"]:
+            if task["error"]:
+                print(f"      ⚠️  {task['error']}")
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Fan-out multi-sites SharePoint")
+    parser.add_argument("operation", choices=["list", "upload", "permissions"])
+    parser.add_argument("--site", action="append", default=[], help="URL ou ID de site")
+    parser.add_argument("--sites-file", help="Fichier texte : un site par ligne")
+    parser.add_argument("--discover", help="Requête de découverte des sites")
+    parser.add_argument("--folder", default="", help="Dossier cible dans le drive")
+    parser.add_argument("--file", action="append", default=[], help="Fichier à uploader")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--per-site", type=int, default=2)
+    parser.add_argument("--cache", default=DEFAULT_SITE_CACHE_PATH)
+    parser.add_argument("--report", help="Fichier JSON du rapport")
+    parser.add_argument("--identity-pool", action="store_true",
+                        help="Répartir les requêtes sur IDENTITY_CLIENT_IDS")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    pool = IdentityPool.from_env() if args.identity_pool else None
+    # Session propre au script, pool de connexions dimensionné pour les workers
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=args.workers,
+                                          pool_maxsize=args.workers))
+    if pool:
+        print(f"🆔 Pool de {len(pool)} identités")
+        client = GraphClient(identity_pool=pool, session=session)
+    else:
+        from credential_factory import get_credential
+
+        client = GraphClient(get_credential(), session=session)
+
+    sites = list(args.site)
+    if args.sites_file:
+        lines = Path(args.sites_file).read_text(encoding="utf-8").splitlines()
+        sites += [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    if args.discover:
+        sites += discover_sites(client, args.discover)
+    if not sites:
+        print("❌ Aucun site fourni (--site, --sites-file ou --discover)")
+        return
+
+    if args.operation == "upload":
+        if not args.file:
+            print("❌ --file est requis pour l'upload")
+            return
+        operation, work_items = upload_operation(args.folder), args.file
+    elif args.operation == "list":
+        operation, work_items = list_operation(args.folder), None
+    else:
+        operation, work_items = permissions_operation(), None
+
+    print(f"🚀 {args.operation} sur {len(sites)} sites "
+          f"({args.workers} workers, {args.per_site} par site)")
+    fanout = SiteFanout(
+        client,
+        max_workers=args.workers,
+        per_site_concurrency=args.per_site,
+        resolver=SiteResolver(client, args.cache),
+    )
+    report = fanout.run(sites, operation, work_items)
+    print_report(report)
+    if pool:
+        report["identities"] = pool.metrics()
+        print_pool_metrics(pool)
+
+    if args.report:
+        Path(args.report).write_text(
+            json.dumps(report, indent=2, ensure_ascii=False, default=str), encoding="utf-8"
+        )
+        print(f"📄 Rapport écrit: {args.report}")
+
+
+if __name__ == "__main__":
+    run_profiled(main)
@@ -0,0 +1,107 @@
+"""
+Tests de bout en bout des notifications de changement contre le stand-in Graph
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+from change_notifications import (
+    NotificationReceiver,
+    SubscriptionManager,
+    delta_sync_handler,
+    print_changes,
+)
+from drive_index import DriveIndex
+
+DRIVE_ID = "drive-test"
+
+
+@pytest.fixture(name="setup")
+def fixture_setup(standin, make_client):
+    """Stand-in, récepteur, gestionnaire d'abonnements et index"""
+    standin.add_drive(DRIVE_ID)
+    client = make_client()
+    index = DriveIndex(":memory:")
+
+    changes = []
+    received = threading.Event()
+
+    def on_items(drive_id, items):
+        changes.extend(items)
+        received.set()
+
+    manager = SubscriptionManager(client, notification_url="")
+    receiver = NotificationReceiver(
+        manager, delta_sync_handler(client, index, on_items),
+        host="127.0.0.1", port=0, debounce_seconds=0.05,
+    ).start()
+    manager.notification_url = receiver.url
+
+    yield standin, manager, receiver, index, changes, received
+
+    receiver.stop()
+    index.close()
+
+
+def test_notification_triggers_delta_sync(setup):
+    """Un fichier ajouté déclenche une notification puis un delta incrémental"""
+    standin, manager, _, index, changes, received = setup
+    subscription = manager.create(DRIVE_ID)
+    assert subscription["id"] in standin.subscriptions
+
+    standin.put_file(DRIVE_ID, "Rapports/janvier.txt", b"contenu")
+    assert received.wait(5)
+    assert index.get_item_id(DRIVE_ID, "rapports/JANVIER.txt")
+    assert any(c["path"] == "Rapports/janvier.txt" for c in changes)
+
+    # Seconde notification : seuls les nouveaux changements sont transmis
+    received.clear()
+    changes.clear()
+    standin.put_file(DRIVE_ID, "Rapports/fevrier.txt", b"contenu")
+    assert received.wait(5)
+    assert [c["path"] for c in changes if not c["is_folder"]] == ["Rapports/fevrier.txt"]
+
+
+def test_invalid_client_state_is_rejected(setup):
+    """Une notification au clientState inconnu ne déclenche pas de synchronisation"""
+    _, manager, receiver, _, _, received = setup
+    subscription = manager.create(DRIVE_ID)
+
+    response = requests.post(receiver.url, json={"value": [
+        {"subscriptionId": subscription["id"], "clientState": "faux"}
+    ]})
+    assert response.status_code == 202
+    assert not received.wait(0.3)
+    assert receiver.stats["rejected"] == 1
+
+
+def test_renew_and_delete(setup):
+    """Renouvellement des abonnements proches de l'expiration puis suppression"""
+    standin, manager, _, _, _, _ = setup
+    subscription = manager.create(DRIVE_ID)
+
+    later = datetime.now(timezone.utc) + timedelta(minutes=manager.lifetime_minutes)
+    assert manager.renew_due(now=later) == [subscription["id"]]
+
+    # Abonnement expiré côté Graph : recréé au renouvellement
+    del standin.subscriptions[subscription["id"]]
+    recreated = manager.renew(subscription["id"])
+    assert recreated["id"] != subscription["id"]
+    assert list(manager.subscriptions) == [recreated["id"]]
+
+    manager.delete_all()
+    assert not standin.subscriptions
+    assert not manager.subscriptions
+
+
+def test_print_changes_names_the_drive(capsys):
+    """Les changements affichés indiquent le drive concerné, dossiers exclus"""
+    print_changes(DRIVE_ID, [
+        {"path": "Rapports", "is_folder": True, "deleted": False},
+        {"path": "Rapports/mars.txt", "is_folder": False, "deleted": True},
+    ])
+    output = capsys.readouterr().out
+    assert f"1 changement(s) sur le drive {DRIVE_ID}" in output
+    assert "supprimé: Rapports/mars.txt" in output
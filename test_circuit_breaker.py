@@ -0,0 +1,157 @@
+"""
+Tests des disjoncteurs par point d'accès
+"""
+import threading
+import time
+
+import pytest
+import requests
+from unittest.mock import Mock
+
+from circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    endpoint_key,
+)
+from request_lanes import LaneScheduler
+
+
+@pytest.fixture(name="standin")
+def slow_writes_standin(standin):
+    """Service dont chaque écriture prend 300 ms"""
+    standin.add_drive("d")
+    standin.write_latency = 0.3
+    return standin
+
+
+def test_endpoint_key():
+    base = "https://graph.microsoft.com/v1.0"
+    assert endpoint_key("GET", f"{base}/drives/d/root:/a") == "graph.microsoft.com read"
+    assert endpoint_key("PUT", f"{base}/drives/d/root:/a.txt:/content") == "graph.microsoft.com content"
+    assert endpoint_key("POST", f"{base}/$batch") == "graph.microsoft.com batch"
+    assert endpoint_key("PUT", "https://t.sharepoint.com/upload?x=1") == "t.sharepoint.com write"
+
+
+def test_open_half_open_and_close():
+    """Échecs consécutifs : ouvert ; après reset, une seule sonde ; sa réussite referme"""
+    breaker = CircuitBreaker("x", failure_threshold=3, reset_seconds=0.1)
+    for _ in range(3):
+        breaker.record(False, 0.01, breaker.before_call())
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_in > 0
+
+    time.sleep(0.12)
+    probe = breaker.before_call()
+    assert probe and breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(True, 0.01, probe)
+    assert breaker.state == CLOSED
+    assert breaker.stats["rejected"] == 2 and breaker.stats["opened"] == 1
+
+    slow = CircuitBreaker("y", failure_threshold=2, slow_seconds=0.5)
+    for _ in range(2):
+        slow.record(True, 0.6, slow.before_call())
+    assert slow.state == OPEN and slow.stats["slow"] == 2
+
+    # Un fragment de 10 Mo à 1 Mo/s n'est pas lent ; les contenus n'ont pas de seuil
+    sized = CircuitBreaker("z", failure_threshold=1, slow_seconds=0.5,
+                           slow_bytes_per_second=1024 * 1024)
+    sized.record(True, 5.0, sized.before_call(), size_bytes=10 * 1024 * 1024)
+    assert sized.state == CLOSED
+    registry = CircuitBreakerRegistry(slow_seconds=0.5)
+    assert registry.breaker("GET", "https://h/v1.0/drives/d/items/i/content").slow_seconds is None
+
+
+def test_lane_wait_is_not_slowness(make_client):
+    """L'attente d'un créneau de lane ne compte pas dans la durée chronométrée"""
+    lanes = LaneScheduler(shares={"normal": 1})
+    breakers = CircuitBreakerRegistry(failure_threshold=1, slow_seconds=0.2)
+    client = make_client(lanes=lanes, breakers=breakers)
+    holding = threading.Event()
+
+    def hold_slot():
+        with lanes.slot() as slot:
+            holding.set()
+            time.sleep(0.4)
+            slot["response"] = Mock(status_code=200, headers={})
+
+    holder = threading.Thread(target=hold_slot)
+    holder.start()
+    holding.wait()
+    assert client.request("GET", "drives/d/root/children").status_code == 200
+    holder.join()
+    assert all(state["state"] == CLOSED and not state["slow"] for state in breakers.states())
+
+
+def test_failure_ratio_over_window():
+    """Une moitié d'échecs sur la fenêtre ouvre le disjoncteur sans échecs consécutifs"""
+    breaker = CircuitBreaker("x", failure_threshold=100, window=10, min_calls=10)
+    for i in range(9):
+        breaker.record(i % 2 == 0, 0.01, breaker.before_call())
+    assert breaker.state == CLOSED
+    breaker.record(False, 0.01, breaker.before_call())
+    assert breaker.state == OPEN
+
+
+def test_interruption_is_not_an_endpoint_failure():
+    """Ctrl+C pendant un appel : ni échec compté, ni sonde bloquée"""
+    registry = CircuitBreakerRegistry(failure_threshold=1, reset_seconds=0.0)
+    url = "https://h/v1.0/sites/s"
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        registry.call("GET", url, interrupted)
+    breaker = registry.breaker("GET", url)
+    assert breaker.state == CLOSED and breaker.stats["failures"] == 0
+
+    with pytest.raises(requests.ConnectionError):
+        registry.call("GET", url, Mock(side_effect=requests.ConnectionError()))
+    assert breaker.stats["failures"] == 1
+    with pytest.raises(KeyboardInterrupt):
+        registry.call("GET", url, interrupted)
+    assert breaker.state == HALF_OPEN and breaker.probes_inflight == 0
+
+
+def test_timeouts_trip_writes_only(standin, make_client):
+    """Uploads en timeout : le disjoncteur content s'ouvre, les lectures passent toujours"""
+    breakers = CircuitBreakerRegistry(failure_threshold=3, reset_seconds=60)
+    client = make_client(timeout=0.1, breakers=breakers)
+
+    for i in range(3):
+        with pytest.raises(requests.Timeout):
+            client.upload_content("d", f"f{i}.txt", b"x")
+    writes = len(standin.request_log)
+
+    started = time.monotonic()
+    results = []
+
+    def upload():
+        try:
+            client.upload_content("d", "g.txt", b"x")
+        except CircuitOpenError as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=upload) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8 and time.monotonic() - started < 0.1
+    assert len(standin.request_log) == writes
+
+    assert client.request("GET", "drives/d/root/children").status_code == 200
+    states = {s["endpoint"].split()[1]: s["state"] for s in breakers.states()}
+    assert states == {"content": OPEN, "read": CLOSED}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -4,6 +4,7 @@ Script de test rapide pour vérifier la configuration SharePoint
 """
 import os
 from dotenv import load_dotenv
+from profiling import run_profiled
 
 def test_configuration():
     """Test de la configuration SharePoint"""
@@ -41,4 +42,4 @@ def test_configuration():
     print("python sharepoint_auth.py")
 
 if __name__ == "__main__":
-    test_configuration() 
\ No newline at end of file
+    run_profiled(test_configuration)
\ No newline at end of file
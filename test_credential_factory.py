@@ -0,0 +1,104 @@
+"""
+Tests du choix de credential selon l'environnement
+"""
+import json
+
+import pytest
+from unittest.mock import Mock
+
+from credential_factory import BUILDERS, detect_environment, get_credential
+
+
+class Builders(dict):
+    """Constructeurs factices : comptent les constructions, échouent à la demande."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.built = []
+        super().__init__({kind: self._builder(kind)
+                          for kind in ("environment", "managed_identity", "cli")})
+
+    def _builder(self, kind):
+        def build(env):
+            self.built.append(kind)
+            credential = Mock()
+            if kind in self.failing:
+                credential.get_token.side_effect = Exception(f"{kind} indisponible\ndétails")
+            else:
+                credential.get_token.return_value = Mock(token=kind, expires_on=4102444800)
+            return credential
+        return build
+
+
+ENV = {"AZURE_TENANT_ID": "t", "AZURE_CLIENT_ID": "c", "AZURE_CLIENT_SECRET": "s",
+       "IDENTITY_ENDPOINT": "http://localhost:42356/msi/token", "PATH": ""}
+
+
+def test_detection_order():
+    """Variables AZURE_*, identité managée, CLI ; USE_MANAGED_IDENTITY la place en tête"""
+    assert detect_environment(ENV) == ["environment", "managed_identity"]
+    assert detect_environment(dict(ENV, USE_MANAGED_IDENTITY="true")) == \
+        ["managed_identity", "environment"]
+    assert detect_environment({"USE_MANAGED_IDENTITY": "true", "PATH": ""}) == ["managed_identity"]
+    assert detect_environment(dict(ENV, SHAREPOINT_CREDENTIAL="cli")) == ["cli"]
+    with pytest.raises(ValueError):
+        detect_environment({"SHAREPOINT_CREDENTIAL": "browser"})
+
+
+def test_remembered_choice_builds_only_that_credential(tmp_path):
+    """Premier passage : essais dans l'ordre ; ensuite seul le credential retenu est construit"""
+    path = str(tmp_path / "choice.json")
+    builders = Builders(failing={"environment"})
+    credential = get_credential(choice_path=path, env=ENV, builders=builders)
+    assert builders.built == ["environment", "managed_identity"]
+    assert credential.kind == "managed_identity"
+    assert json.loads((tmp_path / "choice.json").read_text())["kind"] == "managed_identity"
+
+    # Le token de vérification est réutilisé, puis gardé jusqu'à son expiration
+    assert credential.get_token("https://graph.microsoft.com/.default").token == "managed_identity"
+    credential.get_token("https://graph.microsoft.com/.default")
+    assert credential.stats == {"requested": 2, "fetched": 0}
+    assert credential.credential.get_token.call_count == 1
+
+    builders = Builders(failing={"environment"})
+    assert get_credential(choice_path=path, env=ENV, builders=builders).kind == "managed_identity"
+    assert builders.built == ["managed_identity"]
+
+
+def test_stale_choice_falls_back(tmp_path):
+    """Choix mémorisé en échec ou environnement changé : nouvelle détection"""
+    path = str(tmp_path / "choice.json")
+    get_credential(choice_path=path, env=ENV, builders=Builders())
+
+    builders = Builders(failing={"environment"})
+    assert get_credential(choice_path=path, env=ENV, builders=builders).kind == "managed_identity"
+    assert builders.built == ["environment", "managed_identity"]
+
+    builders = Builders()
+    env = dict(ENV, USE_MANAGED_IDENTITY="true")
+    get_credential(choice_path=path, env=env, builders=builders)
+    assert builders.built == ["managed_identity"]
+
+    with pytest.raises(RuntimeError, match="cli: cli indisponible"):
+        get_credential(choice_path=path, env={"SHAREPOINT_CREDENTIAL": "cli"},
+                       builders=Builders(failing={"cli"}))
+
+
+def test_builders_read_the_given_environment(monkeypatch):
+    """Les credentials sont construits depuis env, comme la détection, pas depuis os.environ"""
+    from azure.identity import AzureCliCredential, ClientSecretCredential
+
+    for name in ("AZURE_TENANT_ID", "AZURE_CLIENT_ID", "AZURE_CLIENT_SECRET"):
+        monkeypatch.delenv(name, raising=False)
+    credential = BUILDERS["environment"](ENV)
+    assert isinstance(credential, ClientSecretCredential) and credential._tenant_id == "t"
+    with pytest.raises(ValueError, match="AZURE_CLIENT_SECRET"):
+        BUILDERS["environment"]({"AZURE_TENANT_ID": "t", "AZURE_CLIENT_ID": "c"})
+
+    cli = BUILDERS["cli"](ENV)
+    assert isinstance(cli, AzureCliCredential) and cli.tenant_id == "t"
+    assert BUILDERS["cli"]({}).tenant_id == ""
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
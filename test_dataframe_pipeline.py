@@ -0,0 +1,69 @@
+"""
+Tests pour l'export pipeliné de DataFrames
+"""
+import io
+import threading
+import pandas as pd
+import pytest
+from dataframe_pipeline import (
+    PipelinedExcelExporter,
+    export_sequential,
+    serialize_dataframe,
+)
+
+
+def make_frames(count):
+    """Crée des DataFrames de test"""
+    return [
+        (f"frame_{i}", pd.DataFrame({"id": range(5), "valeur": [i] * 5}), "Data")
+        for i in range(count)
+    ]
+
+
+class RecordingUpload:
+    """Upload simulé qui mémorise les fichiers reçus"""
+
+    def __init__(self, fail_on=None):
+        self.files = {}
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def __call__(self, content, filename, content_type):
+        if filename == self.fail_on:
+            return None
+        with self.lock:
+            self.files[filename] = content
+        return f"https://test.sharepoint.com/{filename}"
+
+
+def test_serialize_dataframe_roundtrip():
+    """Test de la sérialisation xlsx en mémoire"""
+    df = pd.DataFrame({"nom": ["Alice", "Bob"], "age": [25, 30]})
+    content = serialize_dataframe(df, "TestData")
+    restored = pd.read_excel(io.BytesIO(content), sheet_name="TestData")
+    assert restored.equals(df)
+
+
+def test_pipelined_export_uploads_every_frame():
+    """Test de l'export pipeliné complet"""
+    upload = RecordingUpload(fail_on="frame_3.xlsx")
+    exporter = PipelinedExcelExporter(
+        upload, serialize_workers=2, upload_workers=2,
+        max_pending_serializations=2, upload_queue_size=1,
+    )
+    report = exporter.export(make_frames(6))
+
+    assert report["files"] == 6
+    assert report["failed"] == 1
+    assert sorted(upload.files) == [f"frame_{i}.xlsx" for i in range(6) if i != 3]
+
+
+def test_sequential_export_report_format():
+    """Test du format de rapport de l'export séquentiel"""
+    report = export_sequential(RecordingUpload(), make_frames(2))
+    assert report["files"] == 2
+    assert report["bytes"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
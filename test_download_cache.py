@@ -0,0 +1,114 @@
+"""
+Tests du cache local des téléchargements (GET conditionnels, LRU, verrous)
+"""
+import threading
+
+import pytest
+
+from download_cache import DownloadCache
+
+KB = 1024
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Drive avec trois fichiers de référence de 100 Ko"""
+    standin.add_drive("d")
+    for name in ("a", "b", "c"):
+        standin.put_file("d", f"Ref/{name}.bin", name.encode() * 100 * KB, notify=False)
+    return standin
+
+
+def content_gets(standin):
+    return [path for method, path in standin.request_log
+            if method == "GET" and path.endswith("content")]
+
+
+def test_revalidation_costs_one_round_trip(standin, make_client, tmp_path):
+    """Relecture : un GET de métadonnées sans contenu ; cTag connu : aucun appel ; modification : retéléchargé"""
+    with DownloadCache(make_client(), str(tmp_path)) as cache:
+        assert cache.read_bytes("d", path="Ref/a.bin") == b"a" * 100 * KB
+        standin.request_log.clear()
+        assert cache.read_bytes("d", path="ref/A.bin") == b"a" * 100 * KB
+        assert (cache.stats["downloads"], cache.stats["revalidated"]) == (1, 1)
+        assert cache.stats["bytes_downloaded"] == 100 * KB
+        assert len(standin.request_log) == 1 and not content_gets(standin)
+
+        drive = standin.drives["d"]
+        item = drive.to_json(drive.resolve("Ref/a.bin"), standin.root_url)
+        standin.request_log.clear()
+        cache.fetch("d", item_id=item["id"])
+        cache.fetch("d", item_id=item["id"], ctag=item["cTag"])
+        assert cache.stats["hits"] == 1
+        assert len(content_gets(standin)) == 1
+
+        standin.put_file("d", "Ref/a.bin", b"nouveau", notify=False)
+        assert cache.read_bytes("d", path="Ref/a.bin") == b"nouveau"
+        assert cache.summary()["entries"] == 2
+
+
+def test_fast_path_keyed_on_item_ctag(standin, make_client, tmp_path):
+    """L'ETag du téléchargement diffère du cTag (comme dans Graph) : le cTag fourni suffit"""
+    drive = standin.drives["d"]
+    item = drive.to_json(drive.resolve("Ref/b.bin"), standin.root_url)
+    with DownloadCache(make_client(), str(tmp_path)) as cache:
+        cache.fetch("d", item_id=item["id"], ctag=item["cTag"])
+        standin.request_log.clear()
+        cache.fetch("d", item_id=item["id"], ctag=item["cTag"])
+        assert cache.stats["hits"] == 1
+        assert standin.request_log == []
+
+        standin.put_file("d", "Ref/b.bin", b"v2", notify=False)
+        changed = drive.to_json(drive.resolve("Ref/b.bin"), standin.root_url)
+        assert cache.read_bytes("d", item_id=item["id"], ctag=changed["cTag"]) == b"v2"
+        assert cache.stats["downloads"] == 2
+
+
+def test_identical_content_is_stored_once(standin, make_client, tmp_path):
+    """Deux éléments de même contenu partagent un seul fichier du cache"""
+    standin.put_file("d", "Copie/a.bin", b"a" * 100 * KB, notify=False)
+    with DownloadCache(make_client(), str(tmp_path)) as cache:
+        first = cache.fetch("d", path="Ref/a.bin")
+        second = cache.fetch("d", path="Copie/a.bin")
+        assert first == second
+        assert cache.disk_usage() == 100 * KB
+
+
+def test_lru_eviction_under_budget(make_client, tmp_path):
+    """Au-delà du budget, l'entrée la moins récemment utilisée est évincée"""
+    with DownloadCache(make_client(), str(tmp_path), max_bytes=250 * KB) as cache:
+        cache.fetch("d", path="Ref/a.bin")
+        cache.fetch("d", path="Ref/b.bin")
+        cache.fetch("d", path="Ref/a.bin")
+        cache.fetch("d", path="Ref/c.bin")
+        assert cache.stats["evictions"] == 1
+        assert cache.disk_usage() == 200 * KB
+
+        cache.fetch("d", path="Ref/a.bin")
+        cache.fetch("d", path="Ref/b.bin")
+        assert cache.stats["downloads"] == 4
+        assert len([p for p in (tmp_path / "blobs").rglob("*") if p.is_file()]) == 2
+
+
+def test_concurrent_caches_share_one_download(make_client, tmp_path):
+    """Plusieurs caches sur le même répertoire : un seul téléchargement, les autres revalident"""
+    caches = [DownloadCache(make_client(), str(tmp_path)) for _ in range(4)]
+    results = []
+
+    def read(cache):
+        results.append(cache.read_bytes("d", path="Ref/b.bin"))
+
+    threads = [threading.Thread(target=read, args=(cache,)) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [b"b" * 100 * KB] * 4
+    assert sum(cache.stats["downloads"] for cache in caches) == 1
+    assert sum(cache.stats["revalidated"] for cache in caches) == 3
+    for cache in caches:
+        cache.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
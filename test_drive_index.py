@@ -0,0 +1,144 @@
+"""
+Tests pour l'index local SQLite des driveItems
+"""
+import pytest
+from unittest.mock import Mock
+from drive_index import DriveIndex, parent_path_from_reference, sync_delta
+
+DRIVE = "b!drive"
+
+
+def folder(item_id, name, parent_id, parent_path=None):
+    """Crée un driveItem dossier"""
+    reference = {"id": parent_id}
+    if parent_path is not None:
+        reference["path"] = f"/drives/{DRIVE}/root:{parent_path}"
+    return {"id": item_id, "name": name, "folder": {}, "parentReference": reference}
+
+
+def file(item_id, name, parent_id, parent_path=None, ctag="c1", size=10):
+    """Crée un driveItem fichier"""
+    item = folder(item_id, name, parent_id, parent_path)
+    del item["folder"]
+    item.update({
+        "cTag": ctag,
+        "size": size,
+        "file": {"hashes": {"quickXorHash": f"hash-{item_id}"}},
+    })
+    return item
+
+
+def test_parent_path_from_reference():
+    """Test de l'extraction du chemin parent"""
+    assert parent_path_from_reference({"path": "/drive/root:"}) == ""
+    assert parent_path_from_reference({"path": "/drives/x/root:/A/B"}) == "A/B"
+    assert parent_path_from_reference({"id": "1"}) is None
+
+
+class TestDriveIndex:
+    """Tests pour la classe DriveIndex"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.index = DriveIndex(":memory:")
+        self.index.upsert_items(DRIVE, [
+            {"id": "root", "name": "root", "root": {}, "folder": {}},
+            folder("f1", "General", "root", ""),
+            file("a", "rapport.xlsx", "f1", "/General"),
+            folder("f2", "Sub", "f1", "/General"),
+            file("b", "note.txt", "f2", "/General/Sub"),
+        ])
+
+    def test_lookup_path_is_case_insensitive(self):
+        """Test de la résolution chemin -> ID"""
+        assert self.index.get_item_id(DRIVE, "General/rapport.xlsx") == "a"
+        assert self.index.get_item_id(DRIVE, "/general/SUB/note.txt") == "b"
+        assert self.index.get_item_id(DRIVE, "absent.txt") is None
+
+    def test_list_prefix(self):
+        """Test du listing par préfixe"""
+        recursive = [e["path"] for e in self.index.list_prefix(DRIVE, "General")]
+        assert recursive == ["General/rapport.xlsx", "General/Sub", "General/Sub/note.txt"]
+        direct = [e["name"] for e in self.index.list_prefix(DRIVE, "General", False)]
+        assert direct == ["rapport.xlsx", "Sub"]
+
+    def test_delta_items_resolve_path_from_parent(self):
+        """Test des éléments delta sans parentReference.path"""
+        since = self.index.current_sequence(DRIVE)
+        self.index.upsert_items(DRIVE, [
+            file("c", "nouveau.txt", "f2"),
+            {"id": "a", "deleted": {}},
+        ])
+
+        changes = self.index.changed_since(DRIVE, since)
+        assert [(c["item_id"], c["deleted"]) for c in changes] == [("c", 0), ("a", 1)]
+        assert self.index.get_item_id(DRIVE, "General/Sub/nouveau.txt") == "c"
+        assert self.index.lookup_path(DRIVE, "General/rapport.xlsx") is None
+
+    def test_folder_rename_updates_descendants(self):
+        """Test du renommage d'un dossier"""
+        self.index.upsert_items(DRIVE, [folder("f2", "Renamed", "f1")])
+        assert self.index.get_item_id(DRIVE, "General/Renamed/note.txt") == "b"
+
+    def test_relisting_unchanged_items_keeps_sequence(self):
+        """Test d'un listing relu : seuls les éléments au cTag modifié sont signalés"""
+        since = self.index.current_sequence(DRIVE)
+        self.index.upsert_items(DRIVE, [file("a", "rapport.xlsx", "f1", "/General"),
+                                        file("b", "note.txt", "f2", "/General/Sub", ctag="c2")])
+        assert [c["item_id"] for c in self.index.changed_since(DRIVE, since)] == ["b"]
+
+        since = self.index.current_sequence(DRIVE)
+        self.index.upsert_items(DRIVE, [{"id": "a", "deleted": {}}, {"id": "a", "deleted": {}}])
+        assert len(self.index.changed_since(DRIVE, since)) == 1
+
+    def test_item_without_parent_never_replaces_root(self):
+        """Test d'un élément sans parentReference.id une fois la racine connue"""
+        assert self.index.upsert_items(DRIVE, [
+            {"id": "orphan", "name": "orphelin.txt", "cTag": "c1"},
+            {"id": "other", "name": "autre", "folder": {}},
+        ]) == 0
+        assert self.index.get_item_id(DRIVE, "") == "root"
+        assert self.index.lookup_path(DRIVE, "orphelin.txt") is None
+
+    def test_invalidate_by_ctag(self):
+        """Test de l'invalidation par cTag"""
+        assert self.index.invalidate(DRIVE, "a", "c1") is False
+        assert self.index.invalidate(DRIVE, "a", "c2") is True
+        assert self.index.get_item_id(DRIVE, "General/rapport.xlsx") is None
+
+
+def test_sync_delta_stores_delta_link():
+    """Test de la synchronisation delta et du deltaLink"""
+    index = DriveIndex(":memory:")
+    client = Mock()
+    client.get_json.side_effect = [
+        {"value": [{"id": "root", "root": {}, "folder": {}}],
+         "@odata.nextLink": "https://graph/next"},
+        {"value": [file("a", "x.txt", "root", "")],
+         "@odata.deltaLink": "https://graph/delta?token=1"},
+    ]
+
+    assert sync_delta(client, index, DRIVE) == 2
+    assert index.get_delta_link(DRIVE) == "https://graph/delta?token=1"
+    assert index.get_item_id(DRIVE, "x.txt") == "a"
+
+
+def test_projected_root_without_root_facet():
+    """Profil hashes : la racine n'a ni facette root ni parentReference.id"""
+    index = DriveIndex(":memory:")
+    client = Mock()
+    client.get_json.side_effect = [
+        {"value": [{"id": "root", "name": "root", "folder": {}},
+                   folder("f1", "General", "root"),
+                   file("a", "x.txt", "f1")],
+         "@odata.deltaLink": "https://graph/delta?token=1"},
+    ]
+
+    assert sync_delta(client, index, DRIVE) == 3
+    assert index.get_item_id(DRIVE, "General/x.txt") == "a"
+    assert index.get_item_id(DRIVE, "root/General/x.txt") is None
+    assert [e["path"] for e in index.list_prefix(DRIVE, "")] == ["General", "General/x.txt"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
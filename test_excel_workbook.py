@@ -0,0 +1,99 @@
+"""
+Tests des écritures incrémentales dans les classeurs Excel (API workbook)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from excel_workbook import WorkbookSession, WorkbookWriteError, dataframe_to_rows
+
+COLUMNS = ["Date", "Projet", "Heures"]
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Stand-in avec un classeur de 50 Mo contenant une table Suivi"""
+    standin.add_drive("d")
+    standin.add_workbook("d", "Suivi/suivi.xlsx", {"Suivi": COLUMNS}, size=50 * 1024 * 1024)
+    return standin
+
+
+def workbook(standin):
+    (state,) = standin.workbooks.values()
+    return state
+
+
+def test_dataframe_to_rows_is_json_safe():
+    """NaN/NaT -> None, dates en texte, scalaires numpy convertis, colonnes réordonnées"""
+    df = pd.DataFrame({
+        "Heures": np.array([1.5, np.nan]),
+        "Projet": ["A", None],
+        "Date": pd.to_datetime(["2024-01-02 08:30", None]),
+        "Nombre": np.array([3, 4], dtype=np.int64),
+    })
+    rows = dataframe_to_rows(df, ["Date", "Projet", "Heures", "Nombre"])
+    assert rows == [["2024-01-02 08:30:00", "A", 1.5, 3], [None, None, None, 4]]
+    assert type(rows[0][3]) is int
+    with pytest.raises(ValueError):
+        dataframe_to_rows(df, ["Inconnue"])
+
+
+def test_append_rows_costs_kilobytes(standin, make_client):
+    """1 000 lignes ajoutées à un classeur de 50 Mo : quelques Ko, deux appels $batch au plus"""
+    df = pd.DataFrame({
+        "Projet": [f"P{i % 7}" for i in range(1000)],
+        "Heures": np.arange(1000) / 4,
+        "Date": pd.date_range("2024-01-01", periods=1000, freq="h"),
+    })
+    standin.request_log.clear()
+    with WorkbookSession(make_client(), "d", "Suivi/suivi.xlsx",
+                         rows_per_request=100) as session:
+        assert session.append_dataframe("Suivi", df) == 1000
+
+    rows = workbook(standin)["tables"]["Suivi"]["rows"]
+    assert len(rows) == 1000
+    assert rows[0] == ["2024-01-01 00:00:00", "P0", 0.0]
+    assert rows[-1][1:] == ["P5", 249.75]
+    assert standin.bytes_received < 100 * 1024
+    assert sum(1 for method, path in standin.request_log if path.endswith("$batch")) == 1
+    assert not workbook(standin)["sessions"]
+
+
+def test_expired_session_is_recreated(standin, make_client):
+    """Une session expirée est recréée et les écritures rejouées"""
+    session = WorkbookSession(make_client(), "d", "Suivi/suivi.xlsx").open()
+    workbook(standin)["sessions"].clear()
+
+    assert session.add_rows("Suivi", [["2024-01-01", "A", 1]]) == 1
+    assert session.stats["sessions"] == 2
+    assert session.update_ranges([("Feuil1", "E1:F1", [["Total", 1]])]) == 1
+    assert workbook(standin)["ranges"][("Feuil1", "E1:F1")] == [["Total", 1]]
+    session.close()
+
+
+def test_chained_append_survives_expiry_and_throttling(standin, make_client, monkeypatch):
+    """Ajout sur plusieurs lots $batch : session expirée puis écriture throttlée, ordre conservé"""
+    monkeypatch.setattr("graph_client.time.sleep", lambda seconds: None)
+    rows = [[f"2024-01-{i % 28 + 1:02d}", f"P{i}", i] for i in range(450)]
+    session = WorkbookSession(make_client(), "d", "Suivi/suivi.xlsx",
+                              rows_per_request=10).open()
+    workbook(standin)["sessions"].clear()
+    assert session.add_rows("Suivi", rows) == 450
+    assert session.stats["sessions"] == 2
+
+    standin.throttle_writes = 1
+    assert session.add_rows("Suivi", rows) == 450
+    assert workbook(standin)["tables"]["Suivi"]["rows"] == rows + rows
+    session.close()
+
+
+def test_rejected_rows_raise(make_client):
+    """Les sous-requêtes refusées lèvent WorkbookWriteError"""
+    with WorkbookSession(make_client(), "d", "Suivi/suivi.xlsx") as session:
+        with pytest.raises(WorkbookWriteError) as error:
+            session.add_rows("Suivi", [["trop", "peu"]])
+    assert error.value.failures[0]["status"] == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
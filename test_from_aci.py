@@ -8,6 +8,7 @@ import os
 import requests
 from datetime import datetime
 from azure.identity import ManagedIdentityCredential
+from profiling import run_profiled
 
 
 def test_sharepoint_from_aci():
@@ -112,4 +113,4 @@ def test_sharepoint_from_aci():
 
 
 if __name__ == "__main__":
-    test_sharepoint_from_aci() 
\ No newline at end of file
+    run_profiled(test_sharepoint_from_aci)
\ No newline at end of file
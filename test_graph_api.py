@@ -8,6 +8,9 @@ import sys
 import requests
 from dotenv import load_dotenv
 
+from graph_client import build_graph_request
+from profiling import run_profiled
+
 # Chargement de la configuration
 load_dotenv('config.env')
 
@@ -61,8 +64,9 @@ def test_graph_api_access():
         
         # Récupération des informations du site
         # Utilisation de l'URL complète du tenant
-        graph_url = f"https://graph.microsoft.com/v1.0/sites/{tenant}:/sites/{site_name}"
-        response = requests.get(graph_url, headers=headers)
+        graph_path = f"sites/{tenant}:/sites/{site_name}"
+        graph_url, params = build_graph_request(graph_path, profile="listing")
+        response = requests.get(graph_url, headers=headers, params=params)
         
         if response.status_code == 200:
             site_info = response.json()
@@ -71,8 +75,11 @@ def test_graph_api_access():
             
             # Test d'accès aux listes du site
             print("\n📋 Test d'accès aux listes du site...")
-            lists_url = f"{graph_url}/lists"
-            lists_response = requests.get(lists_url, headers=headers)
+            lists_url, params = build_graph_request(
+                f"{graph_path}/lists", profile="listing"
+            )
+            lists_response = requests.get(lists_url, headers=headers,
+                                          params=params)
             
             if lists_response.status_code == 200:
                 lists_data = lists_response.json()
@@ -90,16 +97,22 @@ def test_graph_api_access():
             
             # Test d'accès aux fichiers du site
             print("\n📁 Test d'accès aux fichiers du site...")
-            drive_url = f"{graph_url}/drive"
-            drive_response = requests.get(drive_url, headers=headers)
+            drive_url, params = build_graph_request(
+                f"{graph_path}/drive", profile="listing"
+            )
+            drive_response = requests.get(drive_url, headers=headers,
+                                          params=params)
             
             if drive_response.status_code == 200:
                 drive_info = drive_response.json()
                 print(f"✅ Drive trouvé: {drive_info.get('name', 'N/A')}")
                 
                 # Test d'accès aux éléments racine
-                root_url = f"{drive_url}/root/children"
-                root_response = requests.get(root_url, headers=headers)
+                root_url, params = build_graph_request(
+                    f"{graph_path}/drive/root/children", profile="listing"
+                )
+                root_response = requests.get(root_url, headers=headers,
+                                             params=params)
                 
                 if root_response.status_code == 200:
                     root_data = root_response.json()
@@ -146,5 +159,5 @@ def test_graph_api_access():
 
 
 if __name__ == "__main__":
-    success = test_graph_api_access()
+    success = run_profiled(test_graph_api_access)
     sys.exit(0 if success else 1) 
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Tests pour le client Microsoft Graph et les profils de projection
+"""
+import pytest
+from unittest.mock import Mock
+from graph_client import GraphClient, build_graph_request, infer_resource_kind
+
+
+def make_response(payload, status_code=200):
+    """Crée une réponse HTTP simulée"""
+    response = Mock(status_code=status_code)
+    response.json.return_value = payload
+    return response
+
+
+def test_infer_resource_kind():
+    """Test de la détection du type de ressource"""
+    assert infer_resource_kind("sites/t.sharepoint.com:/sites/DDASYS") == "site"
+    assert infer_resource_kind("sites/abc/drive") == "drive"
+    assert infer_resource_kind("sites/abc/drives") == "drive"
+    assert infer_resource_kind("drives/d/root/children") == "item"
+    assert infer_resource_kind("sites/abc/lists") == "list"
+    assert infer_resource_kind("drives/d/root:/sites/lists.txt:/content") == "item"
+
+
+def test_build_graph_request_applies_profile():
+    """Test de l'application du profil $select"""
+    url, params = build_graph_request("sites/abc/drives", profile="listing")
+    assert url == "https://graph.microsoft.com/v1.0/sites/abc/drives"
+    assert params == {"$select": "id,name,driveType,webUrl"}
+
+    _, params = build_graph_request("drives/d/root/children", profile="ids_only")
+    assert params["$select"] == "id"
+
+    _, params = build_graph_request("sites/abc", profile="full")
+    assert params == {}
+
+
+def test_build_graph_request_keeps_explicit_select():
+    """Test de la priorité d'un $select explicite"""
+    _, params = build_graph_request(
+        "sites/abc", profile="listing", params={"$select": "id,sharepointIds"}
+    )
+    assert params["$select"] == "id,sharepointIds"
+
+
+def test_build_graph_request_unknown_profile():
+    """Test du refus d'un profil inconnu"""
+    with pytest.raises(ValueError):
+        build_graph_request("sites/abc", profile="tout")
+
+
+class TestGraphClient:
+    """Tests pour la classe GraphClient"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.credential = Mock()
+        self.credential.get_token.return_value = Mock(token="jeton", expires_on=9e12)
+        self.session = Mock()
+        self.client = GraphClient(self.credential, session=self.session)
+
+    def test_token_is_cached(self):
+        """Test de la réutilisation du token"""
+        self.session.request.return_value = make_response({})
+        self.client.get_json("sites/abc")
+        self.client.get_json("sites/abc")
+        assert self.credential.get_token.call_count == 1
+
+    def test_iter_pages_follows_next_link(self):
+        """Test de la pagination via @odata.nextLink"""
+        next_link = "https://graph.microsoft.com/v1.0/drives/d/root/children?$skiptoken=2"
+        self.session.request.side_effect = [
+            make_response({"value": [{"id": "1"}], "@odata.nextLink": next_link}),
+            make_response({"value": [{"id": "2"}]}),
+        ]
+        items = list(self.client.iter_pages("drives/d/root/children"))
+
+        assert [item["id"] for item in items] == ["1", "2"]
+        first_call, second_call = self.session.request.call_args_list
+        assert first_call.kwargs["params"]["$select"].startswith("id,name")
+        assert second_call.args[1] == next_link
+        assert second_call.kwargs["params"] is None
+
+
+def test_batch_retries_throttled_sub_requests(credential, monkeypatch):
+    """Test du rejeu des sous-requêtes $batch throttlées"""
+    monkeypatch.setattr("graph_client.time.sleep", lambda seconds: None)
+    session = Mock()
+    calls = []
+
+    def respond(method, url, json=None, **kwargs):
+        ids = [sub["id"] for sub in json["requests"]]
+        calls.append(ids)
+        return make_response({"responses": [
+            {"id": i, "status": 429 if (i == "1" and len(calls) == 1) else 200,
+             "headers": {"Retry-After": "2"}, "body": {"value": [i]}}
+            for i in ids
+        ]})
+
+    session.request.side_effect = respond
+    client = GraphClient(credential, session=session)
+    entries = [{"method": "GET", "url": f"/sites/s{i}/permissions"} for i in range(25)]
+    results = client.batch(entries)
+
+    assert [len(ids) for ids in calls] == [20, 5, 1]
+    assert calls[2] == ["1"]
+    assert all(result["status"] == 200 for result in results)
+    assert results[1]["body"] == {"value": ["1"]}
+
+
+def test_batch_requeues_throttled_lot(credential, monkeypatch):
+    """Test du rejeu d'un lot $batch throttlé en bloc, après son Retry-After"""
+    sleeps = []
+    monkeypatch.setattr("graph_client.time.sleep", sleeps.append)
+    session = Mock()
+    calls = []
+
+    def respond(method, url, json=None, **kwargs):
+        ids = [sub["id"] for sub in json["requests"]]
+        calls.append(ids)
+        if len(calls) == 1:
+            response = make_response({"error": {"code": "TooManyRequests"}}, 429)
+            response.headers = {"Retry-After": "7"}
+            response.raise_for_status.side_effect = AssertionError("lot non rejoué")
+            return response
+        return make_response({"responses": [
+            {"id": i, "status": 200, "headers": {}, "body": {"value": [i]}} for i in ids
+        ]})
+
+    session.request.side_effect = respond
+    client = GraphClient(credential, session=session)
+    entries = [{"method": "GET", "url": f"/sites/s{i}/permissions"} for i in range(25)]
+    results = client.batch(entries)
+
+    assert [len(ids) for ids in calls] == [20, 5, 20]
+    assert sleeps == [7.0]
+    assert all(result["status"] == 200 for result in results)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,120 @@
+"""
+Tests des doublons de lecture (hedging)
+"""
+import threading
+import time
+
+import pytest
+from unittest.mock import Mock
+
+from hedging import HedgePolicy
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Drive dont 10 % des lectures sont retardées de 500 ms"""
+    standin.add_drive("d")
+    standin.put_file("d", "Ref/a.txt", b"a", notify=False)
+    standin.slow_read_ratio = 0.1
+    standin.slow_read_seconds = 0.5
+    return standin
+
+
+def test_hedging_cuts_tail_latency(standin, make_client):
+    """Les lectures lentes sont doublées après le p90 observé ; écritures jamais doublées"""
+    with HedgePolicy(percentile=90, budget_ratio=0.5, min_samples=10) as policy:
+        client = make_client(hedging=policy)
+        latencies = []
+        for _ in range(100):
+            started = time.perf_counter()
+            assert client.get_json("drives/d/root:/Ref/a.txt", profile="ids_only")["id"]
+            latencies.append(time.perf_counter() - started)
+        # Les premières lectures précèdent le calcul du percentile (délai maximal)
+        assert max(latencies[10:]) < 0.3
+        assert policy.stats["hedge_wins"] > 0
+        assert policy.delay() < 0.1
+
+        standin.request_log.clear()
+        standin.write_latency = 0.1
+        client.upload_content("d", "Ref/b.txt", b"b")
+        assert [method for method, _ in standin.request_log] == ["PUT"]
+
+
+def test_only_metadata_reads_are_hedged(standin, make_client):
+    """Listings, delta et contenu ne sont jamais doublés, même lents"""
+    standin.slow_read_ratio = 1.0
+    standin.slow_read_seconds = 0.05
+    with HedgePolicy(budget_ratio=1.0, min_delay=0.001, max_delay=0.001) as policy:
+        client = make_client(hedging=policy)
+        standin.request_log.clear()
+        client.get_json("drives/d/root:/Ref:/children")
+        client.get_json("drives/d/root/delta")
+        client.request("GET", "drives/d/root:/Ref/a.txt:/content")
+        assert len(standin.request_log) == 3
+        assert policy.stats["requests"] == 0
+
+        client.get_json("drives/d/root:/Ref/a.txt", profile="ids_only")
+        assert policy.stats["hedged"] == 1
+
+    assert HedgePolicy.eligible("/drives/d/items/01ABC")
+    assert HedgePolicy.eligible("/sites/s/lists")
+    assert not HedgePolicy.eligible("/drives/d/root/delta?token=abc")
+    assert not HedgePolicy.eligible("/sites/s/lists/l/items?$skiptoken=2")
+
+
+def test_site_drives_lookup_is_hedged(standin, make_client):
+    """La recherche du drive d'un site (sites/{id}/drives) est doublée"""
+    standin.add_site("site-1", "Equipe", drive_id="d-site")
+    standin.slow_read_ratio = 1.0
+    standin.slow_read_seconds = 0.05
+    with HedgePolicy(budget_ratio=1.0, min_delay=0.001, max_delay=0.001) as policy:
+        client = make_client(hedging=policy)
+        drives = client.get_json("sites/site-1/drives", profile="listing")["value"]
+        assert [drive["id"] for drive in drives] == ["d-site"]
+        assert policy.stats["hedged"] == 1
+
+
+def test_budget_bounds_extra_load():
+    """Toutes les lectures lentes : les doublons restent dans le budget"""
+    calls = []
+    lock = threading.Lock()
+
+    def slow_send():
+        with lock:
+            calls.append(1)
+        time.sleep(0.03)
+        return Mock(status_code=200)
+
+    with HedgePolicy(budget_ratio=0.1, burst=2, min_delay=0.001, max_delay=0.001) as policy:
+        for _ in range(50):
+            assert policy.run(slow_send).status_code == 200
+        summary = policy.summary()
+    assert summary["hedged"] <= 2 + 50 * 0.1
+    assert summary["budget_denied"] >= 40
+    assert len(calls) == 50 + summary["hedged"]
+
+
+def test_failed_attempt_falls_back_to_other():
+    """Une tentative en erreur laisse gagner l'autre ; deux erreurs remontent"""
+    attempts = iter([0.2, 0.0])
+
+    def flaky_send():
+        delay = next(attempts)
+        time.sleep(delay)
+        if delay:
+            return Mock(status_code=200)
+        raise ConnectionError("frontal indisponible")
+
+    with HedgePolicy(min_delay=0.01, max_delay=0.01) as policy:
+        assert policy.run(flaky_send).status_code == 200
+
+        def broken_send():
+            time.sleep(0.05)
+            raise ConnectionError("indisponible")
+
+        with pytest.raises(ConnectionError):
+            policy.run(broken_send)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
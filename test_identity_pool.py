@@ -0,0 +1,112 @@
+"""
+Tests pour le pool d'identités Graph
+"""
+import io
+
+import pytest
+from unittest.mock import Mock
+from graph_client import GraphClient
+from identity_pool import IdentityPool, PooledIdentity, parse_retry_after
+
+
+def make_identity(name, max_concurrency=2):
+    """Crée une identité avec un credential simulé"""
+    credential = Mock()
+    credential.get_token.return_value = Mock(token=f"jeton-{name}", expires_on=9e12)
+    return PooledIdentity(name, credential, max_concurrency)
+
+
+def make_response(status_code, retry_after=None):
+    """Crée une réponse HTTP simulée"""
+    response = Mock(status_code=status_code)
+    response.headers = {"Retry-After": retry_after} if retry_after else {}
+    return response
+
+
+def test_parse_retry_after():
+    """Test de la lecture de Retry-After"""
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(None) == 10.0
+    assert parse_retry_after("invalide") == 10.0
+
+
+class TestIdentityPool:
+    """Tests pour la classe IdentityPool"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.a = make_identity("a")
+        self.b = make_identity("b")
+        self.pool = IdentityPool([self.a, self.b])
+
+    def test_acquire_spreads_load(self):
+        """Test de la répartition selon la marge disponible"""
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        assert {first.name, second.name} == {"a", "b"}
+
+    def test_throttled_identity_is_skipped(self):
+        """Test de la mise à l'écart d'une identité throttlée"""
+        identity = self.pool.acquire()
+        assert self.pool.release(identity, 429, "30") is True
+        for _ in range(2):
+            assert self.pool.acquire().name != identity.name
+
+    def test_acquire_times_out_when_saturated(self):
+        """Test de l'attente quand toutes les identités sont saturées"""
+        for _ in range(4):
+            self.pool.acquire()
+        with pytest.raises(TimeoutError):
+            self.pool.acquire(timeout=0.05)
+
+    def test_metrics_per_identity(self):
+        """Test des métriques par identité"""
+        identity = self.pool.acquire()
+        self.pool.release(identity, 200)
+        metrics = {m["identity"]: m for m in self.pool.metrics()}
+        assert metrics[identity.name]["succeeded"] == 1
+        assert metrics[identity.name]["inflight"] == 0
+
+
+def test_graph_client_fails_over_on_throttling():
+    """Test de la bascule du client Graph vers une autre identité"""
+    pool = IdentityPool([make_identity("a"), make_identity("b")])
+    session = Mock()
+    session.request.side_effect = [make_response(429, "60"), make_response(200)]
+    client = GraphClient(identity_pool=pool, session=session)
+
+    response = client.request("GET", "sites/abc")
+
+    assert response.status_code == 200
+    tokens = [c.kwargs["headers"]["Authorization"] for c in session.request.call_args_list]
+    assert tokens[0] != tokens[1]
+    assert sum(m["throttled"] for m in pool.metrics()) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
+
+
+def test_failover_replays_only_rewindable_bodies():
+    """Test de la bascule avec un corps en flux : rembobiné s'il le peut, sinon pas renvoyé"""
+    sent = []
+
+    def consume(method, url, data=None, **kwargs):
+        sent.append(data.read() if hasattr(data, "read") else b"".join(data))
+        return make_response(429, "60") if len(sent) == 1 else make_response(200)
+
+    session = Mock()
+    session.request.side_effect = consume
+    client = GraphClient(identity_pool=IdentityPool([make_identity("a"), make_identity("b")]),
+                         session=session)
+    stream = io.BytesIO(b"entete-contenu")
+    stream.seek(7)
+    assert client.request("PUT", "drives/d/items/x/content", data=stream).status_code == 200
+    assert sent == [b"contenu", b"contenu"]
+
+    sent.clear()
+    client = GraphClient(identity_pool=IdentityPool([make_identity("a"), make_identity("b")]),
+                         session=session)
+    chunks = iter([b"con", b"tenu"])
+    assert client.request("PUT", "drives/d/items/x/content", data=chunks).status_code == 429
+    assert sent == [b"contenu"]
@@ -0,0 +1,121 @@
+"""
+Tests de la lecture vectorisée des listes SharePoint (delta et copie locale)
+"""
+import json
+
+import pandas as pd
+import pytest
+
+from list_reader import ListReader, items_to_frame, merge_changes
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Site avec une liste Suivi de 2 500 éléments"""
+    standin.add_site("site-1", "Projets")
+    standin.add_list("site-1", "Suivi", ["Reference", "Heures", "Echeance"], items=[
+        {"Title": f"Tâche {i}", "Reference": i, "Heures": i / 2,
+         "Echeance": "2024-06-01T00:00:00Z"}
+        for i in range(1, 2501)
+    ])
+    return standin
+
+
+def make_reader(make_client, cache_path=None, **kwargs):
+    return ListReader(make_client(), "site-1", "list-0",
+                      fields=["Title", "Reference", "Heures", "Echeance"],
+                      cache_path=cache_path, **kwargs)
+
+
+def test_items_to_frame_columns():
+    """Colonnes dans l'ordre de la projection, champs absents à None"""
+    items = [
+        {"id": "1", "lastModifiedDateTime": "2024-01-01T00:00:00Z",
+         "fields": {"Title": "A", "Heures": 1.5}},
+        {"id": "2", "lastModifiedDateTime": "2024-01-02T00:00:00Z", "fields": {"Title": "B"}},
+    ]
+    frame = items_to_frame(items, ["Heures", "Title"])
+    assert list(frame.columns) == ["id", "lastModifiedDateTime", "Heures", "Title"]
+    assert frame["Title"].tolist() == ["A", "B"]
+    assert pd.isna(frame["Heures"][1])
+    assert list(items_to_frame(items).columns) == ["id", "lastModifiedDateTime", "Title", "Heures"]
+
+
+def test_merge_changes_replaces_and_drops():
+    """Les éléments modifiés remplacent la copie locale, les supprimés disparaissent"""
+    cached = pd.DataFrame({"id": ["1", "2", "10"], "Title": ["a", "b", "c"]})
+    changed = pd.DataFrame({"id": ["2", "11"], "Title": ["B", "d"]})
+    merged = merge_changes(cached, changed, ["1"])
+    assert merged["id"].tolist() == ["2", "10", "11"]
+    assert merged["Title"].tolist() == ["B", "c", "d"]
+
+
+def test_full_read_then_delta(standin, make_client, tmp_path):
+    """Lecture complète paginée, puis seuls les changements sont transférés et fusionnés"""
+    cache = tmp_path / "suivi.pkl"
+    reader = make_reader(make_client, cache, parse_dates=["Echeance"])
+    frame = reader.read()
+    assert reader.stats["mode"] == "full"
+    assert reader.stats["requests"] == 3
+    assert len(frame) == 2500
+    assert frame["Reference"].tolist() == list(range(1, 2501))
+    assert isinstance(frame["Echeance"].dtype, pd.DatetimeTZDtype)
+
+    client = make_client()
+    items_url = "sites/site-1/lists/list-0/items"
+    client.request("PATCH", f"{items_url}/7/fields", json={"Heures": 70.0}).raise_for_status()
+    client.request("POST", items_url, json={"fields": {"Title": "Nouvelle", "Reference": 2501}}
+                   ).raise_for_status()
+    client.request("DELETE", f"{items_url}/3").raise_for_status()
+
+    standin.request_log.clear()
+    reader = make_reader(make_client, cache, parse_dates=["Echeance"])
+    merged = reader.read()
+    assert reader.stats["mode"] == "delta"
+    assert (reader.stats["items"], reader.stats["deleted"], reader.stats["requests"]) == (2, 1, 1)
+    assert len(standin.request_log) == 1
+    assert len(merged) == 2500
+    assert "3" not in set(merged["id"])
+    assert merged.loc[merged["id"] == "7", "Heures"].item() == 70.0
+    assert merged["id"].iloc[-1] == "2501"
+
+    # Sans changement : une seule requête, aucun élément
+    idle = make_reader(make_client, cache, parse_dates=["Echeance"])
+    idle.read()
+    assert (idle.stats["items"], idle.stats["requests"]) == (0, 1)
+
+
+def test_projection_change_forces_full_read(make_client, tmp_path):
+    """Une copie locale obtenue avec d'autres champs n'est pas réutilisée"""
+    cache = tmp_path / "suivi.pkl"
+    make_reader(make_client, cache).read()
+    reader = ListReader(make_client(), "site-1", "list-0", fields=["Title"],
+                        cache_path=cache)
+    frame = reader.read()
+    assert reader.stats["mode"] == "full"
+    assert list(frame.columns) == ["id", "lastModifiedDateTime", "Title"]
+
+
+def test_parquet_cache_without_pyarrow(make_client, tmp_path, monkeypatch):
+    """Sans pyarrow, la copie .parquet est écrite en pickle et relue par delta"""
+    monkeypatch.setattr("list_reader.pyarrow", None)
+    cache = tmp_path / "suivi.parquet"
+    make_reader(make_client, cache).read()
+    state_path = tmp_path / "suivi.parquet.json"
+    assert json.loads(state_path.read_text())["format"] == "pickle"
+
+    reader = make_reader(make_client, cache)
+    assert len(reader.read()) == 2500 and reader.stats["mode"] == "delta"
+    with pytest.raises(ImportError, match="pyarrow"):
+        reader.read_arrow()
+
+    # Copie écrite en Parquet par une installation avec pyarrow : relecture complète
+    state = json.loads(state_path.read_text())
+    state_path.write_text(json.dumps(dict(state, format="parquet")))
+    reader = make_reader(make_client, cache)
+    reader.read()
+    assert reader.stats["mode"] == "full"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,111 @@
+"""
+Tests de l'écriture en masse dans les listes SharePoint
+"""
+import pandas as pd
+import pytest
+
+from list_writer import ListWriter, _key, resolve_list_id
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Site avec une liste Suivi déjà partiellement remplie"""
+    standin.add_site("site-1", "Projets")
+    standin.add_list("site-1", "Suivi", ["Reference", "Heures", "Echeance"], items=[
+        {"Title": "Alpha", "Reference": 1, "Heures": 2.0},
+        {"Title": "Beta", "Reference": 2, "Heures": 4.0},
+    ])
+    return standin
+
+
+def list_items(standin):
+    (sp_list,) = [entry for entry in standin.sites["site-1"]["lists"].values()
+                  if entry["displayName"] == "Suivi"]
+    return {item["fields"]["Reference"]: item for item in sp_list["items"].values()}
+
+
+def frame(count):
+    return pd.DataFrame({
+        "Title": [f"Tâche {i}" for i in range(1, count + 1)],
+        "Reference": range(1, count + 1),
+        "Heures": [2.0] + [float(i) for i in range(2, count + 1)],
+        "Echeance": pd.to_datetime(["2024-06-01"] * count),
+    })
+
+
+def test_key_normalization():
+    """12, 12.0 et " 12 " désignent la même clé"""
+    assert _key(12) == _key(12.0) == _key(" 12 ") == "12"
+    assert _key(None) is None and _key("") is None
+
+
+def test_write_is_idempotent(standin, make_client):
+    """Création des nouvelles lignes, mise à jour des modifiées, relance sans écriture"""
+    client = make_client()
+    list_id = resolve_list_id(client, "site-1", "Suivi")
+    writer = ListWriter(client, "site-1", list_id, "Reference", concurrency=2)
+    df = frame(45)
+
+    report = writer.write(df)
+    assert (report["created"], report["updated"], report["unchanged"]) == (43, 2, 0)
+    assert not report["failed"]
+    assert report["requests"] == 3
+    items = list_items(standin)
+    assert len(items) == 45
+    assert items[1]["fields"]["Title"] == "Tâche 1"
+    assert items[45]["fields"]["Echeance"] == "2024-06-01T00:00:00Z"
+
+    standin.request_log.clear()
+    rerun = writer.write(df)
+    assert (rerun["created"], rerun["updated"], rerun["unchanged"]) == (0, 0, 45)
+    assert not [entry for entry in standin.request_log if entry[1].endswith("$batch")]
+
+    df.loc[df["Reference"] == 7, "Heures"] = 70.0
+    changed = writer.write(df)
+    assert (changed["created"], changed["updated"]) == (0, 1)
+    assert list_items(standin)[7]["fields"]["Heures"] == 70.0
+
+
+def test_throttled_writes_reduce_concurrency(standin, make_client):
+    """Les écritures encore throttlées sont renvoyées avec une concurrence réduite"""
+    client = make_client()
+    list_id = resolve_list_id(client, "site-1", "Suivi")
+    writer = ListWriter(client, "site-1", list_id, "Reference", concurrency=4, max_retries=0)
+    standin.throttle_writes = 5
+
+    report = writer.write(frame(60))
+    assert report["throttled"] == 5
+    assert report["created"] == 58 and report["updated"] == 2
+    assert len(list_items(standin)) == 60
+
+
+def test_sustained_throttling_ends_in_failures(standin, make_client):
+    """Sous un throttling continu, les écritures finissent en échec après max_requeues"""
+    client = make_client()
+    list_id = resolve_list_id(client, "site-1", "Suivi")
+    writer = ListWriter(client, "site-1", list_id, "Reference", concurrency=2,
+                        max_retries=0, max_requeues=2)
+    standin.throttle_writes = 10_000
+
+    report = writer.write(frame(30))
+    assert report["created"] + report["updated"] == 0
+    assert len(report["failed"]) == 30
+    assert {failure["status"] for failure in report["failed"]} == {429}
+    assert report["throttled"] == 60
+
+
+def test_invalid_input_is_rejected(make_client):
+    """Clés en double et colonnes inconnues refusées avant toute écriture"""
+    client = make_client()
+    list_id = resolve_list_id(client, "site-1", "Suivi")
+    writer = ListWriter(client, "site-1", list_id, "Reference")
+    with pytest.raises(ValueError, match="double"):
+        writer.write(pd.DataFrame({"Reference": [1, 1]}))
+    with pytest.raises(ValueError, match="Inconnue"):
+        writer.write(pd.DataFrame({"Reference": [1], "Inconnue": ["x"]}))
+    dry = writer.write(frame(3), dry_run=True)
+    assert dry["planned"] == {"creates": 1, "updates": 2} and dry["requests"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
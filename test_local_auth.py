@@ -6,6 +6,7 @@ Utilise AzureCliCredential pour le développement local
 import os
 import sys
 from dotenv import load_dotenv
+from profiling import run_profiled
 
 # Chargement de la configuration
 load_dotenv('config.env')
@@ -103,5 +104,5 @@ def test_local_authentication():
 
 
 if __name__ == "__main__":
-    success = test_local_authentication()
+    success = run_profiled(test_local_authentication)
     sys.exit(0 if success else 1) 
\ No newline at end of file
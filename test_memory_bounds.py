@@ -0,0 +1,57 @@
+"""
+Tests des transferts en flux (sessions d'upload, téléchargement) et de leur mémoire
+"""
+import io
+import os
+import pytest
+
+from bench_memory import check_bounded, check_measures_bounded, measure
+
+CHUNK = 320 * 1024
+MB = 1024 * 1024
+
+
+@pytest.fixture(name="client_and_standin")
+def fixture_client_and_standin(standin, make_client):
+    """Client Graph pointant sur un stand-in local"""
+    standin.add_drive("d")
+    return make_client(), standin
+
+
+def test_upload_stream_roundtrip(client_and_standin):
+    """Upload fragmenté puis téléchargement en flux"""
+    client, standin = client_and_standin
+    content = os.urandom(3 * CHUNK + 123)
+    item = client.upload_stream("d", "gros.bin", io.BytesIO(content), len(content), CHUNK)
+    assert item["size"] == len(content)
+    assert not standin.upload_sessions
+
+    destination = io.BytesIO()
+    assert client.download_to("d", "gros.bin", destination, chunk_size=CHUNK) == len(content)
+    assert destination.getvalue() == content
+
+
+def test_upload_stream_cancels_session_on_short_stream(client_and_standin):
+    """Un flux plus court que la taille annoncée annule la session"""
+    client, standin = client_and_standin
+    with pytest.raises(ValueError):
+        client.upload_stream("d", "tronque.bin", io.BytesIO(b"abc"), 10, CHUNK)
+    assert not standin.upload_sessions
+
+
+def test_upload_file_memory_is_bounded(client_and_standin, tmp_path):
+    """Le pic mémoire de upload_file ne dépend pas de la taille du fichier"""
+    client, standin = client_and_standin
+    standin.keep_content = False
+    results = []
+    for size_mb in (5, 20):
+        path = tmp_path / f"f{size_mb}.bin"
+        path.write_bytes(b"\0" * (size_mb * 1024 * 1024))
+        results.append(measure(lambda: client.upload_file("d", path.name, str(path), chunk_size=CHUNK)))
+    assert check_measures_bounded(results)
+    assert not check_bounded([1024 * 1024, 20 * 1024 * 1024])
+    # Un RSS qui croît avec la charge fait échouer la vérification, même si tracemalloc est borné
+    assert not check_measures_bounded([
+        {"peak_traced": MB, "peak_rss_delta": MB},
+        {"peak_traced": MB, "peak_rss_delta": 64 * MB},
+    ])
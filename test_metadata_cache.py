@@ -0,0 +1,97 @@
+"""
+Tests du cache de métadonnées du client Graph
+"""
+import pytest
+
+from graph_client import batch_request
+from metadata_cache import MetadataCache, parse_address
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Drive avec deux dossiers et un fichier chacun"""
+    standin.add_drive("d")
+    standin.put_file("d", "Ref/a.txt", b"a", notify=False)
+    standin.put_file("d", "Autre/b.txt", b"b", notify=False)
+    return standin
+
+
+def gets(standin):
+    return [path for method, path in standin.request_log if method == "GET"]
+
+
+def test_parse_address():
+    assert parse_address("/drives/d/root:/A/B.txt:/content") == {
+        "drive": "d", "path": "a/b.txt", "item": None, "scope": None}
+    assert parse_address("drives/d/root/children")["path"] == ""
+    assert parse_address("drives/d/items/01X/children")["item"] == "01X"
+    assert parse_address("sites/s1/lists/l1/items/3/fields")["scope"] == "sites/s1/lists/l1"
+
+
+def test_fresh_hits_and_etag_revalidation(standin, make_client):
+    """Réponse fraîche servie sans appel, puis revalidée en 304"""
+    client = make_client(metadata_cache=MetadataCache())
+    first = client.get_json("drives/d/root:/Ref/a.txt", profile="listing")
+    assert client.get_json("drives/d/root:/ref/A.TXT", profile="listing") == first
+    assert len(gets(standin)) == 1
+
+    stale = make_client(metadata_cache=MetadataCache(fresh_seconds=0))
+    stale.get_json("drives/d/root:/Ref/a.txt")
+    response = stale.request("GET", "drives/d/root:/Ref/a.txt")
+    assert response.status_code == 200 and response.json()["name"] == "a.txt"
+    assert stale.metadata_cache.stats["revalidated"] == 1
+
+
+def test_negative_cache_then_invalidated_by_create(standin, make_client):
+    """Un dossier absent n'est pas revérifié ; sa création par le client invalide le 404"""
+    client = make_client(metadata_cache=MetadataCache())
+    assert client.request("GET", "drives/d/root:/Exports").status_code == 404
+    assert client.request("GET", "drives/d/root:/Exports").status_code == 404
+    assert len(gets(standin)) == 1
+    assert client.metadata_cache.stats["negative_hits"] == 1
+
+    client.request("POST", "drives/d/root/children",
+                   json={"name": "Exports", "folder": {}}).raise_for_status()
+    assert client.request("GET", "drives/d/root:/Exports").status_code == 200
+
+
+def test_writes_invalidate_related_entries_only(make_client):
+    """Upload et suppression $batch invalident le chemin écrit et ses parents, pas le reste"""
+    client = make_client(metadata_cache=MetadataCache())
+    client.get_json("drives/d/root:/Ref/a.txt")
+    client.get_json("drives/d/root:/Ref")
+    other = client.get_json("drives/d/root:/Autre/b.txt")
+
+    client.upload_content("d", "Ref/a.txt", b"plus long")
+    assert client.get_json("drives/d/root:/Ref/a.txt")["size"] == 9
+    assert client.get_json("drives/d/root:/Autre/b.txt") == other
+    assert client.metadata_cache.stats["hits"] == 1
+
+    results = client.batch([batch_request(f"drives/d/items/{other['id']}", method="DELETE")])
+    assert results[0]["status"] == 204
+    assert client.request("GET", "drives/d/root:/Autre/b.txt").status_code == 404
+
+
+def test_content_and_delta_are_not_cached(standin, make_client):
+    client = make_client(metadata_cache=MetadataCache())
+    for _ in range(2):
+        client.request("GET", "drives/d/root:/Ref/a.txt:/content")
+        client.get_json("drives/d/root/delta")
+    assert len(gets(standin)) == 4
+    summary = client.metadata_cache.summary()
+    assert summary["uncacheable"] == 4 and summary["lookups"] == 0
+
+
+def test_bulk_metadata_chatter_hit_ratio(standin, make_client):
+    """Vérifications répétées du même dossier pendant un traitement en masse"""
+    client = make_client(metadata_cache=MetadataCache())
+    for _ in range(50):
+        client.get_json("drives/d/root:/Ref", profile="ids_only", kind="item")
+        client.request("GET", "drives/d/root:/Manquant", profile="ids_only", kind="item")
+    summary = client.metadata_cache.summary()
+    assert len(gets(standin)) == 2
+    assert summary["hit_ratio"] == pytest.approx(98 / 100)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,71 @@
+"""
+Tests pour l'audit des permissions par $batch
+"""
+import pytest
+
+from permission_audit import (
+    PermissionAudit, diff_reports, permission_rows, read_report, write_report,
+)
+
+
+def grant(permission_id, app_name, roles=("read",)):
+    """Permission Sites.Selected accordée à une application"""
+    return {
+        "id": permission_id,
+        "roles": list(roles),
+        "grantedToIdentitiesV2": [
+            {"application": {"id": f"app-{app_name}", "displayName": app_name}}
+        ],
+    }
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Stand-in avec 45 sites, dont un de 250 permissions (pagination)"""
+    for i in range(45):
+        standin.add_site(f"site-{i}", f"Site{i}", permissions=[grant(f"p{i}", "DDASYS")],
+                         libraries={"Documents": [grant(f"lp{i}", "Export", ("write",))]})
+    standin.sites["site-0"]["permissions"] = [grant(f"p{n}", f"App{n}") for n in range(250)]
+    return standin
+
+
+def test_audit_uses_batch_pagination_and_etag_cache(standin, make_client, tmp_path):
+    """Lots $batch, pagination et réutilisation du cache ETag"""
+    cache = str(tmp_path / "cache.json")
+    sites = [f"site-{i}" for i in range(45)] + ["inconnu"]
+
+    report = PermissionAudit(make_client(), cache).run(sites)
+    assert report["sites"] == 45
+    assert report["failed_sites"] == ["inconnu"]
+    assert len(report["rows"]) == 250 + 44
+    # 46 résolutions + 45 permissions + 1 page suivante, par lots de 20
+    assert standin.request_log.count(("POST", "/v1.0/$batch")) == 3 + 3 + 1
+
+    standin.sites["site-3"]["permissions"].append(grant("p-new", "Nouvelle"))
+    audit = PermissionAudit(make_client(), cache)
+    second = audit.run(sites[:-1])
+    assert audit.stats["cache_hits"] == 44
+    assert len(second["rows"]) == len(report["rows"]) + 1
+
+
+def test_audit_libraries(make_client):
+    """Permissions au niveau des bibliothèques"""
+    report = PermissionAudit(make_client(), None, include_libraries=True).run(["site-1"])
+    scopes = {(row["scope"], row["library"], row["roles"]) for row in report["rows"]}
+    assert scopes == {("site", "", "read"), ("library", "Documents", "write")}
+
+
+def test_report_roundtrip_and_diff(tmp_path):
+    """Rapport CSV relu et comparaison entre deux audits"""
+    site = {"id": "s1", "displayName": "DDASYS", "webUrl": "https://t/sites/DDASYS"}
+    before = permission_rows(site, [grant("p1", "A"), grant("p2", "B")])
+    after = permission_rows(site, [grant("p1", "A", ("read", "write")), grant("p3", "C")])
+
+    path = str(tmp_path / "audit.csv")
+    write_report(before, path)
+    assert read_report(path) == before
+
+    diff = diff_reports(before, after)
+    assert [row["permission_id"] for row in diff["added"]] == ["p3"]
+    assert [row["permission_id"] for row in diff["removed"]] == ["p2"]
+    assert [row["roles"] for row in diff["changed"]] == ["read;write"]
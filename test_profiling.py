@@ -0,0 +1,89 @@
+"""
+Tests du profilage intégré aux scripts
+"""
+import json
+import sys
+import time
+import pytest
+
+import profiling
+from profiling import phase, profile_mode, run_profiled
+
+
+@pytest.fixture(autouse=True)
+def no_profile_env(monkeypatch):
+    """Profilage désactivé sauf demande explicite"""
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+
+
+def test_profile_mode_strips_flag():
+    """--profile est retiré des arguments avant argparse"""
+    argv = ["script.py", "--site", "x", "--profile=cprofile"]
+    assert profile_mode(argv) == "cprofile"
+    assert argv == ["script.py", "--site", "x"]
+
+    argv = ["script.py", "--profile"]
+    assert profile_mode(argv) == "sampling"
+    assert argv == ["script.py"]
+
+    assert profile_mode(["script.py"]) is None
+    with pytest.raises(ValueError):
+        profile_mode(["script.py", "--profile=inconnu"])
+
+
+def test_profile_mode_from_environment(monkeypatch):
+    """SHAREPOINT_PROFILE active le profilage sans toucher aux arguments"""
+    monkeypatch.setenv(profiling.PROFILE_ENV, "1")
+    assert profile_mode(["script.py"]) == "sampling"
+    monkeypatch.setenv(profiling.PROFILE_ENV, "cprofile")
+    assert profile_mode(["script.py"]) == "cprofile"
+    monkeypatch.setenv(profiling.PROFILE_ENV, "0")
+    assert profile_mode(["script.py"]) is None
+
+
+def test_nested_phases_split_self_time():
+    """Le temps des sous-phases est retiré du temps propre de la phase parente"""
+    timer = profiling.PhaseTimer()
+    with timer.measure("outer"):
+        time.sleep(0.02)
+        with timer.measure("inner"):
+            time.sleep(0.03)
+
+    outer, inner = timer.phases["outer"], timer.phases["inner"]
+    assert outer["total"] >= outer["self"] + inner["total"] - 1e-6
+    assert inner["self"] == pytest.approx(inner["total"])
+    assert [row["phase"] for row in timer.breakdown(1.0)] == ["inner", "outer"]
+
+
+@pytest.mark.parametrize("mode,suffix", [("sampling", ".folded"), ("cprofile", ".pstats")])
+def test_run_profiled_writes_profile_and_phases(monkeypatch, tmp_path, mode, suffix):
+    """Le point d'entrée écrit le profil et le découpage par phase"""
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(sys, "argv", ["mon_script.py", f"--profile={mode}"])
+
+    def main():
+        assert sys.argv == ["mon_script.py"]
+        with phase("http"):
+            time.sleep(0.05)
+        return 42
+
+    assert run_profiled(main) == 42
+    assert not profiling._timer.enabled
+    assert len(list(tmp_path.glob(f"mon_script-*{suffix}"))) == 1
+
+    report = json.loads(next(tmp_path.glob("mon_script-*-phases.json")).read_text())
+    assert report["mode"] == mode
+    assert report["phases"][0]["phase"] == "http"
+    assert report["phases"][0]["calls"] == 1
+
+
+def test_run_profiled_disabled_is_transparent(monkeypatch, tmp_path):
+    """Sans profilage, main est appelé directement et rien n'est écrit"""
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(sys, "argv", ["mon_script.py"])
+    assert run_profiled(lambda: "ok") == "ok"
+    assert not list(tmp_path.iterdir())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
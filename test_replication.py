@@ -0,0 +1,81 @@
+"""
+Tests de la réplication par copie serveur et du poller d'opérations longues
+"""
+import pytest
+
+from operation_poller import OperationFailed, OperationPoller
+from replication import Replicator
+
+CONTENT = b"export" * 50_000
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Trois bibliothèques, un dossier Exports dans la première"""
+    for drive_id in ("d1", "d2", "d3"):
+        standin.add_drive(drive_id)
+    standin.drives["d1"].ensure_folder("Exports")
+    return standin
+
+
+TARGETS = [
+    {"drive_id": "d1", "folder": "Exports"},
+    {"drive_id": "d2", "folder": "Rapports/2024"},
+    {"drive_id": "d3", "folder": ""},
+]
+
+
+def test_upload_once_then_copy(standin, make_client):
+    """Un seul upload, copies serveur vers les autres drives, dossiers manquants créés"""
+    client = make_client()
+    with OperationPoller(client.session, interval=0.01) as poller:
+        report = Replicator(client, poller).replicate_content(CONTENT, "export.xlsx", TARGETS)
+
+    assert (report["completed"], report["failed"]) == (3, 0)
+    assert (report["uploads"], report["copies"]) == (1, 2)
+    assert standin.bytes_received < len(CONTENT) + 10_000
+    for target in TARGETS:
+        drive = standin.drives[target["drive_id"]]
+        path = f"{target['folder']}/export.xlsx".lstrip("/")
+        assert drive.content_of(drive.resolve(path)) == CONTENT
+    assert [r["item_id"] for r in report["targets"]][1] == standin.drives["d2"].resolve(
+        "Rapports/2024/export.xlsx")
+    assert poller.stats["completed"] == 2
+    assert poller.stats["polls"] == 2 * (standin.copy_polls + 1)
+
+
+def test_per_target_failure_is_reported(standin, make_client):
+    """Un conflit dans une cible n'empêche pas les autres copies"""
+    standin.put_file("d3", "export.xlsx", b"ancien")
+    client = make_client()
+    with OperationPoller(client.session, interval=0.01) as poller:
+        report = Replicator(client, poller, conflict_behavior="fail").replicate_content(
+            CONTENT, "export.xlsx", TARGETS)
+
+    statuses = [r["status"] for r in report["targets"]]
+    assert statuses == ["completed", "completed", "failed"]
+    assert "existe déjà" in report["targets"][2]["error"]
+    drive = standin.drives["d3"]
+    assert drive.content_of(drive.resolve("export.xlsx")) == b"ancien"
+
+
+def test_poller_timeout_and_close(standin, make_client):
+    """Une opération trop longue échoue ; la fermeture libère les opérations en attente"""
+    standin.copy_polls = 1000
+    client = make_client()
+    source = client.upload_content("d1", "Exports/a.txt", b"a")
+
+    poller = OperationPoller(client.session, interval=0.01, max_interval=0.02, timeout=0.2)
+    replicator = Replicator(client, poller)
+    with pytest.raises(OperationFailed, match="non terminée"):
+        replicator.start_copy(source, {"drive_id": "d2", "folder": ""}, "a.txt").result(5)
+
+    poller.timeout = 60
+    pending = replicator.start_copy(source, {"drive_id": "d2", "folder": ""}, "a.txt")
+    poller.close()
+    with pytest.raises(OperationFailed):
+        pending.result(5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
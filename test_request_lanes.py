@@ -0,0 +1,89 @@
+"""
+Tests des classes de priorité des requêtes Graph
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from unittest.mock import Mock
+
+from request_lanes import LaneScheduler, current_lane, priority
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Service limité à 4 requêtes simultanées, écritures de 100 ms"""
+    standin.add_drive("d").ensure_folder("Bulk")
+    standin.put_file("d", "Ref/a.txt", b"a", notify=False)
+    standin.capacity = threading.Semaphore(4)
+    standin.write_latency = 0.1
+    return standin
+
+
+def interactive_latencies(client, uploads=48, checks=8):
+    """Vérifications de dossier pendant un upload en masse sur 12 threads"""
+    latencies = []
+
+    def bulk(i):
+        with priority("bulk"):
+            client.upload_content("d", f"Bulk/f{i}.bin", b"x" * 1000)
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        futures = [executor.submit(bulk, i) for i in range(uploads)]
+        time.sleep(0.15)
+        with priority("interactive"):
+            for _ in range(checks):
+                started = time.perf_counter()
+                client.request("GET", "drives/d/root:/Ref").raise_for_status()
+                latencies.append(time.perf_counter() - started)
+                time.sleep(0.02)
+        for future in futures:
+            future.result()
+    return latencies
+
+
+def test_interactive_stays_fast_during_bulk(make_client):
+    """Sans lanes, la vérification attend derrière les PUT ; avec, le bulk laisse de la place"""
+    baseline = interactive_latencies(make_client())
+    assert max(baseline) > 0.05
+
+    lanes = LaneScheduler(shares={"bulk": 3})
+    latencies = interactive_latencies(make_client(lanes=lanes))
+    assert max(latencies) < 0.05
+    metrics = {lane["lane"]: lane for lane in lanes.metrics()}
+    assert metrics["bulk"]["requests"] == 48 and metrics["interactive"]["requests"] == 8
+    assert metrics["interactive"]["p99"] < metrics["bulk"]["p50"]
+    assert metrics["bulk"]["wait_p99"] > 0.1
+
+
+def test_throttling_pauses_lower_priority_lanes():
+    """Un 429 en normal suspend normal et bulk, pas interactive"""
+    lanes = LaneScheduler()
+    ticket = lanes.acquire("normal")
+    lanes.release(ticket, Mock(status_code=429, headers={"Retry-After": "5"}))
+    assert lanes.paused_for("bulk") > 4 and lanes.paused_for("normal") > 4
+    assert lanes.paused_for("interactive") == 0
+
+    lanes.release(lanes.acquire("interactive", timeout=0.01), Mock(status_code=200))
+    with pytest.raises(TimeoutError):
+        lanes.acquire("bulk", timeout=0.05)
+
+
+def test_rate_budget_and_context():
+    """Débit plafonné par classe ; la classe suit le contexte courant"""
+    lanes = LaneScheduler(rates={"bulk": 20})
+    started = time.monotonic()
+    with priority("bulk"):
+        assert current_lane() == "bulk"
+        for _ in range(5):
+            lanes.release(lanes.acquire(), Mock(status_code=200))
+    assert time.monotonic() - started >= 0.15
+    assert current_lane() == "normal"
+    assert {m["lane"]: m["requests"] for m in lanes.metrics()}["bulk"] == 5
+    with pytest.raises(ValueError, match="inconnue"):
+        LaneScheduler(shares={"urgent": 2})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,119 @@
+"""
+Tests du nettoyage par règles de rétention
+"""
+import time
+
+import pytest
+
+from drive_index import DriveIndex
+from retention_cleanup import (
+    TEST_ARTIFACT_POLICY,
+    CleanupEngine,
+    normalize_policy,
+    run_scheduled,
+    select_candidates,
+)
+
+NOW = time.time()
+DAY = 86400
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Dossier Tests : 60 anciens fichiers de test, 3 récents et un fichier à garder"""
+    drive = standin.add_drive("d")
+    folder_id = drive.ensure_folder("Tests")
+    drive.add_files_bulk(folder_id, [(f"test-final-202401{i:02d}-120000.txt", 100)
+                                     for i in range(60)], mtime=NOW - 30 * DAY)
+    drive.add_files_bulk(folder_id, [(f"test-final-recent-{i}.txt", 100) for i in range(3)],
+                         mtime=NOW - 60)
+    drive.add_files_bulk(folder_id, [("rapport.xlsx", 5000)], mtime=NOW - 90 * DAY)
+    return standin
+
+
+def remaining(standin):
+    drive = standin.drives["d"]
+    return sorted(drive.children[drive.resolve("Tests")])
+
+
+def test_select_candidates():
+    """Motifs, taille, keep_latest et âge ; dossiers et dates inconnues conservés"""
+    entries = [
+        {"id": "1", "path": "a/x-1.txt", "name": "x-1.txt", "size": 10, "mtime": NOW - 10 * DAY,
+         "is_folder": False},
+        {"id": "2", "path": "a/x-2.txt", "name": "X-2.TXT", "size": 10, "mtime": NOW - 9 * DAY,
+         "is_folder": False},
+        {"id": "3", "path": "a/x-3.txt", "name": "x-3.txt", "size": 10, "mtime": NOW - 1 * DAY,
+         "is_folder": False},
+        {"id": "4", "path": "a/x-4.txt", "name": "x-4.txt", "size": 10, "mtime": None,
+         "is_folder": False},
+        {"id": "5", "path": "a/x-5.txt", "name": "x-5.txt", "size": 0, "mtime": NOW - 99 * DAY,
+         "is_folder": True},
+        {"id": "6", "path": "a/x-6.txt", "name": "x-6.txt", "size": 9000, "mtime": NOW - 99 * DAY,
+         "is_folder": False},
+    ]
+    policy = normalize_policy({"patterns": ["x-*.txt"], "older_than_days": 7, "keep_latest": 1,
+                               "max_size": 1000})
+    assert [e["id"] for e in select_candidates(entries, policy, NOW)] == ["1", "2"]
+
+    with pytest.raises(ValueError, match="sans critère"):
+        normalize_policy({"folder": "a"})
+    with pytest.raises(ValueError, match="inconnues"):
+        normalize_policy({"patterns": ["*.txt"], "age": 3})
+
+
+def test_artifact_policy_covers_test_scripts():
+    """Chaque fichier horodaté écrit par un script de test relève de la règle intégrée"""
+    names = [
+        "test-final-20240101-120000.txt", "test-excel-20240101-120000.xlsx",
+        "test-personal-identity-20240101-120000.txt", "test-simple-20240101-120000.txt",
+        "test-graph-api-20240101-120000.txt", "test-rest-api-20240101-120000.txt",
+        "test_from_aci_20240101_120000.txt", "test_perso_20240101_120000.txt",
+        "test_aci_20240101_120000.txt", "test_with_ids_20240101_120000.txt",
+        "test_sharepoint_ddasys_20240101_120000.xlsx",
+    ]
+    entries = [{"id": str(i), "path": name, "name": name, "size": 10, "mtime": NOW - 30 * DAY,
+                "is_folder": False} for i, name in enumerate(names + ["rapport.xlsx"])]
+    policy = normalize_policy(dict(TEST_ARTIFACT_POLICY, keep_latest=0))
+    assert sorted(e["name"] for e in select_candidates(entries, policy, NOW)) == sorted(names)
+
+
+def test_dry_run_then_batched_delete(standin, make_client):
+    """Simulation sans suppression, puis suppression par $batch malgré le throttling"""
+    client = make_client()
+    engine = CleanupEngine(client, "d", concurrency=2)
+    policies = [normalize_policy(dict(TEST_ARTIFACT_POLICY, folder="Tests"))]
+
+    dry = engine.run(policies, dry_run=True)
+    assert dry["policies"][0]["candidates"] == 58
+    assert dry["deleted"] == 0 and len(remaining(standin)) == 64
+
+    standin.request_log.clear()
+    standin.throttle_writes = 7
+    report = engine.run(policies)
+    assert (report["deleted"], report["failed"]) == (58, 0)
+    assert report["policies"][0]["requests"] == 3
+    assert not [entry for entry in standin.request_log if entry[0] == "DELETE"]
+    names = remaining(standin)
+    assert len(names) == 6
+    assert "rapport.xlsx" in names
+    assert sum(name.startswith("test-final-recent") for name in names) == 3
+
+
+def test_index_source_and_schedule(standin, make_client, tmp_path):
+    """Candidats lus dans l'index synchronisé, index mis à jour après suppression"""
+    client = make_client()
+    with DriveIndex(str(tmp_path / "index.sqlite")) as index:
+        engine = CleanupEngine(client, "d", index=index, max_deletes=50)
+        policies = [normalize_policy({"folder": "Tests", "patterns": ["test-final-2024*"],
+                                      "older_than_days": 7})]
+
+        reports = run_scheduled(engine, policies, interval=0, source="index", iterations=2)
+        assert reports[0]["policies"][0]["capped"]
+        assert [r["deleted"] for r in reports] == [50, 10]
+        assert len(index.list_prefix("d", "Tests")) == 4
+    assert len(remaining(standin)) == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,181 @@
+"""
+Tests de l'expédition de journaux par segments
+"""
+import gzip
+import io
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from segment_shipper import SegmentShipper, reassemble
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    standin.add_drive("d")
+    return standin
+
+
+def remote_index(standin):
+    drive = standin.drives["d"]
+    return json.loads(drive.content_of(drive.resolve("Logs/app/index.json")))
+
+
+def test_size_rolling_and_reassembly(standin, make_client, tmp_path):
+    """Segments clos par taille, index ordonné, flux reconstitué à l'identique"""
+    client = make_client()
+    lines = b"".join(f"{i},mesure,{i * 7}\n".encode() for i in range(5000))
+    with SegmentShipper(client, "d", "Logs", "app", max_bytes=20_000,
+                        spool_dir=str(tmp_path)) as shipper:
+        assert shipper.ship_stream(io.BytesIO(lines)) == len(lines)
+
+    index = remote_index(standin)
+    assert [s["seq"] for s in index["segments"]] == list(range(1, len(index["segments"]) + 1))
+    assert len(index["segments"]) >= len(lines) // 20_000
+    assert sum(s["raw_bytes"] for s in index["segments"]) == len(lines)
+    assert all(s["compressed_bytes"] < s["raw_bytes"] for s in index["segments"])
+    assert not list((tmp_path / "app").glob("*.gz"))
+
+    destination = io.BytesIO()
+    result = reassemble(client, "d", "Logs", "app", destination)
+    assert destination.getvalue() == lines
+    assert result["segments"] == len(index["segments"])
+
+    # Les membres gzip concaténés forment aussi un fichier gzip valide
+    drive = standin.drives["d"]
+    raw = b"".join(drive.content_of(drive.resolve(f"Logs/app/{s['file']}"))
+                   for s in index["segments"])
+    assert gzip.decompress(raw) == lines
+
+
+def test_time_rolling_and_failed_upload_retried_in_order(standin, make_client, tmp_path):
+    """Segment clos par âge ; un upload refusé reste en attente et part avant le suivant"""
+    client = make_client()
+    shipper = SegmentShipper(client, "d", "Logs", "app", max_seconds=60,
+                             spool_dir=str(tmp_path))
+    shipper.write(b"premier\n")
+    assert not shipper.poll(now=shipper._opened_at + 10)
+    standin.throttle_writes = 1000
+    assert shipper.poll(now=shipper._opened_at + 61)
+    assert [s["seq"] for s in shipper.state["pending"]] == [1]
+    assert shipper.stats["upload_failures"] == 1
+
+    standin.throttle_writes = 0
+    shipper.write(b"second\n")
+    shipper.close()
+    assert shipper.state["pending"] == []
+    assert [s["seq"] for s in remote_index(standin)["segments"]] == [1, 2]
+
+    destination = io.BytesIO()
+    reassemble(client, "d", "Logs", "app", destination)
+    assert destination.getvalue() == b"premier\nsecond\n"
+
+
+def test_tail_resumes_without_duplicates(standin, make_client, tmp_path):
+    """Lignes complètes seulement ; reprise après redémarrage, troncature et rotation"""
+    client = make_client()
+    log = tmp_path / "app.log"
+    spool = str(tmp_path / "spool")
+    log.write_bytes(b"a\nb\nincompl")
+
+    shipper = SegmentShipper(client, "d", "Logs", "app", spool_dir=spool)
+    assert shipper.tail_once(str(log)) == 4
+    shipper.close()
+
+    with open(log, "ab") as f:
+        f.write(b"et\nc\n")
+    restarted = SegmentShipper(client, "d", "Logs", "app", spool_dir=spool)
+    assert restarted.tail_once(str(log)) == len(b"incomplet\nc\n")
+    assert restarted.tail_once(str(log)) == 0
+
+    log.write_bytes(b"d\n")
+    assert restarted.tail_once(str(log)) == 2
+    os.rename(log, tmp_path / "app.log.1")
+    log.write_bytes(b"rotated line\n")
+    assert restarted.tail_once(str(log)) == len(b"rotated line\n")
+    restarted.close()
+
+    destination = io.BytesIO()
+    reassemble(client, "d", "Logs", "app", destination)
+    assert destination.getvalue() == b"a\nb\nincomplet\nc\nd\nrotated line\n"
+
+    # Sans état local, la numérotation reprend après l'index distant
+    fresh = SegmentShipper(client, "d", "Logs", "app", spool_dir=str(tmp_path / "other"))
+    assert fresh.state["next_seq"] == len(remote_index(standin)["segments"]) + 1
+
+
+def test_tail_lines_longer_than_a_read_block(make_client, tmp_path):
+    """Une ligne de 70 Ko passe ; une ligne sans fin au-delà de max_bytes aussi"""
+    client = make_client()
+    log = tmp_path / "app.log"
+    long_line = b"x" * 70_000 + b"\n"
+    log.write_bytes(long_line + b"court\n" + b"y" * 70_000)
+    shipper = SegmentShipper(client, "d", "Logs", "app", max_bytes=100_000,
+                             spool_dir=str(tmp_path / "spool"))
+    assert shipper.tail_once(str(log)) == len(long_line) + len(b"court\n")
+    assert shipper.tail_once(str(log)) == 0
+
+    with open(log, "ab") as f:
+        f.write(b"y" * 40_000)
+    assert shipper.tail_once(str(log)) == 110_000
+    shipper.close()
+
+    destination = io.BytesIO()
+    reassemble(client, "d", "Logs", "app", destination)
+    assert destination.getvalue() == long_line + b"court\n" + b"y" * 110_000
+
+
+def test_crash_loses_nothing(make_client, tmp_path):
+    """Arrêt brutal avec un segment ouvert : relu depuis le fichier, ou récupéré du spool"""
+    client = make_client()
+    log = tmp_path / "app.log"
+    spool = str(tmp_path / "spool")
+    log.write_bytes(b"line1\nline2\n")
+    crashed = SegmentShipper(client, "d", "Logs", "app", spool_dir=spool)
+    crashed.tail_once(str(log))
+    assert json.loads((tmp_path / "spool" / "app" / "state.json").read_text())["tail"]["offset"] == 0
+
+    with open(log, "ab") as f:
+        f.write(b"line3\n")
+    restarted = SegmentShipper(client, "d", "Logs", "app", spool_dir=spool)
+    restarted.tail_once(str(log))
+    restarted.close()
+    destination = io.BytesIO()
+    reassemble(client, "d", "Logs", "app", destination)
+    assert destination.getvalue() == b"line1\nline2\nline3\n"
+
+    lines = b"".join(f"{i},{i * i}\n".encode() for i in range(200_000))
+    crashed = SegmentShipper(client, "d", "Logs", "csv", spool_dir=spool)
+    crashed.write(lines)
+    restarted = SegmentShipper(client, "d", "Logs", "csv", spool_dir=spool)
+    restarted.close()
+    destination = io.BytesIO()
+    reassemble(client, "d", "Logs", "csv", destination)
+    recovered = destination.getvalue()
+    assert recovered and lines.startswith(recovered)
+
+
+def test_idle_stream_rolls_on_time(standin, make_client, tmp_path):
+    """Un flux sans nouvelles données clôt quand même son segment après max_seconds"""
+    client = make_client()
+    shipper = SegmentShipper(client, "d", "Logs", "app", max_seconds=0.2,
+                             spool_dir=str(tmp_path))
+    read_end, write_end = os.pipe()
+    os.write(write_end, b"en attente\n")
+    with open(read_end, "rb") as stream:
+        thread = threading.Thread(target=shipper.ship_stream, args=(stream,))
+        thread.start()
+        deadline = time.time() + 5
+        while not shipper.stats["segments"] and time.time() < deadline:
+            time.sleep(0.05)
+        assert shipper.stats["segments"] == 1
+        os.close(write_end)
+        thread.join()
+    assert [s["raw_bytes"] for s in remote_index(standin)["segments"]] == [11]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
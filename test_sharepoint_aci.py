@@ -10,6 +10,7 @@ import requests
 from datetime import datetime
 from azure.identity import ManagedIdentityCredential
 import json
+from profiling import run_profiled
 
 def test_sharepoint_from_aci():
     """Test d'écriture SharePoint depuis ACI avec User Assigned Identity."""
@@ -272,4 +273,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    run_profiled(main)
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Tests pour le regroupement des petits fichiers
+"""
+import pytest
+from sharepoint_bundler import (
+    BundleUploadError,
+    SmallFileBundler,
+    extract_from_bundle,
+    read_bundle_index,
+)
+
+
+class TestSmallFileBundler:
+    """Tests pour la classe SmallFileBundler"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.uploads = []
+
+    def fake_upload(self, content, filename, content_type):
+        """Upload simulé qui mémorise les archives envoyées"""
+        self.uploads.append((content, filename, content_type))
+        return f"https://test.sharepoint.com/{filename}"
+
+    def test_small_files_are_bundled_in_one_request(self, tmp_path):
+        """Test de regroupement de plusieurs fichiers en une archive"""
+        bundler = SmallFileBundler(
+            self.fake_upload, index_path=str(tmp_path / "index.json")
+        )
+        for i in range(10):
+            assert bundler.add(f"file-{i}.txt", f"contenu {i}".encode()) is not None
+        bundler.flush()
+
+        assert len(self.uploads) == 1
+        archive, _, content_type = self.uploads[0]
+        assert content_type == "application/zip"
+        assert extract_from_bundle(archive, "file-3.txt") == b"contenu 3"
+        assert "file-9.txt" in read_bundle_index(archive)
+
+        report = bundler.report()
+        assert report["requests_saved"] == 9
+        assert report["reduction_percent"] == 90.0
+
+    def test_large_file_is_rejected(self):
+        """Test du refus des fichiers au-dessus du seuil"""
+        bundler = SmallFileBundler(self.fake_upload, size_threshold=10, index_path=None)
+        assert bundler.add("big.txt", b"x" * 11) is None
+        assert bundler.report()["files_rejected"] == 1
+
+    def test_max_files_triggers_flush(self):
+        """Test de l'envoi automatique quand le lot est plein"""
+        bundler = SmallFileBundler(
+            self.fake_upload, max_bundle_files=3, archive_format="tar", index_path=None
+        )
+        for i in range(7):
+            bundler.add(f"f{i}.txt", b"data")
+        bundler.flush()
+
+        assert len(self.uploads) == 3
+        assert extract_from_bundle(self.uploads[2][0], "f6.txt", "tar") == b"data"
+
+    def test_index_is_persisted_and_lookup_works(self, tmp_path):
+        """Test de la persistance de l'index et de la recherche"""
+        index_path = str(tmp_path / "index.json")
+        with SmallFileBundler(self.fake_upload, index_path=index_path) as bundler:
+            bundler.add("a.txt", b"abc")
+
+        reloaded = SmallFileBundler(self.fake_upload, index_path=index_path)
+        found = reloaded.lookup("a.txt")
+        assert found["size"] == 3
+        assert found["url"].endswith(".zip")
+
+    def test_failed_upload_is_reported_and_kept(self):
+        """Test de l'échec d'upload : remonté à l'appelant, archive conservée"""
+        bundler = SmallFileBundler(lambda *args: None, index_path=None)
+        reference = bundler.add("a.txt", b"abc")
+        with pytest.raises(BundleUploadError) as error:
+            bundler.flush()
+        assert error.value.bundles == [reference.split("#")[0]]
+        assert bundler.report()["bundles_failed"] == 1
+        assert bundler.report()["bundles_pending"] == 1
+        assert bundler.lookup(reference) is None
+
+    def test_failed_bundles_are_not_resent_on_every_add(self):
+        """Test du plafond des archives en échec, sans renvoi à chaque ajout"""
+        calls = []
+        bundler = SmallFileBundler(lambda *args: calls.append(args), max_bundle_files=3,
+                                   max_spooled_bundles=2, index_path=None)
+        references = [bundler.add(f"f{i}.txt", b"data") for i in range(10)]
+        assert all(references[:6])
+        assert references[6:] == [None] * 4
+        assert len(calls) == 2
+        assert bundler.pending_bundles() == sorted({r.split("#")[0] for r in references[:6]})
+        assert bundler.report()["files_spilled"] == 4
+
+    def test_retry_with_backoff_and_after_restart(self, tmp_path, monkeypatch):
+        """Test du nouvel essai différé, puis de la reprise des archives sur disque"""
+        clock = [1000.0]
+        monkeypatch.setattr("sharepoint_bundler.time.monotonic", lambda: clock[0])
+        index_path = str(tmp_path / "index.json")
+        outage = SmallFileBundler(lambda *args: None, index_path=index_path,
+                                  retry_base_seconds=30)
+        first = outage.add("a.txt", b"abc")
+        with pytest.raises(BundleUploadError):
+            outage.flush()
+        outage.upload_func = self.fake_upload
+        clock[0] += 10
+        assert outage.flush_if_due() is None
+        assert self.uploads == []
+
+        clock[0] += 30
+        outage.flush_if_due()
+        assert outage.lookup(first)["size"] == 3
+        assert not list((tmp_path / "index.spool").iterdir())
+
+        outage.upload_func = lambda *args: None
+        second = outage.add("b.txt", b"de")
+        with pytest.raises(BundleUploadError):
+            outage.flush()
+        restarted = SmallFileBundler(self.fake_upload, index_path=index_path)
+        assert restarted.pending_bundles() == [second.split("#")[0]]
+        restarted.flush()
+        assert restarted.lookup(second)["size"] == 2
+        assert extract_from_bundle(self.uploads[-1][0], "b.txt") == b"de"
+
+    def test_duplicate_names_in_a_lot_are_renamed(self):
+        """Test du renommage d'un nom déjà présent dans le lot"""
+        bundler = SmallFileBundler(self.fake_upload, index_path=None)
+        bundler.add("rapport.txt", b"v1")
+        renamed = bundler.add("rapport.txt", b"v2")
+        bundler.flush()
+        assert renamed.endswith("#rapport (2).txt")
+        archive = self.uploads[0][0]
+        assert extract_from_bundle(archive, "rapport.txt") == b"v1"
+        assert extract_from_bundle(archive, "rapport (2).txt") == b"v2"
+        assert bundler.lookup(renamed)["size"] == 2
+
+    def test_same_name_in_several_bundles(self, tmp_path):
+        """Test de l'index quand un même nom figure dans plusieurs archives"""
+        index_path = str(tmp_path / "index.json")
+        bundler = SmallFileBundler(self.fake_upload, index_path=index_path)
+        first = bundler.add("rapport.txt", b"v1")
+        bundler.flush()
+        second = bundler.add("rapport.txt", b"version 2")
+        bundler.flush()
+
+        reloaded = SmallFileBundler(self.fake_upload, index_path=index_path)
+        assert reloaded.lookup("rapport.txt")["bundle"] == second.split("#")[0]
+        assert reloaded.lookup(first)["size"] == 2
+        assert reloaded.lookup(second)["size"] == 9
+        assert reloaded.lookup("rapport.txt", "inconnu.zip") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
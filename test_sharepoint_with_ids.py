@@ -10,6 +10,9 @@ from datetime import datetime
 from azure.identity import AzureCliCredential
 from dotenv import load_dotenv
 
+from drive_index import DriveIndex
+from profiling import run_profiled
+
 # Chargement de la configuration
 load_dotenv('config.env')
 
@@ -129,9 +132,15 @@ Test effectué avec Azure CLI et l'API Microsoft Graph.
             # Si erreur dossier, essayer de créer le dossier d'abord
             if response.status_code == 404 and folder_path:
                 print(f"   🔧 Tentative de création du dossier...")
-                return create_folder_and_retry(
-                    drive_id, folder_path, filename, content, headers
-                )
+                index_path = os.getenv("SHAREPOINT_INDEX_PATH")
+                index = DriveIndex(index_path) if index_path else None
+                try:
+                    return create_folder_and_retry(
+                        drive_id, folder_path, filename, content, headers, index=index
+                    )
+                finally:
+                    if index:
+                        index.close()
         
         return False
         
@@ -140,8 +149,14 @@ Test effectué avec Azure CLI et l'API Microsoft Graph.
         return False
 
 
-def create_folder_and_retry(drive_id, folder_path, filename, content, headers):
-    """Crée le dossier s'il n'existe pas et retry l'upload."""
+def create_folder_and_retry(drive_id, folder_path, filename, content, headers,
+                            index=None):
+    """
+    Crée le dossier s'il n'existe pas et retry l'upload.
+    
+    Si un index local (DriveIndex) est fourni, l'existence des dossiers est
+    vérifiée localement et les listings/créations alimentent l'index.
+    """
     try:
         # Séparer les composants du chemin
         path_parts = [p.strip() for p in folder_path.split('/') if p.strip()]
@@ -156,19 +171,26 @@ def create_folder_and_retry(drive_id, folder_path, filename, content, headers):
             else:
                 parent_path = "/root"
             
-            # Vérifier si le dossier existe
-            check_url = (f"https://graph.microsoft.com/v1.0/drives/{drive_id}"
-                        f"{parent_path}/children")
+            part_path = f"{current_path}/{part}" if current_path else part
             
-            response = requests.get(check_url, headers=headers)
+            # Vérifier si le dossier existe (index local d'abord)
+            indexed = index.lookup_path(drive_id, part_path) if index else None
+            folder_exists = bool(indexed and indexed['is_folder'])
             
-            folder_exists = False
-            if response.status_code == 200:
-                items = response.json().get('value', [])
-                folder_exists = any(
-                    item.get('name') == part and 'folder' in item 
-                    for item in items
-                )
+            if not folder_exists:
+                check_url = (f"https://graph.microsoft.com/v1.0/drives/{drive_id}"
+                            f"{parent_path}/children")
+                
+                response = requests.get(check_url, headers=headers)
+                
+                if response.status_code == 200:
+                    items = response.json().get('value', [])
+                    if index:
+                        index.upsert_items(drive_id, items)
+                    folder_exists = any(
+                        item.get('name') == part and 'folder' in item 
+                        for item in items
+                    )
             
             if not folder_exists:
                 # Créer le dossier
@@ -188,6 +210,8 @@ def create_folder_and_retry(drive_id, folder_path, filename, content, headers):
                 )
                 
                 if response.status_code in [200, 201]:
+                    if index:
+                        index.upsert_items(drive_id, [response.json()])
                     print(f"   ✅ Dossier créé: {part}")
                 else:
                     print(f"   ⚠️  Erreur création dossier {part}: "
@@ -252,4 +276,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    run_profiled(main)
\ No newline at end of file
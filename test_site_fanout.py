@@ -0,0 +1,106 @@
+"""
+Tests pour l'exécution multi-sites
+"""
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from site_fanout import SiteFanout, SiteResolver, site_graph_path, upload_operation
+
+
+def test_site_graph_path():
+    """Test de la conversion URL/ID de site en chemin Graph"""
+    assert (site_graph_path("https://t.sharepoint.com/sites/DDASYS/")
+            == "sites/t.sharepoint.com:/sites/DDASYS")
+    assert site_graph_path("t.sharepoint.com,1,2") == "sites/t.sharepoint.com,1,2"
+
+
+class TestSiteFanout:
+    """Tests pour la classe SiteFanout"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.client = Mock()
+        self.client.get_json.side_effect = lambda path, **kwargs: (
+            {"id": f"drive-of-{path}"} if path.endswith("/drive")
+            else {"id": path.split("/")[-1], "displayName": "Site"}
+        )
+
+    def test_resolver_uses_cache(self, tmp_path):
+        """Test du cache de résolution des sites"""
+        cache_path = str(tmp_path / "sites.json")
+        target = SiteResolver(self.client, cache_path).resolve("site-a")
+        assert target["drive_id"] == "drive-of-sites/site-a/drive"
+
+        self.client.get_json.reset_mock()
+        SiteResolver(self.client, cache_path).resolve("site-a")
+        self.client.get_json.assert_not_called()
+
+    def test_run_aggregates_results_and_errors(self):
+        """Test du rapport agrégé"""
+        def operation(client, target, work_item):
+            if target["site"] == "site-b":
+                raise RuntimeError("403 Forbidden")
+            return {"file": work_item}
+
+        fanout = SiteFanout(self.client, resolver=SiteResolver(self.client, None))
+        report = fanout.run(["site-a", "site-b", "site-c"], operation, ["f1", "f2"])
+
+        assert report["tasks"] == 6
+        assert report["succeeded"] == 4
+        assert report["failed_sites"] == ["site-b"]
+
+    def test_per_site_concurrency_cap(self):
+        """Test de la limite de concurrence par site"""
+        running, peak, lock = {}, {}, threading.Lock()
+
+        def operation(client, target, work_item):
+            site = target["site"]
+            with lock:
+                running[site] = running.get(site, 0) + 1
+                peak[site] = max(peak.get(site, 0), running[site])
+            time.sleep(0.01)
+            with lock:
+                running[site] -= 1
+
+        fanout = SiteFanout(self.client, max_workers=8, per_site_concurrency=2,
+                            resolver=SiteResolver(self.client, None))
+        fanout.run(["site-a", "site-b"], operation, list(range(8)))
+
+        assert max(peak.values()) <= 2
+
+    def test_busy_site_does_not_block_others(self):
+        """Un site chargé n'occupe pas tous les workers : les autres sites avancent"""
+        finished = {}
+
+        def operation(client, target, work_item):
+            time.sleep(0.05 if target["site"] == "busy" else 0.0)
+            finished.setdefault(target["site"], time.perf_counter())
+
+        session = Mock()
+        self.client.session = session
+        fanout = SiteFanout(self.client, max_workers=4, per_site_concurrency=1,
+                            resolver=SiteResolver(self.client, None))
+        started = time.perf_counter()
+        report = fanout.run(["busy", "idle"], operation, list(range(6)))
+
+        assert finished["idle"] - started < 0.05
+        busy = next(entry for entry in report["per_site"] if entry["site"] == "busy")
+        assert busy["seconds"] < 0.05 * 6 * 1.5
+        session.mount.assert_not_called()
+
+
+def test_upload_operation_streams_large_files(standin, make_client, tmp_path):
+    """Upload au-delà de 4 Mo par session d'upload, sans PUT simple"""
+    path = tmp_path / "gros.bin"
+    path.write_bytes(b"z" * (5 * 1024 * 1024))
+    drive = standin.add_drive("d")
+    drive.ensure_folder("Partage")
+    result = upload_operation("Partage")(make_client(), {"drive_id": "d"}, str(path))
+    assert result["size"] == 5 * 1024 * 1024
+    assert drive.content_of(drive.resolve("Partage/gros.bin")) == path.read_bytes()
+    assert any("createUploadSession" in url for _, url in standin.request_log)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,169 @@
+"""
+Tests du planificateur de transferts
+"""
+import os
+import sys
+import time
+import pytest
+
+from drive_index import DriveIndex, sync_delta
+from graph_client import SIMPLE_UPLOAD_LIMIT, UPLOAD_CHUNK_SIZE
+import transfer_planner
+from transfer_planner import (
+    TransferPlanner,
+    estimate,
+    execute_plan,
+    fit_throughput,
+    load_plan,
+    save_plan,
+    upload_request_count,
+)
+
+
+@pytest.fixture(name="source")
+def fixture_source(tmp_path):
+    """Arborescence locale : deux dossiers imbriqués et un fichier à la racine"""
+    root = tmp_path / "source"
+    (root / "A" / "B").mkdir(parents=True)
+    (root / "C").mkdir()
+    (root / "racine.txt").write_bytes(b"r" * 10)
+    (root / "A" / "a.txt").write_bytes(b"a" * 20)
+    (root / "A" / "B" / "b.txt").write_bytes(b"b" * 30)
+    (root / "C" / "c.txt").write_bytes(b"c" * 40)
+    return root
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    """Stand-in avec une destination partiellement peuplée"""
+    drive = standin.add_drive("d")
+    standin.put_file("d", "Dest/A/a.txt", b"a" * 20, notify=False)
+    standin.put_file("d", "Dest/C/c.txt", b"ancien", notify=False)
+    drive.ensure_folder("Dest/racine.txt")
+    return standin
+
+
+def actions(plan):
+    return {op["path"]: op["action"] for op in plan["operations"]}
+
+
+def test_upload_request_count():
+    """PUT simple jusqu'à 4 Mo, puis session et fragments"""
+    assert upload_request_count(0) == 1
+    assert upload_request_count(SIMPLE_UPLOAD_LIMIT) == 1
+    assert upload_request_count(SIMPLE_UPLOAD_LIMIT + 1) == 1 + 2
+    assert upload_request_count(10 * UPLOAD_CHUNK_SIZE) == 11
+
+
+def test_plan_from_listing(source, make_client):
+    """Le plan distingue création, upload, remplacement, identique et conflit"""
+    client = make_client()
+    planner = TransferPlanner("d", "Dest", throughput_path=None)
+    plan = planner.plan(client, str(source), "listing")
+
+    assert actions(plan) == {
+        "Dest/A/B": "create_folder",
+        "Dest/A/a.txt": "skip",
+        "Dest/A/B/b.txt": "upload",
+        "Dest/C/c.txt": "overwrite",
+        "Dest/racine.txt": "conflict",
+    }
+    # Racine, A et C listés ; A/B absent n'est pas listé
+    assert plan["discovery_requests"] == 3
+    assert plan["summary"]["operations"]["upload"] == 1
+    assert plan["estimate"]["requests"] == 1 + 2
+    assert plan["estimate"]["bytes"] == 70
+
+
+def test_plan_from_index_matches_listing(source, make_client):
+    """L'index synchronisé par delta donne le même plan sans lister les dossiers"""
+    client = make_client()
+    planner = TransferPlanner("d", "Dest", throughput_path=None)
+    index = DriveIndex(":memory:")
+    sync_delta(client, index, "d")
+
+    from_index = planner.plan(None, str(source), "index", index)
+    assert actions(from_index) == actions(planner.plan(client, str(source), "listing"))
+    assert from_index["discovery_requests"] == 0
+
+
+def test_plan_from_index_then_execute(source, standin, make_client, tmp_path, monkeypatch):
+    """plan --remote index --execute : planifié sans client, exécuté avec"""
+    client = make_client()
+    db = str(tmp_path / "index.sqlite")
+    index = DriveIndex(db)
+    sync_delta(client, index, "d")
+    index.close()
+
+    monkeypatch.setattr(transfer_planner, "_client", lambda: client)
+    monkeypatch.setattr(sys, "argv", [
+        "transfer_planner.py", "plan", str(tmp_path / "plan.json"), "--drive-id", "d",
+        "--source", str(source), "--dest", "Dest", "--remote", "index", "--db", db,
+        "--throughput", str(tmp_path / "debit.json"), "--execute",
+    ])
+    transfer_planner.main()
+    drive = standin.drives["d"]
+    assert drive.content_of(drive.resolve("Dest/A/B/b.txt")) == b"b" * 30
+
+
+def test_policies(source, make_client):
+    """always remplace tout fichier existant, never n'en remplace aucun"""
+    client = make_client()
+    always = TransferPlanner("d", "Dest", "always", None).plan(client, str(source))
+    never = TransferPlanner("d", "Dest", "never", None).plan(client, str(source))
+    assert actions(always)["Dest/A/a.txt"] == "overwrite"
+    assert actions(never)["Dest/C/c.txt"] == "skip"
+
+    newer = time.time() + 3600
+    os.utime(source / "A" / "a.txt", (newer, newer))
+    changed = TransferPlanner("d", "Dest", throughput_path=None).plan(client, str(source))
+    assert actions(changed)["Dest/A/a.txt"] == "overwrite"
+
+
+def test_execute_saved_plan_without_rediscovery(source, standin, make_client, tmp_path):
+    """Le plan relu est exécuté sans listing et met à jour le débit mesuré"""
+    client = make_client()
+    plan_path = tmp_path / "plan.json"
+    throughput_path = tmp_path / "debit.json"
+    (source / "D" / "E").mkdir(parents=True)
+    (source / "D" / "E" / "e.txt").write_bytes(b"e" * 50)
+    save_plan(TransferPlanner("d", "Dest", throughput_path=None).plan(client, str(source)),
+              str(plan_path))
+
+    standin.request_log.clear()
+    report = execute_plan(client, load_plan(str(plan_path)), concurrency=2,
+                          throughput_path=str(throughput_path))
+
+    assert report["done"] == {"create_folder": 3, "upload": 2, "overwrite": 1}
+    assert not report["errors"]
+    assert not [entry for entry in standin.request_log
+                if entry[0] == "GET" and "children" in entry[1]]
+    drive = standin.drives["d"]
+    assert drive.content_of(drive.resolve("Dest/D/E/e.txt")) == b"e" * 50
+    assert drive.content_of(drive.resolve("Dest/C/c.txt")) == b"c" * 40
+    assert throughput_path.exists()
+
+    replanned = TransferPlanner("d", "Dest", throughput_path=None).plan(client, str(source))
+    assert set(actions(replanned).values()) == {"skip", "conflict"}
+
+
+def test_fit_throughput_and_estimate():
+    """Latence issue des petits fichiers, débit issu des gros"""
+    requests = upload_request_count(10_000_000)
+    samples = [(1, 1024, 0.1)] * 5 + [(requests, 10_000_000, requests * 0.1 + 1.0)]
+    throughput = fit_throughput(samples)
+    assert throughput["request_seconds"] == pytest.approx(0.1)
+    assert throughput["bytes_per_second"] == pytest.approx(10_000_000)
+
+    plan = {"operations": [
+        {"action": "create_folder", "path": "X"},
+        {"action": "upload", "path": "X/f", "size": 10_000_000},
+        {"action": "skip", "path": "X/g", "size": 5},
+    ]}
+    result = estimate(plan, throughput, concurrency=1)
+    assert result["requests"] == 1 + requests
+    assert result["seconds"] == pytest.approx(0.1 + requests * 0.1 + 1.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
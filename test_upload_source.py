@@ -0,0 +1,104 @@
+"""
+Tests des sources d'upload sans copie (mmap, tampons, flux)
+"""
+import io
+
+import numpy as np
+import pytest
+import requests
+
+from upload_source import UploadSource
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(name="standin")
+def seeded_standin(standin):
+    standin.add_drive("d").ensure_folder("Up")
+    return standin
+
+
+def test_sources_slice_without_copies(tmp_path):
+    """Chemins, fichiers ouverts et tampons : vues ; flux : lecture séquentielle comptée"""
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"0123456789")
+    with UploadSource(str(path)) as source:
+        chunk = source.view(2, 5)
+        assert isinstance(chunk, memoryview) and bytes(chunk) == b"234"
+        assert source.zero_copy and source.bytes_copied == 0
+        del chunk
+
+    with open(path, "rb") as f:
+        f.seek(4)
+        with UploadSource(f) as source:
+            assert (source.size, bytes(source.body())) == (6, b"456789")
+
+    buffer = io.BytesIO(b"hello world")
+    buffer.seek(6)
+    with UploadSource(buffer) as source:
+        assert bytes(source.body()) == b"world"
+    with UploadSource(np.arange(4, dtype=np.int32)) as source:
+        assert source.size == 16 and source.zero_copy
+
+    class Pipe:
+        def __init__(self):
+            self.raw = io.BytesIO(b"x" * 100)
+
+        def read(self, size=-1):
+            return self.raw.read(size)
+
+    with pytest.raises(ValueError, match="Taille requise"):
+        UploadSource(Pipe())
+    with UploadSource(Pipe(), size=100) as source:
+        assert len(source.view(0, 60)) == 60
+        with pytest.raises(ValueError, match="séquentiellement"):
+            source.view(0, 10)
+        assert len(source.view(60, 200)) == 40
+        assert not source.zero_copy and source.bytes_copied == 100
+
+
+def test_upload_accepts_paths_files_and_buffers(standin, make_client, tmp_path):
+    """Même contenu en PUT simple et en session, quelle que soit la source"""
+    client = make_client()
+    drive = standin.drives["d"]
+    large = np.random.default_rng(0).integers(0, 256, 9 * MB, dtype=np.uint8).tobytes()
+    path = tmp_path / "large.bin"
+    path.write_bytes(large)
+
+    item = client.upload("d", "Up/large.bin", str(path), chunk_size=10 * 320 * 1024)
+    assert item["size"] == len(large)
+    assert drive.content_of(drive.resolve("Up/large.bin")) == large
+    assert sum(1 for method, p in standin.request_log if p.startswith("/upload/")) == 3
+
+    with open(path, "rb") as f:
+        client.upload("d", "Up/from-file.bin", f)
+    assert drive.content_of(drive.resolve("Up/from-file.bin")) == large
+
+    payload = bytearray(b"abcdef" * 1000)
+    client.upload("d", "Up/slice.bin", memoryview(payload)[6:60], content_type="text/plain")
+    assert drive.content_of(drive.resolve("Up/slice.bin")) == bytes(payload[6:60])
+    (tmp_path / "empty.bin").write_bytes(b"")
+    client.upload_file("d", "Up/empty.bin", str(tmp_path / "empty.bin"))
+    assert drive.content_of(drive.resolve("Up/empty.bin")) == b""
+
+
+def test_failed_chunk_releases_mapping(standin, make_client, tmp_path):
+    """Un fragment refusé lève l'erreur HTTP, pas une erreur de projection encore référencée"""
+    path = tmp_path / "large.bin"
+    path.write_bytes(b"z" * 5 * MB)
+    client = make_client()
+    original = client._put_chunk
+
+    def failing_put(upload_url, chunk, offset, end, size):
+        if offset:
+            standin.throttle_writes = 1
+        return original(upload_url, chunk, offset, end, size)
+
+    client._put_chunk = failing_put
+    with pytest.raises(requests.HTTPError):
+        client.upload("d", "Up/large.bin", str(path))
+    assert standin.drives["d"].resolve("Up/large.bin") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
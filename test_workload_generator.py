@@ -0,0 +1,53 @@
+"""
+Tests pour le générateur de charges synthétiques
+"""
+import pytest
+
+from workload_generator import KB, MB, WorkloadGenerator, WorkloadSpec, seed_standin
+
+
+def test_sizes_are_deterministic_and_heavy_tailed():
+    """Tailles reproductibles : beaucoup de petits fichiers, quelques très gros"""
+    spec = WorkloadSpec(file_count=20000, size_profile="mixed")
+    sizes = WorkloadGenerator(spec).file_sizes()
+    assert (sizes == WorkloadGenerator(spec).file_sizes()).all()
+    assert (sizes < 64 * KB).mean() > 0.7
+    assert 0 < (sizes >= 64 * MB).sum() < 100
+    assert sizes.max() <= spec.max_size
+
+
+def test_folders_and_frames_follow_spec():
+    """Arborescence et formes des DataFrames"""
+    spec = WorkloadSpec(file_count=50, folder_depth=2, folder_fanout=3, frame_count=3,
+                        frame_rows=(10, 20), frame_cols=(4, 6))
+    generator = WorkloadGenerator(spec)
+    folders = generator.folder_paths()
+    assert len(folders) == 9
+    assert all(folder.count("/") == 1 for folder in folders)
+    assert {folder for folder, _, _ in generator.iter_files()} <= set(folders)
+
+    for name, df, sheet in generator.iter_frames():
+        assert 10 <= len(df) <= 20 and 4 <= len(df.columns) <= 6
+
+
+def test_materialize_respects_budget(tmp_path):
+    """Écriture sur disque et garde-fou de volume"""
+    spec = WorkloadSpec(file_count=20, size_profile="tiny", folder_depth=1, folder_fanout=2)
+    assert WorkloadGenerator(spec).materialize(str(tmp_path)) == 20
+    with pytest.raises(ValueError):
+        WorkloadGenerator(spec).materialize(str(tmp_path), max_total_bytes=10)
+
+
+def test_seed_standin_serves_paginated_listing(standin, make_client):
+    """Stand-in peuplé : listing paginé et résolution par chemin via GraphClient"""
+    spec = WorkloadSpec(file_count=1500, folder_depth=0)
+    seeded = seed_standin(standin, spec, "big")
+    assert seeded["files"] == 1500
+
+    client = make_client()
+    names = [item["name"] for item in client.iter_pages("drives/big/root/children")]
+    assert len(names) == 1500 and names == sorted(names)
+
+    _, name, _ = next(WorkloadGenerator(spec).iter_files())
+    item = client.get_json(f"drives/big/root:/{name.upper()}", profile="ids_only")
+    assert set(item) == {"id"}
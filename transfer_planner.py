@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""
+Planification à blanc des transferts vers SharePoint, avec estimation du coût.
+
+Compare une arborescence locale à l'état distant (listing Graph, index local ou
+requête delta) et produit le plan exact des opérations : dossiers à créer,
+fichiers à uploader, à remplacer ou à ignorer. Le plan estime le nombre de
+requêtes, le volume et la durée à partir du débit mesuré lors des exécutions
+précédentes (ou d'une calibration), puis peut être exécuté tel quel, sans
+nouvelle découverte de l'état distant.
+
+Usage:
+    python transfer_planner.py plan --drive-id <id> --source ./export --dest Archives
+    python transfer_planner.py plan --drive-id <id> --source ./export --remote index
+    python transfer_planner.py execute transfer_plan.json --concurrency 8
+    python transfer_planner.py calibrate --drive-id <id> --dest Archives
+"""
+
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from drive_index import DEFAULT_INDEX_PATH, DriveIndex, sync_delta
+from graph_client import (
+    GRAPH_BATCH_LIMIT,
+    SIMPLE_UPLOAD_LIMIT,
+    UPLOAD_CHUNK_SIZE,
+    GraphClient,
+    batch_request,
+)
+from profiling import phase, run_profiled
+from request_lanes import LaneScheduler, print_lane_metrics, priority
+
+logger = logging.getLogger(__name__)
+
+PLAN_VERSION = 1
+DEFAULT_PLAN_PATH = "transfer_plan.json"
+DEFAULT_THROUGHPUT_PATH = "transfer_throughput.json"
+
+REMOTE_SOURCES = ("listing", "index", "delta")
+
+# Politique appliquée aux fichiers déjà présents côté SharePoint
+OVERWRITE_POLICIES = ("changed", "always", "never")
+
+# Débit supposé tant qu'aucune exécution ni calibration n'a été mesurée
+DEFAULT_THROUGHPUT = {"request_seconds": 0.25, "bytes_per_second": 8 * 1024 * 1024,
+                      "samples": 0}
+
+# Les fichiers plus petits servent à mesurer la latence par requête
+LATENCY_SAMPLE_MAX_BYTES = 64 * 1024
+
+# Écart toléré entre horodatages local et distant (secondes)
+MTIME_TOLERANCE = 2.0
+
+
+def _parse_mtime(value: Optional[str]) -> Optional[float]:
+    """Convertit lastModifiedDateTime (ISO 8601) en epoch."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _join(*parts: str) -> str:
+    return "/".join(part.strip("/") for part in parts if part.strip("/"))
+
+
+def upload_request_count(size: int, chunk_size: int = UPLOAD_CHUNK_SIZE) -> int:
+    """Nombre de requêtes d'un upload (PUT simple, ou session + fragments)."""
+    if size <= SIMPLE_UPLOAD_LIMIT:
+        return 1
+    return 1 + math.ceil(size / chunk_size)
+
+
+def scan_local(source: str) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+    """
+    Parcourt l'arborescence locale.
+
+    Args:
+        source: Dossier local à transférer
+
+    Returns:
+        Tuple[dossiers relatifs, {chemin relatif: {"local_path", "size", "mtime"}}]
+    """
+    root = Path(source).resolve()
+    folders, files = [], {}
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        relative = Path(directory).relative_to(root).as_posix()
+        if relative != ".":
+            folders.append(relative)
+        for name in sorted(filenames):
+            local_path = Path(directory) / name
+            stat = local_path.stat()
+            key = name if relative == "." else f"{relative}/{name}"
+            files[key] = {"local_path": str(local_path), "size": stat.st_size,
+                          "mtime": stat.st_mtime}
+    return folders, files
+
+
+def remote_from_index(
+    index: DriveIndex, drive_id: str, destination: str = ""
+) -> Dict[str, Dict[str, Any]]:
+    """
+    État distant sous la destination, lu depuis l'index local.
+
+    Returns:
+        Dict: {chemin relatif à la destination en minuscules: entrée}
+    """
+    destination = destination.strip("/")
+    state = {}
+    for entry in index.list_prefix(drive_id, destination):
+        relative = entry["path"][len(destination):].strip("/") if destination else entry["path"]
+        state[relative.lower()] = {
+            "is_folder": bool(entry["is_folder"]),
+            "size": entry["size"],
+            "mtime": _parse_mtime(entry["mtime"]),
+        }
+    return state
+
+
+def remote_from_listing(
+    client: GraphClient, drive_id: str, destination: str, local_folders: Iterable[str]
+) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """
+    État distant obtenu en listant uniquement les dossiers présents localement.
+
+    Un dossier absent côté SharePoint n'est pas listé, ni ses sous-dossiers :
+    leur contenu distant est vide par construction.
+
+    Returns:
+        Tuple[état distant (voir remote_from_index), nombre de requêtes]
+    """
+    state: Dict[str, Dict[str, Any]] = {}
+    request_count = 0
+
+    for folder in [""] + sorted(local_folders, key=lambda f: (f.count("/"), f)):
+        # Parents listés avant leurs enfants : un dossier inconnu est absent
+        if folder and not state.get(folder.lower(), {}).get("is_folder"):
+            continue
+        target = _join(destination, folder)
+        path = (f"drives/{drive_id}/root:/{target}:/children" if target
+                else f"drives/{drive_id}/root/children")
+        try:
+            for item in client.iter_pages(path, profile="hashes", kind="item"):
+                relative = _join(folder, item["name"])
+                state[relative.lower()] = {
+                    "is_folder": "folder" in item,
+                    "size": item.get("size"),
+                    "mtime": _parse_mtime(item.get("lastModifiedDateTime")),
+                }
+        except requests.HTTPError as e:
+            # Destination absente : tout est à créer
+            if e.response is None or e.response.status_code != 404:
+                raise
+        request_count += 1
+    return state, request_count
+
+
+class TransferPlanner:
+    """Construit le plan d'un transfert local -> SharePoint et estime son coût."""
+
+    def __init__(
+        self,
+        drive_id: str,
+        destination: str = "",
+        policy: str = "changed",
+        throughput_path: Optional[str] = DEFAULT_THROUGHPUT_PATH,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ):
+        """
+        Initialise le planificateur.
+
+        Args:
+            drive_id: ID du drive cible
+            destination: Dossier cible relatif à la racine du drive
+            policy: Fichiers existants : "changed" (remplacés si taille ou date
+                diffèrent), "always" (toujours remplacés), "never" (ignorés)
+            throughput_path: Fichier JSON du débit mesuré (None : valeurs par défaut)
+            chunk_size: Taille des fragments des sessions d'upload
+        """
+        if policy not in OVERWRITE_POLICIES:
+            raise ValueError(f"Politique inconnue: {policy} ({', '.join(OVERWRITE_POLICIES)})")
+        self.drive_id = drive_id
+        self.destination = destination.strip("/")
+        self.policy = policy
+        self.throughput_path = throughput_path
+        self.chunk_size = chunk_size
+
+    def _decide(self, local: Dict[str, Any], remote: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+        """Retourne (action, raison) pour un fichier local."""
+        if remote is None:
+            return "upload", "absent"
+        if remote["is_folder"]:
+            return "conflict", "un dossier distant porte ce nom"
+        if self.policy == "always":
+            return "overwrite", "remplacement forcé"
+        if self.policy == "never":
+            return "skip", "déjà présent"
+        if remote["size"] != local["size"]:
+            return "overwrite", f"taille {remote['size']} -> {local['size']}"
+        if remote["mtime"] is not None and local["mtime"] > remote["mtime"] + MTIME_TOLERANCE:
+            return "overwrite", "local plus récent"
+        return "skip", "identique"
+
+    def build(
+        self,
+        source: str,
+        remote: Dict[str, Dict[str, Any]],
+        remote_source: str,
+        local: Optional[Tuple[List[str], Dict[str, Dict[str, Any]]]] = None,
+        discovery_requests: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Compare l'arborescence locale à l'état distant.
+
+        Args:
+            source: Dossier local
+            remote: État distant (voir remote_from_index)
+            remote_source: Origine de l'état distant ("listing", "index", "delta")
+            local: Résultat de scan_local (recalculé si absent)
+            discovery_requests: Requêtes consommées par la découverte
+
+        Returns:
+            Dict: Plan sérialisable en JSON
+        """
+        folders, files = local or scan_local(source)
+        operations: List[Dict[str, Any]] = []
+
+        for folder in sorted(folders, key=lambda f: (f.count("/"), f)):
+            existing = remote.get(folder.lower())
+            if existing is None:
+                operations.append({"action": "create_folder",
+                                   "path": _join(self.destination, folder)})
+            elif not existing["is_folder"]:
+                operations.append({"action": "conflict", "path": _join(self.destination, folder),
+                                   "reason": "un fichier distant porte ce nom"})
+
+        for relative, entry in files.items():
+            action, reason = self._decide(entry, remote.get(relative.lower()))
+            operations.append({
+                "action": action,
+                "path": _join(self.destination, relative),
+                "local_path": entry["local_path"],
+                "size": entry["size"],
+                "reason": reason,
+            })
+
+        plan = {
+            "version": PLAN_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "drive_id": self.drive_id,
+            "source": str(Path(source).resolve()),
+            "destination": self.destination,
+            "remote_source": remote_source,
+            "policy": self.policy,
+            "chunk_size": self.chunk_size,
+            "discovery_requests": discovery_requests,
+            "operations": operations,
+        }
+        plan["summary"] = summarize(operations)
+        return plan
+
+    def plan(
+        self,
+        client: Optional[GraphClient],
+        source: str,
+        remote_source: str = "listing",
+        index: Optional[DriveIndex] = None,
+        concurrency: int = 4,
+    ) -> Dict[str, Any]:
+        """
+        Découvre l'état distant puis construit et estime le plan.
+
+        Args:
+            client: Client Graph (inutile avec remote_source="index")
+            source: Dossier local
+            remote_source: "listing" (dossiers locaux listés), "index" (index
+                local tel quel) ou "delta" (index synchronisé par delta)
+            index: Index local (requis pour "index" et "delta")
+            concurrency: Uploads simultanés prévus à l'exécution
+
+        Returns:
+            Dict: Plan avec son estimation
+        """
+        if remote_source not in REMOTE_SOURCES:
+            raise ValueError(f"Source distante inconnue: {remote_source}")
+
+        with phase("planning"):
+            local = scan_local(source)
+            discovery_requests = 0
+            if remote_source == "listing":
+                remote, discovery_requests = remote_from_listing(
+                    client, self.drive_id, self.destination, local[0]
+                )
+            else:
+                if index is None:
+                    raise ValueError(f"Un index local est requis pour remote_source={remote_source}")
+                if remote_source == "delta":
+                    sequence = index.current_sequence(self.drive_id)
+                    sync_delta(client, index, self.drive_id)
+                    logger.info(f"Index synchronisé (séquence {sequence} -> "
+                                f"{index.current_sequence(self.drive_id)})")
+                remote = remote_from_index(index, self.drive_id, self.destination)
+
+            plan = self.build(source, remote, remote_source, local, discovery_requests)
+        plan["estimate"] = estimate(plan, load_throughput(self.throughput_path), concurrency)
+        return plan
+
+
+def summarize(operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compte les opérations et les octets par action."""
+    summary: Dict[str, Any] = {"operations": {}, "bytes": {}}
+    for operation in operations:
+        action = operation["action"]
+        summary["operations"][action] = summary["operations"].get(action, 0) + 1
+        summary["bytes"][action] = summary["bytes"].get(action, 0) + operation.get("size", 0)
+    return summary
+
+
+def folder_levels(operations: List[Dict[str, Any]]) -> List[List[str]]:
+    """Regroupe les dossiers à créer par profondeur (parents d'abord)."""
+    levels: Dict[int, List[str]] = {}
+    for operation in operations:
+        if operation["action"] == "create_folder":
+            levels.setdefault(operation["path"].count("/"), []).append(operation["path"])
+    return [levels[depth] for depth in sorted(levels)]
+
+
+def estimate(
+    plan: Dict[str, Any], throughput: Dict[str, float], concurrency: int = 4
+) -> Dict[str, Any]:
+    """
+    Estime requêtes, volume et durée de l'exécution d'un plan.
+
+    Chaque upload coûte request_seconds par requête plus son volume divisé par
+    bytes_per_second ; les uploads sont répartis sur `concurrency` flux. Les
+    dossiers sont créés par lots $batch, un niveau de profondeur à la fois.
+
+    Returns:
+        Dict: {"requests", "bytes", "seconds", "concurrency", "throughput"}
+    """
+    chunk_size = plan.get("chunk_size", UPLOAD_CHUNK_SIZE)
+    request_seconds = throughput["request_seconds"]
+    bytes_per_second = throughput["bytes_per_second"]
+
+    folder_requests = sum(math.ceil(len(level) / GRAPH_BATCH_LIMIT)
+                          for level in folder_levels(plan["operations"]))
+    upload_requests = upload_bytes = 0
+    upload_seconds = 0.0
+    for operation in plan["operations"]:
+        if operation["action"] in ("upload", "overwrite"):
+            count = upload_request_count(operation["size"], chunk_size)
+            upload_requests += count
+            upload_bytes += operation["size"]
+            upload_seconds += count * request_seconds + operation["size"] / bytes_per_second
+
+    return {
+        "requests": folder_requests + upload_requests,
+        "folder_requests": folder_requests,
+        "upload_requests": upload_requests,
+        "bytes": upload_bytes,
+        "seconds": folder_requests * request_seconds + upload_seconds / max(concurrency, 1),
+        "concurrency": concurrency,
+        "throughput": dict(throughput),
+    }
+
+
+def load_throughput(path: Optional[str] = DEFAULT_THROUGHPUT_PATH) -> Dict[str, float]:
+    """Charge le débit mesuré (valeurs par défaut si absent ou illisible)."""
+    if path and Path(path).exists():
+        try:
+            return {**DEFAULT_THROUGHPUT, **json.loads(Path(path).read_text(encoding="utf-8"))}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Débit mesuré illisible, valeurs par défaut: {e}")
+    return dict(DEFAULT_THROUGHPUT)
+
+
+def fit_throughput(
+    samples: List[Tuple[int, int, float]], previous: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
+    """
+    Déduit latence par requête et débit d'échantillons (requêtes, octets, secondes).
+
+    La latence vient des petits fichiers (médiane), le débit du temps restant
+    des gros fichiers une fois la latence retirée. Une grandeur sans
+    échantillon exploitable conserve sa valeur précédente.
+    """
+    throughput = dict(previous or DEFAULT_THROUGHPUT)
+    small = [seconds / count for count, size, seconds in samples
+             if size <= LATENCY_SAMPLE_MAX_BYTES]
+    if small:
+        throughput["request_seconds"] = statistics.median(small)
+
+    large = [(count, size, seconds) for count, size, seconds in samples
+             if size > LATENCY_SAMPLE_MAX_BYTES]
+    transfer_seconds = sum(max(seconds - count * throughput["request_seconds"], 0.0)
+                           for count, _, seconds in large)
+    if transfer_seconds > 0:
+        throughput["bytes_per_second"] = sum(size for _, size, _ in large) / transfer_seconds
+    throughput["samples"] = len(samples)
+    throughput["measured_at"] = datetime.now(timezone.utc).isoformat()
+    return throughput
+
+
+def save_throughput(path: str, throughput: Dict[str, float]) -> None:
+    """Persiste le débit mesuré."""
+    Path(path).write_text(json.dumps(throughput, indent=2), encoding="utf-8")
+
+
+def save_plan(plan: Dict[str, Any], path: str = DEFAULT_PLAN_PATH) -> None:
+    """Écrit le plan en JSON."""
+    Path(path).write_text(json.dumps(plan, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def load_plan(path: str = DEFAULT_PLAN_PATH) -> Dict[str, Any]:
+    """Lit un plan écrit par save_plan."""
+    plan = json.loads(Path(path).read_text(encoding="utf-8"))
+    if plan.get("version") != PLAN_VERSION:
+        raise ValueError(f"Version de plan non supportée: {plan.get('version')}")
+    return plan
+
+
+def _create_folders(client: GraphClient, drive_id: str, operations: List[Dict[str, Any]],
+                    report: Dict[str, Any]) -> None:
+    """Crée les dossiers du plan par lots $batch, niveau par niveau."""
+    for level in folder_levels(operations):
+        entries = []
+        for path in level:
+            parent, _, name = path.rpartition("/")
+            url = (f"drives/{drive_id}/root:/{parent}:/children" if parent
+                   else f"drives/{drive_id}/root/children")
+            entries.append(batch_request(url, profile="ids_only", kind="item", method="POST",
+                                         body={"name": name, "folder": {},
+                                               "@microsoft.graph.conflictBehavior": "fail"}))
+        results = client.batch(entries)
+        report["requests"] += math.ceil(len(entries) / GRAPH_BATCH_LIMIT)
+        for path, result in zip(level, results):
+            # 409 : dossier créé entre-temps, le plan reste valable
+            if result["status"] in (200, 201, 409):
+                report["done"]["create_folder"] = report["done"].get("create_folder", 0) + 1
+            else:
+                report["errors"].append({"path": path, "status": result["status"],
+                                         "error": str(result["body"])[:200]})
+
+
+def execute_plan(
+    client: GraphClient,
+    plan: Dict[str, Any],
+    concurrency: int = 4,
+    throughput_path: Optional[str] = DEFAULT_THROUGHPUT_PATH,
+    lane: str = "bulk",
+) -> Dict[str, Any]:
+    """
+    Exécute un plan tel quel, sans relister l'état distant.
+
+    Les dossiers sont créés avant les uploads ; les opérations "skip" et
+    "conflict" ne sont pas exécutées. Les durées mesurées mettent à jour le
+    débit utilisé par les estimations suivantes.
+
+    Args:
+        client: Client Graph
+        plan: Plan construit par TransferPlanner
+        concurrency: Uploads simultanés
+        throughput_path: Fichier JSON du débit mesuré (None pour ne pas l'écrire)
+        lane: Classe de priorité des requêtes du transfert (si le client a des lanes)
+
+    Returns:
+        Dict: {"done", "errors", "requests", "bytes", "seconds", "changed_since_plan",
+            "throughput"}
+    """
+    drive_id = plan["drive_id"]
+    chunk_size = plan.get("chunk_size", UPLOAD_CHUNK_SIZE)
+    operations = plan["operations"]
+    report: Dict[str, Any] = {"done": {}, "errors": [], "requests": 0, "bytes": 0,
+                              "changed_since_plan": 0}
+    started = time.perf_counter()
+
+    with priority(lane):
+        _create_folders(client, drive_id, operations, report)
+
+    def upload(operation: Dict[str, Any]) -> Tuple[int, int, float]:
+        size = os.path.getsize(operation["local_path"])
+        operation_started = time.perf_counter()
+        with priority(lane):
+            client.upload_file(drive_id, operation["path"], operation["local_path"],
+                               chunk_size=chunk_size)
+        return upload_request_count(size, chunk_size), size, time.perf_counter() - operation_started
+
+    transfers = [op for op in operations if op["action"] in ("upload", "overwrite")]
+    samples: List[Tuple[int, int, float]] = []
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        futures = {executor.submit(upload, operation): operation for operation in transfers}
+        for future in as_completed(futures):
+            operation = futures[future]
+            try:
+                count, size, seconds = future.result()
+            except (requests.RequestException, OSError, ValueError) as e:
+                logger.error(f"Échec de {operation['path']}: {e}")
+                report["errors"].append({"path": operation["path"], "error": str(e)})
+                continue
+            samples.append((count, size, seconds))
+            report["requests"] += count
+            report["bytes"] += size
+            report["changed_since_plan"] += size != operation["size"]
+            action = operation["action"]
+            report["done"][action] = report["done"].get(action, 0) + 1
+
+    report["seconds"] = time.perf_counter() - started
+    report["throughput"] = fit_throughput(samples, load_throughput(throughput_path))
+    if throughput_path and samples:
+        save_throughput(throughput_path, report["throughput"])
+    return report
+
+
+def calibrate(
+    client: GraphClient,
+    drive_id: str,
+    destination: str = "",
+    small_probes: int = 10,
+    large_probe_bytes: int = 2 * SIMPLE_UPLOAD_LIMIT,
+    throughput_path: Optional[str] = DEFAULT_THROUGHPUT_PATH,
+) -> Dict[str, float]:
+    """
+    Mesure latence et débit par des uploads de sonde, supprimés ensuite.
+
+    Returns:
+        Dict: Débit mesuré (également persisté dans throughput_path)
+    """
+    folder = _join(destination, f".transfer_probe_{os.getpid()}")
+    parent, _, name = folder.rpartition("/")
+    url = (f"drives/{drive_id}/root:/{parent}:/children" if parent
+           else f"drives/{drive_id}/root/children")
+    response = client.request("POST", url, json={
+        "name": name, "folder": {}, "@microsoft.graph.conflictBehavior": "replace",
+    })
+    response.raise_for_status()
+
+    samples = []
+    try:
+        for i in range(small_probes):
+            started = time.perf_counter()
+            client.upload_content(drive_id, f"{folder}/probe_{i}.bin", b"\0" * 1024)
+            samples.append((1, 1024, time.perf_counter() - started))
+        stream = io.BytesIO(os.urandom(large_probe_bytes))
+        started = time.perf_counter()
+        client.upload_stream(drive_id, f"{folder}/probe_large.bin", stream, large_probe_bytes)
+        samples.append((upload_request_count(large_probe_bytes), large_probe_bytes,
+                        time.perf_counter() - started))
+    finally:
+        client.request("DELETE", f"drives/{drive_id}/root:/{folder}")
+
+    throughput = fit_throughput(samples, load_throughput(throughput_path))
+    if throughput_path:
+        save_throughput(throughput_path, throughput)
+    return throughput
+
+
+def print_plan(plan: Dict[str, Any], show: int = 20) -> None:
+    """Affiche le résumé d'un plan et son estimation."""
+    labels = {"create_folder": "📁 Dossiers à créer", "upload": "⬆️  Fichiers à uploader",
+              "overwrite": "♻️  Fichiers à remplacer", "skip": "⏭️  Fichiers inchangés",
+              "conflict": "⚠️  Conflits"}
+    summary = plan["summary"]
+    print(f"🗺️  Plan {plan['source']} -> {plan['destination'] or '/'} "
+          f"(état distant: {plan['remote_source']}, {plan['discovery_requests']} requêtes)")
+    for action, label in labels.items():
+        count = summary["operations"].get(action, 0)
+        if count:
+            size = summary["bytes"].get(action, 0)
+            print(f"   {label:<26} {count:>8}" + (f"  ({size / 1e6:,.1f} Mo)" if size else ""))
+
+    conflicts = [op for op in plan["operations"] if op["action"] == "conflict"]
+    for operation in conflicts[:show]:
+        print(f"      ⚠️  {operation['path']}: {operation['reason']}")
+
+    estimate_ = plan.get("estimate")
+    if estimate_:
+        throughput = estimate_["throughput"]
+        source = (f"mesuré sur {throughput['samples']} transferts" if throughput["samples"]
+                  else "valeurs par défaut, lancer calibrate")
+        print(f"\n📊 Estimation: {estimate_['requests']} requêtes "
+              f"({estimate_['folder_requests']} $batch de dossiers), "
+              f"{estimate_['bytes'] / 1e6:,.1f} Mo, "
+              f"~{estimate_['seconds'] / 60:.1f} min avec {estimate_['concurrency']} flux")
+        print(f"   Débit: {throughput['request_seconds'] * 1000:.0f} ms/requête, "
+              f"{throughput['bytes_per_second'] / 1e6:.1f} Mo/s ({source})")
+
+
+def _client() -> GraphClient:
+    from credential_factory import get_credential
+
+    return GraphClient(get_credential(), lanes=LaneScheduler.from_env())
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Plan et estimation d'un transfert")
+    parser.add_argument("command", choices=["plan", "execute", "calibrate"])
+    parser.add_argument("plan_file", nargs="?", default=DEFAULT_PLAN_PATH,
+                        help="Fichier du plan (écrit par plan, lu par execute)")
+    parser.add_argument("--drive-id", help="ID du drive cible")
+    parser.add_argument("--source", help="Dossier local à transférer")
+    parser.add_argument("--dest", default="", help="Dossier cible dans le drive")
+    parser.add_argument("--remote", choices=REMOTE_SOURCES, default="listing",
+                        help="Origine de l'état distant")
+    parser.add_argument("--db", default=DEFAULT_INDEX_PATH, help="Index SQLite (index, delta)")
+    parser.add_argument("--policy", choices=OVERWRITE_POLICIES, default="changed")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--throughput", default=DEFAULT_THROUGHPUT_PATH,
+                        help="Fichier du débit mesuré")
+    parser.add_argument("--execute", action="store_true", help="Exécuter le plan aussitôt")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "calibrate":
+        if not args.drive_id:
+            parser.error("--drive-id est requis")
+        throughput = calibrate(_client(), args.drive_id, args.dest,
+                               throughput_path=args.throughput)
+        print(f"✅ {throughput['request_seconds'] * 1000:.0f} ms/requête, "
+              f"{throughput['bytes_per_second'] / 1e6:.1f} Mo/s -> {args.throughput}")
+        return
+
+    if args.command == "plan":
+        if not args.drive_id or not args.source:
+            parser.error("--drive-id et --source sont requis")
+        # L'index suffit à planifier ; l'exécution a toujours besoin du client
+        client = _client() if args.execute or args.remote != "index" else None
+        index = DriveIndex(args.db) if args.remote != "listing" else None
+        planner = TransferPlanner(args.drive_id, args.dest, args.policy, args.throughput)
+        plan = planner.plan(client, args.source, args.remote, index, args.concurrency)
+        if index:
+            index.close()
+        save_plan(plan, args.plan_file)
+        print_plan(plan)
+        print(f"\n📄 Plan: {args.plan_file}")
+        if not args.execute:
+            return
+    else:
+        client = _client()
+        plan = load_plan(args.plan_file)
+        print_plan(plan)
+
+    print("\n🚀 Exécution du plan...")
+    report = execute_plan(client, plan, args.concurrency, args.throughput)
+    done = ", ".join(f"{count} {action}" for action, count in sorted(report["done"].items()))
+    print(f"✅ {done or 'rien à faire'} en {report['seconds']:.1f}s "
+          f"({report['requests']} requêtes, {report['bytes'] / 1e6:,.1f} Mo)")
+    if plan.get("estimate"):
+        print(f"   Estimé: {plan['estimate']['seconds']:.1f}s, "
+              f"{plan['estimate']['requests']} requêtes")
+    if report["changed_since_plan"]:
+        print(f"⚠️  {report['changed_since_plan']} fichiers modifiés depuis le plan")
+    if client.lanes is not None:
+        print_lane_metrics(client.lanes)
+    for error in report["errors"][:20]:
+        print(f"❌ {error['path']}: {error['error']}")
+    if report["errors"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    run_profiled(main)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Sources d'upload sans copie : chemins projetés en mémoire (mmap), tampons et flux.
+
+Un upload lu par file.read() crée une copie complète du fichier, et une session
+d'upload qui lit chaque fragment par stream.read() en crée une par fragment.
+UploadSource expose le contenu sous forme de memoryview :
+
+    - chemin (str ou PathLike) : fichier projeté par mmap, les fragments sont
+      des tranches de la projection, envoyées telles quelles à la socket ;
+    - bytes, bytearray, memoryview ou tout objet tampon : tranches du tampon ;
+    - fichier ouvert : projeté par mmap s'il a un descripteur, tampon de
+      BytesIO (getbuffer), sinon lu fragment par fragment (seul cas de copie,
+      compté dans bytes_copied).
+
+urllib3 transmet un corps memoryview directement à socket.sendall : aucune
+copie en espace utilisateur entre le fichier et la socket.
+"""
+
+import io
+import logging
+import mmap
+import os
+from typing import Any, BinaryIO, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+SourceLike = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+class UploadSource:
+    """Contenu d'un upload, découpable en tranches sans copie."""
+
+    def __init__(self, source: Any, size: Optional[int] = None):
+        """
+        Ouvre la source.
+
+        Args:
+            source: Chemin, objet tampon ou fichier binaire ouvert (lu depuis sa position)
+            size: Taille à envoyer (obligatoire pour un flux sans fin connue)
+        """
+        self._file: Optional[BinaryIO] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._stream: Optional[BinaryIO] = None
+        self._position = 0
+        self.bytes_copied = 0
+
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, "rb")
+            self._map_file(self._file, 0)
+        elif isinstance(source, io.BytesIO):
+            self._view = source.getbuffer()[source.tell():]
+        elif hasattr(source, "read"):
+            try:
+                self._map_file(source, source.tell())
+            except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+                self._stream = source
+        else:
+            view = memoryview(source)
+            self._view = view if view.format == "B" and view.ndim == 1 else view.cast("B")
+
+        if self._view is not None:
+            self.size = self._view.nbytes if size is None else min(size, self._view.nbytes)
+        elif size is not None:
+            self.size = size
+        else:
+            try:
+                start = source.tell()
+                self.size = source.seek(0, os.SEEK_END) - start
+                source.seek(start)
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                raise ValueError("Taille requise pour un flux non positionnable") from None
+
+    def _map_file(self, file: BinaryIO, start: int) -> None:
+        """Projette le fichier en mémoire à partir de la position start."""
+        length = os.fstat(file.fileno()).st_size
+        if length - start <= 0:
+            self._view = memoryview(b"")
+            return
+        self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)[start:]
+
+    @property
+    def zero_copy(self) -> bool:
+        """True si les tranches sont des vues (projection ou tampon), sans copie."""
+        return self._view is not None
+
+    def view(self, start: int, stop: int) -> Union[memoryview, bytes]:
+        """
+        Tranche [start, stop) du contenu.
+
+        Les sources projetées ou tampons acceptent tout ordre ; un flux ne peut
+        être lu que séquentiellement.
+
+        Returns:
+            memoryview (sans copie) ou bytes lus depuis le flux
+        """
+        stop = min(stop, self.size)
+        if stop <= start:
+            return b""
+        if self._view is not None:
+            return self._view[start:stop]
+        if start != self._position:
+            raise ValueError(f"Flux lu séquentiellement : position {self._position}, "
+                             f"tranche demandée à {start}")
+        data = self._stream.read(stop - start)
+        self._position += len(data)
+        self.bytes_copied += len(data)
+        return data
+
+    def body(self) -> Union[memoryview, bytes]:
+        """Contenu complet (corps d'un PUT simple)."""
+        return self.view(0, self.size)
+
+    def close(self) -> None:
+        """Libère la projection et le fichier ouverts par la source."""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Une tranche est encore référencée (ex: exception en cours) : fermée par le GC
+                logger.debug("Projection encore référencée, fermeture différée")
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "UploadSource":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Générateur de charges de travail synthétiques pour les tests à l'échelle.
+
+Une charge est décrite par un WorkloadSpec : nombre de fichiers, distribution
+des tailles (beaucoup de petits fichiers, quelques très gros), profondeur et
+largeur de l'arborescence, formes des DataFrames. Le générateur est
+déterministe (graine) et peut :
+    - résumer la charge (tailles, percentiles, histogramme) ;
+    - la matérialiser sur disque ;
+    - peupler le stand-in Graph avec des bibliothèques de 100k à 1M éléments
+      (sans contenu), pour tester listing, delta, upload et résolution d'IDs.
+
+Usage:
+    python workload_generator.py summary --files 100000 --size-profile mixed
+    python workload_generator.py materialize --dir ./workload --files 500
+    python workload_generator.py serve --files 1000000 --port 8765
+"""
+
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dataframe_pipeline import FrameJob
+from graph_standin import GraphStandIn
+from profiling import run_profiled
+
+logger = logging.getLogger(__name__)
+
+KB = 1024
+MB = 1024 * KB
+
+# Profils de distribution des tailles :
+# (taille médiane du corps, dispersion log-normale, part de gros fichiers,
+#  taille minimale des gros fichiers)
+SIZE_PROFILES: Dict[str, Tuple[int, float, float, int]] = {
+    "tiny": (2 * KB, 1.0, 0.0, 0),
+    "mixed": (16 * KB, 1.5, 0.001, 64 * MB),
+    "documents": (256 * KB, 1.2, 0.01, 32 * MB),
+    "large": (8 * MB, 1.0, 0.05, 256 * MB),
+}
+
+FILE_EXTENSIONS = [".txt", ".csv", ".xlsx", ".pdf", ".json", ".docx"]
+
+
+class WorkloadSpec:
+    """Paramètres d'une charge de travail synthétique."""
+
+    def __init__(
+        self,
+        file_count: int = 10000,
+        size_profile: str = "mixed",
+        max_size: int = 2 * 1024 * MB,
+        folder_depth: int = 3,
+        folder_fanout: int = 10,
+        frame_count: int = 0,
+        frame_rows: Tuple[int, int] = (100, 10000),
+        frame_cols: Tuple[int, int] = (3, 30),
+        seed: int = 42,
+    ):
+        """
+        Initialise la spécification.
+
+        Args:
+            file_count: Nombre de fichiers
+            size_profile: Profil de tailles (tiny, mixed, documents, large)
+            max_size: Taille maximale d'un fichier (octets)
+            folder_depth: Profondeur de l'arborescence (0 = tout à la racine)
+            folder_fanout: Nombre de sous-dossiers par dossier
+            frame_count: Nombre de DataFrames à générer
+            frame_rows: Bornes (min, max) du nombre de lignes des DataFrames
+            frame_cols: Bornes (min, max) du nombre de colonnes des DataFrames
+            seed: Graine du générateur aléatoire
+        """
+        if size_profile not in SIZE_PROFILES:
+            raise ValueError(f"Profil de tailles inconnu: {size_profile}")
+        self.file_count = file_count
+        self.size_profile = size_profile
+        self.max_size = max_size
+        self.folder_depth = folder_depth
+        self.folder_fanout = folder_fanout
+        self.frame_count = frame_count
+        self.frame_rows = frame_rows
+        self.frame_cols = frame_cols
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class WorkloadGenerator:
+    """Génère fichiers, arborescence et DataFrames d'une charge de travail."""
+
+    def __init__(self, spec: WorkloadSpec):
+        self.spec = spec
+
+    def _rng(self, stream: int) -> np.random.Generator:
+        """Générateur indépendant par flux (tailles, placement, DataFrames)."""
+        return np.random.default_rng([self.spec.seed, stream])
+
+    def file_sizes(self) -> np.ndarray:
+        """
+        Tire les tailles des fichiers.
+
+        Le corps suit une loi log-normale ; une petite part de fichiers suit une
+        loi de Pareto à partir d'un seuil élevé (queue des très gros fichiers).
+
+        Returns:
+            np.ndarray: Tailles en octets (int64)
+        """
+        median, sigma, huge_fraction, huge_min = SIZE_PROFILES[self.spec.size_profile]
+        rng = self._rng(1)
+        count = self.spec.file_count
+        sizes = rng.lognormal(np.log(median), sigma, size=count)
+        if huge_fraction > 0:
+            huge = rng.random(count) < huge_fraction
+            sizes[huge] = huge_min * (1 + rng.pareto(1.5, size=int(huge.sum())))
+        return np.clip(sizes, 1, self.spec.max_size).astype(np.int64)
+
+    def folder_paths(self) -> List[str]:
+        """Chemins des dossiers feuilles de l'arborescence."""
+        level = [""]
+        for depth in range(self.spec.folder_depth):
+            level = [
+                f"{parent}/dossier_{depth}_{i:03d}".lstrip("/")
+                for parent in level
+                for i in range(self.spec.folder_fanout)
+            ]
+        return level
+
+    def iter_files(self) -> Iterator[Tuple[str, str, int]]:
+        """
+        Itère sur les fichiers de la charge.
+
+        Yields:
+            Tuple[dossier, nom de fichier, taille]
+        """
+        folders = self.folder_paths()
+        rng = self._rng(2)
+        placement = rng.integers(0, len(folders), size=self.spec.file_count)
+        extensions = rng.integers(0, len(FILE_EXTENSIONS), size=self.spec.file_count)
+        for i, size in enumerate(self.file_sizes().tolist()):
+            name = f"fichier_{i:07d}{FILE_EXTENSIONS[extensions[i]]}"
+            yield folders[placement[i]], name, size
+
+    def iter_frames(self) -> Iterator[FrameJob]:
+        """
+        Itère sur des DataFrames de formes variées (types numériques, texte, dates).
+
+        Yields:
+            FrameJob: (nom, DataFrame, nom de feuille)
+        """
+        rng = self._rng(3)
+        for i in range(self.spec.frame_count):
+            rows = int(rng.integers(self.spec.frame_rows[0], self.spec.frame_rows[1] + 1))
+            cols = int(rng.integers(self.spec.frame_cols[0], self.spec.frame_cols[1] + 1))
+            data: Dict[str, Any] = {}
+            for c in range(cols):
+                kind = c % 4
+                if kind == 0:
+                    data[f"mesure_{c}"] = rng.normal(size=rows)
+                elif kind == 1:
+                    data[f"compte_{c}"] = rng.integers(0, 10000, size=rows)
+                elif kind == 2:
+                    data[f"categorie_{c}"] = rng.choice(["A", "B", "C", "D"], size=rows)
+                else:
+                    data[f"date_{c}"] = pd.date_range("2025-01-01", periods=rows, freq="min")
+            yield f"workload_frame_{i:04d}", pd.DataFrame(data), "Data"
+
+    def summary(self) -> Dict[str, Any]:
+        """Statistiques de la charge (tailles, percentiles, histogramme)."""
+        sizes = self.file_sizes()
+        buckets = [0, 4 * KB, 64 * KB, MB, 16 * MB, 256 * MB, np.inf]
+        labels = ["<4K", "4K-64K", "64K-1M", "1M-16M", "16M-256M", ">256M"]
+        counts, _ = np.histogram(sizes, bins=buckets)
+        return {
+            "files": int(sizes.size),
+            "folders": len(self.folder_paths()),
+            "total_bytes": int(sizes.sum()),
+            "p50": int(np.percentile(sizes, 50)) if sizes.size else 0,
+            "p99": int(np.percentile(sizes, 99)) if sizes.size else 0,
+            "max": int(sizes.max()) if sizes.size else 0,
+            "histogram": dict(zip(labels, counts.tolist())),
+        }
+
+    def materialize(self, directory: str, max_total_bytes: int = 1024 * MB) -> int:
+        """
+        Écrit la charge sur disque (contenu pseudo-aléatoire).
+
+        Args:
+            directory: Dossier de destination
+            max_total_bytes: Garde-fou sur le volume total écrit
+
+        Returns:
+            int: Nombre de fichiers écrits
+        """
+        total = int(self.file_sizes().sum())
+        if total > max_total_bytes:
+            raise ValueError(
+                f"Charge de {total / MB:.0f} Mo supérieure à la limite de "
+                f"{max_total_bytes / MB:.0f} Mo"
+            )
+        root = Path(directory)
+        block = self._rng(4).bytes(MB)
+        written = 0
+        for folder, name, size in self.iter_files():
+            target = root / folder / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, "wb") as f:
+                remaining = size
+                while remaining > 0:
+                    chunk = block[:min(remaining, len(block))]
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            written += 1
+        return written
+
+
+def seed_standin(
+    standin: GraphStandIn,
+    spec: WorkloadSpec,
+    drive_id: str = "standin-drive",
+) -> Dict[str, Any]:
+    """
+    Peuple un drive du stand-in avec la charge (métadonnées seulement).
+
+    Le contenu n'est pas stocké : un téléchargement renvoie des octets nuls de la
+    taille déclarée.
+
+    Args:
+        standin: Stand-in Graph
+        spec: Spécification de la charge
+        drive_id: ID du drive à créer ou compléter
+
+    Returns:
+        Dict: {"drive_id", "files", "folders", "seconds"}
+    """
+    started = time.perf_counter()
+    generator = WorkloadGenerator(spec)
+    with standin.lock:
+        drive = standin.drives.get(drive_id) or standin.add_drive(drive_id)
+        by_folder: Dict[str, List[Tuple[str, int]]] = {}
+        for folder, name, size in generator.iter_files():
+            by_folder.setdefault(folder, []).append((name, size))
+        count = 0
+        for folder, files in by_folder.items():
+            count += drive.add_files_bulk(drive.ensure_folder(folder), files)
+    seconds = time.perf_counter() - started
+    logger.info(f"Stand-in peuplé: {count} fichiers en {seconds:.1f}s")
+    return {"drive_id": drive_id, "files": count,
+            "folders": len(by_folder), "seconds": seconds}
+
+
+def _rss_mb() -> Optional[float]:
+    """Mémoire résidente du processus (Mo), Linux uniquement."""
+    try:
+        with open(f"/proc/{os.getpid()}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / MB
+    except (OSError, ValueError):
+        return None
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    """Affiche le résumé d'une charge."""
+    print(f"📊 {summary['files']} fichiers dans {summary['folders']} dossiers, "
+          f"{summary['total_bytes'] / MB:.1f} Mo au total")
+    print(f"   p50 {summary['p50'] / KB:.1f} Ko, p99 {summary['p99'] / KB:.1f} Ko, "
+          f"max {summary['max'] / MB:.1f} Mo")
+    for label, count in summary["histogram"].items():
+        print(f"   {label:>9}: {count}")
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Charges de travail synthétiques")
+    parser.add_argument("command", choices=["summary", "materialize", "serve"])
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--size-profile", choices=sorted(SIZE_PROFILES), default="mixed")
+    parser.add_argument("--max-size", type=int, default=2 * 1024 * MB)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dir", default="workload", help="Destination (materialize)")
+    parser.add_argument("--max-total-mb", type=int, default=1024)
+    parser.add_argument("--port", type=int, default=8765, help="Port du stand-in (serve)")
+    parser.add_argument("--drive-id", default="standin-drive")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    spec = WorkloadSpec(
+        file_count=args.files,
+        size_profile=args.size_profile,
+        max_size=args.max_size,
+        folder_depth=args.depth,
+        folder_fanout=args.fanout,
+        seed=args.seed,
+    )
+    generator = WorkloadGenerator(spec)
+
+    if args.command == "summary":
+        print_summary(generator.summary())
+
+    elif args.command == "materialize":
+        written = generator.materialize(args.dir, args.max_total_mb * MB)
+        print(f"✅ {written} fichiers écrits dans {args.dir}")
+
+    else:
+        standin = GraphStandIn(port=args.port)
+        result = seed_standin(standin, spec, args.drive_id)
+        rss = _rss_mb()
+        print(f"✅ {result['files']} fichiers dans {result['folders']} dossiers "
+              f"en {result['seconds']:.1f}s"
+              + (f" (RSS {rss:.0f} Mo)" if rss else ""))
+        print(f"🧪 Stand-in Graph: {standin.base_url} (drive {args.drive_id})")
+        try:
+            standin.start()
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            standin.stop()
+
+
+if __name__ == "__main__":
+    run_profiled(main)
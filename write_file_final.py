@@ -15,6 +15,8 @@ import requests
 from azure.identity import AzureCliCredential
 from dotenv import load_dotenv
 import os
+from profiling import run_profiled
+from upload_source import UploadSource
 
 # Chargement de la configuration
 load_dotenv('config.env')
@@ -181,10 +183,6 @@ Test réussi ! 🎉
                             with pd.ExcelWriter(temp_file_path, engine='openpyxl') as writer:
                                 test_data.to_excel(writer, sheet_name="TestData", index=False)
                             
-                            # Lecture du contenu du fichier
-                            with open(temp_file_path, 'rb') as file:
-                                file_content = file.read()
-                            
                             excel_filename = f"test-excel-{datetime.now().strftime('%Y%m%d-%H%M%S')}.xlsx"
                             excel_upload_url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root:/{excel_filename}:/content"
                             
@@ -193,11 +191,14 @@ Test réussi ! 🎉
                                 'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
                             }
                             
-                            excel_response = requests.put(
-                                excel_upload_url,
-                                data=file_content,
-                                headers=excel_headers
-                            )
+                            # Fichier projeté en mémoire : envoyé sans copie intermédiaire
+                            with UploadSource(temp_file_path) as source:
+                                excel_response = requests.put(
+                                    excel_upload_url,
+                                    data=source.body(),
+                                    headers=excel_headers
+                                )
+                                excel_response.request.body = None
                             
                             if excel_response.status_code in [200, 201]:
                                 excel_info = excel_response.json()
@@ -233,4 +234,4 @@ Test réussi ! 🎉
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    run_profiled(main)
\ No newline at end of file
@@ -6,6 +6,7 @@ import os
 import sys
 from datetime import datetime
 from dotenv import load_dotenv
+from profiling import run_profiled
 
 # Chargement de la configuration
 load_dotenv('config.env')
@@ -91,6 +92,8 @@ Informations du site:
 
 Test réussi ! 🎉
 """
+        # Encodé une seule fois : réutilisé par l'essai dans le dossier spécifique
+        file_bytes = file_content.encode('utf-8')
         
         # Nom du fichier
         filename = f"test-graph-api-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
@@ -115,7 +118,7 @@ Test réussi ! 🎉
             
             upload_response = requests.put(
                 upload_url, 
-                data=file_content.encode('utf-8'),
+                data=file_bytes,
                 headers=upload_headers
             )
             
@@ -135,7 +138,7 @@ Test réussi ! 🎉
                         
                         folder_upload_response = requests.put(
                             folder_upload_url,
-                            data=file_content.encode('utf-8'),
+                            data=file_bytes,
                             headers=upload_headers
                         )
                         
@@ -171,7 +174,7 @@ Test réussi ! 🎉
 
 
 if __name__ == "__main__":
-    success = write_file_graph()
+    success = run_profiled(write_file_graph)
     if success:
         print("\n🎉 Test d'écriture réussi !")
         print("Vous pouvez maintenant vérifier le fichier dans SharePoint.")
@@ -6,6 +6,7 @@ import os
 import sys
 from datetime import datetime
 from dotenv import load_dotenv
+from profiling import run_profiled
 
 # Chargement de la configuration
 load_dotenv('config.env')
@@ -75,6 +76,8 @@ avec l'API REST SharePoint et l'identité personnelle.
 
 Test réussi ! 🎉
 """
+        # Encodé une seule fois : réutilisé par l'essai dans le dossier spécifique
+        file_bytes = file_content.encode('utf-8')
         
         # Nom du fichier
         filename = f"test-rest-api-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
@@ -106,7 +109,7 @@ Test réussi ! 🎉
         # Upload du fichier
         upload_response = requests.post(
             upload_url,
-            data=file_content.encode('utf-8'),
+            data=file_bytes,
             headers=upload_headers
         )
         
@@ -138,7 +141,7 @@ Test réussi ! 🎉
                         
                         specific_upload_response = requests.post(
                             specific_upload_url,
-                            data=file_content.encode('utf-8'),
+                            data=file_bytes,
                             headers=upload_headers
                         )
                         
@@ -169,7 +172,7 @@ Test réussi ! 🎉
 
 
 if __name__ == "__main__":
-    success = write_file_sharepoint_rest()
+    success = run_profiled(write_file_sharepoint_rest)
     if success:
         print("\n🎉 Test d'écriture réussi !")
         print("Vous pouvez maintenant vérifier le fichier dans SharePoint.")
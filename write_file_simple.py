@@ -6,6 +6,7 @@ import os
 import sys
 from datetime import datetime
 from dotenv import load_dotenv
+from profiling import run_profiled
 
 # Chargement de la configuration
 load_dotenv('.env')
@@ -121,7 +122,7 @@ Test réussi ! 🎉
 
 
 if __name__ == "__main__":
-    success = write_file_simple()
+    success = run_profiled(write_file_simple)
     if success:
         print("\n🎉 Test d'écriture réussi !")
         print("Vous pouvez maintenant vérifier le fichier dans SharePoint.")
@@ -16,6 +16,16 @@ from azure.identity import AzureCliCredential
 from dotenv import load_dotenv
 import os
 
+from circuit_breaker import CircuitBreakerRegistry, CircuitOpenError, print_breaker_states
+from dataframe_pipeline import PipelinedExcelExporter
+from drive_index import DriveIndex
+from excel_workbook import WorkbookSession
+from graph_client import SIMPLE_UPLOAD_LIMIT, GraphClient, build_graph_request
+from metadata_cache import MetadataCache, print_cache_summary
+from sharepoint_bundler import BundleUploadError, SmallFileBundler
+from profiling import run_profiled
+from replication import Replicator
+
 # Chargement de la configuration
 load_dotenv('config.env')
 
@@ -23,6 +33,23 @@ load_dotenv('config.env')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Timeouts des appels HTTP directs : (connexion, lecture) en secondes
+REQUEST_TIMEOUT = (10, 30)
+UPLOAD_TIMEOUT = (10, 120)
+
+
+def falls_back_to_root(status_code: Optional[int]) -> bool:
+    """
+    Indique si un échec d'upload dans le dossier justifie un essai à la racine.
+    
+    Seul un refus du dossier (4xx : dossier absent, accès refusé) le justifie.
+    Timeout, 5xx, throttling ou disjoncteur ouvert signalent un service dégradé :
+    un second upload ne ferait que doubler la charge.
+    """
+    return status_code is not None and 400 <= status_code < 500 and status_code != 429
+
 
 class SharePointDDASYSTester:
     """Classe pour tester la connexion et l'écriture SharePoint DDASYS."""
@@ -41,6 +68,11 @@ class SharePointDDASYSTester:
         self.credential = AzureCliCredential()
         self.site_id = None
         self.drive_id = None
+        self.bundler: Optional[SmallFileBundler] = None
+        self.index: Optional[DriveIndex] = None
+        self.client: Optional[GraphClient] = None
+        # Disjoncteurs par hôte et classe d'opération, partagés par tous les appels
+        self.breakers = CircuitBreakerRegistry()
         
     def get_access_token(self) -> str:
         """Récupère un token d'accès pour l'API Microsoft Graph."""
@@ -79,8 +111,9 @@ class SharePointDDASYSTester:
                 return False
             
             # Récupération des informations du site
-            graph_url = f"https://graph.microsoft.com/v1.0/sites/{tenant}:/sites/{site_name}"
-            response = requests.get(graph_url, headers=headers)
+            graph_path = f"sites/{tenant}:/sites/{site_name}"
+            graph_url, params = build_graph_request(graph_path, profile="listing")
+            response = self._http('GET', graph_url, headers=headers, params=params)
             
             if response.status_code == 200:
                 site_info = response.json()
@@ -89,8 +122,8 @@ class SharePointDDASYSTester:
                 logger.info(f"Site ID: {self.site_id}")
                 
                 # Récupération du drive principal
-                drive_url = f"{graph_url}/drive"
-                drive_response = requests.get(drive_url, headers=headers)
+                drive_url, params = build_graph_request(f"{graph_path}/drive", profile="listing")
+                drive_response = self._http('GET', drive_url, headers=headers, params=params)
                 
                 if drive_response.status_code == 200:
                     drive_info = drive_response.json()
@@ -128,10 +161,12 @@ class SharePointDDASYSTester:
             }
             
             # Test de listage des fichiers à la racine
-            list_url = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root/children"
+            list_url, params = build_graph_request(
+                f"drives/{self.drive_id}/root/children", profile="ids_only"
+            )
             
             logger.info(f"Test de connexion sur: {list_url}")
-            response = requests.get(list_url, headers=headers)
+            response = self._http('GET', list_url, headers=headers, params=params)
             
             if response.status_code == 200:
                 files = response.json().get('value', [])
@@ -145,73 +180,91 @@ class SharePointDDASYSTester:
             logger.error(f"Erreur lors du test de connexion: {e}")
             return False
     
-    def upload_excel_file(self, df: pd.DataFrame, filename: str, sheet_name: str = "Sheet1") -> Optional[str]:
+    def enable_bundling(self, **bundler_options) -> SmallFileBundler:
         """
-        Upload un DataFrame vers SharePoint en tant que fichier Excel.
+        Active le regroupement des petits fichiers texte en archives.
         
         Args:
-            df: DataFrame pandas à exporter
-            filename: Nom du fichier (sans extension)
-            sheet_name: Nom de la feuille Excel
+            **bundler_options: Options transmises à SmallFileBundler
+            
+        Returns:
+            SmallFileBundler: Le regroupeur utilisé par upload_text_file
+        """
+        self.bundler = SmallFileBundler(self.upload_bytes, **bundler_options)
+        return self.bundler
+
+    def _flush_bundles_if_due(self) -> None:
+        """Envoie le lot de petits fichiers dont la fenêtre est écoulée (entre deux uploads)."""
+        if not self.bundler:
+            return
+        try:
+            self.bundler.flush_if_due()
+        except BundleUploadError as e:
+            logger.error(f"Archives de petits fichiers en attente: {e}")
+    
+    def _http(self, method: str, url: str, timeout=REQUEST_TIMEOUT, **kwargs) -> requests.Response:
+        """Appel HTTP direct avec timeout, sous le disjoncteur de son point d'accès."""
+        return self.breakers.call(
+            method, url, lambda: requests.request(method, url, timeout=timeout, **kwargs)
+        )
+    
+    def upload_bytes(self, content: bytes, filename: str, content_type: str) -> Optional[str]:
+        """
+        Upload un contenu binaire vers SharePoint (dossier spécifique puis racine).
+        
+        La racine n'est essayée que si le dossier refuse l'upload (4xx) : pendant
+        un incident (timeout, 5xx, disjoncteur ouvert) l'échec est immédiat.
+        
+        Args:
+            content: Contenu du fichier
+            filename: Nom du fichier (avec extension)
+            content_type: Type MIME du contenu
             
         Returns:
             str: URL du fichier uploadé ou None en cas d'erreur
         """
-        temp_file_path = None
         try:
             if not self.site_id or not self.drive_id:
                 if not self.get_site_and_drive_info():
                     return None
             
             token = self.get_access_token()
-            
-            # Création d'un fichier Excel temporaire
-            with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as temp_file:
-                temp_file_path = temp_file.name
-            
-            # Export du DataFrame vers Excel
-            with pd.ExcelWriter(temp_file_path, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-            
-            logger.info(f"Fichier Excel temporaire créé: {temp_file_path}")
-            
-            # Lecture du contenu du fichier
-            with open(temp_file_path, 'rb') as file:
-                file_content = file.read()
+            headers = {
+                'Authorization': f'Bearer {token}',
+                'Content-Type': content_type
+            }
             
             # Tentative d'upload dans le dossier spécifique d'abord
             if self.folder_path:
-                upload_path = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/{self.folder_path}/{filename}.xlsx:/content"
+                upload_path = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/{self.folder_path}/{filename}:/content"
                 logger.info(f"Tentative d'upload dans le dossier spécifique: {upload_path}")
                 
-                headers = {
-                    'Authorization': f'Bearer {token}',
-                    'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                }
-                
-                response = requests.put(upload_path, data=file_content, headers=headers)
+                response = self._http('PUT', upload_path, timeout=UPLOAD_TIMEOUT,
+                                      data=content, headers=headers)
                 
                 if response.status_code in [200, 201]:
                     file_info = response.json()
+                    self._record_upload(file_info)
                     file_url = file_info.get('webUrl', '')
                     logger.info(f"Fichier uploadé avec succès dans le dossier spécifique: {file_url}")
                     return file_url
+                elif not falls_back_to_root(response.status_code):
+                    logger.error(f"Échec upload dossier spécifique - Code: {response.status_code}, "
+                                 f"pas de repli à la racine")
+                    return None
                 else:
                     logger.warning(f"Échec upload dossier spécifique - Code: {response.status_code}")
             
             # Fallback: upload à la racine
-            upload_path_root = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/{filename}.xlsx:/content"
+            upload_path_root = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/{filename}:/content"
             logger.info(f"Tentative d'upload à la racine: {upload_path_root}")
             
-            headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            }
-            
-            response = requests.put(upload_path_root, data=file_content, headers=headers)
+            response = self._http('PUT', upload_path_root, timeout=UPLOAD_TIMEOUT,
+                                  data=content, headers=headers)
             
             if response.status_code in [200, 201]:
                 file_info = response.json()
+                self._record_upload(file_info)
                 file_url = file_info.get('webUrl', '')
                 logger.info(f"Fichier uploadé avec succès à la racine: {file_url}")
                 return file_url
@@ -219,6 +272,90 @@ class SharePointDDASYSTester:
                 logger.error(f"Échec upload racine - Code: {response.status_code}, Réponse: {response.text}")
                 return None
                 
+        except CircuitOpenError as e:
+            logger.error(f"Upload de {filename} non tenté: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Erreur lors de l'upload de {filename}: {e}")
+            return None
+    
+    def upload_file(self, local_path: str, filename: str, content_type: str) -> Optional[str]:
+        """
+        Upload un fichier local en flux (dossier spécifique puis racine).
+        
+        Le fichier n'est jamais chargé entièrement en mémoire : PUT simple lu
+        depuis le disque, ou session d'upload fragmentée au-delà de 4 Mo.
+        
+        Args:
+            local_path: Chemin du fichier local
+            filename: Nom du fichier dans SharePoint (avec extension)
+            content_type: Type MIME du contenu
+            
+        Returns:
+            str: URL du fichier uploadé ou None en cas d'erreur
+        """
+        if not self.site_id or not self.drive_id:
+            if not self.get_site_and_drive_info():
+                return None
+        if self.client is None:
+            self.client = GraphClient(self.credential, metadata_cache=MetadataCache.from_env(),
+                                      breakers=self.breakers)
+        
+        targets = [f"{self.folder_path}/{filename}"] if self.folder_path else []
+        targets.append(filename)
+        for item_path in targets:
+            try:
+                file_info = self.client.upload_file(self.drive_id, item_path, local_path, content_type)
+                self._record_upload(file_info)
+                file_url = file_info.get('webUrl', '')
+                logger.info(f"Fichier uploadé avec succès: {file_url}")
+                return file_url
+            except Exception as e:
+                logger.warning(f"Échec upload vers {item_path}: {e}")
+                response = getattr(e, 'response', None)
+                if not falls_back_to_root(response.status_code if response is not None else None):
+                    break
+        
+        logger.error(f"Échec de l'upload de {filename}")
+        return None
+    
+    def _record_upload(self, file_info: dict) -> None:
+        """Enregistre l'élément uploadé dans l'index local s'il est activé."""
+        if self.index and file_info.get('id'):
+            self.index.upsert_items(self.drive_id, [file_info])
+    
+    def upload_excel_file(self, df: pd.DataFrame, filename: str, sheet_name: str = "Sheet1") -> Optional[str]:
+        """
+        Upload un DataFrame vers SharePoint en tant que fichier Excel.
+        
+        Args:
+            df: DataFrame pandas à exporter
+            filename: Nom du fichier (sans extension)
+            sheet_name: Nom de la feuille Excel
+            
+        Returns:
+            str: URL du fichier uploadé ou None en cas d'erreur
+        """
+        self._flush_bundles_if_due()
+        temp_file_path = None
+        try:
+            if not self.site_id or not self.drive_id:
+                if not self.get_site_and_drive_info():
+                    return None
+            
+            # Création d'un fichier Excel temporaire
+            with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as temp_file:
+                temp_file_path = temp_file.name
+            
+            # Export du DataFrame vers Excel
+            with pd.ExcelWriter(temp_file_path, engine='openpyxl') as writer:
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+            
+            logger.info(f"Fichier Excel temporaire créé: {temp_file_path}")
+            
+            # Upload en flux depuis le fichier temporaire (pas de copie en mémoire)
+            return self.upload_file(temp_file_path, f"{filename}.xlsx", XLSX_CONTENT_TYPE)
+                
         except Exception as e:
             logger.error(f"Erreur lors de l'upload: {e}")
             return None
@@ -231,68 +368,168 @@ class SharePointDDASYSTester:
                 except Exception as e:
                     logger.warning(f"Impossible de supprimer le fichier temporaire {temp_file_path}: {e}")
 
-    def upload_text_file(self, content: str, filename: str) -> Optional[str]:
+    def replicate_excel_file(self, df: pd.DataFrame, filename: str, targets: list,
+                             sheet_name: str = "Sheet1") -> Optional[dict]:
         """
-        Upload un fichier texte vers SharePoint.
+        Upload un DataFrame une seule fois puis le copie côté serveur vers d'autres bibliothèques.
+        
+        Le fichier est uploadé dans le dossier spécifique du drive courant, puis
+        dupliqué par l'action copy de Graph : les octets ne sont envoyés qu'une fois.
         
         Args:
-            content: Contenu du fichier texte
-            filename: Nom du fichier (avec extension)
+            df: DataFrame pandas à exporter
+            filename: Nom du fichier (sans extension)
+            targets: Cibles supplémentaires {"drive_id", "folder"}
+            sheet_name: Nom de la feuille Excel
             
         Returns:
-            str: URL du fichier uploadé ou None en cas d'erreur
+            dict: Rapport par cible (voir Replicator.replicate) ou None en cas d'erreur
         """
+        if not self.site_id or not self.drive_id:
+            if not self.get_site_and_drive_info():
+                return None
+        if self.client is None:
+            self.client = GraphClient(self.credential, metadata_cache=MetadataCache.from_env(),
+                                      breakers=self.breakers)
+        
+        temp_file_path = None
         try:
-            if not self.site_id or not self.drive_id:
-                if not self.get_site_and_drive_info():
-                    return None
+            with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as temp_file:
+                temp_file_path = temp_file.name
+            with pd.ExcelWriter(temp_file_path, engine='openpyxl') as writer:
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
             
-            token = self.get_access_token()
+            all_targets = [{"drive_id": self.drive_id, "folder": self.folder_path or ""}]
+            all_targets.extend(targets)
+            with Replicator(self.client) as replicator:
+                report = replicator.replicate_file(temp_file_path, all_targets,
+                                                   name=f"{filename}.xlsx",
+                                                   content_type=XLSX_CONTENT_TYPE)
+            if report["source"]:
+                self._record_upload(report["source"])
+            return report
+        except Exception as e:
+            logger.error(f"Erreur lors de la réplication: {e}")
+            return None
+        finally:
+            if temp_file_path:
+                Path(temp_file_path).unlink(missing_ok=True)
+
+    def upload_excel_files(self, frames: list, **pipeline_options) -> dict:
+        """
+        Upload plusieurs DataFrames en pipelinant sérialisation et upload.
+        
+        Args:
+            frames: Liste de tuples (nom sans extension, DataFrame, nom de feuille)
+            **pipeline_options: Options transmises à PipelinedExcelExporter
             
-            # Tentative d'upload dans le dossier spécifique d'abord
-            if self.folder_path:
-                upload_path = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/{self.folder_path}/{filename}:/content"
-                logger.info(f"Tentative d'upload texte dans le dossier spécifique: {upload_path}")
-                
-                headers = {
-                    'Authorization': f'Bearer {token}',
-                    'Content-Type': 'text/plain'
-                }
-                
-                response = requests.put(upload_path, data=content.encode('utf-8'), headers=headers)
-                
-                if response.status_code in [200, 201]:
-                    file_info = response.json()
-                    file_url = file_info.get('webUrl', '')
-                    logger.info(f"Fichier texte uploadé avec succès dans le dossier spécifique: {file_url}")
-                    return file_url
-                else:
-                    logger.warning(f"Échec upload texte dossier spécifique - Code: {response.status_code}")
+        Returns:
+            dict: Rapport d'export (URL et durées par fichier)
+        """
+        if not self.site_id or not self.drive_id:
+            if not self.get_site_and_drive_info():
+                return {"files": 0, "failed": len(frames), "results": []}
+        
+        exporter = PipelinedExcelExporter(self.upload_bytes, **pipeline_options)
+        report = exporter.export(frames)
+        logger.info(f"{report['files']} fichiers Excel exportés en {report['wall_seconds']:.1f}s "
+                    f"({report['failed']} échecs)")
+        return report
+
+    def append_excel_rows(self, df: pd.DataFrame, filename: str, table_name: str) -> Optional[int]:
+        """
+        Ajoute les lignes d'un DataFrame à une table d'un classeur existant.
+        
+        Contrairement à upload_excel_file, le classeur n'est ni régénéré ni
+        réuploadé : seules les nouvelles lignes sont transmises (API workbook).
+        
+        Args:
+            df: Lignes à ajouter (colonnes nommées comme l'en-tête de la table)
+            filename: Nom du classeur (sans extension), dossier spécifique puis racine
+            table_name: Nom de la table Excel
             
-            # Fallback: upload à la racine
-            upload_path_root = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/{filename}:/content"
-            logger.info(f"Tentative d'upload texte à la racine: {upload_path_root}")
+        Returns:
+            int: Nombre de lignes ajoutées ou None en cas d'erreur
+        """
+        if not self.site_id or not self.drive_id:
+            if not self.get_site_and_drive_info():
+                return None
+        if self.client is None:
+            self.client = GraphClient(self.credential, metadata_cache=MetadataCache.from_env(),
+                                      breakers=self.breakers)
+        
+        targets = [f"{self.folder_path}/{filename}.xlsx"] if self.folder_path else []
+        targets.append(f"{filename}.xlsx")
+        for item_path in targets:
+            session = WorkbookSession(self.client, self.drive_id, item_path)
+            try:
+                session.open()
+            except requests.HTTPError as e:
+                logger.warning(f"Classeur introuvable ou inaccessible: {item_path} ({e})")
+                continue
+            # Pas de repli une fois des lignes envoyées : risque de doublons
+            try:
+                count = session.append_dataframe(table_name, df)
+                logger.info(f"{count} lignes ajoutées à {item_path} ({session.stats['requests']} requêtes)")
+                return count
+            except Exception as e:
+                logger.error(f"Échec de l'ajout de lignes dans {item_path}: {e}")
+                return None
+            finally:
+                try:
+                    session.close()
+                except requests.RequestException as e:
+                    logger.warning(f"Fermeture de la session de classeur impossible: {e}")
+        
+        logger.error(f"Classeur {filename}.xlsx introuvable")
+        return None
+
+    def upload_text_file(self, content: str, filename: str) -> Optional[str]:
+        """
+        Upload un fichier texte vers SharePoint.
+        
+        Args:
+            content: Contenu du fichier texte
+            filename: Nom du fichier (avec extension)
             
-            headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'text/plain'
-            }
+        Returns:
+            str: URL du fichier uploadé, référence "archive#fichier" en mode
+            regroupement (uploadé avec son archive, voir bundler.lookup) ou
+            None en cas d'erreur
+        """
+        self._flush_bundles_if_due()
+        try:
+            # Gros contenu : encodage par blocs dans un fichier temporaire
+            if len(content) > SIMPLE_UPLOAD_LIMIT:
+                return self._upload_large_text(content, filename)
             
-            response = requests.put(upload_path_root, data=content.encode('utf-8'), headers=headers)
+            # Mode regroupement : les petits fichiers partent dans une archive
+            data = content.encode('utf-8')
+            if self.bundler:
+                reference = self.bundler.add(filename, data)
+                if reference:
+                    logger.info(f"Fichier texte ajouté au lot: {reference}")
+                    return reference
             
-            if response.status_code in [200, 201]:
-                file_info = response.json()
-                file_url = file_info.get('webUrl', '')
-                logger.info(f"Fichier texte uploadé avec succès à la racine: {file_url}")
-                return file_url
-            else:
-                logger.error(f"Échec upload texte racine - Code: {response.status_code}, Réponse: {response.text}")
-                return None
+            return self.upload_bytes(data, filename, 'text/plain')
                 
         except Exception as e:
             logger.error(f"Erreur lors de l'upload texte: {e}")
             return None
 
+    def _upload_large_text(self, content: str, filename: str, block_chars: int = 1024 * 1024) -> Optional[str]:
+        """Upload un gros texte sans en créer une copie encodée complète."""
+        temp_file_path = None
+        try:
+            with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as temp_file:
+                temp_file_path = temp_file.name
+                for start in range(0, len(content), block_chars):
+                    temp_file.write(content[start:start + block_chars].encode('utf-8'))
+            return self.upload_file(temp_file_path, filename, 'text/plain')
+        finally:
+            if temp_file_path:
+                Path(temp_file_path).unlink(missing_ok=True)
+
 
 def main():
     """Fonction principale de test."""
@@ -328,6 +565,21 @@ def main():
         folder_path=folder_path
     )
     
+    # Index local des éléments uploadés (opt-in)
+    index_path = os.getenv("SHAREPOINT_INDEX_PATH")
+    if index_path:
+        tester.index = DriveIndex(index_path)
+        print(f"🗂️  Index local activé: {index_path}")
+    
+    # Mode regroupement des petits fichiers (opt-in)
+    bundling_enabled = os.getenv("SHAREPOINT_BUNDLE_SMALL_FILES", "false").lower() == "true"
+    if bundling_enabled:
+        tester.enable_bundling(
+            size_threshold=int(os.getenv("SHAREPOINT_BUNDLE_THRESHOLD", str(256 * 1024))),
+            archive_format=os.getenv("SHAREPOINT_BUNDLE_FORMAT", "zip"),
+        )
+        print("📦 Regroupement des petits fichiers activé")
+    
     # Test 1: Connexion et lecture
     print("\n2. Test de connexion SharePoint...")
     try:
@@ -366,7 +618,11 @@ Test réussi ! 🎉
             filename=filename
         )
         
-        if file_url:
+        if file_url and tester.bundler and "#" in file_url \
+                and tester.bundler.lookup(file_url) is None:
+            print("📦 Fichier texte ajouté au lot, uploadé avec son archive")
+            print(f"   📄 Référence: {file_url}")
+        elif file_url:
             print("✅ Fichier texte uploadé avec succès !")
             print(f"   📄 URL: {file_url}")
         else:
@@ -407,10 +663,27 @@ Test réussi ! 🎉
     except Exception as e:
         print(f"❌ Erreur lors de l'upload Excel: {e}")
     
+    if tester.bundler:
+        print("\n📦 Regroupement des petits fichiers:")
+        try:
+            tester.bundler.flush()
+        except BundleUploadError as e:
+            print(f"❌ {len(e.bundles)} archive(s) non uploadée(s), conservées pour un "
+                  f"nouvel essai: {', '.join(tester.bundler.pending_bundles())}")
+        report = tester.bundler.report()
+        print(f"   Fichiers regroupés: {report['files_bundled']}")
+        print(f"   Requêtes: {report['requests_with_bundling']} au lieu de "
+              f"{report['requests_without_bundling']} "
+              f"(-{report['reduction_percent']}%)")
+    
+    if tester.client and tester.client.metadata_cache:
+        print_cache_summary(tester.client.metadata_cache)
+    print_breaker_states(tester.breakers)
+    
     print("\n" + "=" * 65)
     print("Test terminé ! 🎉")
     print("\nMaintenant vous pouvez procéder au test avec User Assigned Identity sur Azure.")
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    run_profiled(main)
\ No newline at end of file
@@ -9,6 +9,7 @@ import requests
 from datetime import datetime
 from azure.identity import AzureCliCredential
 from dotenv import load_dotenv
+from profiling import run_profiled
 
 # Chargement de la configuration
 load_dotenv('.env')
@@ -242,4 +243,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    run_profiled(main)
\ No newline at end of file